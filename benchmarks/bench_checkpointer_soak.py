@@ -0,0 +1,225 @@
+"""チェックポインタのソークテスト（セッション数に対するメモリ使用量）
+
+疑似 LLM・疑似ベクトルストアを注入した AgentWorkflow で、数千セッション
+（各セッションで複数の質問）を順に実行し、一定セッションごとに
+tracemalloc で Python ヒープの使用量を計測する。MemorySaver（memory）は
+セッション数に比例して増え続け、上限付きのチェックポインタ（bounded・sqlite）は
+スレッド数の上限に達した後は横ばいになることを確認する。
+
+実行例:
+    uv run python benchmarks/bench_checkpointer_soak.py
+    uv run python benchmarks/bench_checkpointer_soak.py --sessions 5000 --questions 1
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections.abc import AsyncIterator
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from langgraph.checkpoint.memory import MemorySaver
+
+from domain.config import WorkflowConfig
+from domain.models import (
+    DocumentChunk,
+    JudgeResult,
+    SearchResult,
+    Subtask,
+    TaskPlanningResult,
+)
+from domain.ports.llm_port import ChatResponse
+from interfaces.adapters.checkpointer import (
+    BoundedMemorySaver,
+    SQLiteCheckpointSaver,
+)
+from usecases.agent_workflow import AgentWorkflow
+
+# 検索結果1件あたりの本文（チェックポイントに保存される状態の大きさを現実に寄せる）
+_CHUNK_TEXT = "軸受の定格寿命は基本動定格荷重と等価荷重から求める。" * 10
+
+
+class _FakeLLM:
+    """固定の応答を即座に返す疑似 LLM"""
+
+    async def agenerate(
+        self,
+        messages: list[dict],
+        *,
+        num_predict: int | None = None,
+        reasoning: str | None = None,
+    ) -> ChatResponse:
+        return ChatResponse(content="要約: " + _CHUNK_TEXT[:400], thinking="")
+
+    async def agenerate_structured(
+        self,
+        messages: list[dict],
+        response_model: type,
+        *,
+        num_predict: int | None = None,
+        reasoning: str | None = None,
+    ) -> object:
+        if response_model is TaskPlanningResult:
+            return TaskPlanningResult(
+                subtasks=[
+                    Subtask(purpose="定義", queries=["定格寿命"]),
+                    Subtask(purpose="計算式", queries=["寿命計算"]),
+                ],
+            )
+        return JudgeResult(sufficient=True, reason="十分")
+
+    async def astream(
+        self,
+        messages: list[dict],
+        *,
+        reasoning: str | None = None,
+        temperature: float | None = None,
+    ) -> AsyncIterator[str]:
+        for token in ("定格寿命は", "L10 = (C/P)^3", " で求めます。"):
+            yield token
+
+
+class _FakeVectorStore:
+    """クエリごとに固定件数の検索結果を返す疑似ベクトルストア"""
+
+    async def ahybrid_search_many(
+        self,
+        queries: list[str],
+        k: int = 10,
+        bm25_weight: float = 0.3,
+    ) -> list[list[SearchResult]]:
+        return [
+            [
+                SearchResult(
+                    chunk=DocumentChunk(
+                        chunk_id=f"{query}-{i}",
+                        text=_CHUNK_TEXT,
+                        source="bearing.pdf",
+                        page=i,
+                    ),
+                    score=0.5,
+                )
+                for i in range(k)
+            ]
+            for query in queries
+        ]
+
+
+class _FakeReranker:
+    """上位 top_k 件をそのまま返す疑似 Reranker"""
+
+    async def arerank(
+        self,
+        query: str,
+        results: list[SearchResult],
+        top_k: int = 5,
+    ) -> list[SearchResult]:
+        return results[:top_k]
+
+
+async def _soak(
+    checkpointer: BaseCheckpointSaver,
+    *,
+    sessions: int,
+    questions: int,
+    samples: int,
+) -> tuple[list[tuple[int, float]], float]:
+    """セッションを順に実行し、(セッション数, ヒープ MB) の推移と所要時間を返す。"""
+    workflow = AgentWorkflow(
+        llm=_FakeLLM(),
+        vectorstore=_FakeVectorStore(),
+        reranker=_FakeReranker(),
+        config=WorkflowConfig(),
+        checkpointer=checkpointer,
+    )
+    every = max(1, sessions // samples)
+    series = []
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        for session in range(1, sessions + 1):
+            history: list[dict] = []
+            for q in range(questions):
+                question = f"セッション{session} の質問{q}: 定格寿命とは？"
+                result = await workflow.ainvoke(
+                    question,
+                    chat_history=history,
+                    thread_id=f"session-{session}",
+                )
+                history = [
+                    *history,
+                    {"role": "user", "content": question},
+                    {"role": "assistant", "content": result["answer"]},
+                ]
+            if session % every == 0:
+                current, _ = tracemalloc.get_traced_memory()
+                series.append((session, current / 1e6))
+    finally:
+        elapsed = time.perf_counter() - start
+        tracemalloc.stop()
+    return series, elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sessions", type=int, default=2000)
+    parser.add_argument(
+        "--questions", type=int, default=2, help="セッションあたりの質問数"
+    )
+    parser.add_argument("--samples", type=int, default=8, help="計測点の数")
+    parser.add_argument("--max-threads", type=int, default=256)
+    parser.add_argument("--max-per-thread", type=int, default=4)
+    parser.add_argument(
+        "--backends",
+        default="memory,bounded,sqlite",
+        help="計測するチェックポインタ（カンマ区切り）",
+    )
+    args = parser.parse_args()
+
+    limits = {
+        "max_threads": args.max_threads,
+        "thread_ttl": 0.0,
+        "max_checkpoints_per_thread": args.max_per_thread,
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "checkpoints.sqlite3"
+        factories = {
+            "memory": MemorySaver,
+            "bounded": lambda: BoundedMemorySaver(**limits),
+            "sqlite": lambda: SQLiteCheckpointSaver(db_path, **limits),
+        }
+        print(
+            f"sessions: {args.sessions}, questions/session: {args.questions}, "
+            f"max_threads: {args.max_threads}, "
+            f"max_checkpoints_per_thread: {args.max_per_thread}"
+        )
+        for backend in args.backends.split(","):
+            checkpointer = factories[backend]()
+            series, elapsed = asyncio.run(
+                _soak(
+                    checkpointer,
+                    sessions=args.sessions,
+                    questions=args.questions,
+                    samples=args.samples,
+                ),
+            )
+            print(f"\n[{backend}] {elapsed:.1f} s")
+            for session, mb in series:
+                print(f"  sessions {session:>6}: {mb:8.1f} MB")
+            growth = series[-1][1] - series[len(series) // 2][1]
+            print(f"  growth over last half : {growth:+.1f} MB")
+            if backend == "sqlite":
+                checkpointer.close()
+                size = db_path.stat().st_size / 1e6
+                print(f"  db file size          : {size:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+"""要約・判定の統合ノード（fused_summarize_judge）の評価
+
+固定の質問セットについて、summarize → judge の2回呼び出しと、
+summarize_judge の1回呼び出しを実行し、1ループあたりのレイテンシと
+判定（十分 / 再検索）の一致率を比較する。
+
+既定ではプロンプト長・出力長から処理時間を模擬する疑似 LLM を使う
+（判定は「各【目的】のキーワードが LLM の入力に含まれるか」で決まり、
+要約で情報が落ちると2回呼び出し側の判定が変わる）。--model を指定すると
+実際の Ollama で同じ比較を行う。
+
+実行例:
+    uv run python benchmarks/bench_fused_judge.py
+    uv run python benchmarks/bench_fused_judge.py --model gpt-oss:20b
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from domain.config import WorkflowConfig
+from domain.models import (
+    JudgeResult,
+    Subtask,
+    SummarizeJudgeResult,
+)
+from domain.ports.llm_port import ChatResponse, LLMPort
+from domain.token_budget import estimate_messages_tokens
+from interfaces.adapters.ollama_adapter import OllamaAdapter
+from usecases.nodes.judge_node import create_judge_node
+from usecases.nodes.summarize_judge_node import (
+    create_summarize_judge_node,
+)
+from usecases.nodes.summarize_node import create_summarize_node
+
+# 疑似 LLM の処理速度（トークン/秒）と1呼び出しあたりの固定コスト（秒）
+_PREFILL_TOKENS_PER_SEC = 2000.0
+_DECODE_TOKENS_PER_SEC = 40.0
+_CALL_OVERHEAD_SEC = 0.3
+
+# 疑似 LLM の要約が各ブロックから残す文字数と、キーワードを拾える範囲（先頭からの割合）
+_SUMMARY_CHARS_PER_BLOCK = 240
+_SUMMARY_KEYWORD_RANGE = 0.8
+
+_KEYWORD = re.compile(r"《(.+?)》")
+_PURPOSE = re.compile(r"【目的: (.+?)】")
+
+
+def _question_set(n: int, rng: random.Random) -> list[tuple[str, list[str]]]:
+    """（質問, 検索結果ブロック）の固定セットを生成する。
+
+    各ブロックには目的のキーワード《…》が含まれるか、含まれない（情報不足）。
+    キーワードがブロックの後半にあると、要約で落ちることがある。
+    """
+    words = [f"語{i}" for i in range(2000)]
+    questions = []
+    for q in range(n):
+        blocks = []
+        for p in range(rng.randint(1, 3)):
+            body = [" ".join(rng.choices(words, k=20)) for _ in range(12)]
+            if rng.random() < 0.75:
+                body.insert(rng.randrange(len(body)), f"《キーワード{q}-{p}》")
+            blocks.append(f"【目的: 観点{q}-{p}】\n" + "\n---\n".join(body))
+        questions.append((f"質問{q}: 観点{q} について教えてください", blocks))
+    return questions
+
+
+def _has_all_keywords(text: str) -> bool:
+    """各【目的】の区間にキーワードが含まれるか。"""
+    sections = _PURPOSE.split(text)[1:]
+    return all(_KEYWORD.search(body) for body in sections[1::2])
+
+
+class _SimulatedLLM:
+    """プロンプト長・出力長に比例して待つ疑似 LLM"""
+
+    def __init__(self, time_scale: float) -> None:
+        self._time_scale = time_scale
+
+    async def _wait(self, messages: list[dict], output: str) -> None:
+        seconds = (
+            _CALL_OVERHEAD_SEC
+            + estimate_messages_tokens(messages) / _PREFILL_TOKENS_PER_SEC
+            + estimate_messages_tokens([{"content": output}]) / _DECODE_TOKENS_PER_SEC
+        )
+        await asyncio.sleep(seconds * self._time_scale)
+
+    @staticmethod
+    def _summarize(text: str) -> str:
+        """各ブロックの先頭と、末尾付近以外にあるキーワードを残す。"""
+        parts = []
+        for block in text.split("【目的: ")[1:]:
+            limit = len(block) * _SUMMARY_KEYWORD_RANGE
+            keywords = [
+                m.group(0) for m in _KEYWORD.finditer(block) if m.start() < limit
+            ]
+            head = block[:_SUMMARY_CHARS_PER_BLOCK].strip()
+            parts.append("【目的: " + " ".join([head, *keywords]))
+        return "\n".join(parts)
+
+    async def agenerate(
+        self,
+        messages: list[dict],
+        *,
+        num_predict: int | None = None,
+        reasoning: str | None = None,
+    ) -> ChatResponse:
+        summary = self._summarize(messages[-1]["content"])
+        await self._wait(messages, summary)
+        return ChatResponse(content=summary, thinking="")
+
+    async def agenerate_structured(
+        self,
+        messages: list[dict],
+        response_model: type,
+        *,
+        num_predict: int | None = None,
+        reasoning: str | None = None,
+    ) -> object:
+        text = messages[-1]["content"]
+        sufficient = _has_all_keywords(text)
+        judgement = JudgeResult(
+            sufficient=sufficient,
+            reason="十分" if sufficient else "キーワードが不足しています",
+            additional_subtasks=(
+                None
+                if sufficient
+                else [Subtask(purpose="追加調査", queries=["キーワード"])]
+            ),
+        )
+        if response_model is SummarizeJudgeResult:
+            result: object = SummarizeJudgeResult(
+                summary=self._summarize(text),
+                judgement=judgement,
+            )
+        else:
+            result = judgement
+        await self._wait(messages, result.model_dump_json())
+        return result
+
+
+async def _run(
+    llm: LLMPort,
+    config: WorkflowConfig,
+    questions: list[tuple[str, list[str]]],
+) -> tuple[list[float], list[float], list[bool], list[bool]]:
+    """各質問で両方式を1ループ分実行し、所要時間と判定を返す。"""
+    summarize = create_summarize_node(llm, config)
+    judge = create_judge_node(llm, config)
+    fused = create_summarize_judge_node(llm, config)
+
+    two_call_times, fused_times = [], []
+    two_call_decisions, fused_decisions = [], []
+    for question, blocks in questions:
+        state = {"question": question, "search_results": blocks, "loop_count": 0}
+
+        start = time.perf_counter()
+        summarized = {**state, **(await summarize(state))}
+        result = await judge(summarized)
+        two_call_times.append(time.perf_counter() - start)
+        two_call_decisions.append(not result["subtasks"])
+
+        start = time.perf_counter()
+        result = await fused(state)
+        fused_times.append(time.perf_counter() - start)
+        fused_decisions.append(not result["subtasks"])
+    return two_call_times, fused_times, two_call_decisions, fused_decisions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--questions", type=int, default=20)
+    parser.add_argument("--model", default="", help="計測に使う Ollama モデル")
+    parser.add_argument(
+        "--time-scale",
+        type=float,
+        default=0.05,
+        help="疑似 LLM の待ち時間の倍率（表示は 1.0 に換算）",
+    )
+    args = parser.parse_args()
+
+    config = WorkflowConfig(max_loop_count=2)
+    questions = _question_set(args.questions, random.Random(0))
+    if args.model:
+        llm: LLMPort = OllamaAdapter(
+            args.model,
+            num_ctx=config.llm_num_ctx,
+            keep_alive=config.llm_keep_alive,
+            base_url=os.environ.get("OLLAMA_HOST"),
+        )
+        scale = 1.0
+    else:
+        llm = _SimulatedLLM(args.time_scale)
+        scale = args.time_scale
+
+    two_call, fused, two_call_ok, fused_ok = asyncio.run(
+        _run(llm, config, questions),
+    )
+    agree = sum(a == b for a, b in zip(two_call_ok, fused_ok))
+    two_call_mean = sum(two_call) / len(two_call) / scale
+    fused_mean = sum(fused) / len(fused) / scale
+    print(f"questions                 : {len(questions)}")
+    print(f"summarize + judge (mean)  : {two_call_mean:.2f} s")
+    print(f"summarize_judge (mean)    : {fused_mean:.2f} s")
+    print(f"latency reduction         : {1 - fused_mean / two_call_mean:.0%}")
+    print(f"sufficient (two-call)     : {sum(two_call_ok)}/{len(questions)}")
+    print(f"sufficient (fused)        : {sum(fused_ok)}/{len(questions)}")
+    print(
+        f"decision agreement        : {agree}/{len(questions)} "
+        f"({agree / len(questions):.0%})"
+    )
+
+
+if __name__ == "__main__":
+    main()
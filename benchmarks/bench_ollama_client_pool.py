@@ -0,0 +1,127 @@
+"""OllamaAdapter のクライアントプールによる呼び出しオーバーヘッドのベンチマーク
+
+ローカルに起動した偽の Ollama サーバ（/api/chat に即座に応答する）に対して、
+呼び出しごとに ChatOllama を生成する従来方式と、プールした ChatOllama を
+再利用する方式の1呼び出しあたりの時間と TCP 接続数を比較する。
+推論時間を含まないため、差分がそのままクライアント側のオーバーヘッドになる。
+
+実行例:
+    uv run python benchmarks/bench_ollama_client_pool.py --calls 200
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import sys
+import threading
+import time
+from collections.abc import Callable
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from pydantic import BaseModel
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from interfaces.adapters.ollama_adapter import OllamaAdapter
+
+_MODEL = "fake-model"
+
+
+class _Verdict(BaseModel):
+    sufficient: bool
+    reason: str
+
+
+class _FakeOllamaHandler(BaseHTTPRequestHandler):
+    """/api/chat に固定の応答を NDJSON で返す偽 Ollama サーバ"""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    connections = 0
+
+    def setup(self) -> None:
+        super().setup()
+        type(self).connections += 1
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(length)
+        content = json.dumps({"sufficient": True, "reason": "ok"})
+        body = (
+            json.dumps(
+                {
+                    "model": _MODEL,
+                    "created_at": "2026-01-01T00:00:00Z",
+                    "message": {"role": "assistant", "content": content},
+                    "done": True,
+                    "done_reason": "stop",
+                },
+            )
+            + "\n"
+        ).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+
+async def _run(
+    calls: int,
+    get_adapter: Callable[[], OllamaAdapter],
+    messages: list[dict],
+) -> float:
+    start = time.perf_counter()
+    for i in range(calls):
+        adapter = get_adapter()
+        if i % 2 == 0:
+            await adapter.agenerate(messages, num_predict=256)
+        else:
+            await adapter.agenerate_structured(messages, _Verdict, num_predict=256)
+    return (time.perf_counter() - start) / calls
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=200)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _FakeOllamaHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    messages = [
+        {"role": "system", "content": "あなたは評価者です。"},
+        {"role": "user", "content": "情報は十分ですか？"},
+    ]
+
+    shared = OllamaAdapter(_MODEL, base_url=base_url)
+    factories: dict[str, Callable[[], OllamaAdapter]] = {
+        # 従来方式相当: 呼び出しごとに新しい ChatOllama（と HTTP クライアント）を使う
+        "per-call": lambda: OllamaAdapter(_MODEL, base_url=base_url),
+        "pooled": lambda: shared,
+    }
+
+    results: dict[str, tuple[float, int]] = {}
+    for label, factory in factories.items():
+        _FakeOllamaHandler.connections = 0
+        latency = asyncio.run(_run(args.calls, factory, messages))
+        results[label] = (latency, _FakeOllamaHandler.connections)
+
+    server.shutdown()
+
+    print(f"calls                : {args.calls}")
+    for label, (latency, connections) in results.items():
+        print(f"{label:<9} per call    : {latency * 1000:.2f} ms")
+        print(f"{label:<9} connections : {connections}")
+    speedup = results["per-call"][0] / results["pooled"][0]
+    print(f"speedup              : {speedup:.1f} x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""プロンプト配置による KV キャッシュ再利用（prompt_eval 削減）のベンチマーク
+
+複数ターンの会話で回答生成プロンプトを組み立て、直前のターンと先頭が一致する
+文字数（Ollama が KV キャッシュを再利用できる範囲）を legacy / stable_prefix
+配置で比較する。--model を指定すると実際の Ollama に送信し、応答統計の
+prompt_eval_duration（プロンプト処理時間）の合計も比較する。
+
+実行例:
+    uv run python benchmarks/bench_prompt_prefix.py --turns 8
+    uv run python benchmarks/bench_prompt_prefix.py --turns 8 --model gpt-oss:20b
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+from itertools import pairwise
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from domain.config import WorkflowConfig
+from domain.telemetry import RequestTelemetry, current_telemetry
+from interfaces.adapters.ollama_adapter import OllamaAdapter
+from usecases.prompt_layout import (
+    LEGACY,
+    STABLE_PREFIX,
+    build_answer_messages,
+)
+
+_LAYOUTS = [LEGACY, STABLE_PREFIX]
+
+
+def _session(turns: int, rng: random.Random) -> list[tuple[str, list[str], str]]:
+    """（質問, 検索結果, 回答）のターン列を生成する。"""
+    words = [f"語{i}" for i in range(3000)]
+    return [
+        (
+            f"質問{t}: " + " ".join(rng.choices(words, k=12)),
+            [" ".join(rng.choices(words, k=150)) for _ in range(5)],
+            f"回答{t}: " + " ".join(rng.choices(words, k=80)),
+        )
+        for t in range(turns)
+    ]
+
+
+def _build_turns(
+    config: WorkflowConfig,
+    session: list[tuple[str, list[str], str]],
+) -> list[list[dict]]:
+    """各ターンの回答生成メッセージ列を返す。"""
+    history: list[dict] = []
+    prompts = []
+    for question, results, answer in session:
+        prompts.append(
+            build_answer_messages(
+                config,
+                user_prompt=config.system_prompt_user_default,
+                question=question,
+                search_results=results,
+                history=history,
+            ),
+        )
+        history += [
+            {"role": "user", "content": question},
+            {"role": "assistant", "content": answer},
+        ]
+    return prompts
+
+
+def _render(messages: list[dict]) -> str:
+    return "".join(f"<{m['role']}>{m['content']}" for m in messages)
+
+
+def _common_prefix(a: str, b: str) -> int:
+    n = 0
+    for x, y in zip(a, b):
+        if x != y:
+            break
+        n += 1
+    return n
+
+
+async def _measure_prompt_eval(
+    model: str,
+    config: WorkflowConfig,
+    prompts: list[list[dict]],
+) -> float:
+    """実際の Ollama に送信し、prompt_eval_duration の合計（秒）を返す。"""
+    llm = OllamaAdapter(
+        model,
+        num_ctx=config.llm_num_ctx,
+        keep_alive=config.llm_keep_alive,
+        base_url=os.environ.get("OLLAMA_HOST"),
+    )
+    # 直前の計測の KV キャッシュを無関係なプロンプトで追い出す
+    await llm.agenerate([{"role": "user", "content": "こんにちは"}], num_predict=1)
+
+    telemetry = RequestTelemetry()
+    token = current_telemetry.set(telemetry)
+    try:
+        for messages in prompts:
+            await llm.agenerate(messages, num_predict=1)
+    finally:
+        current_telemetry.reset(token)
+    return telemetry.total.prompt_eval_duration
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--turns", type=int, default=8)
+    parser.add_argument("--model", default="", help="計測に使う Ollama モデル")
+    args = parser.parse_args()
+
+    session = _session(args.turns, random.Random(0))
+    for layout in _LAYOUTS:
+        config = WorkflowConfig(prompt_layout=layout)
+        prompts = _build_turns(config, session)
+        rendered = [_render(m) for m in prompts]
+        total = sum(len(r) for r in rendered)
+        reused = sum(_common_prefix(prev, cur) for prev, cur in pairwise(rendered))
+        print(f"[{layout}]")
+        print(f"  prompt chars (all turns) : {total}")
+        print(f"  reusable prefix chars    : {reused} ({reused / total:.0%})")
+        print(f"  chars to evaluate        : {total - reused}")
+        if args.model:
+            seconds = asyncio.run(_measure_prompt_eval(args.model, config, prompts))
+            print(f"  prompt_eval_duration     : {seconds:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""検索結果の重複除外・パッセージ結合によるプロンプトトークンの削減量
+
+chunk_overlap 付きで分割した疑似コーパスに対し、クエリの話題に近い連続
+チャンクを返す疑似ベクトルストアで doc_search ノードを2ループ分実行する
+（2ループ目は judge が追加したサブタスクを想定）。要約に渡る検索結果の
+推定トークン数を、search_dedup・search_merge_adjacent の組み合わせごとに比較する。
+
+実行例:
+    uv run python benchmarks/bench_search_dedup.py
+    uv run python benchmarks/bench_search_dedup.py --chunk-size 800 --overlap 200
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from domain.config import WorkflowConfig
+from domain.models import DocumentChunk, SearchResult
+from domain.token_budget import estimate_tokens
+from usecases.nodes.doc_search_node import (
+    create_doc_search_node,
+    create_result_resolver,
+)
+
+_TOPICS = ["定格寿命", "潤滑", "取付け", "予圧", "はめあい", "損傷"]
+
+# 1ループ目のサブタスク（話題の近いクエリで同じ付近のチャンクが返る）
+_FIRST_LOOP = [
+    {"purpose": "定義", "queries": ["定格寿命", "定格寿命 定義"]},
+    {"purpose": "計算手順", "queries": ["定格寿命 計算", "潤滑 寿命補正"]},
+    {"purpose": "使用条件", "queries": ["潤滑", "取付け"]},
+]
+# 2ループ目に judge が追加するサブタスク
+_SECOND_LOOP = [
+    {"purpose": "補正係数", "queries": ["潤滑 寿命補正", "予圧"]},
+    {"purpose": "不具合事例", "queries": ["損傷", "取付け"]},
+]
+
+
+def _build_corpus(
+    docs: int,
+    chunk_size: int,
+    overlap: int,
+) -> tuple[list[DocumentChunk], dict[str, list[int]]]:
+    """話題ごとの節からなる疑似資料を chunk_overlap 付きで分割する。"""
+    chunks: list[DocumentChunk] = []
+    topic_chunks: dict[str, list[int]] = {t: [] for t in _TOPICS}
+    for d in range(docs):
+        source = f"manual-{d}.pdf"
+        sections = []
+        for t, topic in enumerate(_TOPICS):
+            sentences = "".join(
+                f"資料{d}の{topic}に関する第{i}項では、条件{(i * 7 + t) % 11}の"
+                f"場合の値{(d + 1) * (i + 3) * (t + 2)}を用いて手順を説明する。"
+                for i in range(12)
+            )
+            sections.append((topic, sentences))
+
+        text = "".join(s for _, s in sections)
+        bounds = []
+        start = 0
+        for topic, s in sections:
+            bounds.append((start, start + len(s), topic))
+            start += len(s)
+
+        step = chunk_size - overlap
+        for index, pos in enumerate(range(0, len(text) - overlap, step)):
+            topic = next(t for b, e, t in bounds if b <= pos < e)
+            topic_chunks[topic].append(len(chunks))
+            chunks.append(
+                DocumentChunk(
+                    chunk_id=f"{source}-{index}",
+                    text=text[pos : pos + chunk_size],
+                    source=source,
+                    metadata={"chunk_index": index},
+                ),
+            )
+    return chunks, topic_chunks
+
+
+class _TopicVectorStore:
+    """クエリに含まれる話題の連続チャンクを返す疑似ベクトルストア"""
+
+    def __init__(
+        self,
+        chunks: list[DocumentChunk],
+        topic_chunks: dict[str, list[int]],
+    ) -> None:
+        self._chunks = chunks
+        self._topic_chunks = topic_chunks
+
+    def get_chunks(self, chunk_ids: list[str]) -> list[DocumentChunk]:
+        by_id = {c.chunk_id: c for c in self._chunks}
+        return [by_id[cid] for cid in chunk_ids if cid in by_id]
+
+    def _search(self, query: str, k: int) -> list[SearchResult]:
+        terms = query.split()
+        hits = [
+            i
+            for term in terms
+            if term in self._topic_chunks
+            for i in self._topic_chunks[term]
+        ]
+        # 語ごとに少しずらした位置から取る（同じ付近のチャンクが重なって返る）
+        offset = sum(len(term) for term in terms[1:]) % 3
+        hits = list(dict.fromkeys(hits[offset:] + hits[:offset]))
+        return [
+            SearchResult(chunk=self._chunks[i], score=1.0 - rank / (k + 1))
+            for rank, i in enumerate(hits[:k])
+        ]
+
+    async def ahybrid_search_many(
+        self,
+        queries: list[str],
+        k: int = 10,
+        bm25_weight: float = 0.3,
+    ) -> list[list[SearchResult]]:
+        return [self._search(q, k) for q in queries]
+
+
+class _PassThroughReranker:
+    """上位 top_k 件をそのまま返す疑似 Reranker"""
+
+    async def arerank(
+        self,
+        query: str,
+        results: list[SearchResult],
+        top_k: int = 5,
+    ) -> list[SearchResult]:
+        return results[:top_k]
+
+
+async def _run(vectorstore: _TopicVectorStore, config: WorkflowConfig) -> list[int]:
+    """2ループ分の検索を行い、ループごとに要約へ渡る検索結果のトークン数を返す。"""
+    node = create_doc_search_node(vectorstore, _PassThroughReranker(), config)
+    resolve = create_result_resolver(vectorstore, config)
+    state: dict = {"search_results": [], "retrieved_chunk_ids": []}
+    tokens = []
+    for subtasks in (_FIRST_LOOP, _SECOND_LOOP):
+        summarized = len(state["search_results"])
+        state.update(await node({**state, "subtasks": subtasks}))
+        new_blocks = resolve(state["search_results"][summarized:])
+        tokens.append(estimate_tokens("\n\n".join(new_blocks)))
+    return tokens
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--docs", type=int, default=3, help="疑似資料の数")
+    parser.add_argument("--chunk-size", type=int, default=500)
+    parser.add_argument("--overlap", type=int, default=100)
+    parser.add_argument("--rerank-top-k", type=int, default=5)
+    args = parser.parse_args()
+
+    chunks, topic_chunks = _build_corpus(args.docs, args.chunk_size, args.overlap)
+    vectorstore = _TopicVectorStore(chunks, topic_chunks)
+    variants = {
+        "baseline": {},
+        "dedup": {"search_dedup": True},
+        "merge": {"search_merge_adjacent": True},
+        "dedup+merge": {"search_dedup": True, "search_merge_adjacent": True},
+    }
+    print(
+        f"chunks: {len(chunks)}, chunk_size: {args.chunk_size}, "
+        f"overlap: {args.overlap}, rerank_top_k: {args.rerank_top_k}"
+    )
+    print(f"{'variant':<12} {'loop 1':>8} {'loop 2':>8} {'total':>8} {'saved':>7}")
+    baseline = None
+    for name, flags in variants.items():
+        config = WorkflowConfig(rerank_top_k=args.rerank_top_k, **flags)
+        tokens = asyncio.run(_run(vectorstore, config))
+        total = sum(tokens)
+        baseline = baseline or total
+        print(
+            f"{name:<12} {tokens[0]:>8} {tokens[1]:>8} {total:>8} "
+            f"{1 - total / baseline:>7.1%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
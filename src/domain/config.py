@@ -1,8 +1,12 @@
 """ハイパーパラメータの一元管理"""
 
-from pydantic import Field
+import logging
+
+from pydantic import Field, model_validator
 from pydantic_settings import BaseSettings
 
+logger = logging.getLogger(__name__)
+
 
 class WorkflowConfig(BaseSettings):
     """Agentic RAG ワークフローのハイパーパラメータ"""
@@ -20,7 +24,21 @@ class WorkflowConfig(BaseSettings):
     )
     llm_num_ctx: int = Field(
         default=16384,
-        description="コンテキストウィンドウサイズ",
+        description="コンテキストウィンドウサイズ（動的に選ぶ場合は上限）",
+    )
+    llm_num_ctx_buckets: list[int] = Field(
+        default_factory=list,
+        description=(
+            "プロンプト長に応じて呼び出しごとに選ぶ num_ctx の区切り値"
+            "（空なら llm_num_ctx で固定。切り替わるたびに再ロードが発生しうる）"
+        ),
+    )
+    answer_num_predict_reserve: int = Field(
+        default=4096,
+        description=(
+            "回答生成で出力（推論過程を含む）のために確保するトークン数。"
+            "残りをプロンプト（検索結果・会話履歴）の上限とする"
+        ),
     )
     llm_temperature: float = Field(
         default=0.8,
@@ -32,6 +50,29 @@ class WorkflowConfig(BaseSettings):
         default=1.1,
         description="繰り返しペナルティ",
     )
+    llm_keep_alive: str = Field(
+        default="30m",
+        description="Ollama がモデル（と KV キャッシュ）をメモリに保持する時間",
+    )
+    llm_reload_warning_seconds: float = Field(
+        default=1.0,
+        description=(
+            "初回以降の load_duration がこの秒数を超えたら再ロードとして警告する"
+        ),
+    )
+
+    # --- プロンプト配置 ---
+    prompt_layout: str = Field(
+        default="legacy",
+        description=(
+            "メッセージの配置（legacy: 従来の配置 / stable_prefix: 静的なシステム"
+            "プロンプトと会話履歴を先頭に固定し、検索結果など変動する内容を末尾に置く）"
+        ),
+    )
+    answer_history_messages: int = Field(
+        default=4,
+        description="回答生成に含める直近の会話履歴のメッセージ数",
+    )
 
     # --- ノードごとの推論パラメータ ---
     reasoning_task_planning: str = Field(
@@ -60,6 +101,27 @@ class WorkflowConfig(BaseSettings):
         default=4096,
         description="構造化出力の最大トークン数",
     )
+    task_planning_pipeline: bool = Field(
+        default=False,
+        description=(
+            "タスク分割の構造化出力をストリーミングし、確定したサブタスクから"
+            "順に検索を始める（パイプライン実行）"
+        ),
+    )
+    speculative_retrieval: bool = Field(
+        default=False,
+        description=(
+            "タスク分割と並行して生の質問で検索を始め、結果をサブタスクの"
+            "検索結果と統合する（タスク分割失敗時はそのまま使う）"
+        ),
+    )
+    speculative_answer: bool = Field(
+        default=False,
+        description=(
+            "十分性判定と並行して回答生成を始め、十分と判定されたら採用する"
+            "（再検索となった場合は生成を中止する。UI のストリーミング経路のみ）"
+        ),
+    )
     summarize_timeout: float = Field(
         default=180.0,
         description="要約のタイムアウト（秒）",
@@ -68,6 +130,134 @@ class WorkflowConfig(BaseSettings):
         default=4096,
         description="要約の最大トークン数",
     )
+    summarize_map_reduce: bool = Field(
+        default=False,
+        description=(
+            "検索結果を【目的】ブロックごとに並列に要約する（map）。"
+            "False なら全ブロックを1回の呼び出しで要約する"
+        ),
+    )
+    summarize_map_concurrency: int = Field(
+        default=3,
+        description="map 要約の同時実行数の上限",
+    )
+    summarize_map_num_predict: int = Field(
+        default=1024,
+        description="map 要約1件あたりの最大トークン数",
+    )
+    summarize_reduce: bool = Field(
+        default=False,
+        description="map 要約の結果を1回の呼び出しで統合する（reduce）",
+    )
+    fused_summarize_judge: bool = Field(
+        default=False,
+        description=(
+            "要約と十分性判定を1回の構造化出力呼び出しで行う"
+            "（summarize → judge の2往復を1往復にする）"
+        ),
+    )
+    summarize_incremental: bool = Field(
+        default=False,
+        description=(
+            "再検索ループでは前回の要約に含まれていない検索結果ブロックだけを"
+            "要約し、前回の要約と統合する"
+        ),
+    )
+
+    # --- リクエストの締め切り ---
+    request_deadline_seconds: float = Field(
+        default=0.0,
+        description=(
+            "質問1件の回答完了までの時間予算（秒）。0 以下なら締め切りなしで、"
+            "各ノードは固定のタイムアウトのみで動く"
+        ),
+    )
+    deadline_answer_reserve: float = Field(
+        default=60.0,
+        description="締め切りのうち回答生成のために残しておく時間（秒）",
+    )
+    deadline_pressure_seconds: float = Field(
+        default=60.0,
+        description=(
+            "中間ノードの残り時間がこれを切ると縮退する"
+            "（推論強度を下げ、要約・判定を省略する）"
+        ),
+    )
+    deadline_context_tokens: int = Field(
+        default=4096,
+        description="縮退時に回答生成のプロンプトに入れる検索結果・履歴の上限トークン数",
+    )
+
+    # --- LLM スケジューリング ---
+    llm_max_concurrency: int = Field(
+        default=2,
+        description=(
+            "Ollama への同時 LLM 呼び出し数の上限"
+            "（0 以下ならスケジューラを使わず無制限）"
+        ),
+    )
+    llm_speculative_slots: int = Field(
+        default=1,
+        description=(
+            "投機的な回答生成（speculative_answer）専用の予約スロット数（1 以上）。"
+            "llm_max_concurrency とは別枠で、judge などの呼び出しを待たせない"
+        ),
+    )
+
+    # --- LLM 応答キャッシュ ---
+    llm_cache_task_planning: bool = Field(
+        default=False,
+        description="task_planning の LLM 応答をキャッシュするか",
+    )
+    llm_cache_summarize: bool = Field(
+        default=False,
+        description="summarize の LLM 応答をキャッシュするか",
+    )
+    llm_cache_judge: bool = Field(
+        default=False,
+        description="judge の LLM 応答をキャッシュするか",
+    )
+    llm_cache_ttl: float = Field(
+        default=3600.0,
+        description="LLM 応答キャッシュの有効期間（秒）",
+    )
+    llm_cache_max_entries: int = Field(
+        default=1024,
+        description="LLM 応答キャッシュの最大エントリ数",
+    )
+    llm_cache_path: str = Field(
+        default="",
+        description=(
+            "LLM 応答キャッシュを永続化する SQLite ファイルのパス"
+            "（空文字ならメモリ上のみ）"
+        ),
+    )
+
+    # --- チェックポインタ ---
+    checkpointer_backend: str = Field(
+        default="memory",
+        description=(
+            "ワークフローのチェックポインタ。memory: 上限なし（MemorySaver）、"
+            "bounded: スレッド数・TTL・チェックポイント数に上限を持つメモリ上の保存、"
+            "sqlite: checkpoint_path の SQLite ファイルに同じ上限で保存"
+        ),
+    )
+    checkpoint_max_threads: int = Field(
+        default=1024,
+        description="保持するスレッド（セッション）数の上限（0 以下なら無制限）",
+    )
+    checkpoint_thread_ttl: float = Field(
+        default=3600.0,
+        description="最終アクセスからスレッドを破棄するまでの秒数（0 以下なら無期限）",
+    )
+    checkpoint_max_per_thread: int = Field(
+        default=4,
+        description="名前空間ごとに残すチェックポイント数（0 以下なら無制限）",
+    )
+    checkpoint_path: str = Field(
+        default="checkpoints/checkpoints.sqlite3",
+        description="checkpointer_backend=sqlite のときの SQLite ファイルのパス",
+    )
 
     # --- 検索パラメータ ---
     retrieval_top_k: int = Field(
@@ -86,6 +276,76 @@ class WorkflowConfig(BaseSettings):
         default=8000,
         description="検索結果の最大文字数",
     )
+    search_result_refs: bool = Field(
+        default=False,
+        description=(
+            "ワークフローの状態に検索結果の本文ではなくチャンク ID・スコアを載せ、"
+            "本文はプロンプトの組み立て時にストアから取得するか"
+            "（チェックポイントと状態コピーを小さくする）"
+        ),
+    )
+    search_dedup: bool = Field(
+        default=False,
+        description=(
+            "取得済みのチャンク（他のクエリ・サブタスク、前のループで取得したもの）を"
+            "チャンク ID で除き、検索結果に同じチャンクを2回載せないか"
+        ),
+    )
+    search_merge_adjacent: bool = Field(
+        default=False,
+        description=(
+            "同じ資料の隣接・重複するチャンクを、重なりを除いて1つのパッセージに"
+            "つなげるか"
+        ),
+    )
+    search_merge_min_overlap: int = Field(
+        default=20,
+        description=(
+            "通し番号のないチャンクを本文の重なりで隣接とみなす最小文字数"
+            "（偶然の一致でつなげないため）"
+        ),
+    )
+    context_pack_tokens: int = Field(
+        default=0,
+        description=(
+            "要約・回答のプロンプトに入れる検索結果パッセージの合計トークン数の上限。"
+            "Reranker スコアの高い順に詰める（search_result_refs が有効な場合のみ。"
+            "0 なら詰め込みを行わない）"
+        ),
+    )
+    context_mmr_lambda: float = Field(
+        default=1.0,
+        description=(
+            "パッセージを詰める際の MMR の重み（1.0 ならスコア順のみ。小さいほど"
+            "選択済みのパッセージと Embedding が似たものを後回しにする）"
+        ),
+    )
+    retrieval_max_workers: int = Field(
+        default=4,
+        description="検索・Reranking を実行するスレッドプールのワーカー数",
+    )
+    retrieval_fast_path: bool = Field(
+        default=False,
+        description=(
+            "Reranker スコアの確信度が高ければ要約・判定を省略して回答生成に進む"
+        ),
+    )
+    fast_path_score_threshold: float = Field(
+        default=0.9,
+        description="サブタスクを確信ありとみなす較正済み最上位スコアの閾値",
+    )
+    fast_path_min_coverage: float = Field(
+        default=1.0,
+        description="ファストパスに必要な、閾値を超えたサブタスクの割合",
+    )
+    reranker_calibration_slope: float = Field(
+        default=1.0,
+        description="Reranker スコア較正（Platt スケーリング）の傾き",
+    )
+    reranker_calibration_intercept: float = Field(
+        default=0.0,
+        description="Reranker スコア較正（Platt スケーリング）の切片",
+    )
 
     # --- チャンク分割パラメータ ---
     chunk_size: int = Field(default=500, description="チャンクサイズ（文字数）")
@@ -98,6 +358,26 @@ class WorkflowConfig(BaseSettings):
         description="spaCy 分割前のブロック最大バイト数",
     )
 
+    # --- インデックススナップショット ---
+    index_snapshot_dir: str = Field(
+        default="",
+        description=(
+            "起動時に復元する検索インデックスのスナップショットディレクトリ"
+            "（空文字なら復元しない）"
+        ),
+    )
+    index_shared_root: str = Field(
+        default="",
+        description=(
+            "読み取り専用ワーカーが参照する公開済みインデックスのルート"
+            "（指定時は Chroma DB の代わりに共有メモリマップ上の世代を検索する）"
+        ),
+    )
+    index_refresh_interval: float = Field(
+        default=5.0,
+        description="読み取り専用ワーカーが新しい世代を確認する間隔（秒）",
+    )
+
     # --- Embedding / Reranker モデル ---
     embedding_model_name: str = Field(
         default="cl-nagoya/ruri-v3-310m",
@@ -107,6 +387,13 @@ class WorkflowConfig(BaseSettings):
         default="cl-nagoya/ruri-v3-reranker-310m",
         description="Reranker モデル名",
     )
+    warmup_enabled: bool = Field(
+        default=True,
+        description=(
+            "起動時にバックグラウンドで LLM・Embedding・Reranker・形態素解析"
+            "モデルをロードし、ダミー推論を実行する"
+        ),
+    )
 
     # --- システムプロンプト ---
     system_prompt_task_planning: str = Field(
@@ -136,6 +423,31 @@ class WorkflowConfig(BaseSettings):
         ),
         description="要約ノードのシステムプロンプト",
     )
+    system_prompt_summarize_map: str = Field(
+        default=(
+            "あなたは検索結果を要約するアシスタントです。\n"
+            "以下は1つの【目的】について検索した結果です。"
+            "ユーザの質問に回答するために必要な情報に絞って日本語で要約してください。\n\n"
+            "要約のルール:\n"
+            "- 得られた主要な情報を箇条書きで整理する。\n"
+            "- 数値・固有名詞・技術用語は正確に保持する。\n"
+            "- 目的に対して情報が不足していれば、「情報不足」と明記する。\n"
+            "- 要約を300文字以内に収める。"
+        ),
+        description="map 要約（【目的】ブロック単位）のシステムプロンプト",
+    )
+    system_prompt_summarize_reduce: str = Field(
+        default=(
+            "あなたは要約を統合するアシスタントです。\n"
+            "以下は【目的】ごとの検索結果の要約です。"
+            "ユーザの質問に回答するために、重複を除いて1つの要約に統合してください。\n\n"
+            "統合のルール:\n"
+            "- 各【目的】の見出しと「情報不足」の記載は残す。\n"
+            "- 数値・固有名詞・技術用語は正確に保持する。\n"
+            "- 要約全体を800文字以内に収める。"
+        ),
+        description="reduce 要約（map 要約の統合）のシステムプロンプト",
+    )
     system_prompt_judge: str = Field(
         default=(
             "あなたはリサーチの品質を判定する審査員です。\n"
@@ -150,6 +462,25 @@ class WorkflowConfig(BaseSettings):
         ),
         description="十分性判定ノードのシステムプロンプト",
     )
+    system_prompt_summarize_judge: str = Field(
+        default=(
+            "あなたはリサーチの品質を判定する審査員です。\n"
+            "ユーザの質問と検索結果を見て、まず summary に回答に必要な情報を"
+            "要約し、その要約をもとに judgement で回答に十分な情報があるか"
+            "判断してください。\n\n"
+            "# 要約のルール\n"
+            "- 各【目的】ごとに、得られた主要な情報を箇条書きで整理する。\n"
+            "- 数値・固有名詞・技術用語は正確に保持する。\n"
+            "- 情報が不足している目的があれば、「情報不足」と明記する。\n"
+            "- 要約全体を800文字以内に収める。\n\n"
+            "# 判定のルール\n"
+            "- reason フィールドは必ず日本語で出力してください。\n"
+            "- sufficient が true なら回答作成に進みます。\n"
+            "- sufficient が false なら、不足している目的について "
+            "additional_subtasks を生成してください。"
+        ),
+        description="要約・十分性判定の統合ノードのシステムプロンプト",
+    )
     system_prompt_generate_answer: str = Field(
         default=(
             "あなたはリサーチ結果をもとに回答するAIアシスタントです。\n"
@@ -169,3 +500,12 @@ class WorkflowConfig(BaseSettings):
     )
 
     model_config = {"env_prefix": "RAG_"}
+
+    @model_validator(mode="after")
+    def _warn_ineffective_packing(self) -> "WorkflowConfig":
+        """参照モードでないために効かない context_pack_tokens を警告する。"""
+        if self.context_pack_tokens > 0 and not self.search_result_refs:
+            logger.warning(
+                "context_pack_tokens は search_result_refs が無効なため適用されません",
+            )
+        return self
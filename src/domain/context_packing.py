@@ -0,0 +1,83 @@
+"""トークン予算に合わせた検索結果パッセージの選択
+
+プロンプトに入れる検索結果を、パッセージごとの概算トークン数と Reranker
+スコアから選ぶ。スコアの高い順に予算へ詰め（収まらないものは飛ばして
+より短いものを試す）、Embedding が渡された場合は MMR（Maximal Marginal
+Relevance）で選択済みのパッセージと似たものの優先度を下げる。
+"""
+
+from __future__ import annotations
+
+from collections.abc import Sequence
+
+import numpy as np
+from pydantic import BaseModel, Field
+
+
+class ContextPack(BaseModel):
+    """パッセージの選択結果"""
+
+    selected: list[int] = Field(description="選んだパッセージの添字（選択順）")
+    packed_tokens: int = Field(description="選んだパッセージの概算トークン数")
+    dropped_tokens: int = Field(description="予算から外れたパッセージの概算トークン数")
+    dropped_count: int = Field(description="予算から外れたパッセージ数")
+
+
+def _relevance(scores: np.ndarray) -> np.ndarray:
+    """スコアを 0〜1 に正規化する（全て同じなら 1）。"""
+    spread = scores.max() - scores.min()
+    if spread <= 0:
+        return np.ones_like(scores)
+    return (scores - scores.min()) / spread
+
+
+def pack_passages(
+    tokens: Sequence[int],
+    scores: Sequence[float],
+    max_tokens: int,
+    *,
+    embeddings: Sequence[Sequence[float]] | None = None,
+    mmr_lambda: float = 1.0,
+) -> ContextPack:
+    """合計が max_tokens に収まるパッセージを貪欲に選ぶ。
+
+    mmr_lambda < 1 かつ embeddings がある場合、各ステップで
+    mmr_lambda * 関連度 - (1 - mmr_lambda) * 選択済みとの最大コサイン類似度
+    が最大のパッセージを選ぶ（類似度は行列演算でまとめて計算する）。
+    """
+    cost = np.asarray(tokens, dtype=np.int64)
+    relevance = _relevance(np.asarray(scores, dtype=np.float64)) if len(cost) else cost
+    similarity = None
+    if embeddings is not None and mmr_lambda < 1.0 and len(cost):
+        matrix = np.asarray(embeddings, dtype=np.float64)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix = matrix / np.where(norms == 0, 1.0, norms)
+        similarity = matrix @ matrix.T
+
+    selected: list[int] = []
+    available = np.ones(len(cost), dtype=bool)
+    max_similarity = np.zeros(len(cost))
+    remaining = max_tokens
+    while True:
+        # 残り予算に収まらないものは以後も収まらない
+        available &= cost <= remaining
+        if not available.any():
+            break
+        if similarity is None:
+            gain = relevance
+        else:
+            gain = mmr_lambda * relevance - (1 - mmr_lambda) * max_similarity
+        pick = int(np.argmax(np.where(available, gain, -np.inf)))
+        selected.append(pick)
+        available[pick] = False
+        remaining -= int(cost[pick])
+        if similarity is not None:
+            max_similarity = np.maximum(max_similarity, similarity[pick])
+
+    packed = int(cost[selected].sum()) if selected else 0
+    return ContextPack(
+        selected=selected,
+        packed_tokens=packed,
+        dropped_tokens=int(cost.sum()) - packed,
+        dropped_count=len(cost) - len(selected),
+    )
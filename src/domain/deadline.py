@@ -0,0 +1,112 @@
+"""リクエスト単位の締め切り（レイテンシ予算）
+
+質問1件の締め切り時刻をワークフローの状態（deadline）で受け渡し、各ノードは
+残り時間から自分のタイムアウトと縮退の要否を決める。中間ノード
+（タスク分割・要約・判定）は回答生成のための時間（answer_reserve）を
+残すよう締め切りを前倒しして扱い、残りが少なくなると推論強度を下げ、
+要約・判定を省略し、回答生成のコンテキストを切り詰める。
+"""
+
+from __future__ import annotations
+
+import math
+import time
+from typing import TYPE_CHECKING
+
+from pydantic import BaseModel, Field
+
+if TYPE_CHECKING:
+    from domain.config import WorkflowConfig
+
+# 締め切りなし（state["deadline"] の既定値）
+NO_DEADLINE = 0.0
+
+# 縮退時の推論強度
+DEGRADED_REASONING = "low"
+
+
+def start_deadline(seconds: float, now: float | None = None) -> float:
+    """現在から seconds 秒後の締め切り時刻を返す（0 以下なら締め切りなし）。"""
+    if seconds <= 0:
+        return NO_DEADLINE
+    return (time.time() if now is None else now) + seconds
+
+
+def time_remaining(
+    deadline: float,
+    *,
+    reserve: float = 0.0,
+    now: float | None = None,
+) -> float:
+    """締め切りの reserve 秒前までの残り時間を返す（締め切りなしなら inf）。"""
+    if deadline <= NO_DEADLINE:
+        return math.inf
+    return deadline - reserve - (time.time() if now is None else now)
+
+
+class NodeBudget(BaseModel):
+    """ノード1回分の時間予算"""
+
+    timeout: float = Field(description="LLM 呼び出しのタイムアウト（秒）")
+    reasoning: str = Field(description="使用する推論強度")
+    pressed: bool = Field(description="締め切りが近く、縮退して実行するか")
+    expired: bool = Field(description="このノードに使える時間が残っていないか")
+
+
+def node_budget(
+    deadline: float,
+    *,
+    timeout: float,
+    reasoning: str,
+    reserve: float,
+    pressure: float,
+    now: float | None = None,
+) -> NodeBudget:
+    """締め切りの reserve 秒前までの残り時間からノードの予算を決める。
+
+    タイムアウトは残り時間で頭打ちにし、残りが pressure 秒を切ったら
+    縮退（推論強度を DEGRADED_REASONING に下げる）とする。
+    """
+    remaining = time_remaining(deadline, reserve=reserve, now=now)
+    pressed = remaining < pressure
+    return NodeBudget(
+        timeout=max(0.0, min(timeout, remaining)),
+        reasoning=DEGRADED_REASONING if pressed else reasoning,
+        pressed=pressed,
+        expired=remaining <= 0,
+    )
+
+
+def stage_budget(
+    deadline: float,
+    config: WorkflowConfig,
+    *,
+    timeout: float,
+    reasoning: str,
+    now: float | None = None,
+) -> NodeBudget:
+    """中間ノード（タスク分割・要約・判定）の予算（回答生成の時間を残す）。"""
+    return node_budget(
+        deadline,
+        timeout=timeout,
+        reasoning=reasoning,
+        reserve=config.deadline_answer_reserve,
+        pressure=config.deadline_pressure_seconds,
+        now=now,
+    )
+
+
+def answer_budget(
+    deadline: float,
+    config: WorkflowConfig,
+    now: float | None = None,
+) -> NodeBudget:
+    """回答生成の予算（確保した時間に食い込んでいれば縮退する）。"""
+    return node_budget(
+        deadline,
+        timeout=math.inf,
+        reasoning=config.reasoning_generate_answer,
+        reserve=0.0,
+        pressure=config.deadline_answer_reserve,
+        now=now,
+    )
@@ -100,3 +100,12 @@ class JudgeResult(BaseModel):
             )
             self.additional_subtasks = None
         return self
+
+
+class SummarizeJudgeResult(BaseModel):
+    """要約・十分性判定の統合ノードの出力"""
+
+    summary: str = Field(
+        description="ユーザの質問に回答するために必要な情報の要約（日本語）",
+    )
+    judgement: JudgeResult = Field(description="要約した情報の十分性の判定")
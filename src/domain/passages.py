@@ -0,0 +1,109 @@
+"""検索結果のチャンクのパッセージへの結合
+
+チャンク分割では境界の前後 chunk_overlap 文字が重なるため、同じ資料の
+隣り合うチャンクが同時に検索されると、重なった部分がプロンプトに2回入る。
+同じ資料の隣接・重複するチャンクを、重なりを除いて1つのパッセージにつなげる。
+
+隣接の判定には、チャンクのメタデータ chunk_index（資料内の通し番号）があれば
+それを使い、なければ本文の重なり（前のチャンクの末尾と次のチャンクの先頭が
+min_overlap 文字以上一致する）で判定する。
+"""
+
+from __future__ import annotations
+
+from pydantic import BaseModel, Field
+
+from domain.models import DocumentChunk, SearchResult
+
+
+def overlap_length(left: str, right: str, min_overlap: int) -> int:
+    """left の末尾と right の先頭が一致する最長の文字数（min_overlap 未満なら 0）"""
+    for length in range(min(len(left), len(right)), max(min_overlap, 1) - 1, -1):
+        if left.endswith(right[:length]):
+            return length
+    return 0
+
+
+def follows(left: DocumentChunk, right: DocumentChunk, min_overlap: int) -> bool:
+    """right が同じ資料内で left の直後に続くチャンクか判定する。"""
+    if left.source != right.source or left.chunk_id == right.chunk_id:
+        return False
+    left_index = left.metadata.get("chunk_index")
+    right_index = right.metadata.get("chunk_index")
+    if left_index is not None and right_index is not None:
+        return right_index == left_index + 1
+    return overlap_length(left.text, right.text, min_overlap) > 0
+
+
+def join_texts(texts: list[str], min_overlap: int) -> str:
+    """資料内の順に並んだチャンクの本文を、重なりを除いてつなげる。"""
+    joined = texts[0] if texts else ""
+    for text in texts[1:]:
+        overlap = overlap_length(joined, text, min_overlap)
+        joined += text[overlap:] if overlap else "\n" + text
+    return joined
+
+
+class Passage(BaseModel):
+    """同じ資料の連続するチャンクをつなげたパッセージ"""
+
+    model_config = {"frozen": True}
+
+    chunks: list[DocumentChunk] = Field(description="資料内の順に並んだチャンク")
+    score: float = Field(description="含まれるチャンクの最高スコア")
+
+    @property
+    def chunk_ids(self) -> list[str]:
+        return [c.chunk_id for c in self.chunks]
+
+
+def merge_passages(results: list[SearchResult], min_overlap: int) -> list[Passage]:
+    """検索結果の隣接・重複するチャンクをパッセージにまとめる。
+
+    パッセージは含まれるチャンクの最上位の順位で並べる（上位から詰める
+    トークン予算の切り詰めがそのまま効くように）。同じチャンクが複数回
+    含まれる場合は1回だけ使う。
+    """
+    runs: list[list[SearchResult]] = []
+    used: set[str] = set()
+    for result in results:
+        if result.chunk.chunk_id in used:
+            continue
+        used.add(result.chunk.chunk_id)
+
+        run = next(
+            (
+                r
+                for r in runs
+                if follows(r[-1].chunk, result.chunk, min_overlap)
+                or follows(result.chunk, r[0].chunk, min_overlap)
+            ),
+            None,
+        )
+        if run is None:
+            runs.append([result])
+            continue
+        if follows(run[-1].chunk, result.chunk, min_overlap):
+            run.append(result)
+        else:
+            run.insert(0, result)
+
+        # 新しいチャンクが2つのパッセージの間を埋めた場合はつなげる
+        for other in runs:
+            if other is run:
+                continue
+            if follows(run[-1].chunk, other[0].chunk, min_overlap):
+                joined = run + other
+            elif follows(other[-1].chunk, run[0].chunk, min_overlap):
+                joined = other + run
+            else:
+                continue
+            first, second = sorted((runs.index(run), runs.index(other)))
+            runs[first] = joined
+            del runs[second]
+            break
+
+    return [
+        Passage(chunks=[r.chunk for r in run], score=max(r.score for r in run))
+        for run in runs
+    ]
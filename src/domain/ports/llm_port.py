@@ -5,6 +5,23 @@ from typing import AsyncIterator, Protocol, TypeVar
 from pydantic import BaseModel, Field
 
 T = TypeVar("T", bound=BaseModel)
+ItemT = TypeVar("ItemT", bound=BaseModel)
+
+
+class LLMUsage(BaseModel):
+    """1回の LLM 呼び出しのトークン数・処理時間（Ollama の応答統計）"""
+
+    model_config = {"frozen": True}
+
+    prompt_eval_count: int = Field(default=0, description="プロンプトのトークン数")
+    eval_count: int = Field(default=0, description="生成したトークン数")
+    prompt_eval_duration: float = Field(
+        default=0.0,
+        description="プロンプト処理時間（秒）",
+    )
+    eval_duration: float = Field(default=0.0, description="デコード時間（秒）")
+    load_duration: float = Field(default=0.0, description="モデルのロード時間（秒）")
+    total_duration: float = Field(default=0.0, description="サーバ側の合計時間（秒）")
 
 
 class ChatResponse(BaseModel):
@@ -14,6 +31,10 @@ class ChatResponse(BaseModel):
 
     content: str = Field(description="LLM の応答テキスト")
     thinking: str = Field(default="", description="Thinking ログ（推論過程）")
+    usage: LLMUsage | None = Field(
+        default=None,
+        description="トークン数・処理時間（取得できない場合は None）",
+    )
 
 
 class LLMPort(Protocol):
@@ -40,11 +61,33 @@ class LLMPort(Protocol):
         """構造化出力（task_planning, judge で使用）"""
         ...
 
+    async def astream_list_items(
+        self,
+        messages: list[dict],
+        response_model: type[BaseModel],
+        item_model: type[ItemT],
+        *,
+        field: str,
+        num_predict: int | None = None,
+        reasoning: str | None = None,
+    ) -> AsyncIterator[ItemT]:
+        """構造化出力をストリーミングし、リスト型フィールドの要素を完成順に返す
+
+        response_model のフィールド field（item_model のリスト）の要素を、
+        応答全体の完了を待たずに1件ずつ返す（task_planning のパイプライン実行で使用）。
+        """
+        ...
+
     async def astream(
         self,
         messages: list[dict],
         *,
         reasoning: str | None = None,
+        temperature: float | None = None,
     ) -> AsyncIterator[str]:
-        """ストリーミング生成（generate_answer で使用）"""
+        """ストリーミング生成（generate_answer で使用）
+
+        トークン数・処理時間は戻り値に含められないため、
+        domain.telemetry.record_llm_usage で記録する。
+        """
         ...
@@ -16,3 +16,12 @@ class RerankerPort(Protocol):
     ) -> list[SearchResult]:
         """検索結果を Reranker モデルで再ランキングする"""
         ...
+
+    async def arerank(
+        self,
+        query: str,
+        results: list[SearchResult],
+        top_k: int = 5,
+    ) -> list[SearchResult]:
+        """再ランキングをイベントループを塞がずに実行する"""
+        ...
@@ -12,6 +12,14 @@ class VectorStorePort(Protocol):
         """ドキュメントチャンクをベクトル DB に追加する"""
         ...
 
+    def get_chunks(self, chunk_ids: list[str]) -> list[DocumentChunk]:
+        """ID に対応するチャンクを返す（存在しない ID は含めない）"""
+        ...
+
+    def get_embeddings(self, chunk_ids: list[str]) -> list[list[float]]:
+        """ID に対応するチャンクの Embedding を返す（存在しない ID は含めない）"""
+        ...
+
     def similarity_search(
         self,
         query: str,
@@ -27,3 +35,62 @@ class VectorStorePort(Protocol):
     ) -> list[SearchResult]:
         """キーワード検索（BM25）を実行する"""
         ...
+
+    def hybrid_search(
+        self,
+        query: str,
+        k: int = 10,
+        bm25_weight: float = 0.3,
+    ) -> list[SearchResult]:
+        """ハイブリッド検索（ベクトル + BM25 の RRF 統合）を実行する"""
+        ...
+
+    def similarity_search_many(
+        self,
+        queries: list[str],
+        k: int = 10,
+    ) -> list[list[SearchResult]]:
+        """複数クエリのベクトル類似度検索を一括で実行する"""
+        ...
+
+    def keyword_search_many(
+        self,
+        queries: list[str],
+        k: int = 10,
+    ) -> list[list[SearchResult]]:
+        """複数クエリのキーワード検索（BM25）を一括で実行する"""
+        ...
+
+    def hybrid_search_many(
+        self,
+        queries: list[str],
+        k: int = 10,
+        bm25_weight: float = 0.3,
+    ) -> list[list[SearchResult]]:
+        """複数クエリのハイブリッド検索を一括で実行する"""
+        ...
+
+    async def asimilarity_search(
+        self,
+        query: str,
+        k: int = 10,
+    ) -> list[SearchResult]:
+        """ベクトル類似度検索をイベントループを塞がずに実行する"""
+        ...
+
+    async def akeyword_search(
+        self,
+        query: str,
+        k: int = 10,
+    ) -> list[SearchResult]:
+        """キーワード検索（BM25）をイベントループを塞がずに実行する"""
+        ...
+
+    async def ahybrid_search_many(
+        self,
+        queries: list[str],
+        k: int = 10,
+        bm25_weight: float = 0.3,
+    ) -> list[list[SearchResult]]:
+        """複数クエリのハイブリッド検索をイベントループを塞がずに実行する"""
+        ...
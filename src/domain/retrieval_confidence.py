@@ -0,0 +1,72 @@
+"""検索結果の確信度による要約・判定の省略（ファストパス）判定
+
+事実を問う簡単な質問では Reranker の最上位スコアが非常に高く、
+summarize → judge を経ても「十分」と判定されるだけになる。サブタスクごとの
+最上位スコアを較正した確信度に変換し、閾値を超えたサブタスクの割合
+（カバレッジ）が十分なら、要約・判定を省略して回答生成に進む。
+"""
+
+from __future__ import annotations
+
+import math
+from collections.abc import Sequence
+
+from pydantic import BaseModel, Field
+
+# logit 変換で 0 / 1 を避けるための下限・上限
+_EPSILON = 1e-6
+
+
+def calibrate_score(score: float, slope: float = 1.0, intercept: float = 0.0) -> float:
+    """Reranker スコア（0〜1 の確率）を Platt スケーリングで較正する。
+
+    logit 空間で slope 倍して intercept を加え、確率に戻す
+    （slope=1, intercept=0 なら元のスコアのまま）。
+    """
+    p = min(max(score, _EPSILON), 1 - _EPSILON)
+    z = slope * math.log(p / (1 - p)) + intercept
+    return 1 / (1 + math.exp(-z))
+
+
+class RetrievalConfidence(BaseModel):
+    """検索結果の確信度の評価"""
+
+    top_scores: list[float] = Field(
+        description="サブタスクごとの較正済み最上位スコア",
+    )
+    threshold: float = Field(description="サブタスクを確信ありとみなす閾値")
+    min_coverage: float = Field(description="ファストパスに必要なカバレッジ")
+
+    @property
+    def coverage(self) -> float:
+        """閾値を超えたサブタスクの割合（サブタスクが無ければ 0.0）"""
+        if not self.top_scores:
+            return 0.0
+        confident = sum(1 for s in self.top_scores if s >= self.threshold)
+        return confident / len(self.top_scores)
+
+    @property
+    def confidence(self) -> float:
+        """最も確信度の低いサブタスクのスコア（サブタスクが無ければ 0.0）"""
+        return min(self.top_scores, default=0.0)
+
+    @property
+    def fast_path(self) -> bool:
+        """要約・判定を省略して回答生成に進むか"""
+        return bool(self.top_scores) and self.coverage >= self.min_coverage
+
+
+def assess_retrieval(
+    top_scores: Sequence[float],
+    *,
+    threshold: float,
+    min_coverage: float,
+    slope: float = 1.0,
+    intercept: float = 0.0,
+) -> RetrievalConfidence:
+    """サブタスクごとの Reranker 最上位スコアから確信度を評価する。"""
+    return RetrievalConfidence(
+        top_scores=[calibrate_score(s, slope, intercept) for s in top_scores],
+        threshold=threshold,
+        min_coverage=min_coverage,
+    )
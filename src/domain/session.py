@@ -0,0 +1,15 @@
+"""セッション（会話スレッド）のコンテキスト
+
+LLM 呼び出しのスケジューリングなど、ノードの引数を経由せずに
+呼び出し元のセッションを参照したい処理のために、実行中のセッション ID を
+コンテキスト変数として保持する。
+"""
+
+from contextvars import ContextVar
+
+DEFAULT_SESSION_ID = "default"
+
+current_session_id: ContextVar[str] = ContextVar(
+    "current_session_id",
+    default=DEFAULT_SESSION_ID,
+)
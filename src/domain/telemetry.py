@@ -0,0 +1,140 @@
+"""LLM 呼び出しのテレメトリ（トークン数・処理時間の集計）
+
+LLM アダプタは呼び出しごとに record_llm_usage を呼び、実行中のリクエストの
+RequestTelemetry に、実行中のノード名で集計する。リクエスト・ノードは
+コンテキスト変数で受け渡すため、ノードの引数や LLMPort の戻り値を
+変えずに集計できる（ストリーミング生成も同じ経路で記録する）。
+ファストパスの採否などワークフローの分岐判断も、同じリクエスト単位で記録する。
+"""
+
+from __future__ import annotations
+
+import logging
+from collections.abc import Awaitable, Callable
+from contextvars import ContextVar
+from typing import Any
+
+from pydantic import BaseModel, Field
+
+from domain.ports.llm_port import LLMUsage
+
+logger = logging.getLogger(__name__)
+
+UNKNOWN_NODE = "unknown"
+
+
+class UsageStats(BaseModel):
+    """複数の LLM 呼び出しの集計"""
+
+    calls: int = Field(default=0, description="呼び出し回数")
+    prompt_eval_count: int = Field(default=0, description="プロンプトのトークン数")
+    eval_count: int = Field(default=0, description="生成したトークン数")
+    prompt_eval_duration: float = Field(
+        default=0.0,
+        description="プロンプト処理時間（秒）",
+    )
+    eval_duration: float = Field(default=0.0, description="デコード時間（秒）")
+    load_duration: float = Field(default=0.0, description="モデルのロード時間（秒）")
+    total_duration: float = Field(default=0.0, description="サーバ側の合計時間（秒）")
+
+    def add(self, usage: LLMUsage | UsageStats) -> None:
+        """呼び出し1回分（または別の集計）を加算する。"""
+        self.calls += usage.calls if isinstance(usage, UsageStats) else 1
+        self.prompt_eval_count += usage.prompt_eval_count
+        self.eval_count += usage.eval_count
+        self.prompt_eval_duration += usage.prompt_eval_duration
+        self.eval_duration += usage.eval_duration
+        self.load_duration += usage.load_duration
+        self.total_duration += usage.total_duration
+
+    def format(self) -> str:
+        """思考過程ログ向けの1行表記を返す。"""
+        return (
+            f"prompt {self.prompt_eval_count} tok / "
+            f"{self.prompt_eval_duration:.1f}s, "
+            f"decode {self.eval_count} tok / {self.eval_duration:.1f}s, "
+            f"load {self.load_duration:.1f}s"
+        )
+
+
+class RequestTelemetry:
+    """1リクエスト（質問1件）分の LLM テレメトリ"""
+
+    def __init__(self) -> None:
+        self._by_node: dict[str, UsageStats] = {}
+        self._decisions: list[dict[str, Any]] = []
+
+    def record(self, node: str, usage: LLMUsage) -> None:
+        """ノードの LLM 呼び出し1回分を記録する。"""
+        self._by_node.setdefault(node, UsageStats()).add(usage)
+
+    def record_decision(self, name: str, **data: Any) -> None:
+        """ワークフローの分岐判断（閾値の調整に使う入力と結果）を記録する。"""
+        self._decisions.append({"name": name, **data})
+
+    @property
+    def decisions(self) -> list[dict[str, Any]]:
+        """記録した分岐判断（記録順）"""
+        return [dict(d) for d in self._decisions]
+
+    @property
+    def by_node(self) -> dict[str, UsageStats]:
+        """ノード名ごとの集計（記録順）"""
+        return {node: s.model_copy() for node, s in self._by_node.items()}
+
+    @property
+    def total(self) -> UsageStats:
+        """全ノードの合計"""
+        total = UsageStats()
+        for stats in self._by_node.values():
+            total.add(stats)
+        return total
+
+    def log_summary(self) -> None:
+        """ノードごとの集計をログに出力する。"""
+        for node, stats in self._by_node.items():
+            logger.info(
+                "LLM テレメトリ [%s] %d 回: %s", node, stats.calls, stats.format()
+            )
+        if self._by_node:
+            logger.info("LLM テレメトリ [合計]: %s", self.total.format())
+        for decision in self._decisions:
+            logger.info("分岐判断: %s", decision)
+
+
+current_telemetry: ContextVar[RequestTelemetry | None] = ContextVar(
+    "current_telemetry",
+    default=None,
+)
+current_node: ContextVar[str] = ContextVar("current_node", default=UNKNOWN_NODE)
+
+
+def record_llm_usage(usage: LLMUsage) -> None:
+    """実行中のリクエスト・ノードに LLM 呼び出し1回分を記録する。"""
+    telemetry = current_telemetry.get()
+    if telemetry is not None:
+        telemetry.record(current_node.get(), usage)
+
+
+def record_decision(name: str, **data: Any) -> None:
+    """実行中のリクエストに分岐判断を記録する。"""
+    telemetry = current_telemetry.get()
+    if telemetry is not None:
+        telemetry.record_decision(name, **data)
+
+
+def traced_node[R](
+    name: str,
+    node: Callable[[dict[str, Any]], Awaitable[R]],
+) -> Callable[[dict[str, Any]], Awaitable[R]]:
+    """ノード関数の実行中、テレメトリの記録先ノード名を name にする。"""
+
+    async def wrapper(state: dict[str, Any]) -> R:
+        token = current_node.set(name)
+        try:
+            return await node(state)
+        finally:
+            current_node.reset(token)
+
+    wrapper.__name__ = getattr(node, "__name__", name)
+    return wrapper
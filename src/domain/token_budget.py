@@ -0,0 +1,75 @@
+"""トークン数の概算とプロンプトの予算配分
+
+Ollama の num_ctx はプロンプトと生成トークンの合計の上限で、超過した分は
+プロンプトの先頭から切り捨てられる。トークナイザを呼ばずに文字種から
+トークン数を概算し（日本語は1文字≒1トークン、ASCII は4文字≒1トークンと
+多めに見積もる）、num_ctx の選択やプロンプトに入れる内容の上限に使う。
+"""
+
+from __future__ import annotations
+
+import math
+from collections.abc import Sequence
+
+# ASCII 文字の1トークンあたりの文字数
+_ASCII_CHARS_PER_TOKEN = 4
+
+# メッセージごとのロール・区切りトークン
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# これより少ない予算しか残らない場合、途中で切り詰めずに捨てる
+_MIN_TRUNCATED_TOKENS = 64
+
+
+def estimate_tokens(text: str) -> int:
+    """テキストのトークン数を概算する（実際より多めになる）。"""
+    ascii_chars = sum(1 for c in text if c.isascii())
+    return math.ceil(ascii_chars / _ASCII_CHARS_PER_TOKEN) + len(text) - ascii_chars
+
+
+def estimate_messages_tokens(messages: list[dict]) -> int:
+    """メッセージ列全体のトークン数を概算する。"""
+    return sum(
+        estimate_tokens(m.get("content", "")) + MESSAGE_OVERHEAD_TOKENS
+        for m in messages
+    )
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """概算トークン数が max_tokens に収まるよう末尾を切り詰める。"""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    ascii_chars = 0
+    for i, c in enumerate(text):
+        if c.isascii():
+            ascii_chars += 1
+        tokens = math.ceil(ascii_chars / _ASCII_CHARS_PER_TOKEN) + i + 1 - ascii_chars
+        if tokens > max_tokens:
+            return text[:i]
+    return text
+
+
+def fit_texts(texts: Sequence[str], max_tokens: int) -> list[str]:
+    """先頭から順に、合計が max_tokens に収まる分だけテキストを残す。
+
+    収まらなくなったテキストは、残り予算が十分あれば切り詰めて含め、
+    それ以降は捨てる。
+    """
+    kept: list[str] = []
+    remaining = max_tokens
+    for text in texts:
+        tokens = estimate_tokens(text) + 1  # 区切りの改行
+        if tokens <= remaining:
+            kept.append(text)
+            remaining -= tokens
+            continue
+        if remaining >= _MIN_TRUNCATED_TOKENS:
+            kept.append(truncate_to_tokens(text, remaining - 1))
+        break
+    return kept
+
+
+def select_bucket(required: int, buckets: Sequence[int]) -> int:
+    """required 以上の最小の区切り値を返す（無ければ最大の区切り値）。"""
+    ordered = sorted(buckets)
+    return next((b for b in ordered if required <= b), ordered[-1])
@@ -0,0 +1,111 @@
+"""起動時のモデルウォームアップ
+
+LLM・Embedding・Reranker・形態素解析モデルは初回使用時にロードされるため、
+起動直後の最初の質問だけ数十秒待たされる。登録したステップ（モデルの
+ロードとダミー推論）をバックグラウンドスレッドで順に実行し、完了状態を
+UI から参照できるようにする。
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections.abc import Callable
+
+logger = logging.getLogger(__name__)
+
+
+class ModelWarmup:
+    """ウォームアップのステップを順に実行し、進捗と完了状態を保持する
+
+    ステップの失敗はログに記録して次へ進む（失敗したモデルは初回使用時に
+    通常どおりロードされる）。
+    """
+
+    def __init__(self) -> None:
+        self._steps: list[tuple[str, Callable[[], object]]] = []
+        self._current: str | None = None
+        self._completed: list[str] = []
+        self._failed: list[str] = []
+        self._elapsed = 0.0
+        self._started = False
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+
+    def add_step(self, name: str, fn: Callable[[], object]) -> None:
+        """ウォームアップのステップを登録する。"""
+        self._steps.append((name, fn))
+
+    @property
+    def ready(self) -> bool:
+        """全ステップが終了したか（未開始の場合は False）"""
+        return self._ready.is_set()
+
+    @property
+    def failed(self) -> list[str]:
+        """失敗したステップ名"""
+        with self._lock:
+            return list(self._failed)
+
+    def start(self) -> threading.Thread | None:
+        """バックグラウンドスレッドでウォームアップを開始する（2回目以降は無視）。"""
+        with self._lock:
+            if self._started:
+                return None
+            self._started = True
+        thread = threading.Thread(target=self.run, name="warmup", daemon=True)
+        thread.start()
+        return thread
+
+    def run(self) -> None:
+        """登録されたステップを順に実行する。"""
+        start = time.perf_counter()
+        logger.info("ウォームアップを開始します (%d ステップ)", len(self._steps))
+        try:
+            for name, fn in self._steps:
+                with self._lock:
+                    self._current = name
+                step_start = time.perf_counter()
+                try:
+                    fn()
+                except Exception:
+                    logger.warning(
+                        "ウォームアップに失敗しました: %s",
+                        name,
+                        exc_info=True,
+                    )
+                    with self._lock:
+                        self._failed.append(name)
+                    continue
+                logger.info(
+                    "ウォームアップ完了: %s (%.1fs)",
+                    name,
+                    time.perf_counter() - step_start,
+                )
+                with self._lock:
+                    self._completed.append(name)
+        finally:
+            with self._lock:
+                self._current = None
+                self._elapsed = time.perf_counter() - start
+            self._ready.set()
+            logger.info("ウォームアップが終了しました (%.1fs)", self._elapsed)
+
+    def wait(self, timeout: float | None = None) -> bool:
+        """完了まで待機し、完了していれば True を返す。"""
+        return self._ready.wait(timeout)
+
+    def status_message(self) -> str:
+        """UI に表示する進捗メッセージを返す。"""
+        with self._lock:
+            if self._ready.is_set():
+                message = f"✅ モデル準備完了 ({self._elapsed:.1f}s)"
+                if self._failed:
+                    message += f"（失敗: {', '.join(self._failed)}）"
+                return message
+            done = len(self._completed) + len(self._failed)
+            current = self._current or "準備中"
+            return (
+                f"⏳ モデルをウォームアップ中... {current} ({done}/{len(self._steps)})"
+            )
@@ -3,11 +3,32 @@
 from __future__ import annotations
 
 import logging
+import threading
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from langgraph.checkpoint.memory import MemorySaver
 
 from domain.config import WorkflowConfig
+from domain.models import DocumentChunk, JudgeResult, SearchResult, TaskPlanningResult
+from domain.ports.llm_port import LLMPort
+from domain.warmup import ModelWarmup
+from interfaces.adapters.checkpointer import (
+    BoundedMemorySaver,
+    SQLiteCheckpointSaver,
+)
 from interfaces.adapters.chromadb_adapter import ChromaDBAdapter
+from interfaces.adapters.llm_cache import CachedLLMAdapter, LLMResponseCache
+from interfaces.adapters.llm_scheduler import (
+    LLMPriority,
+    LLMScheduler,
+    ScheduledLLMAdapter,
+)
 from interfaces.adapters.ollama_adapter import OllamaAdapter
 from interfaces.adapters.pdf_loader_adapter import PDFLoaderAdapter, tokenize
+from interfaces.adapters.readonly_index_adapter import ReadOnlyIndexAdapter
 from interfaces.adapters.reranker_adapter import RerankerAdapter
 from interfaces.ui.gradio_handler import GradioHandler
 from usecases.agent_workflow import AgentWorkflow
@@ -15,6 +36,9 @@ from usecases.data_ingestion import DataIngestion
 
 logger = logging.getLogger(__name__)
 
+# テキストのリストを Embedding のリストに変換する関数
+EmbeddingFn = Callable[[list[str]], list[list[float]]]
+
 
 class DIContainer:
     """すべての依存性を組み立て、コンストラクタインジェクションで注入する"""
@@ -22,18 +46,81 @@ class DIContainer:
     def __init__(self, config: WorkflowConfig | None = None) -> None:
         self.config = config or WorkflowConfig()
         self._llm: OllamaAdapter | None = None
-        self._vectorstore: ChromaDBAdapter | None = None
+        self._llm_cache: LLMResponseCache | None = None
+        self._llm_scheduler: LLMScheduler | None = None
+        self._node_llms: dict[str, LLMPort] | None = None
+        self._vectorstore: ChromaDBAdapter | ReadOnlyIndexAdapter | None = None
         self._reranker: RerankerAdapter | None = None
         self._dataloader: PDFLoaderAdapter | None = None
         self._workflow: AgentWorkflow | None = None
+        self._checkpointer: BaseCheckpointSaver | None = None
         self._ingestion: DataIngestion | None = None
+        self._retrieval_executor: ThreadPoolExecutor | None = None
+        self._embedding_executor: ThreadPoolExecutor | None = None
+        self._embedding_fns: tuple[EmbeddingFn, EmbeddingFn] | None = None
+        self._warmup: ModelWarmup | None = None
+        # ウォームアップのスレッドと検索時の呼び出しでモデルを二重にロードしない
+        self._model_lock = threading.Lock()
+        # Reranker の生成はロード中の Embedding モデルを待たない
+        self._reranker_lock = threading.Lock()
+
+    def _get_retrieval_executor(self) -> ThreadPoolExecutor:
+        """検索・Reranking を実行する共有スレッドプールを返す。
+
+        CPU バウンドな検索処理をイベントループから切り離し、
+        同時接続ユーザのストリーミングを塞がないようにする。
+        """
+        if self._retrieval_executor is None:
+            self._retrieval_executor = ThreadPoolExecutor(
+                max_workers=self.config.retrieval_max_workers,
+                thread_name_prefix="retrieval",
+            )
+        return self._retrieval_executor
+
+    def _get_embedding_executor(self) -> ThreadPoolExecutor:
+        """クエリ Embedding をトークナイズと並行に実行する共有スレッドプールを返す。
 
-    def _create_embedding_fns(self) -> tuple[callable, callable]:
+        検索ワーカーから投入して完了を待つため、検索用とは別のプールにする
+        （同じプールでは全ワーカーが待ち状態になりうる）。ワーカー数は
+        検索用と揃え、同時に検索するセッションが順番待ちにならないようにする。
+        """
+        if self._embedding_executor is None:
+            self._embedding_executor = ThreadPoolExecutor(
+                max_workers=self.config.retrieval_max_workers,
+                thread_name_prefix="query-embedding",
+            )
+        return self._embedding_executor
+
+    def close(self) -> None:
+        """生成したスレッドプールを終了する。"""
+        for executor in (self._retrieval_executor, self._embedding_executor):
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+        self._retrieval_executor = None
+        self._embedding_executor = None
+        logger.info("DIContainer のスレッドプールを終了しました")
+
+    def _create_embedding_fns(self) -> tuple[EmbeddingFn, EmbeddingFn]:
         """Sentence Transformers による Embedding 関数を生成する。
 
         ruri-v3 はドキュメント/クエリで異なるプレフィックスを要求するため、
         2つの関数を返す。
         """
+        with self._model_lock:
+            if self._embedding_fns is None:
+                self._embedding_fns = self._load_embedding_fns()
+            return self._embedding_fns
+
+    def _embed_documents(self, texts: list[str]) -> list[list[float]]:
+        """文書用 Embedding（モデルは初回呼び出し時にロードする）"""
+        return self._create_embedding_fns()[0](texts)
+
+    def _embed_query(self, texts: list[str]) -> list[list[float]]:
+        """クエリ用 Embedding（モデルは初回呼び出し時にロードする）"""
+        return self._create_embedding_fns()[1](texts)
+
+    def _load_embedding_fns(self) -> tuple[EmbeddingFn, EmbeddingFn]:
+        """Embedding モデルをロードし、文書用・クエリ用の関数を返す。"""
         from sentence_transformers import SentenceTransformer
 
         model = SentenceTransformer(self.config.embedding_model_name)
@@ -59,33 +146,160 @@ class DIContainer:
                 top_k=self.config.llm_top_k,
                 top_p=self.config.llm_top_p,
                 repeat_penalty=self.config.llm_repeat_penalty,
+                keep_alive=self.config.llm_keep_alive,
+                reload_warning_seconds=self.config.llm_reload_warning_seconds,
+                num_ctx_buckets=self.config.llm_num_ctx_buckets,
+                output_reserve=self.config.answer_num_predict_reserve,
             )
             logger.info("OllamaAdapter を生成: model=%s", self.config.llm_model_name)
         return self._llm
 
-    def create_vectorstore(self) -> ChromaDBAdapter:
-        """VectorStorePort の具体実装を生成する。"""
+    def create_llm_cache(self) -> LLMResponseCache:
+        """ノード間で共有する LLM 応答キャッシュを生成する。"""
+        if self._llm_cache is None:
+            self._llm_cache = LLMResponseCache(
+                ttl=self.config.llm_cache_ttl,
+                max_entries=self.config.llm_cache_max_entries,
+                path=self.config.llm_cache_path or None,
+            )
+            logger.info("LLMResponseCache を生成")
+        return self._llm_cache
+
+    def create_llm_scheduler(self) -> LLMScheduler | None:
+        """全セッションで共有する LLM スケジューラを生成する（無効なら None）。"""
+        if self._llm_scheduler is None and self.config.llm_max_concurrency > 0:
+            self._llm_scheduler = LLMScheduler(
+                self.config.llm_max_concurrency,
+                speculative_slots=self.config.llm_speculative_slots,
+            )
+            logger.info(
+                "LLMScheduler を生成: max_concurrency=%d, speculative_slots=%d",
+                self.config.llm_max_concurrency,
+                self.config.llm_speculative_slots,
+            )
+        return self._llm_scheduler
+
+    def create_node_llms(self) -> dict[str, LLMPort]:
+        """ノードごとの LLM を組み立てる。
+
+        スケジューラが有効なら各ノードの優先度クラスで ScheduledLLMAdapter を、
+        llm_cache_<ノード名> が True のノードにはさらに CachedLLMAdapter を
+        前段に重ねる（キャッシュヒット時はスロットを消費しない）。
+        共通の LLM をそのまま使うノードは戻り値に含めない。
+        """
+        if self._node_llms is not None:
+            return self._node_llms
+
+        priorities = {
+            "task_planning": LLMPriority.PLANNING,
+            "summarize": LLMPriority.SUMMARIZE,
+            "judge": LLMPriority.JUDGE,
+            "summarize_judge": LLMPriority.JUDGE,
+            "generate_answer": LLMPriority.FINAL_ANSWER,
+            "speculative_answer": LLMPriority.SPECULATIVE_ANSWER,
+        }
+        cache_enabled = {
+            "task_planning": self.config.llm_cache_task_planning,
+            "summarize": self.config.llm_cache_summarize,
+            "judge": self.config.llm_cache_judge,
+        }
+        scheduler = self.create_llm_scheduler()
+
+        self._node_llms = {}
+        for node, priority in priorities.items():
+            llm: LLMPort = self.create_llm()
+            if scheduler is not None:
+                llm = ScheduledLLMAdapter(llm, scheduler, priority=priority)
+            if cache_enabled.get(node):
+                llm = self._wrap_with_cache(llm, node)
+            if llm is not self._llm:
+                self._node_llms[node] = llm
+        return self._node_llms
+
+    def _wrap_with_cache(self, llm: LLMPort, node: str) -> CachedLLMAdapter:
+        """ノードの LLM の前段に応答キャッシュを置く。"""
+        vectorstore = self.create_vectorstore()
+        logger.info("LLM 応答キャッシュを有効化: node=%s", node)
+        return CachedLLMAdapter(
+            llm,
+            self.create_llm_cache(),
+            node=node,
+            model_name=self.config.llm_model_name,
+            # num_ctx はプロンプト長に応じてアダプタ側で決まるためキーに含めない
+            sampling_params={
+                "temperature": self.config.llm_temperature,
+                "top_k": self.config.llm_top_k,
+                "top_p": self.config.llm_top_p,
+                "repeat_penalty": self.config.llm_repeat_penalty,
+            },
+            corpus_fingerprint_fn=lambda: vectorstore.corpus_fingerprint,
+        )
+
+    def create_vectorstore(self) -> ChromaDBAdapter | ReadOnlyIndexAdapter:
+        """VectorStorePort の具体実装を生成する。
+
+        index_shared_root が設定されている場合は、公開済みの世代を
+        メモリマップで共有する読み取り専用ワーカーとして構成する。
+        Embedding モデルは初回の Embedding 時（またはウォームアップ）にロードする。
+        """
         if self._vectorstore is None:
-            embed_documents, embed_query = self._create_embedding_fns()
+            if self.config.index_shared_root:
+                self._vectorstore = ReadOnlyIndexAdapter(
+                    root=self.config.index_shared_root,
+                    query_embedding_fn=self._embed_query,
+                    tokenize_fn=tokenize,
+                    executor=self._get_retrieval_executor(),
+                    refresh_interval=self.config.index_refresh_interval,
+                    embedding_model=self.config.embedding_model_name,
+                )
+                logger.info(
+                    "ReadOnlyIndexAdapter を生成: root=%s",
+                    self.config.index_shared_root,
+                )
+                return self._vectorstore
+
             self._vectorstore = ChromaDBAdapter(
-                embedding_fn=embed_documents,
-                query_embedding_fn=embed_query,
+                embedding_fn=self._embed_documents,
+                query_embedding_fn=self._embed_query,
                 tokenize_fn=tokenize,
+                executor=self._get_retrieval_executor(),
+                embedding_executor=self._get_embedding_executor(),
+                embedding_model=self.config.embedding_model_name,
             )
             logger.info("ChromaDBAdapter を生成")
+            self._restore_index_snapshot(self._vectorstore)
         return self._vectorstore
 
-    def create_reranker(self) -> RerankerAdapter:
-        """RerankerPort の具体実装を生成する。"""
-        if self._reranker is None:
-            self._reranker = RerankerAdapter(
-                model_name=self.config.reranker_model_name,
-            )
-            logger.info(
-                "RerankerAdapter を生成: model=%s",
-                self.config.reranker_model_name,
+    def _restore_index_snapshot(self, vectorstore: ChromaDBAdapter) -> None:
+        """設定されたスナップショットがあれば、取り込み処理なしで復元する。"""
+        snapshot_dir = self.config.index_snapshot_dir
+        if not snapshot_dir:
+            return
+        if not Path(snapshot_dir).is_dir():
+            logger.warning("スナップショットが見つかりません: %s", snapshot_dir)
+            return
+        try:
+            vectorstore.import_snapshot(snapshot_dir)
+        except Exception:
+            logger.warning(
+                "スナップショットの復元に失敗しました: %s",
+                snapshot_dir,
+                exc_info=True,
             )
-        return self._reranker
+
+    def create_reranker(self) -> RerankerAdapter:
+        """RerankerPort の具体実装を生成する（モデルは初回使用時にロードする）。"""
+        with self._reranker_lock:
+            if self._reranker is None:
+                self._reranker = RerankerAdapter(
+                    model_name=self.config.reranker_model_name,
+                    executor=self._get_retrieval_executor(),
+                )
+                logger.info(
+                    "RerankerAdapter を生成: model=%s",
+                    self.config.reranker_model_name,
+                )
+            return self._reranker
 
     def create_dataloader(self) -> PDFLoaderAdapter:
         """DataLoaderPort の具体実装を生成する。"""
@@ -98,6 +312,31 @@ class DIContainer:
             logger.info("PDFLoaderAdapter を生成")
         return self._dataloader
 
+    def create_checkpointer(self) -> BaseCheckpointSaver:
+        """checkpointer_backend に応じたチェックポインタを生成する。"""
+        if self._checkpointer is not None:
+            return self._checkpointer
+
+        backend = self.config.checkpointer_backend
+        limits = {
+            "max_threads": self.config.checkpoint_max_threads,
+            "thread_ttl": self.config.checkpoint_thread_ttl,
+            "max_checkpoints_per_thread": self.config.checkpoint_max_per_thread,
+        }
+        if backend == "bounded":
+            self._checkpointer = BoundedMemorySaver(**limits)
+        elif backend == "sqlite":
+            self._checkpointer = SQLiteCheckpointSaver(
+                self.config.checkpoint_path,
+                **limits,
+            )
+        elif backend == "memory":
+            self._checkpointer = MemorySaver()
+        else:
+            raise ValueError(f"未対応の checkpointer_backend です: {backend}")
+        logger.info("チェックポインタを生成: %s", backend)
+        return self._checkpointer
+
     def create_workflow(self) -> AgentWorkflow:
         """AgentWorkflow を生成する。"""
         if self._workflow is None:
@@ -106,6 +345,8 @@ class DIContainer:
                 vectorstore=self.create_vectorstore(),
                 reranker=self.create_reranker(),
                 config=self.config,
+                node_llms=self.create_node_llms(),
+                checkpointer=self.create_checkpointer(),
             )
             logger.info("AgentWorkflow を生成")
         return self._workflow
@@ -120,12 +361,66 @@ class DIContainer:
             logger.info("DataIngestion を生成")
         return self._ingestion
 
+    def create_warmup(self) -> ModelWarmup:
+        """起動時のウォームアップ手順を組み立てる（開始はしない）。
+
+        Ollama へのモデルロード、Embedding・Reranker のダミー推論、
+        ja_ginza のロード、構造化出力 Runnable の事前生成を行う。
+        Embedding・Reranker のモデルはここではロードせず、ウォームアップの
+        スレッド上で生成する（呼び出し元を塞がない）。
+        """
+        if self._warmup is not None:
+            return self._warmup
+
+        llm = self.create_llm()
+        dummy = SearchResult(
+            chunk=DocumentChunk(chunk_id="warmup", text="ウォームアップ", source=""),
+            score=0.0,
+        )
+
+        def compile_structured() -> None:
+            llm.prepare_structured(
+                TaskPlanningResult,
+                num_predict=self.config.structured_output_num_predict,
+                reasoning=self.config.reasoning_task_planning,
+            )
+            llm.prepare_structured(
+                JudgeResult,
+                num_predict=self.config.structured_output_num_predict,
+                reasoning=self.config.reasoning_judge,
+            )
+
+        self._warmup = ModelWarmup()
+        self._warmup.add_step("LLM", llm.load_model)
+        self._warmup.add_step(
+            "Embedding",
+            lambda: self._create_embedding_fns()[1](["ウォームアップ"]),
+        )
+        self._warmup.add_step(
+            "Reranker",
+            lambda: self.create_reranker().rerank("ウォームアップ", [dummy], top_k=1),
+        )
+        self._warmup.add_step("形態素解析", lambda: tokenize("ウォームアップ"))
+        self._warmup.add_step("構造化出力", compile_structured)
+        return self._warmup
+
     def create_ui(self) -> GradioHandler:
-        """GradioHandler を生成する。"""
+        """GradioHandler を生成する。
+
+        warmup_enabled が True なら、ウォームアップをバックグラウンドで開始する。
+        Embedding・Reranker モデルのロードはウォームアップ（または初回の検索）
+        に任せ、UI の生成を待たせない。
+        """
+        warmup = None
+        if self.config.warmup_enabled:
+            warmup = self.create_warmup()
+            warmup.start()
         return GradioHandler(
             ingestion=self.create_ingestion(),
             config=self.config,
             llm=self.create_llm(),
             vectorstore=self.create_vectorstore(),
             reranker=self.create_reranker(),
+            node_llms=self.create_node_llms(),
+            warmup=warmup,
         )
@@ -0,0 +1,620 @@
+"""上限付きの LangGraph チェックポインタ
+
+LangGraph の MemorySaver は thread_id（= Gradio のセッション）ごとに、
+ワークフローの各ステップのチェックポイントをすべて保持し続ける。
+長時間稼働するサーバではセッション数・質問数に比例してメモリが増えるため、
+次の上限を設けたチェックポインタを提供する。
+
+- スレッド単位の LRU + TTL: 最終アクセスから thread_ttl 秒経過したスレッド、
+  および max_threads を超えた最も古いスレッドを破棄する
+- スレッドあたりのチェックポイント数: 名前空間ごとに新しい順に
+  max_checkpoints_per_thread 件だけ残す（ワークフローの再開に必要なのは
+  最新のチェックポイントのみ）
+
+BoundedMemorySaver はメモリ上、SQLiteCheckpointSaver はローカルの
+SQLite ファイルに保存し、再起動後も会話を再開できる。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import AsyncIterator, Callable, Iterator, Sequence
+from pathlib import Path
+from typing import Any
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from langgraph.checkpoint.memory import InMemorySaver
+from pydantic import BaseModel, Field
+
+logger = logging.getLogger(__name__)
+
+
+class CheckpointerStats(BaseModel):
+    """チェックポインタの保持数・破棄数の統計"""
+
+    threads: int = Field(default=0, description="保持しているスレッド数")
+    checkpoints: int = Field(default=0, description="保持しているチェックポイント数")
+    evicted_threads: int = Field(
+        default=0,
+        description="スレッド数の上限超過で破棄したスレッド数",
+    )
+    expired_threads: int = Field(default=0, description="TTL 切れで破棄したスレッド数")
+    pruned_checkpoints: int = Field(
+        default=0,
+        description="スレッドあたりの上限超過で破棄したチェックポイント数",
+    )
+
+
+class BoundedMemorySaver(InMemorySaver):
+    """スレッド数・TTL・スレッドあたりのチェックポイント数に上限を持つ MemorySaver
+
+    スレッドの最終アクセス時刻を OrderedDict で管理し、書き込みのたびに
+    期限切れ・上限超過のスレッドを古い順に破棄する。max_threads・
+    max_checkpoints_per_thread は 0 以下で無制限、thread_ttl は 0 以下で無期限。
+    """
+
+    def __init__(
+        self,
+        *,
+        max_threads: int = 1024,
+        thread_ttl: float = 3600.0,
+        max_checkpoints_per_thread: int = 4,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        super().__init__()
+        self._max_threads = max_threads
+        self._thread_ttl = thread_ttl
+        self._max_checkpoints = max_checkpoints_per_thread
+        self._clock = clock
+        self._last_access: OrderedDict[str, float] = OrderedDict()
+        self._stats = CheckpointerStats()
+        self._lock = threading.RLock()
+
+    def stats(self) -> CheckpointerStats:
+        """統計を返す。"""
+        with self._lock:
+            return self._stats.model_copy(
+                update={
+                    "threads": len(self._last_access),
+                    "checkpoints": sum(
+                        len(checkpoints)
+                        for namespaces in self.storage.values()
+                        for checkpoints in namespaces.values()
+                    ),
+                },
+            )
+
+    def get_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        """チェックポイントを取得し、スレッドの最終アクセス時刻を更新する。"""
+        thread_id = config["configurable"]["thread_id"]
+        with self._lock:
+            self._expire()
+            result = super().get_tuple(config)
+            if any(self.storage.get(thread_id, {}).values()):
+                self._touch(thread_id)
+            else:
+                # defaultdict により生成された空のエントリを残さない
+                self.storage.pop(thread_id, None)
+            return result
+
+    def list(
+        self,
+        config: RunnableConfig | None,
+        *,
+        filter: dict[str, Any] | None = None,
+        before: RunnableConfig | None = None,
+        limit: int | None = None,
+    ) -> Iterator[CheckpointTuple]:
+        """チェックポイントを新しい順に列挙する（列挙中の破棄を避けて先に確定する）。"""
+        with self._lock:
+            return iter(
+                list(super().list(config, filter=filter, before=before, limit=limit))
+            )
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        """チェックポイントを保存し、上限を超えた分を破棄する。"""
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        with self._lock:
+            saved = super().put(config, checkpoint, metadata, new_versions)
+            self._touch(thread_id)
+            self._prune(thread_id, checkpoint_ns)
+            self._evict()
+            return saved
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        """中間書き込みを保存し、スレッドの最終アクセス時刻を更新する。"""
+        with self._lock:
+            super().put_writes(config, writes, task_id, task_path)
+            self._touch(config["configurable"]["thread_id"])
+
+    def delete_thread(self, thread_id: str) -> None:
+        """スレッドのチェックポイント・書き込み・チャネルの値をすべて削除する。
+
+        全スレッドのキーを走査する MemorySaver の実装を避け、
+        スレッドのチェックポイントから辿れるキーだけを削除する。
+        """
+        with self._lock:
+            for checkpoint_ns, checkpoints in self.storage.pop(thread_id, {}).items():
+                self._drop_checkpoints(thread_id, checkpoint_ns, checkpoints)
+            self._last_access.pop(thread_id, None)
+
+    def _touch(self, thread_id: str) -> None:
+        self._last_access[thread_id] = self._clock()
+        self._last_access.move_to_end(thread_id)
+
+    def _expire(self) -> None:
+        """最終アクセスから thread_ttl 秒を超えたスレッドを古い順に破棄する。"""
+        if self._thread_ttl <= 0:
+            return
+        limit = self._clock() - self._thread_ttl
+        while self._last_access:
+            thread_id, last_access = next(iter(self._last_access.items()))
+            if last_access >= limit:
+                break
+            self.delete_thread(thread_id)
+            self._stats.expired_threads += 1
+
+    def _evict(self) -> None:
+        """期限切れのスレッドと、max_threads を超えた最も古いスレッドを破棄する。"""
+        self._expire()
+        if self._max_threads <= 0:
+            return
+        while len(self._last_access) > self._max_threads:
+            self.delete_thread(next(iter(self._last_access)))
+            self._stats.evicted_threads += 1
+
+    def _prune(self, thread_id: str, checkpoint_ns: str) -> None:
+        """名前空間内の古いチェックポイントと、参照されなくなった値を破棄する。"""
+        checkpoints = self.storage[thread_id][checkpoint_ns]
+        if self._max_checkpoints <= 0 or len(checkpoints) <= self._max_checkpoints:
+            return
+        # チェックポイント ID は時刻順に単調増加する
+        stale = {
+            checkpoint_id: checkpoints.pop(checkpoint_id)
+            for checkpoint_id in sorted(checkpoints)[: -self._max_checkpoints]
+        }
+        self._stats.pruned_checkpoints += len(stale)
+        # 残るチェックポイントが参照するチャネルの値は削除しない
+        self._drop_checkpoints(
+            thread_id,
+            checkpoint_ns,
+            stale,
+            keep=self._channel_versions(checkpoints),
+        )
+
+    def _channel_versions(self, checkpoints: dict[str, tuple]) -> set[tuple]:
+        """チェックポイント群が参照する (チャネル, バージョン) の集合"""
+        versions = set()
+        for serialized, _, _ in checkpoints.values():
+            versions.update(
+                self.serde.loads_typed(serialized)["channel_versions"].items()
+            )
+        return versions
+
+    def _drop_checkpoints(
+        self,
+        thread_id: str,
+        checkpoint_ns: str,
+        checkpoints: dict[str, tuple],
+        keep: set[tuple] | frozenset[tuple] = frozenset(),
+    ) -> None:
+        """取り除いたチェックポイントの書き込みと、チャネルの値を削除する。"""
+        for checkpoint_id in checkpoints:
+            self.writes.pop((thread_id, checkpoint_ns, checkpoint_id), None)
+        for channel, version in self._channel_versions(checkpoints) - keep:
+            self.blobs.pop((thread_id, checkpoint_ns, channel, version), None)
+
+
+class SQLiteCheckpointSaver(BaseCheckpointSaver[str]):
+    """ローカルの SQLite ファイルに保存する上限付きチェックポインタ
+
+    チェックポイントはチャネルの値を含めて1行にシリアライズして保存する。
+    スレッドの最終アクセス時刻を threads テーブルで管理し、
+    BoundedMemorySaver と同じ規則で古いスレッド・チェックポイントを破棄する。
+    非同期 API（ワークフローの ainvoke から呼ばれる）は DB 操作を
+    asyncio.to_thread で実行する。
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        *,
+        max_threads: int = 0,
+        thread_ttl: float = 0.0,
+        max_checkpoints_per_thread: int = 4,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        super().__init__()
+        self._max_threads = max_threads
+        self._thread_ttl = thread_ttl
+        self._max_checkpoints = max_checkpoints_per_thread
+        self._clock = clock
+        self._stats = CheckpointerStats()
+        self._lock = threading.Lock()
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS checkpoints ("
+            " thread_id TEXT NOT NULL,"
+            " checkpoint_ns TEXT NOT NULL,"
+            " checkpoint_id TEXT NOT NULL,"
+            " parent_checkpoint_id TEXT,"
+            " type TEXT NOT NULL,"
+            " checkpoint BLOB NOT NULL,"
+            " metadata_type TEXT NOT NULL,"
+            " metadata BLOB NOT NULL,"
+            " PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id));"
+            "CREATE TABLE IF NOT EXISTS writes ("
+            " thread_id TEXT NOT NULL,"
+            " checkpoint_ns TEXT NOT NULL,"
+            " checkpoint_id TEXT NOT NULL,"
+            " task_id TEXT NOT NULL,"
+            " idx INTEGER NOT NULL,"
+            " channel TEXT NOT NULL,"
+            " type TEXT NOT NULL,"
+            " value BLOB NOT NULL,"
+            " task_path TEXT NOT NULL,"
+            " PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx));"
+            "CREATE TABLE IF NOT EXISTS threads ("
+            " thread_id TEXT PRIMARY KEY,"
+            " last_access REAL NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS threads_last_access"
+            " ON threads (last_access);"
+        )
+        with self._lock:
+            self._evict()
+            self._db.commit()
+        logger.info("チェックポイント DB を開きました: %s", path)
+
+    def close(self) -> None:
+        """DB 接続を閉じる。"""
+        with self._lock:
+            self._db.close()
+
+    def stats(self) -> CheckpointerStats:
+        """統計を返す。"""
+        with self._lock:
+            (threads,) = self._db.execute("SELECT COUNT(*) FROM threads").fetchone()
+            (checkpoints,) = self._db.execute(
+                "SELECT COUNT(*) FROM checkpoints"
+            ).fetchone()
+            return self._stats.model_copy(
+                update={"threads": threads, "checkpoints": checkpoints},
+            )
+
+    def get_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        """チェックポイントを取得し、スレッドの最終アクセス時刻を更新する。"""
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        with self._lock:
+            self._expire()
+            if checkpoint_id := get_checkpoint_id(config):
+                row = self._db.execute(
+                    "SELECT checkpoint_id, parent_checkpoint_id, type, checkpoint,"
+                    " metadata_type, metadata FROM checkpoints"
+                    " WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                    (thread_id, checkpoint_ns, checkpoint_id),
+                ).fetchone()
+            else:
+                row = self._db.execute(
+                    "SELECT checkpoint_id, parent_checkpoint_id, type, checkpoint,"
+                    " metadata_type, metadata FROM checkpoints"
+                    " WHERE thread_id = ? AND checkpoint_ns = ?"
+                    " ORDER BY checkpoint_id DESC LIMIT 1",
+                    (thread_id, checkpoint_ns),
+                ).fetchone()
+            if row is None:
+                self._db.commit()
+                return None
+            self._touch(thread_id)
+            result = self._to_tuple(thread_id, checkpoint_ns, row)
+            self._db.commit()
+            return result
+
+    def list(
+        self,
+        config: RunnableConfig | None,
+        *,
+        filter: dict[str, Any] | None = None,
+        before: RunnableConfig | None = None,
+        limit: int | None = None,
+    ) -> Iterator[CheckpointTuple]:
+        """チェックポイントを新しい順に列挙する。"""
+        where, params = [], []
+        if config:
+            where.append("thread_id = ?")
+            params.append(config["configurable"]["thread_id"])
+            if (
+                checkpoint_ns := config["configurable"].get("checkpoint_ns")
+            ) is not None:
+                where.append("checkpoint_ns = ?")
+                params.append(checkpoint_ns)
+            if checkpoint_id := get_checkpoint_id(config):
+                where.append("checkpoint_id = ?")
+                params.append(checkpoint_id)
+        if before and (before_id := get_checkpoint_id(before)):
+            where.append("checkpoint_id < ?")
+            params.append(before_id)
+        query = (
+            "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id,"
+            " type, checkpoint, metadata_type, metadata FROM checkpoints"
+        )
+        if where:
+            query += " WHERE " + " AND ".join(where)
+        query += " ORDER BY checkpoint_id DESC"
+
+        with self._lock:
+            results = []
+            for thread_id, checkpoint_ns, *row in self._db.execute(
+                query, params
+            ).fetchall():
+                if limit is not None and len(results) >= limit:
+                    break
+                result = self._to_tuple(thread_id, checkpoint_ns, row)
+                if filter and not all(
+                    result.metadata.get(key) == value for key, value in filter.items()
+                ):
+                    continue
+                results.append(result)
+        return iter(results)
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        """チェックポイントを保存し、上限を超えた分を破棄する。"""
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        type_, serialized = self.serde.dumps_typed(checkpoint)
+        metadata_type, serialized_metadata = self.serde.dumps_typed(
+            get_checkpoint_metadata(config, metadata)
+        )
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    thread_id,
+                    checkpoint_ns,
+                    checkpoint["id"],
+                    config["configurable"].get("checkpoint_id"),
+                    type_,
+                    serialized,
+                    metadata_type,
+                    serialized_metadata,
+                ),
+            )
+            self._touch(thread_id)
+            self._prune(thread_id, checkpoint_ns)
+            self._evict()
+            self._db.commit()
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        """中間書き込みを保存する（特殊な書き込み以外は既存の行を上書きしない）。"""
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        with self._lock:
+            for idx, (channel, value) in enumerate(writes):
+                write_idx = WRITES_IDX_MAP.get(channel, idx)
+                verb = "INSERT OR IGNORE" if write_idx >= 0 else "INSERT OR REPLACE"
+                self._db.execute(
+                    f"{verb} INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        thread_id,
+                        checkpoint_ns,
+                        checkpoint_id,
+                        task_id,
+                        write_idx,
+                        channel,
+                        *self.serde.dumps_typed(value),
+                        task_path,
+                    ),
+                )
+            self._touch(thread_id)
+            self._db.commit()
+
+    def delete_thread(self, thread_id: str) -> None:
+        """スレッドのチェックポイント・書き込みをすべて削除する。"""
+        with self._lock:
+            self._delete_thread(thread_id)
+            self._db.commit()
+
+    async def aget_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: RunnableConfig | None,
+        *,
+        filter: dict[str, Any] | None = None,
+        before: RunnableConfig | None = None,
+        limit: int | None = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        # list() は結果を確定してから返すため、列挙中に DB へは触れない
+        items = await asyncio.to_thread(
+            self.list,
+            config,
+            filter=filter,
+            before=before,
+            limit=limit,
+        )
+        for item in items:
+            yield item
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return await asyncio.to_thread(
+            self.put,
+            config,
+            checkpoint,
+            metadata,
+            new_versions,
+        )
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+    def get_next_version(self, current: str | None, channel: None) -> str:
+        """MemorySaver と同じ形式（単調増加する整数部 + 乱数）の次のバージョン"""
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
+
+    def _to_tuple(
+        self,
+        thread_id: str,
+        checkpoint_ns: str,
+        row: Sequence[Any],
+    ) -> CheckpointTuple:
+        """checkpoints テーブルの行と書き込みから CheckpointTuple を組み立てる。"""
+        checkpoint_id, parent_id, type_, checkpoint, metadata_type, metadata = row
+        writes = self._db.execute(
+            "SELECT task_id, channel, type, value FROM writes"
+            " WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?"
+            " ORDER BY task_path, task_id, idx",
+            (thread_id, checkpoint_ns, checkpoint_id),
+        ).fetchall()
+        return CheckpointTuple(
+            config={
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": checkpoint_id,
+                }
+            },
+            checkpoint=self.serde.loads_typed((type_, checkpoint)),
+            metadata=self.serde.loads_typed((metadata_type, metadata)),
+            parent_config=(
+                {
+                    "configurable": {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": checkpoint_ns,
+                        "checkpoint_id": parent_id,
+                    }
+                }
+                if parent_id
+                else None
+            ),
+            pending_writes=[
+                (task_id, channel, self.serde.loads_typed((value_type, value)))
+                for task_id, channel, value_type, value in writes
+            ],
+        )
+
+    def _touch(self, thread_id: str) -> None:
+        self._db.execute(
+            "INSERT OR REPLACE INTO threads VALUES (?, ?)",
+            (thread_id, self._clock()),
+        )
+
+    def _delete_thread(self, thread_id: str) -> None:
+        for table in ("checkpoints", "writes", "threads"):
+            self._db.execute(f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+
+    def _expire(self) -> None:
+        """最終アクセスから thread_ttl 秒を超えたスレッドを破棄する。"""
+        if self._thread_ttl <= 0:
+            return
+        expired = self._db.execute(
+            "SELECT thread_id FROM threads WHERE last_access < ?",
+            (self._clock() - self._thread_ttl,),
+        ).fetchall()
+        for (thread_id,) in expired:
+            self._delete_thread(thread_id)
+        self._stats.expired_threads += len(expired)
+
+    def _evict(self) -> None:
+        """期限切れのスレッドと、max_threads を超えた最も古いスレッドを破棄する。"""
+        self._expire()
+        if self._max_threads <= 0:
+            return
+        overflow = self._db.execute(
+            "SELECT thread_id FROM threads ORDER BY last_access DESC LIMIT -1 OFFSET ?",
+            (self._max_threads,),
+        ).fetchall()
+        for (thread_id,) in overflow:
+            self._delete_thread(thread_id)
+        self._stats.evicted_threads += len(overflow)
+
+    def _prune(self, thread_id: str, checkpoint_ns: str) -> None:
+        """名前空間内の古いチェックポイントと、その書き込みを破棄する。"""
+        if self._max_checkpoints <= 0:
+            return
+        stale = self._db.execute(
+            "SELECT checkpoint_id FROM checkpoints"
+            " WHERE thread_id = ? AND checkpoint_ns = ?"
+            " ORDER BY checkpoint_id DESC LIMIT -1 OFFSET ?",
+            (thread_id, checkpoint_ns, self._max_checkpoints),
+        ).fetchall()
+        for (checkpoint_id,) in stale:
+            for table in ("checkpoints", "writes"):
+                self._db.execute(
+                    f"DELETE FROM {table}"
+                    " WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                    (thread_id, checkpoint_ns, checkpoint_id),
+                )
+        self._stats.pruned_checkpoints += len(stale)
@@ -2,13 +2,31 @@
 
 from __future__ import annotations
 
+import asyncio
 import logging
 from collections.abc import Callable
-from typing import Any
+from concurrent.futures import Executor
+from pathlib import Path
 
 import chromadb
+import numpy as np
+from scipy import sparse
 
 from domain.models import DocumentChunk, SearchResult
+from interfaces.adapters.index_snapshot import (
+    SnapshotManifest,
+    check_embedding_model,
+    corpus_fingerprint,
+    publish_generation,
+    read_snapshot,
+    write_snapshot,
+)
+from interfaces.adapters.ranking import (
+    Ranking,
+    bm25_top_k,
+    build_bm25_matrix,
+    fuse_top_k,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -22,8 +40,13 @@ class ChromaDBAdapter:
         query_embedding_fn: Callable[[list[str]], list[list[float]]] | None = None,
         collection_name: str = "rag_collection",
         tokenize_fn: Callable[[str], list[str]] | None = None,
+        executor: Executor | None = None,
+        embedding_executor: Executor | None = None,
+        embedding_model: str = "",
     ) -> None:
         self._embedding_fn = embedding_fn
+        # スナップショットに記録・照合する Embedding モデル名
+        self._embedding_model = embedding_model
         self._query_embedding_fn = query_embedding_fn or embedding_fn
         self._tokenize_fn = tokenize_fn
         self._client = chromadb.Client()
@@ -33,7 +56,29 @@ class ChromaDBAdapter:
         )
         # BM25 用のドキュメントキャッシュ
         self._chunks_cache: list[DocumentChunk] = []
-        self._bm25_index: Any | None = None
+        # chunk_id → _chunks_cache のインデックス（両リトリーバ共通）
+        self._chunk_index: dict[str, int] = {}
+        # BM25 の語彙（トークン → 行番号）と 語彙 × チャンク の重み行列
+        self._bm25_vocab: dict[str, int] = {}
+        self._bm25_matrix: sparse.csr_matrix | None = None
+        # ドキュメント追加のたびに増加するコーパスバージョン
+        self._corpus_version = 0
+        # 登録済みチャンクの内容ハッシュ（再起動後も同じ内容なら同じ値）
+        self._corpus_fingerprint = ""
+        # クエリ Embedding をトークナイズと並行に実行する先（None なら逐次実行）
+        self._embedding_executor = embedding_executor
+        # 非同期 API 用の実行先（None の場合はイベントループ既定の Executor）
+        self._executor = executor
+
+    @property
+    def corpus_version(self) -> int:
+        """コーパスバージョン（ドキュメント追加のたびに増加）を返す。"""
+        return self._corpus_version
+
+    @property
+    def corpus_fingerprint(self) -> str:
+        """登録済みチャンクの ID と本文から求めた内容ハッシュを返す。"""
+        return self._corpus_fingerprint
 
     def is_empty(self) -> bool:
         """ドキュメントが登録されていないかどうかを返す。"""
@@ -59,27 +104,115 @@ class ChromaDBAdapter:
             metadatas=metadatas,
         )
 
+        offset = len(self._chunks_cache)
         self._chunks_cache.extend(chunks)
+        for i, c in enumerate(chunks):
+            self._chunk_index[c.chunk_id] = offset + i
         self._rebuild_bm25_index()
+        self._corpus_version += 1
+        self._corpus_fingerprint = corpus_fingerprint(
+            chunks,
+            self._corpus_fingerprint,
+        )
 
         logger.info("Chroma DB に %d チャンクを追加しました", len(chunks))
 
+    def get_chunks(self, chunk_ids: list[str]) -> list[DocumentChunk]:
+        """ID に対応するチャンクを返す（存在しない ID は含めない）。"""
+        return [
+            self._chunks_cache[self._chunk_index[cid]]
+            for cid in chunk_ids
+            if cid in self._chunk_index
+        ]
+
+    def get_embeddings(self, chunk_ids: list[str]) -> list[list[float]]:
+        """ID に対応するチャンクの Embedding を返す（存在しない ID は含めない）。"""
+        ids = [cid for cid in chunk_ids if cid in self._chunk_index]
+        if not ids:
+            return []
+        stored = self._collection.get(ids=ids, include=["embeddings"])
+        position = {cid: i for i, cid in enumerate(stored["ids"])}
+        embeddings = np.asarray(stored["embeddings"], dtype=np.float32)
+        return embeddings[[position[cid] for cid in ids]].tolist()
+
+    def export_snapshot(self, path: str | Path) -> SnapshotManifest:
+        """Embedding・チャンク・BM25 インデックスをスナップショットに書き出す。"""
+        return write_snapshot(path, **self._snapshot_payload())
+
+    def publish_snapshot(self, root: str | Path, keep: int = 2) -> Path:
+        """スナップショットを新しい世代として公開する。
+
+        ReadOnlyIndexAdapter は次回の更新確認時に新しい世代へ切り替わる。
+        """
+        return publish_generation(root, keep=keep, **self._snapshot_payload())
+
+    def _snapshot_payload(self) -> dict:
+        """スナップショット書き出し用のデータをまとめる。"""
+        ids = [c.chunk_id for c in self._chunks_cache]
+        stored = self._collection.get(ids=ids, include=["embeddings"])
+        position = {cid: i for i, cid in enumerate(stored["ids"])}
+        embeddings = np.asarray(stored["embeddings"], dtype=np.float32)
+        return {
+            "chunks": self._chunks_cache,
+            "embeddings": embeddings[[position[cid] for cid in ids]],
+            "bm25_vocab": list(self._bm25_vocab),
+            "bm25_matrix": self._bm25_matrix,
+            "corpus_version": self._corpus_version,
+            "embedding_model": self._embedding_model,
+        }
+
+    def import_snapshot(self, path: str | Path) -> SnapshotManifest:
+        """スナップショットを読み込み、再 Embedding・再トークナイズなしで復元する。
+
+        空のアダプタに対してのみ実行できる。Embedding モデルが設定と異なる
+        スナップショットは ValueError で拒否する。
+        """
+        if not self.is_empty():
+            raise ValueError("ドキュメント登録済みのストアには復元できません")
+
+        snapshot = read_snapshot(path)
+        check_embedding_model(snapshot.manifest, self._embedding_model)
+        chunks = snapshot.chunks()
+        batch_size = self._client.get_max_batch_size()
+        for start in range(0, len(chunks), batch_size):
+            batch = chunks[start : start + batch_size]
+            self._collection.add(
+                ids=[c.chunk_id for c in batch],
+                embeddings=np.asarray(
+                    snapshot.embeddings[start : start + len(batch)],
+                ),
+                documents=[c.text for c in batch],
+                metadatas=[
+                    {"source": c.source, "page": c.page or 0, **c.metadata}
+                    for c in batch
+                ],
+            )
+
+        self._chunks_cache = list(chunks)
+        self._chunk_index = {c.chunk_id: i for i, c in enumerate(chunks)}
+        self._bm25_vocab = {term: i for i, term in enumerate(snapshot.bm25_vocab)}
+        self._bm25_matrix = snapshot.bm25_matrix
+        self._corpus_version = snapshot.manifest.corpus_version
+        self._corpus_fingerprint = snapshot.manifest.corpus_fingerprint
+
+        logger.info(
+            "スナップショットから %d チャンクを復元しました (corpus_version=%d)",
+            len(chunks),
+            self._corpus_version,
+        )
+        return snapshot.manifest
+
     def _rebuild_bm25_index(self) -> None:
-        """BM25 インデックスを再構築する。"""
+        """BM25 インデックス（語彙 × チャンク の重み行列）を再構築する。"""
+        self._bm25_vocab = {}
+        self._bm25_matrix = None
         if not self._chunks_cache or self._tokenize_fn is None:
-            self._bm25_index = None
             return
 
-        try:
-            from rank_bm25 import BM25Okapi
-
-            tokenized = [self._tokenize_fn(c.text) for c in self._chunks_cache]
-            self._bm25_index = BM25Okapi(tokenized)
-        except ImportError:
-            logger.warning(
-                "rank_bm25 が利用できないため、BM25 インデックスを構築できません"
-            )
-            self._bm25_index = None
+        tokenized = [self._tokenize_fn(c.text) for c in self._chunks_cache]
+        built = build_bm25_matrix(tokenized)
+        if built is not None:
+            self._bm25_vocab, self._bm25_matrix = built
 
     def similarity_search(
         self,
@@ -87,69 +220,197 @@ class ChromaDBAdapter:
         k: int = 10,
     ) -> list[SearchResult]:
         """ベクトル類似度検索を実行する"""
-        if self._collection.count() == 0:
-            return []
+        return self.similarity_search_many([query], k=k)[0]
 
-        query_embedding = self._query_embedding_fn([query])[0]
+    def keyword_search(
+        self,
+        query: str,
+        k: int = 10,
+    ) -> list[SearchResult]:
+        """キーワード検索（BM25）を実行する"""
+        return self.keyword_search_many([query], k=k)[0]
 
-        results = self._collection.query(
-            query_embeddings=[query_embedding],
-            n_results=min(k, self._collection.count()),
-            include=["documents", "metadatas", "distances"],
-        )
+    def hybrid_search(
+        self,
+        query: str,
+        k: int = 10,
+        bm25_weight: float = 0.3,
+    ) -> list[SearchResult]:
+        """ハイブリッド検索（ベクトル + BM25 の RRF 統合）を1回の呼び出しで実行する。"""
+        return self.hybrid_search_many([query], k=k, bm25_weight=bm25_weight)[0]
 
-        search_results: list[SearchResult] = []
-        if results["ids"] and results["ids"][0]:
-            for i, chunk_id in enumerate(results["ids"][0]):
-                text = results["documents"][0][i] if results["documents"] else ""
-                metadata = results["metadatas"][0][i] if results["metadatas"] else {}
-                distance = results["distances"][0][i] if results["distances"] else 1.0
-                score = 1.0 - distance  # cosine distance → similarity
-
-                chunk = DocumentChunk(
-                    chunk_id=chunk_id,
-                    text=text,
-                    source=metadata.get("source", ""),
-                    page=metadata.get("page"),
-                    metadata={
-                        k: v for k, v in metadata.items() if k not in ("source", "page")
-                    },
-                )
-                search_results.append(SearchResult(chunk=chunk, score=score))
-
-        return search_results
+    def similarity_search_many(
+        self,
+        queries: list[str],
+        k: int = 10,
+    ) -> list[list[SearchResult]]:
+        """複数クエリのベクトル類似度検索を一括で実行する。
 
-    def keyword_search(
+        全クエリを1回の Embedding 計算と1回の collection.query で処理する。
+        """
+        if not queries or self._collection.count() == 0:
+            return [[] for _ in queries]
+
+        embeddings = self._query_embedding_fn(list(queries))
+        return [
+            self._to_search_results(indices, scores)
+            for indices, scores in self._vector_rankings(embeddings, k)
+        ]
+
+    def keyword_search_many(
+        self,
+        queries: list[str],
+        k: int = 10,
+    ) -> list[list[SearchResult]]:
+        """複数クエリのキーワード検索（BM25）を一括で実行する。
+
+        全クエリのスコアを1回の疎行列積で計算する。
+        """
+        if not queries or self._bm25_matrix is None or self._tokenize_fn is None:
+            return [[] for _ in queries]
+
+        token_lists = [self._tokenize_fn(q) for q in queries]
+        return [
+            self._to_search_results(indices, scores)
+            for indices, scores in self._bm25_rankings(token_lists, k)
+        ]
+
+    def hybrid_search_many(
+        self,
+        queries: list[str],
+        k: int = 10,
+        bm25_weight: float = 0.3,
+    ) -> list[list[SearchResult]]:
+        """複数クエリのハイブリッド検索を一括で実行する。
+
+        embedding_executor が指定されていればクエリ Embedding の一括計算と
+        トークナイズを並行に行い、両リトリーバの結果を共通のチャンク
+        インデックス上で NumPy により RRF 統合する。
+        """
+        if not queries or not self._chunks_cache:
+            return [[] for _ in queries]
+
+        embedding_future = None
+        if self._embedding_executor is not None:
+            embedding_future = self._embedding_executor.submit(
+                self._query_embedding_fn,
+                list(queries),
+            )
+        if self._tokenize_fn is not None:
+            token_lists = [self._tokenize_fn(q) for q in queries]
+        else:
+            token_lists = [[] for _ in queries]
+        if embedding_future is not None:
+            embeddings = embedding_future.result()
+        else:
+            embeddings = self._query_embedding_fn(list(queries))
+
+        vec_rankings = self._vector_rankings(embeddings, k)
+        bm25_rankings = self._bm25_rankings(token_lists, k)
+        weights = [1.0 - bm25_weight, bm25_weight]
+        return [
+            self._to_search_results(
+                *fuse_top_k(
+                    [vec_indices, bm25_indices],
+                    weights,
+                    len(self._chunks_cache),
+                    k,
+                ),
+            )
+            for (vec_indices, _), (bm25_indices, _) in zip(
+                vec_rankings,
+                bm25_rankings,
+            )
+        ]
+
+    async def asimilarity_search(
         self,
         query: str,
         k: int = 10,
     ) -> list[SearchResult]:
-        """キーワード検索（BM25）を実行する"""
-        if (
-            self._bm25_index is None
-            or self._tokenize_fn is None
-            or not self._chunks_cache
-        ):
-            return []
+        """ベクトル類似度検索を Executor 上で実行する"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor,
+            self.similarity_search,
+            query,
+            k,
+        )
 
-        query_tokens = self._tokenize_fn(query)
-        if not query_tokens:
-            return []
+    async def akeyword_search(
+        self,
+        query: str,
+        k: int = 10,
+    ) -> list[SearchResult]:
+        """キーワード検索（BM25）を Executor 上で実行する"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor,
+            self.keyword_search,
+            query,
+            k,
+        )
 
-        scores = self._bm25_index.get_scores(query_tokens)
+    async def ahybrid_search_many(
+        self,
+        queries: list[str],
+        k: int = 10,
+        bm25_weight: float = 0.3,
+    ) -> list[list[SearchResult]]:
+        """複数クエリのハイブリッド検索を Executor 上で実行する"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor,
+            self.hybrid_search_many,
+            queries,
+            k,
+            bm25_weight,
+        )
 
-        scored_indices = sorted(
-            range(len(scores)),
-            key=lambda i: scores[i],
-            reverse=True,
-        )[:k]
+    def _vector_rankings(
+        self,
+        query_embeddings: list[list[float]],
+        k: int,
+    ) -> list[Ranking]:
+        """ベクトル検索の上位 k 件を（チャンクインデックス, 類似度）で返す。"""
+        count = self._collection.count()
+        if count == 0:
+            empty = (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64))
+            return [empty for _ in query_embeddings]
 
-        search_results: list[SearchResult] = []
-        for idx in scored_indices:
-            if scores[idx] > 0:
-                chunk = self._chunks_cache[idx]
-                search_results.append(
-                    SearchResult(chunk=chunk, score=float(scores[idx])),
-                )
+        results = self._collection.query(
+            query_embeddings=query_embeddings,
+            n_results=min(k, count),
+            include=["distances"],
+        )
 
-        return search_results
+        rankings: list[Ranking] = []
+        for ids, distances in zip(results["ids"], results["distances"]):
+            pairs = [
+                (self._chunk_index[cid], 1.0 - dist)  # cosine distance → similarity
+                for cid, dist in zip(ids, distances)
+                if cid in self._chunk_index
+            ]
+            indices = np.fromiter((i for i, _ in pairs), dtype=np.int64)
+            scores = np.fromiter((s for _, s in pairs), dtype=np.float64)
+            rankings.append((indices, scores))
+        return rankings
+
+    def _bm25_rankings(
+        self,
+        token_lists: list[list[str]],
+        k: int,
+    ) -> list[Ranking]:
+        """BM25 スコアが正の上位 k 件を（チャンクインデックス, スコア）で返す。"""
+        return bm25_top_k(token_lists, self._bm25_vocab, self._bm25_matrix, k)
+
+    def _to_search_results(
+        self,
+        indices: np.ndarray,
+        scores: np.ndarray,
+    ) -> list[SearchResult]:
+        """チャンクインデックスとスコアを SearchResult のリストに変換する。"""
+        return [
+            SearchResult(chunk=self._chunks_cache[i], score=float(s))
+            for i, s in zip(indices, scores)
+        ]
@@ -0,0 +1,347 @@
+"""検索インデックスのスナップショット（書き出し・読み込み）
+
+Embedding・チャンクテーブル・BM25 ポスティング・コーパスバージョン・
+コーパスの内容ハッシュを1つのディレクトリに書き出す。配列は .npy 形式で
+保存し、読み込み時はメモリマップで開くため、パース処理はほぼ発生しない。
+
+ディレクトリ構成:
+    manifest.json      フォーマットバージョン・件数・Embedding モデル名と次元数など
+    embeddings.npy     float32 (チャンク数 × 次元数)、L2 正規化済み
+    text_blob.bin      全チャンク本文を連結した UTF-8 バイト列
+    text_offsets.npy   int64 (チャンク数 + 1)、text_blob 上の開始位置
+    chunk_meta.json    chunk_id・source・page・metadata のリスト
+    bm25_vocab.json    BM25 の語彙（行番号順）
+    bm25_data.npy      BM25 重み行列（語彙 × チャンク、CSR）の data
+    bm25_indices.npy   同 indices
+    bm25_indptr.npy    同 indptr
+
+複数ワーカープロセスで共有する場合は publish_generation で世代ディレクトリ
+として公開する。CURRENT ファイルが最新世代名を指し、os.replace により
+アトミックに切り替わる:
+    <root>/CURRENT
+    <root>/generations/<世代名>/manifest.json ...
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import uuid
+from collections.abc import Iterable
+from datetime import UTC, datetime
+from pathlib import Path
+
+import numpy as np
+from pydantic import BaseModel, Field
+from scipy import sparse
+
+from domain.models import DocumentChunk
+from interfaces.adapters.ranking import normalize_rows
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FORMAT_VERSION = 1
+
+_MANIFEST = "manifest.json"
+_EMBEDDINGS = "embeddings.npy"
+_TEXT_BLOB = "text_blob.bin"
+_TEXT_OFFSETS = "text_offsets.npy"
+_CHUNK_META = "chunk_meta.json"
+_BM25_VOCAB = "bm25_vocab.json"
+_BM25_DATA = "bm25_data.npy"
+_BM25_INDICES = "bm25_indices.npy"
+_BM25_INDPTR = "bm25_indptr.npy"
+_CURRENT = "CURRENT"
+_GENERATIONS = "generations"
+
+
+class SnapshotManifest(BaseModel):
+    """スナップショットのマニフェスト"""
+
+    model_config = {"frozen": True}
+
+    format_version: int = Field(default=SNAPSHOT_FORMAT_VERSION)
+    corpus_version: int = Field(description="書き出し時点のコーパスバージョン")
+    corpus_fingerprint: str = Field(
+        default="",
+        description="チャンク ID と本文から求めたコーパスの内容ハッシュ",
+    )
+    num_chunks: int = Field(description="チャンク数")
+    embedding_model: str = Field(
+        default="",
+        description="Embedding を生成したモデル名（旧スナップショットは空文字）",
+    )
+    embedding_dim: int = Field(description="Embedding の次元数")
+    vocab_size: int = Field(description="BM25 語彙数")
+    created_at: str = Field(description="作成日時（ISO 8601, UTC）")
+
+
+def corpus_fingerprint(chunks: Iterable[DocumentChunk], previous: str = "") -> str:
+    """チャンク ID と本文を登録順に連鎖させたコーパスの内容ハッシュを返す。
+
+    previous に既存コーパスのハッシュを渡すと、追加分だけで更新できる
+    （まとめて計算した場合と同じ値になる）。チャンクが無ければ previous を返す。
+    コーパスバージョンと異なり、プロセスを再起動しても同じ内容なら同じ値になる。
+    """
+    digest = previous
+    for c in chunks:
+        material = f"{digest}\0{c.chunk_id}\0{c.text}".encode()
+        digest = hashlib.sha256(material).hexdigest()
+    return digest
+
+
+def check_embedding_model(
+    manifest: SnapshotManifest,
+    embedding_model: str,
+    embedding_dim: int | None = None,
+) -> None:
+    """スナップショットの Embedding が設定中のモデルのものか検証する。
+
+    別モデルの Embedding とクエリを比べても、エラーにならず無意味な順位が
+    返るため、モデル名・次元数が一致しなければ ValueError を送出する。
+    embedding_model が空の場合、モデル名を記録していない旧スナップショットの
+    場合はモデル名を検証できない（後者は警告のみ）。
+    """
+    if embedding_dim is not None and manifest.embedding_dim != embedding_dim:
+        raise ValueError(
+            "スナップショットの Embedding 次元数が一致しません: "
+            f"{manifest.embedding_dim} (期待値 {embedding_dim})"
+        )
+    if not embedding_model:
+        return
+    if not manifest.embedding_model:
+        logger.warning(
+            "スナップショットに Embedding モデル名が記録されていません"
+            "（%s で作成されたものとして扱います）",
+            embedding_model,
+        )
+        return
+    if manifest.embedding_model != embedding_model:
+        raise ValueError(
+            "スナップショットの Embedding モデルが設定と異なります: "
+            f"{manifest.embedding_model} (設定 {embedding_model})"
+        )
+
+
+class IndexSnapshot(BaseModel):
+    """読み込み済みスナップショット（配列はメモリマップ）
+
+    チャンク本文はメモリマップ上のバイト列のまま保持し、chunk() で
+    必要な行だけを DocumentChunk に復元する。
+    """
+
+    model_config = {"frozen": True, "arbitrary_types_allowed": True}
+
+    manifest: SnapshotManifest
+    chunk_meta: list[dict]
+    text_blob: np.ndarray
+    text_offsets: np.ndarray
+    embeddings: np.ndarray
+    bm25_vocab: list[str]
+    bm25_matrix: sparse.csr_matrix | None
+
+    def chunk(self, index: int) -> DocumentChunk:
+        """指定行のチャンクを復元する。"""
+        m = self.chunk_meta[index]
+        start, end = self.text_offsets[index], self.text_offsets[index + 1]
+        # 書き出し時に検証済みのデータなので model_construct でバリデーションを省略する
+        return DocumentChunk.model_construct(
+            chunk_id=m["chunk_id"],
+            text=self.text_blob[start:end].tobytes().decode("utf-8"),
+            source=m["source"],
+            page=m["page"],
+            metadata=m["metadata"],
+        )
+
+    def chunks(self) -> list[DocumentChunk]:
+        """全チャンクを復元する。"""
+        return [self.chunk(i) for i in range(self.manifest.num_chunks)]
+
+
+def write_snapshot(
+    path: str | Path,
+    *,
+    chunks: list[DocumentChunk],
+    embeddings: np.ndarray,
+    bm25_vocab: list[str],
+    bm25_matrix: sparse.csr_matrix | None,
+    corpus_version: int,
+    embedding_model: str = "",
+) -> SnapshotManifest:
+    """スナップショットを書き出す。
+
+    一時ディレクトリに全ファイルを書き出してから rename するため、
+    読み手が書き込み途中のスナップショットを開くことはない。
+    """
+    target = Path(path)
+    if not chunks:
+        raise ValueError("チャンクが0件のため、スナップショットを書き出せません")
+    if len(chunks) != len(embeddings):
+        raise ValueError("chunks と embeddings の件数が一致しません")
+
+    tmp = target.with_name(f".{target.name}.tmp-{uuid.uuid4().hex}")
+    tmp.mkdir(parents=True)
+    try:
+        embeddings = normalize_rows(embeddings)
+        np.save(tmp / _EMBEDDINGS, embeddings)
+
+        encoded = [c.text.encode("utf-8") for c in chunks]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        (tmp / _TEXT_BLOB).write_bytes(b"".join(encoded))
+        np.save(tmp / _TEXT_OFFSETS, offsets)
+
+        meta = [
+            {
+                "chunk_id": c.chunk_id,
+                "source": c.source,
+                "page": c.page,
+                "metadata": c.metadata,
+            }
+            for c in chunks
+        ]
+        (tmp / _CHUNK_META).write_text(json.dumps(meta, ensure_ascii=False))
+
+        (tmp / _BM25_VOCAB).write_text(json.dumps(bm25_vocab, ensure_ascii=False))
+        if bm25_matrix is not None:
+            csr = sparse.csr_matrix(bm25_matrix)
+            np.save(tmp / _BM25_DATA, csr.data.astype(np.float64))
+            # scipy が読み込み時にコピーしないよう int32 で保存する
+            np.save(tmp / _BM25_INDICES, csr.indices.astype(np.int32))
+            np.save(tmp / _BM25_INDPTR, csr.indptr.astype(np.int32))
+
+        manifest = SnapshotManifest(
+            corpus_version=corpus_version,
+            corpus_fingerprint=corpus_fingerprint(chunks),
+            num_chunks=len(chunks),
+            embedding_model=embedding_model,
+            embedding_dim=int(embeddings.shape[1]),
+            vocab_size=len(bm25_vocab),
+            created_at=datetime.now(UTC).isoformat(),
+        )
+        (tmp / _MANIFEST).write_text(manifest.model_dump_json(indent=2))
+
+        if target.exists():
+            shutil.rmtree(target)
+        tmp.rename(target)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+
+    logger.info(
+        "スナップショットを書き出しました: %s (%d チャンク)",
+        target,
+        manifest.num_chunks,
+    )
+    return manifest
+
+
+def read_manifest(path: str | Path) -> SnapshotManifest:
+    """マニフェストのみを読み込み、フォーマットバージョンを検証する。"""
+    manifest = SnapshotManifest.model_validate_json(
+        (Path(path) / _MANIFEST).read_text(),
+    )
+    if manifest.format_version != SNAPSHOT_FORMAT_VERSION:
+        raise ValueError(
+            f"未対応のスナップショット形式です: version={manifest.format_version}"
+        )
+    return manifest
+
+
+def read_snapshot(path: str | Path) -> IndexSnapshot:
+    """スナップショットを読み込む（配列はメモリマップで開く）。"""
+    root = Path(path)
+    manifest = read_manifest(root)
+
+    embeddings = np.load(root / _EMBEDDINGS, mmap_mode="r")
+    offsets = np.load(root / _TEXT_OFFSETS, mmap_mode="r")
+    blob = (
+        np.memmap(root / _TEXT_BLOB, dtype=np.uint8, mode="r")
+        if offsets[-1] > 0
+        else np.empty(0, dtype=np.uint8)
+    )
+    meta = json.loads((root / _CHUNK_META).read_text())
+
+    bm25_vocab = json.loads((root / _BM25_VOCAB).read_text())
+    bm25_matrix: sparse.csr_matrix | None = None
+    if (root / _BM25_DATA).exists():
+        bm25_matrix = sparse.csr_matrix(
+            (
+                np.load(root / _BM25_DATA, mmap_mode="r"),
+                np.load(root / _BM25_INDICES, mmap_mode="r"),
+                np.load(root / _BM25_INDPTR, mmap_mode="r"),
+            ),
+            shape=(manifest.vocab_size, manifest.num_chunks),
+        )
+
+    snapshot = IndexSnapshot(
+        manifest=manifest,
+        chunk_meta=meta,
+        text_blob=blob,
+        text_offsets=offsets,
+        embeddings=embeddings,
+        bm25_vocab=bm25_vocab,
+        bm25_matrix=bm25_matrix,
+    )
+    if not manifest.corpus_fingerprint:
+        # 内容ハッシュを持たない旧スナップショットは本文から求める
+        fingerprint = corpus_fingerprint(snapshot.chunks())
+        snapshot = snapshot.model_copy(
+            update={
+                "manifest": manifest.model_copy(
+                    update={"corpus_fingerprint": fingerprint},
+                ),
+            },
+        )
+    return snapshot
+
+
+# ---------------------------------------------------------------------------
+# 世代管理（複数ワーカープロセスでの共有用）
+# ---------------------------------------------------------------------------
+
+
+def publish_generation(
+    root: str | Path,
+    *,
+    keep: int = 2,
+    **snapshot_kwargs: object,
+) -> Path:
+    """スナップショットを新しい世代として書き出し、CURRENT をアトミックに更新する。
+
+    直近 keep 世代より古い世代は削除する。削除済みの世代をメモリマップで
+    開いている読み手は、Linux ではマップを閉じるまでそのまま参照できる。
+    """
+    root_path = Path(root)
+    generations = root_path / _GENERATIONS
+    generations.mkdir(parents=True, exist_ok=True)
+
+    name = (
+        f"{datetime.now(UTC):%Y%m%dT%H%M%S%f}"
+        f"-v{snapshot_kwargs.get('corpus_version', 0)}"
+    )
+    write_snapshot(generations / name, **snapshot_kwargs)
+
+    tmp_pointer = root_path / f".{_CURRENT}.tmp-{uuid.uuid4().hex}"
+    tmp_pointer.write_text(name)
+    os.replace(tmp_pointer, root_path / _CURRENT)
+    logger.info("新しい世代を公開しました: %s", name)
+
+    published = sorted(
+        p for p in generations.iterdir() if p.is_dir() and not p.name.startswith(".")
+    )
+    for old in published[:-keep]:
+        shutil.rmtree(old, ignore_errors=True)
+
+    return generations / name
+
+
+def current_generation(root: str | Path) -> Path | None:
+    """CURRENT が指す世代ディレクトリを返す（未公開なら None）。"""
+    pointer = Path(root) / _CURRENT
+    if not pointer.exists():
+        return None
+    return Path(root) / _GENERATIONS / pointer.read_text().strip()
@@ -0,0 +1,74 @@
+"""ストリーミング中の JSON から配列要素を逐次取り出すパーサ
+
+構造化出力をトークン単位で受け取りながら、トップレベルのオブジェクトの
+指定キーが持つ配列（例: TaskPlanningResult.subtasks）の要素を、
+閉じ括弧が届いて完成した時点で1件ずつ返す。
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any
+
+
+class JsonArrayItemStream:
+    """{"<field>": [{...}, {...}]} 形式の JSON から要素を完成順に取り出す
+
+    文字列中の括弧やエスケープを考慮して括弧の深さを追跡する。
+    要素はオブジェクト（{...}）のみを対象とする。
+    """
+
+    def __init__(self, field: str) -> None:
+        self._field = field
+        self._buffer = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._last_key: str | None = None
+        self._in_array = False
+        self._item_start: int | None = None
+
+    @property
+    def text(self) -> str:
+        """これまでに受け取ったテキスト全体"""
+        return self._buffer
+
+    def feed(self, chunk: str) -> list[Any]:
+        """テキストの断片を追加し、新たに完成した要素を返す。"""
+        self._buffer += chunk
+        items: list[Any] = []
+        buf = self._buffer
+        for i in range(self._pos, len(buf)):
+            c = buf[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._last_key = buf[self._string_start + 1 : i]
+                continue
+
+            if c == '"':
+                self._in_string = True
+                self._string_start = i
+            elif c in "{[":
+                self._depth += 1
+                if c == "[" and self._depth == 2 and self._last_key == self._field:
+                    self._in_array = True
+                elif c == "{" and self._in_array and self._depth == 3:
+                    self._item_start = i
+            elif c in "}]":
+                if c == "}" and self._in_array and self._depth == 3:
+                    if self._item_start is not None:
+                        items.append(json.loads(buf[self._item_start : i + 1]))
+                    self._item_start = None
+                elif c == "]" and self._in_array and self._depth == 2:
+                    self._in_array = False
+                self._depth -= 1
+        self._pos = len(buf)
+        return items
@@ -0,0 +1,387 @@
+"""LLM 応答キャッシュ（LLMPort のデコレータ）
+
+task_planning・judge などの決定的に扱えるノードでは、同じ質問の再送や
+同一の要約により、バイト単位で同じメッセージ列が LLM に渡されることが多い。
+モデル名・メッセージ・応答モデルのスキーマ・サンプリングパラメータを
+キーとして応答を保存し、完全一致した呼び出しでは LLM を呼ばずに返す。
+
+エントリはコーパスの内容ハッシュ（チャンク ID と本文から求める値）と
+紐づけて保存し、ドキュメントの追加でハッシュが変わった時点で古いエントリを
+すべて破棄する。プロセス内のカウンタと違い再起動後も同じ内容なら同じ値に
+なるため、永続化したエントリを別のコーパスに対して返すことはない。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import AsyncIterator, Callable
+from pathlib import Path
+from typing import TypeVar
+
+from pydantic import BaseModel, Field
+
+from domain.ports.llm_port import ChatResponse, ItemT, LLMPort
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T", bound=BaseModel)
+
+
+class LLMCacheStats(BaseModel):
+    """キャッシュのヒット・ミス統計"""
+
+    hits: int = Field(default=0, description="ヒット数")
+    misses: int = Field(default=0, description="ミス数（期限切れを含む）")
+    expired: int = Field(default=0, description="TTL 切れで破棄したエントリ数")
+    evictions: int = Field(default=0, description="容量超過で破棄したエントリ数")
+
+    @property
+    def hit_rate(self) -> float:
+        """ヒット率（呼び出しが無ければ 0.0）"""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class _Entry(BaseModel):
+    """キャッシュエントリ"""
+
+    model_config = {"frozen": True}
+
+    payload: str
+    created_at: float
+    corpus_fingerprint: str
+
+
+class LLMResponseCache:
+    """LRU + TTL の LLM 応答キャッシュ（SQLite による永続化に対応）
+
+    メモリ上の OrderedDict を正とし、path を指定した場合は書き込みを
+    SQLite にも反映して、再起動後に読み戻す。ノード名ごとに統計を集計する。
+    """
+
+    def __init__(
+        self,
+        *,
+        ttl: float = 3600.0,
+        max_entries: int = 1024,
+        path: str | Path | None = None,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self._ttl = ttl
+        self._max_entries = max_entries
+        self._clock = clock
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._stats: dict[str, LLMCacheStats] = {}
+        self._corpus_fingerprint: str | None = None
+        self._lock = threading.Lock()
+        self._db: sqlite3.Connection | None = None
+        if path:
+            self._open_db(Path(path))
+
+    def _open_db(self, path: Path) -> None:
+        """SQLite を開き、有効期限内のエントリを新しい順に読み戻す。"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(llm_cache)")}
+        if columns and "corpus_fingerprint" not in columns:
+            # コーパスの内容を検証できない旧形式のエントリは読み戻さない
+            logger.info("旧形式の LLM キャッシュを破棄しました: %s", path)
+            self._db.execute("DROP TABLE llm_cache")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            " key TEXT PRIMARY KEY,"
+            " payload TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " corpus_fingerprint TEXT NOT NULL)"
+        )
+        self._db.execute(
+            "DELETE FROM llm_cache WHERE created_at < ?",
+            (self._clock() - self._ttl,),
+        )
+        self._db.commit()
+        rows = self._db.execute(
+            "SELECT key, payload, created_at, corpus_fingerprint FROM llm_cache"
+            " ORDER BY created_at DESC LIMIT ?",
+            (self._max_entries,),
+        ).fetchall()
+        for key, payload, created_at, fingerprint in reversed(rows):
+            self._entries[key] = _Entry(
+                payload=payload,
+                created_at=created_at,
+                corpus_fingerprint=fingerprint,
+            )
+        logger.info("LLM キャッシュを読み込みました: %s (%d 件)", path, len(rows))
+
+    def stats(self, node: str | None = None) -> LLMCacheStats:
+        """統計を返す（node 省略時は全ノードの合計）。"""
+        with self._lock:
+            if node is not None:
+                return self._stats.get(node, LLMCacheStats()).model_copy()
+            total = LLMCacheStats()
+            for s in self._stats.values():
+                total.hits += s.hits
+                total.misses += s.misses
+                total.expired += s.expired
+                total.evictions += s.evictions
+            return total
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def sync_corpus_fingerprint(self, fingerprint: str) -> None:
+        """コーパスの内容ハッシュが変わっていれば、他のコーパスのエントリを破棄する。"""
+        with self._lock:
+            if fingerprint == self._corpus_fingerprint:
+                return
+            self._corpus_fingerprint = fingerprint
+            stale = [
+                key
+                for key, entry in self._entries.items()
+                if entry.corpus_fingerprint != fingerprint
+            ]
+            for key in stale:
+                del self._entries[key]
+            if self._db is not None:
+                self._db.execute(
+                    "DELETE FROM llm_cache WHERE corpus_fingerprint != ?",
+                    (fingerprint,),
+                )
+                self._db.commit()
+            if stale:
+                logger.info(
+                    "コーパス更新により LLM キャッシュを破棄しました (%d 件)",
+                    len(stale),
+                )
+
+    def get(self, key: str, *, node: str, corpus_fingerprint: str) -> str | None:
+        """キーに対応する応答（シリアライズ済み）を返す。無ければ None。"""
+        with self._lock:
+            stats = self._stats.setdefault(node, LLMCacheStats())
+            entry = self._entries.get(key)
+            if entry is not None and entry.corpus_fingerprint != corpus_fingerprint:
+                entry = None
+            if entry is not None and self._clock() - entry.created_at > self._ttl:
+                self._delete(key)
+                if self._db is not None:
+                    self._db.commit()
+                stats.expired += 1
+                entry = None
+            if entry is None:
+                stats.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            stats.hits += 1
+            return entry.payload
+
+    def put(
+        self,
+        key: str,
+        payload: str,
+        *,
+        node: str,
+        corpus_fingerprint: str,
+    ) -> None:
+        """応答を保存し、上限を超えた分を古い順に破棄する。"""
+        with self._lock:
+            entry = _Entry(
+                payload=payload,
+                created_at=self._clock(),
+                corpus_fingerprint=corpus_fingerprint,
+            )
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?, ?)",
+                    (key, payload, entry.created_at, corpus_fingerprint),
+                )
+            while len(self._entries) > self._max_entries:
+                oldest = next(iter(self._entries))
+                self._delete(oldest)
+                self._stats.setdefault(node, LLMCacheStats()).evictions += 1
+            if self._db is not None:
+                self._db.commit()
+
+    def clear(self) -> None:
+        """全エントリを破棄する（統計は保持する）。"""
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM llm_cache")
+                self._db.commit()
+
+    def _delete(self, key: str) -> None:
+        del self._entries[key]
+        if self._db is not None:
+            self._db.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+
+
+class CachedLLMAdapter:
+    """LLMResponseCache を前段に置く LLMPort のデコレータ
+
+    agenerate / agenerate_structured の応答をキャッシュする。ストリーミング
+    （astream・astream_list_items）はそのまま内側の LLM に委譲する。
+    """
+
+    def __init__(
+        self,
+        llm: LLMPort,
+        cache: LLMResponseCache,
+        *,
+        node: str,
+        model_name: str,
+        sampling_params: dict | None = None,
+        corpus_fingerprint_fn: Callable[[], str] | None = None,
+    ) -> None:
+        self._llm = llm
+        self._cache = cache
+        self._node = node
+        self._model_name = model_name
+        self._sampling_params = sampling_params or {}
+        self._corpus_fingerprint_fn = corpus_fingerprint_fn
+
+    def _corpus_fingerprint(self) -> str:
+        """現在のコーパスの内容ハッシュを取得し、キャッシュに反映する。"""
+        fingerprint = (
+            self._corpus_fingerprint_fn() if self._corpus_fingerprint_fn else ""
+        )
+        self._cache.sync_corpus_fingerprint(fingerprint)
+        return fingerprint
+
+    def _make_key(
+        self,
+        messages: list[dict],
+        *,
+        response_model: type[BaseModel] | None,
+        num_predict: int | None,
+        reasoning: str | None,
+    ) -> str:
+        """呼び出し内容から決定的なキャッシュキーを生成する。"""
+        material = {
+            "model": self._model_name,
+            "messages": messages,
+            "schema": (response_model.model_json_schema() if response_model else None),
+            "num_predict": num_predict,
+            "reasoning": reasoning,
+            "sampling": self._sampling_params,
+        }
+        encoded = json.dumps(material, ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+    async def agenerate(
+        self,
+        messages: list[dict],
+        *,
+        num_predict: int | None = None,
+        reasoning: str | None = None,
+    ) -> ChatResponse:
+        """テキスト生成（キャッシュ付き）"""
+        fingerprint = self._corpus_fingerprint()
+        key = self._make_key(
+            messages,
+            response_model=None,
+            num_predict=num_predict,
+            reasoning=reasoning,
+        )
+        cached = self._cache.get(
+            key,
+            node=self._node,
+            corpus_fingerprint=fingerprint,
+        )
+        if cached is not None:
+            logger.info("LLM キャッシュヒット: node=%s", self._node)
+            return ChatResponse.model_validate_json(cached)
+
+        result = await self._llm.agenerate(
+            messages,
+            num_predict=num_predict,
+            reasoning=reasoning,
+        )
+        self._cache.put(
+            key,
+            result.model_dump_json(),
+            node=self._node,
+            corpus_fingerprint=fingerprint,
+        )
+        return result
+
+    async def agenerate_structured(
+        self,
+        messages: list[dict],
+        response_model: type[T],
+        *,
+        num_predict: int | None = None,
+        reasoning: str | None = None,
+    ) -> T:
+        """構造化出力（キャッシュ付き）"""
+        fingerprint = self._corpus_fingerprint()
+        key = self._make_key(
+            messages,
+            response_model=response_model,
+            num_predict=num_predict,
+            reasoning=reasoning,
+        )
+        cached = self._cache.get(
+            key,
+            node=self._node,
+            corpus_fingerprint=fingerprint,
+        )
+        if cached is not None:
+            logger.info("LLM キャッシュヒット: node=%s", self._node)
+            return response_model.model_validate_json(cached)
+
+        result = await self._llm.agenerate_structured(
+            messages,
+            response_model,
+            num_predict=num_predict,
+            reasoning=reasoning,
+        )
+        self._cache.put(
+            key,
+            result.model_dump_json(),
+            node=self._node,
+            corpus_fingerprint=fingerprint,
+        )
+        return result
+
+    async def astream_list_items(
+        self,
+        messages: list[dict],
+        response_model: type[BaseModel],
+        item_model: type[ItemT],
+        *,
+        field: str,
+        num_predict: int | None = None,
+        reasoning: str | None = None,
+    ) -> AsyncIterator[ItemT]:
+        """リスト要素のストリーミング（キャッシュしない）"""
+        async for item in self._llm.astream_list_items(
+            messages,
+            response_model,
+            item_model,
+            field=field,
+            num_predict=num_predict,
+            reasoning=reasoning,
+        ):
+            yield item
+
+    async def astream(
+        self,
+        messages: list[dict],
+        *,
+        reasoning: str | None = None,
+        temperature: float | None = None,
+    ) -> AsyncIterator[str]:
+        """ストリーミング生成（キャッシュしない）"""
+        async for token in self._llm.astream(
+            messages,
+            reasoning=reasoning,
+            temperature=temperature,
+        ):
+            yield token
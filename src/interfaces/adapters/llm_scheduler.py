@@ -0,0 +1,279 @@
+"""優先度付き LLM リクエストスケジューラ（LLMPort のデコレータ）
+
+ローカルの Ollama サーバが同時に実行できる生成数は限られる。全セッションの
+LLM 呼び出しを同時実行数の上限付きスロットで制御し、空きを待つ呼び出しは
+優先度クラス（回答ストリーミング > judge > summarize > task_planning）の順に、
+同じクラス内ではセッション間のラウンドロビンで割り当てる。
+ストリーミングは最後のトークンまでスロットを保持する。judge と並行して
+生成する投機的な回答は、judge を待たせないよう専用の予約スロットで実行する。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from collections.abc import AsyncIterator, Callable
+from contextlib import asynccontextmanager
+from enum import IntEnum
+from typing import TypeVar
+
+from pydantic import BaseModel, Field
+
+from domain.ports.llm_port import ChatResponse, ItemT, LLMPort
+from domain.session import current_session_id
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T", bound=BaseModel)
+
+
+class LLMPriority(IntEnum):
+    """LLM 呼び出しの優先度クラス（値が小さいほど優先）"""
+
+    FINAL_ANSWER = 0
+    JUDGE = 1
+    SUMMARIZE = 2
+    PLANNING = 3
+    # 予約スロットでのみ実行する（通常のスロットを消費しない）
+    SPECULATIVE_ANSWER = 4
+
+
+def _is_reserved(priority: LLMPriority) -> bool:
+    """予約スロットで実行する優先度クラスか"""
+    return priority == LLMPriority.SPECULATIVE_ANSWER
+
+
+class SchedulerStats(BaseModel):
+    """優先度クラスごとのキュー待ち時間の統計"""
+
+    requests: int = Field(default=0, description="スロットを獲得した呼び出し数")
+    queued: int = Field(default=0, description="待ちが発生した呼び出し数")
+    total_wait: float = Field(default=0.0, description="待ち時間の合計（秒）")
+    max_wait: float = Field(default=0.0, description="待ち時間の最大値（秒）")
+
+    @property
+    def mean_wait(self) -> float:
+        """平均待ち時間（秒）"""
+        return self.total_wait / self.requests if self.requests else 0.0
+
+
+class LLMScheduler:
+    """同時実行数の上限付きで LLM 呼び出しのスロットを割り当てる
+
+    投機的な回答（SPECULATIVE_ANSWER）は max_concurrency とは別の
+    speculative_slots 個の予約スロットで実行する。Ollama 上の同時実行数は
+    最大で max_concurrency + speculative_slots になる。
+    イベントループ上でのみ使用する（スレッドセーフではない）。
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        speculative_slots: int = 1,
+        clock: Callable[[], float] = time.perf_counter,
+    ) -> None:
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency は1以上を指定してください")
+        if speculative_slots < 1:
+            raise ValueError("speculative_slots は1以上を指定してください")
+        self._clock = clock
+        # 予約スロットか否か → 上限 / 実行中の呼び出し数
+        self._limit = {False: max_concurrency, True: speculative_slots}
+        self._running = {False: 0, True: 0}
+        # 優先度 → (セッション ID → 待機中の Future)。OrderedDict の順序が
+        # ラウンドロビンの順番になる
+        self._waiters: dict[LLMPriority, OrderedDict[str, deque[asyncio.Future]]] = {
+            p: OrderedDict() for p in LLMPriority
+        }
+        self._stats: dict[LLMPriority, SchedulerStats] = {
+            p: SchedulerStats() for p in LLMPriority
+        }
+
+    @property
+    def active(self) -> int:
+        """通常のスロットで実行中の呼び出し数"""
+        return self._running[False]
+
+    @property
+    def speculative_active(self) -> int:
+        """予約スロットで実行中の投機的な呼び出し数"""
+        return self._running[True]
+
+    def queue_depth(self, priority: LLMPriority | None = None) -> int:
+        """待機中の呼び出し数を返す（priority 省略時は全クラスの合計）。"""
+        priorities = [priority] if priority is not None else list(LLMPriority)
+        return sum(
+            sum(1 for f in waiters if not f.done())
+            for p in priorities
+            for waiters in self._waiters[p].values()
+        )
+
+    def stats(self, priority: LLMPriority) -> SchedulerStats:
+        """優先度クラスの待ち時間統計を返す。"""
+        return self._stats[priority].model_copy()
+
+    @asynccontextmanager
+    async def slot(
+        self,
+        priority: LLMPriority,
+        session_id: str | None = None,
+    ) -> AsyncIterator[None]:
+        """スロットを獲得し、ブロックを抜けるまで保持する。"""
+        session = session_id or current_session_id.get()
+        reserved = _is_reserved(priority)
+        start = self._clock()
+        queued = False
+        waiting = sum(
+            self.queue_depth(p) for p in LLMPriority if _is_reserved(p) == reserved
+        )
+        if self._running[reserved] < self._limit[reserved] and waiting == 0:
+            self._running[reserved] += 1
+        else:
+            queued = True
+            future = asyncio.get_running_loop().create_future()
+            self._waiters[priority].setdefault(session, deque()).append(future)
+            try:
+                await future
+            except asyncio.CancelledError:
+                # スロットを受け取った直後にキャンセルされた場合は次へ譲る
+                if future.done() and not future.cancelled():
+                    self._release(priority)
+                raise
+
+        self._record_wait(priority, self._clock() - start, queued=queued)
+        try:
+            yield
+        finally:
+            self._release(priority)
+
+    def _record_wait(
+        self,
+        priority: LLMPriority,
+        wait: float,
+        *,
+        queued: bool,
+    ) -> None:
+        stats = self._stats[priority]
+        stats.requests += 1
+        stats.total_wait += wait
+        stats.max_wait = max(stats.max_wait, wait)
+        if queued:
+            stats.queued += 1
+            logger.debug(
+                "LLM スロット待ち: priority=%s, wait=%.3fs",
+                priority.name,
+                wait,
+            )
+
+    def _release(self, priority: LLMPriority) -> None:
+        """スロットを解放し、同じスロットを待つ次の呼び出しに引き渡す。"""
+        reserved = _is_reserved(priority)
+        future = self._pop_next(reserved)
+        if future is None:
+            self._running[reserved] -= 1
+        else:
+            future.set_result(None)
+
+    def _pop_next(self, reserved: bool) -> asyncio.Future | None:
+        """最優先クラスから、セッション間ラウンドロビンで次の待機者を取り出す。"""
+        for priority in LLMPriority:
+            if _is_reserved(priority) != reserved:
+                continue
+            sessions = self._waiters[priority]
+            while sessions:
+                session, waiters = next(iter(sessions.items()))
+                future = waiters.popleft()
+                if waiters:
+                    sessions.move_to_end(session)
+                else:
+                    del sessions[session]
+                if not future.done():
+                    return future
+        return None
+
+
+class ScheduledLLMAdapter:
+    """LLMScheduler のスロット内で内側の LLM を呼び出す LLMPort のデコレータ"""
+
+    def __init__(
+        self,
+        llm: LLMPort,
+        scheduler: LLMScheduler,
+        *,
+        priority: LLMPriority,
+    ) -> None:
+        self._llm = llm
+        self._scheduler = scheduler
+        self._priority = priority
+
+    async def agenerate(
+        self,
+        messages: list[dict],
+        *,
+        num_predict: int | None = None,
+        reasoning: str | None = None,
+    ) -> ChatResponse:
+        """テキスト生成（スロット獲得後に実行）"""
+        async with self._scheduler.slot(self._priority):
+            return await self._llm.agenerate(
+                messages,
+                num_predict=num_predict,
+                reasoning=reasoning,
+            )
+
+    async def agenerate_structured(
+        self,
+        messages: list[dict],
+        response_model: type[T],
+        *,
+        num_predict: int | None = None,
+        reasoning: str | None = None,
+    ) -> T:
+        """構造化出力（スロット獲得後に実行）"""
+        async with self._scheduler.slot(self._priority):
+            return await self._llm.agenerate_structured(
+                messages,
+                response_model,
+                num_predict=num_predict,
+                reasoning=reasoning,
+            )
+
+    async def astream_list_items(
+        self,
+        messages: list[dict],
+        response_model: type[BaseModel],
+        item_model: type[ItemT],
+        *,
+        field: str,
+        num_predict: int | None = None,
+        reasoning: str | None = None,
+    ) -> AsyncIterator[ItemT]:
+        """リスト要素のストリーミング（最後の要素までスロットを保持する）"""
+        async with self._scheduler.slot(self._priority):
+            async for item in self._llm.astream_list_items(
+                messages,
+                response_model,
+                item_model,
+                field=field,
+                num_predict=num_predict,
+                reasoning=reasoning,
+            ):
+                yield item
+
+    async def astream(
+        self,
+        messages: list[dict],
+        *,
+        reasoning: str | None = None,
+        temperature: float | None = None,
+    ) -> AsyncIterator[str]:
+        """ストリーミング生成（最後のトークンまでスロットを保持する）"""
+        async with self._scheduler.slot(self._priority):
+            async for token in self._llm.astream(
+                messages,
+                reasoning=reasoning,
+                temperature=temperature,
+            ):
+                yield token
@@ -3,22 +3,54 @@
 from __future__ import annotations
 
 import logging
-from collections.abc import AsyncIterator
-from typing import TypeVar
+from collections.abc import AsyncIterator, Mapping, Sequence
+from typing import Any, TypeVar
 
 from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from langchain_core.runnables import Runnable
 from langchain_ollama import ChatOllama
-from pydantic import BaseModel
+from pydantic import BaseModel, ValidationError
 
-from domain.ports.llm_port import ChatResponse
+from domain.ports.llm_port import ChatResponse, ItemT, LLMUsage
+from domain.telemetry import record_llm_usage
+from domain.token_budget import estimate_messages_tokens, select_bucket
+from interfaces.adapters.json_stream import JsonArrayItemStream
 
 logger = logging.getLogger(__name__)
 
 T = TypeVar("T", bound=BaseModel)
 
+# Ollama の応答統計の時間はナノ秒単位
+_NS_PER_SEC = 1e9
+
+# クライアントプールのキー（num_ctx, num_predict, reasoning, temperature）
+_ParamsKey = tuple[int, int | None, str | None, float]
+
+# コンテキストに収まるよう num_predict を下げる場合の下限
+_MIN_NUM_PREDICT = 256
+
+# temperature を丸める刻み
+_TEMPERATURE_STEP = 0.1
+
 
 class OllamaAdapter:
-    """Ollama / LangChain を使用した LLMPort の具体実装"""
+    """Ollama / LangChain を使用した LLMPort の具体実装
+
+    ChatOllama は内部に HTTP クライアント（コネクションプール）を持つため、
+    実効パラメータの組ごとに1つだけ生成して使い回す。これにより呼び出し
+    ごとのインスタンス生成を省き、Ollama への keep-alive 接続を再利用する。
+    構造化出力の Runnable も応答モデルごとにキャッシュする。
+
+    Ollama は num_ctx などのロード時オプションが変わるとモデルを再ロード
+    するため、num_ctx・keep_alive は既定で全呼び出し共通とし、呼び出しごとに
+    変わる temperature は少数のプロファイルに丸める。num_predict は生成長の
+    上限としてノードごとに調整された値のため、指定されたまま使う。
+    応答統計の load_duration から再ロードを検出し、警告を出力する。
+
+    num_ctx_buckets を指定した場合は、プロンプト長の概算に応じて num_ctx を
+    区切り値（最大 num_ctx）から呼び出しごとに選ぶ。KV キャッシュの確保量は
+    減るが、区切り値が切り替わるたびに再ロードが発生しうる。
+    """
 
     def __init__(
         self,
@@ -28,35 +60,183 @@ class OllamaAdapter:
         top_k: int = 40,
         top_p: float = 0.9,
         repeat_penalty: float = 1.1,
+        base_url: str | None = None,
+        keep_alive: str | None = None,
+        reload_warning_seconds: float = 1.0,
+        num_ctx_buckets: Sequence[int] = (),
+        output_reserve: int = 4096,
     ) -> None:
         self._model_name = model_name
+        self._base_url = base_url
+        self._keep_alive = keep_alive
         self._num_ctx = num_ctx
+        self._num_ctx_buckets = (
+            sorted({b for b in num_ctx_buckets if b < num_ctx} | {num_ctx})
+            if num_ctx_buckets
+            else []
+        )
+        self._output_reserve = output_reserve
         self._temperature = temperature
         self._top_k = top_k
         self._top_p = top_p
         self._repeat_penalty = repeat_penalty
+        self._reload_warning_seconds = reload_warning_seconds
+        self._loaded = False
+        self._reload_count = 0
+        self._llm_pool: dict[_ParamsKey, ChatOllama] = {}
+        self._structured_pool: dict[tuple[_ParamsKey, type[BaseModel]], Runnable] = {}
 
-    def _make_llm(
+    def _params_key(
         self,
         *,
+        num_ctx: int | None = None,
         num_predict: int | None = None,
         reasoning: str | None = None,
-    ) -> ChatOllama:
+        temperature: float | None = None,
+    ) -> _ParamsKey:
+        """呼び出しパラメータをプールのキー（プロファイル）に正規化する。
+
+        temperature は 0.1 刻みに丸める。num_predict・temperature はいずれも
+        ロード時オプションではないため、再ロードは発生しない。
+        """
+        if temperature is None:
+            temperature = self._temperature
+        temperature = round(
+            round(temperature / _TEMPERATURE_STEP) * _TEMPERATURE_STEP, 1
+        )
+        return num_ctx or self._num_ctx, num_predict, reasoning, temperature
+
+    def _size_call(
+        self,
+        messages: list[dict],
+        num_predict: int | None,
+    ) -> tuple[int, int | None]:
+        """プロンプト長の概算から num_ctx と num_predict を決める。
+
+        num_predict はプロンプトと合わせて num_ctx を超える場合に限り、収まる
+        値まで下げる（超過するとプロンプトの先頭が切り捨てられるため）。下げた値は
+        プールのキーになるため、プロンプト長ごとにクライアントが増えないよう
+        2 のべき乗に切り下げる。num_predict が未指定の呼び出し（回答の
+        ストリーミング）は output_reserve を確保する。
+        """
+        prompt_tokens = estimate_messages_tokens(messages)
+        num_ctx = self._num_ctx
+        if self._num_ctx_buckets:
+            output = num_predict if num_predict is not None else self._output_reserve
+            num_ctx = select_bucket(prompt_tokens + output, self._num_ctx_buckets)
+        if num_predict is not None:
+            available = num_ctx - prompt_tokens
+            if num_predict > available:
+                capped = 1 << (available.bit_length() - 1) if available > 0 else 0
+                num_predict = max(capped, min(num_predict, _MIN_NUM_PREDICT))
+                logger.debug(
+                    "num_predict をコンテキストに収まるよう制限: %d (prompt≒%d)",
+                    num_predict,
+                    prompt_tokens,
+                )
+        return num_ctx, num_predict
+
+    @property
+    def reload_count(self) -> int:
+        """初回ロード後に検出したモデルの再ロード回数"""
+        return self._reload_count
+
+    def _get_llm(self, key: _ParamsKey) -> ChatOllama:
+        """キーに対応する ChatOllama をプールから取得する（無ければ生成する）。"""
+        llm = self._llm_pool.get(key)
+        if llm is None:
+            llm = self._llm_pool.setdefault(key, self._make_llm(key))
+            logger.debug("ChatOllama をプールに追加: %s", key)
+        return llm
+
+    def _get_structured_llm(
+        self,
+        key: _ParamsKey,
+        response_model: type[BaseModel],
+    ) -> Runnable:
+        """応答モデルごとの構造化出力 Runnable をキャッシュから取得する。"""
+        cache_key = (key, response_model)
+        runnable = self._structured_pool.get(cache_key)
+        if runnable is None:
+            runnable = self._structured_pool.setdefault(
+                cache_key,
+                # 応答統計を取り出すため、生の AIMessage も受け取る
+                self._get_llm(key).with_structured_output(
+                    response_model,
+                    include_raw=True,
+                ),
+            )
+        return runnable
+
+    def _make_llm(self, key: _ParamsKey) -> ChatOllama:
         """パラメータを上書きした ChatOllama インスタンスを生成する。"""
+        num_ctx, num_predict, reasoning, temperature = key
         kwargs: dict = {
             "model": self._model_name,
-            "num_ctx": self._num_ctx,
-            "temperature": self._temperature,
+            "num_ctx": num_ctx,
+            "temperature": temperature,
             "top_k": self._top_k,
             "top_p": self._top_p,
             "repeat_penalty": self._repeat_penalty,
         }
+        if self._base_url is not None:
+            kwargs["base_url"] = self._base_url
+        if self._keep_alive is not None:
+            # 全プロファイルで同じ値を送り、モデルと KV キャッシュを保持する
+            kwargs["keep_alive"] = self._keep_alive
         if num_predict is not None:
             kwargs["num_predict"] = num_predict
         if reasoning is not None:
             kwargs["reasoning"] = reasoning
         return ChatOllama(**kwargs)
 
+    @staticmethod
+    def _to_usage(metadata: Mapping[str, Any] | None) -> LLMUsage | None:
+        """Ollama の応答メタデータからトークン数・処理時間を取り出す。"""
+        if not metadata or "eval_count" not in metadata:
+            return None
+        return LLMUsage(
+            prompt_eval_count=metadata.get("prompt_eval_count") or 0,
+            eval_count=metadata.get("eval_count") or 0,
+            prompt_eval_duration=(metadata.get("prompt_eval_duration") or 0)
+            / _NS_PER_SEC,
+            eval_duration=(metadata.get("eval_duration") or 0) / _NS_PER_SEC,
+            load_duration=(metadata.get("load_duration") or 0) / _NS_PER_SEC,
+            total_duration=(metadata.get("total_duration") or 0) / _NS_PER_SEC,
+        )
+
+    def _record_usage(self, metadata: Mapping[str, Any] | None) -> LLMUsage | None:
+        """応答統計をテレメトリに記録し、取り出した統計を返す。"""
+        usage = self._to_usage(metadata)
+        if usage is not None:
+            record_llm_usage(usage)
+            self._check_reload(usage)
+        return usage
+
+    def _check_reload(self, usage: LLMUsage) -> None:
+        """load_duration から初回以降のモデル再ロードを検出し、警告する。"""
+        if usage.load_duration < self._reload_warning_seconds:
+            self._loaded = True
+            return
+        if not self._loaded:
+            # 起動後最初のロードは想定内
+            self._loaded = True
+            logger.info(
+                "モデルをロードしました: %s (%.1fs)",
+                self._model_name,
+                usage.load_duration,
+            )
+            return
+        self._reload_count += 1
+        logger.warning(
+            "モデルの再ロードを検出しました: %s (load_duration=%.1fs, 累計 %d 回)。"
+            " keep_alive の期限切れか、他のクライアントによるオプション変更の"
+            "可能性があります",
+            self._model_name,
+            usage.load_duration,
+            self._reload_count,
+        )
+
     @staticmethod
     def _to_langchain_messages(
         messages: list[dict],
@@ -74,6 +254,32 @@ class OllamaAdapter:
                 result.append(HumanMessage(content=content))
         return result
 
+    def load_model(self) -> LLMUsage | None:
+        """1トークンだけ生成してモデルを Ollama にロードする（同期）。
+
+        num_ctx・keep_alive は通常の呼び出しと同じ値を送るため、
+        以降の呼び出しで再ロードは発生しない。
+        """
+        llm = self._make_llm((self._num_ctx, 1, None, self._temperature))
+        result = llm.invoke([HumanMessage(content="こんにちは")])
+        return self._record_usage(getattr(result, "response_metadata", None))
+
+    def prepare_structured(
+        self,
+        response_model: type[BaseModel],
+        *,
+        num_predict: int | None = None,
+        reasoning: str | None = None,
+    ) -> None:
+        """構造化出力の Runnable を事前に生成してキャッシュする。"""
+        for num_ctx in self._num_ctx_buckets or [self._num_ctx]:
+            key = self._params_key(
+                num_ctx=num_ctx,
+                num_predict=num_predict,
+                reasoning=reasoning,
+            )
+            self._get_structured_llm(key, response_model)
+
     async def agenerate(
         self,
         messages: list[dict],
@@ -82,16 +288,22 @@ class OllamaAdapter:
         reasoning: str | None = None,
     ) -> ChatResponse:
         """テキスト生成"""
-        llm = self._make_llm(num_predict=num_predict, reasoning=reasoning)
+        num_ctx, num_predict = self._size_call(messages, num_predict)
+        key = self._params_key(
+            num_ctx=num_ctx,
+            num_predict=num_predict,
+            reasoning=reasoning,
+        )
         lc_messages = self._to_langchain_messages(messages)
-        result = await llm.ainvoke(lc_messages)
+        result = await self._get_llm(key).ainvoke(lc_messages)
 
         content = result.content if isinstance(result.content, str) else ""
         thinking = ""
         if hasattr(result, "additional_kwargs"):
             thinking = result.additional_kwargs.get("reasoning_content", "")
+        usage = self._record_usage(getattr(result, "response_metadata", None))
 
-        return ChatResponse(content=content, thinking=thinking)
+        return ChatResponse(content=content, thinking=thinking, usage=usage)
 
     async def agenerate_structured(
         self,
@@ -102,20 +314,72 @@ class OllamaAdapter:
         reasoning: str | None = None,
     ) -> T:
         """構造化出力"""
-        llm = self._make_llm(num_predict=num_predict, reasoning=reasoning)
-        structured_llm = llm.with_structured_output(response_model)
+        num_ctx, num_predict = self._size_call(messages, num_predict)
+        key = self._params_key(
+            num_ctx=num_ctx,
+            num_predict=num_predict,
+            reasoning=reasoning,
+        )
+        structured_llm = self._get_structured_llm(key, response_model)
         lc_messages = self._to_langchain_messages(messages)
-        return await structured_llm.ainvoke(lc_messages)
+        output = await structured_llm.ainvoke(lc_messages)
+        self._record_usage(getattr(output["raw"], "response_metadata", None))
+        if output["parsing_error"] is not None:
+            raise output["parsing_error"]
+        return output["parsed"]
+
+    async def astream_list_items(
+        self,
+        messages: list[dict],
+        response_model: type[BaseModel],
+        item_model: type[ItemT],
+        *,
+        field: str,
+        num_predict: int | None = None,
+        reasoning: str | None = None,
+    ) -> AsyncIterator[ItemT]:
+        """構造化出力をストリーミングし、リスト型フィールドの要素を完成順に返す"""
+        num_ctx, num_predict = self._size_call(messages, num_predict)
+        key = self._params_key(
+            num_ctx=num_ctx,
+            num_predict=num_predict,
+            reasoning=reasoning,
+        )
+        lc_messages = self._to_langchain_messages(messages)
+        parser = JsonArrayItemStream(field)
+        # with_structured_output と同じく JSON Schema で出力形式を制約する
+        stream = self._get_llm(key).astream(
+            lc_messages,
+            format=response_model.model_json_schema(),
+        )
+        async for chunk in stream:
+            if isinstance(chunk.content, str) and chunk.content:
+                for item in parser.feed(chunk.content):
+                    try:
+                        yield item_model.model_validate(item)
+                    except ValidationError:
+                        logger.warning("不正な要素をスキップしました: %s", item)
+            if chunk.response_metadata.get("done"):
+                self._record_usage(chunk.response_metadata)
 
     async def astream(
         self,
         messages: list[dict],
         *,
         reasoning: str | None = None,
+        temperature: float | None = None,
     ) -> AsyncIterator[str]:
         """ストリーミング生成"""
-        llm = self._make_llm(reasoning=reasoning)
+        num_ctx, _ = self._size_call(messages, None)
+        key = self._params_key(
+            num_ctx=num_ctx,
+            reasoning=reasoning,
+            temperature=temperature,
+        )
         lc_messages = self._to_langchain_messages(messages)
-        async for chunk in llm.astream(lc_messages):
+        async for chunk in self._get_llm(key).astream(lc_messages):
             if isinstance(chunk.content, str) and chunk.content:
                 yield chunk.content
+            # 応答統計は最終チャンクのメタデータにのみ含まれる
+            if chunk.response_metadata.get("done"):
+                self._record_usage(chunk.response_metadata)
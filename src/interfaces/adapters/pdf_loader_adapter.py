@@ -183,6 +183,12 @@ class PDFLoaderAdapter:
             chunks = self._split_text(block, source, splitter)
             all_chunks.extend(chunks)
 
+        # 資料内の通し番号（検索結果で隣接するチャンクをつなげるのに使う）
+        all_chunks = [
+            c.model_copy(update={"metadata": {**c.metadata, "chunk_index": i}})
+            for i, c in enumerate(all_chunks)
+        ]
+
         logger.info("チャンク分割完了: %d チャンク", len(all_chunks))
         return all_chunks
 
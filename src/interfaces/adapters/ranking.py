@@ -0,0 +1,186 @@
+"""検索ランキング計算（純粋関数）
+
+ChromaDBAdapter と ReadOnlyIndexAdapter が共有する、チャンクインデックス
+（チャンクテーブル上の行番号）ベースのランキング計算をまとめる。
+"""
+
+from __future__ import annotations
+
+import logging
+from collections.abc import Sequence
+
+import numpy as np
+from scipy import sparse
+
+logger = logging.getLogger(__name__)
+
+# RRF の定数
+RRF_K = 60
+
+# （チャンクインデックス配列, スコア配列）の組。上位順に並ぶ
+Ranking = tuple[np.ndarray, np.ndarray]
+
+
+def _empty_ranking() -> Ranking:
+    return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+
+
+# ---------------------------------------------------------------------------
+# ランキング統合
+# ---------------------------------------------------------------------------
+
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[np.ndarray],
+    weights: Sequence[float],
+    n_items: int,
+    rrf_k: int = RRF_K,
+) -> np.ndarray:
+    """複数リトリーバのランキングを重み付き RRF で統合する。
+
+    各ランキングはチャンクインデックスの配列（上位順）。戻り値は
+    チャンクインデックスごとの RRF スコア配列（長さ n_items）。
+    リトリーバ数は2つに限らない。
+    """
+    if len(rankings) != len(weights):
+        raise ValueError("rankings と weights の長さが一致しません")
+
+    scores = np.zeros(n_items, dtype=np.float64)
+    for ranking, weight in zip(rankings, weights):
+        ranking = np.asarray(ranking, dtype=np.int64)
+        if ranking.size == 0 or weight == 0:
+            continue
+        ranks = np.arange(1, ranking.size + 1, dtype=np.float64)
+        np.add.at(scores, ranking, weight / (rrf_k + ranks))
+    return scores
+
+
+def fuse_top_k(
+    rankings: Sequence[np.ndarray],
+    weights: Sequence[float],
+    n_items: int,
+    k: int,
+) -> Ranking:
+    """RRF 統合後のスコア上位 k 件を返す。"""
+    scores = reciprocal_rank_fusion(rankings, weights, n_items)
+    candidates = np.flatnonzero(scores > 0)
+    order = candidates[np.argsort(-scores[candidates], kind="stable")][:k]
+    return order, scores[order]
+
+
+# ---------------------------------------------------------------------------
+# ベクトル検索
+# ---------------------------------------------------------------------------
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """行ベクトルを L2 正規化する（コサイン類似度を内積で計算するため）。"""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def cosine_top_k(
+    query_embeddings: Sequence[Sequence[float]],
+    normalized_embeddings: np.ndarray,
+    k: int,
+) -> list[Ranking]:
+    """正規化済み Embedding 行列に対する全件コサイン類似度の上位 k 件を返す。"""
+    n_items = len(normalized_embeddings)
+    if n_items == 0:
+        return [_empty_ranking() for _ in query_embeddings]
+
+    scores = normalize_rows(np.asarray(query_embeddings)) @ normalized_embeddings.T
+    k = min(k, n_items)
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    rankings: list[Ranking] = []
+    for row_scores, row_top in zip(scores, top):
+        row_top = row_top[np.argsort(-row_scores[row_top], kind="stable")]
+        rankings.append((row_top.astype(np.int64), row_scores[row_top]))
+    return rankings
+
+
+# ---------------------------------------------------------------------------
+# BM25
+# ---------------------------------------------------------------------------
+
+
+def build_bm25_matrix(
+    tokenized: list[list[str]],
+) -> tuple[dict[str, int], sparse.csr_matrix] | None:
+    """BM25 の語彙と 語彙 × チャンク の重み行列を構築する。
+
+    BM25Okapi の IDF・文書長から各 (語, チャンク) の重みを事前計算し、
+    複数クエリのスコアを1回の疎行列積で求められるようにする。
+    rank_bm25 が利用できない場合は None を返す。
+    """
+    try:
+        from rank_bm25 import BM25Okapi
+    except ImportError:
+        logger.warning(
+            "rank_bm25 が利用できないため、BM25 インデックスを構築できません"
+        )
+        return None
+
+    bm25 = BM25Okapi(tokenized)
+
+    vocab: dict[str, int] = {}
+    rows: list[int] = []
+    cols: list[int] = []
+    tfs: list[float] = []
+    for doc_idx, freqs in enumerate(bm25.doc_freqs):
+        for term, tf in freqs.items():
+            rows.append(vocab.setdefault(term, len(vocab)))
+            cols.append(doc_idx)
+            tfs.append(tf)
+
+    idf = np.zeros(len(vocab), dtype=np.float64)
+    for term, row in vocab.items():
+        idf[row] = bm25.idf.get(term, 0.0)
+
+    row_arr = np.asarray(rows, dtype=np.int64)
+    col_arr = np.asarray(cols, dtype=np.int64)
+    tf_arr = np.asarray(tfs, dtype=np.float64)
+    doc_len = np.asarray(bm25.doc_len, dtype=np.float64)
+    norm = bm25.k1 * (1 - bm25.b + bm25.b * doc_len[col_arr] / bm25.avgdl)
+    weights = idf[row_arr] * tf_arr * (bm25.k1 + 1) / (tf_arr + norm)
+
+    matrix = sparse.csr_matrix(
+        (weights, (row_arr, col_arr)),
+        shape=(len(vocab), len(tokenized)),
+    )
+    return vocab, matrix
+
+
+def bm25_top_k(
+    token_lists: list[list[str]],
+    vocab: dict[str, int],
+    matrix: sparse.csr_matrix | None,
+    k: int,
+) -> list[Ranking]:
+    """BM25 スコアが正の上位 k 件を、全クエリ1回の疎行列積で求める。"""
+    if matrix is None:
+        return [_empty_ranking() for _ in token_lists]
+
+    # クエリ × 語彙 のトークン出現回数行列（未知語は無視）
+    rows: list[int] = []
+    cols: list[int] = []
+    for q_idx, tokens in enumerate(token_lists):
+        for token in tokens:
+            term = vocab.get(token)
+            if term is not None:
+                rows.append(q_idx)
+                cols.append(term)
+    query_matrix = sparse.csr_matrix(
+        (np.ones(len(rows)), (rows, cols)),
+        shape=(len(token_lists), len(vocab)),
+    )
+    scores = (query_matrix @ matrix).toarray()
+
+    top = np.argsort(-scores, axis=1, kind="stable")[:, :k]
+    rankings: list[Ranking] = []
+    for row_scores, row_top in zip(scores, top):
+        row_top = row_top[row_scores[row_top] > 0]
+        rankings.append((row_top, row_scores[row_top]))
+    return rankings
@@ -0,0 +1,323 @@
+"""読み取り専用インデックスアダプタ（VectorStorePort の実装）
+
+publish_generation で公開されたスナップショットをメモリマップで開き、
+Chroma DB を使わずに NumPy / SciPy で検索する。Embedding 行列・チャンク本文・
+BM25 重み行列は OS のページキャッシュ上で全ワーカープロセスに共有されるため、
+ワーカー数を増やしても物理メモリはほぼ1コピー分に留まる。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import Executor
+from pathlib import Path
+
+from pydantic import BaseModel
+
+from domain.models import DocumentChunk, SearchResult
+from interfaces.adapters.index_snapshot import (
+    IndexSnapshot,
+    check_embedding_model,
+    current_generation,
+    read_snapshot,
+)
+from interfaces.adapters.ranking import (
+    Ranking,
+    bm25_top_k,
+    cosine_top_k,
+    fuse_top_k,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class _LoadedGeneration(BaseModel):
+    """1世代分の読み込み済みインデックス（差し替えは参照の代入1回で行う）"""
+
+    model_config = {"frozen": True, "arbitrary_types_allowed": True}
+
+    path: Path
+    snapshot: IndexSnapshot
+    vocab: dict[str, int]
+    chunk_index: dict[str, int]
+
+
+class ReadOnlyIndexAdapter:
+    """共有メモリマップ上のスナップショットを検索する読み取り専用の VectorStorePort"""
+
+    def __init__(
+        self,
+        root: str | Path,
+        query_embedding_fn: Callable[[list[str]], list[list[float]]],
+        tokenize_fn: Callable[[str], list[str]] | None = None,
+        executor: Executor | None = None,
+        refresh_interval: float = 5.0,
+        embedding_model: str = "",
+    ) -> None:
+        self._root = Path(root)
+        self._query_embedding_fn = query_embedding_fn
+        # 世代の Embedding と照合するモデル名（空なら照合しない）
+        self._embedding_model = embedding_model
+        self._tokenize_fn = tokenize_fn
+        # 非同期 API 用の実行先（None の場合はイベントループ既定の Executor）
+        self._executor = executor
+        self._refresh_interval = refresh_interval
+        self._refresh_lock = threading.Lock()
+        self._last_checked = 0.0
+        self._current: _LoadedGeneration | None = None
+        self.refresh()
+
+    @property
+    def corpus_version(self) -> int:
+        """現在の世代のコーパスバージョンを返す。"""
+        current = self._current
+        return current.snapshot.manifest.corpus_version if current else 0
+
+    @property
+    def corpus_fingerprint(self) -> str:
+        """現在の世代のコーパスの内容ハッシュを返す。"""
+        current = self._current
+        return current.snapshot.manifest.corpus_fingerprint if current else ""
+
+    def refresh(self) -> bool:
+        """CURRENT を確認し、新しい世代が公開されていれば切り替える。
+
+        Embedding モデルが設定と異なる世代は ValueError で拒否する
+        （現在の世代はそのまま使い続ける）。
+
+        Returns:
+            世代を切り替えた場合 True
+        """
+        with self._refresh_lock:
+            self._last_checked = time.monotonic()
+            path = current_generation(self._root)
+            if path is None or (self._current and self._current.path == path):
+                return False
+            snapshot = read_snapshot(path)
+            check_embedding_model(snapshot.manifest, self._embedding_model)
+            self._current = _LoadedGeneration(
+                path=path,
+                snapshot=snapshot,
+                vocab={term: i for i, term in enumerate(snapshot.bm25_vocab)},
+                chunk_index={
+                    m["chunk_id"]: i for i, m in enumerate(snapshot.chunk_meta)
+                },
+            )
+            logger.info(
+                "インデックス世代を読み込みました: %s (%d チャンク)",
+                path.name,
+                self._current.snapshot.manifest.num_chunks,
+            )
+            return True
+
+    def _generation(self) -> _LoadedGeneration | None:
+        """更新間隔を過ぎていれば世代を確認してから、現在の世代を返す。"""
+        if time.monotonic() - self._last_checked >= self._refresh_interval:
+            try:
+                self.refresh()
+            except Exception:
+                logger.warning("インデックス世代の更新に失敗しました", exc_info=True)
+        return self._current
+
+    def is_empty(self) -> bool:
+        """ドキュメントが登録されていないかどうかを返す。"""
+        current = self._generation()
+        return current is None or current.snapshot.manifest.num_chunks == 0
+
+    def add_documents(self, chunks: list[DocumentChunk]) -> None:
+        """読み取り専用のため、ドキュメントの追加はできない"""
+        raise RuntimeError(
+            "読み取り専用インデックスです。書き込み側で publish_snapshot してください"
+        )
+
+    def get_chunks(self, chunk_ids: list[str]) -> list[DocumentChunk]:
+        """現在の世代から ID に対応するチャンクを返す（存在しない ID は含めない）。"""
+        current = self._generation()
+        if current is None:
+            return []
+        return [
+            current.snapshot.chunk(current.chunk_index[cid])
+            for cid in chunk_ids
+            if cid in current.chunk_index
+        ]
+
+    def get_embeddings(self, chunk_ids: list[str]) -> list[list[float]]:
+        """現在の世代から ID に対応する（正規化済みの）Embedding を返す。
+
+        存在しない ID は含めない。
+        """
+        current = self._generation()
+        if current is None:
+            return []
+        rows = [
+            current.chunk_index[cid] for cid in chunk_ids if cid in current.chunk_index
+        ]
+        return current.snapshot.embeddings[rows].tolist()
+
+    def similarity_search(
+        self,
+        query: str,
+        k: int = 10,
+    ) -> list[SearchResult]:
+        """ベクトル類似度検索を実行する"""
+        return self.similarity_search_many([query], k=k)[0]
+
+    def keyword_search(
+        self,
+        query: str,
+        k: int = 10,
+    ) -> list[SearchResult]:
+        """キーワード検索（BM25）を実行する"""
+        return self.keyword_search_many([query], k=k)[0]
+
+    def hybrid_search(
+        self,
+        query: str,
+        k: int = 10,
+        bm25_weight: float = 0.3,
+    ) -> list[SearchResult]:
+        """ハイブリッド検索（ベクトル + BM25 の RRF 統合）を実行する"""
+        return self.hybrid_search_many([query], k=k, bm25_weight=bm25_weight)[0]
+
+    def similarity_search_many(
+        self,
+        queries: list[str],
+        k: int = 10,
+    ) -> list[list[SearchResult]]:
+        """複数クエリのベクトル類似度検索を一括で実行する"""
+        current = self._generation()
+        if not queries or current is None:
+            return [[] for _ in queries]
+
+        embeddings = self._query_embedding_fn(list(queries))
+        return [
+            self._to_search_results(current, ranking)
+            for ranking in self._vector_rankings(current, embeddings, k)
+        ]
+
+    def keyword_search_many(
+        self,
+        queries: list[str],
+        k: int = 10,
+    ) -> list[list[SearchResult]]:
+        """複数クエリのキーワード検索（BM25）を一括で実行する"""
+        current = self._generation()
+        if not queries or current is None or self._tokenize_fn is None:
+            return [[] for _ in queries]
+
+        token_lists = [self._tokenize_fn(q) for q in queries]
+        return [
+            self._to_search_results(current, ranking)
+            for ranking in self._bm25_rankings(current, token_lists, k)
+        ]
+
+    def hybrid_search_many(
+        self,
+        queries: list[str],
+        k: int = 10,
+        bm25_weight: float = 0.3,
+    ) -> list[list[SearchResult]]:
+        """複数クエリのハイブリッド検索を一括で実行する"""
+        current = self._generation()
+        if not queries or current is None:
+            return [[] for _ in queries]
+
+        embeddings = self._query_embedding_fn(list(queries))
+        if self._tokenize_fn is not None:
+            token_lists = [self._tokenize_fn(q) for q in queries]
+        else:
+            token_lists = [[] for _ in queries]
+
+        n_items = current.snapshot.manifest.num_chunks
+        weights = [1.0 - bm25_weight, bm25_weight]
+        return [
+            self._to_search_results(
+                current,
+                fuse_top_k([vec_indices, bm25_indices], weights, n_items, k),
+            )
+            for (vec_indices, _), (bm25_indices, _) in zip(
+                self._vector_rankings(current, embeddings, k),
+                self._bm25_rankings(current, token_lists, k),
+            )
+        ]
+
+    async def asimilarity_search(
+        self,
+        query: str,
+        k: int = 10,
+    ) -> list[SearchResult]:
+        """ベクトル類似度検索を Executor 上で実行する"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor,
+            self.similarity_search,
+            query,
+            k,
+        )
+
+    async def akeyword_search(
+        self,
+        query: str,
+        k: int = 10,
+    ) -> list[SearchResult]:
+        """キーワード検索（BM25）を Executor 上で実行する"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor,
+            self.keyword_search,
+            query,
+            k,
+        )
+
+    async def ahybrid_search_many(
+        self,
+        queries: list[str],
+        k: int = 10,
+        bm25_weight: float = 0.3,
+    ) -> list[list[SearchResult]]:
+        """複数クエリのハイブリッド検索を Executor 上で実行する"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor,
+            self.hybrid_search_many,
+            queries,
+            k,
+            bm25_weight,
+        )
+
+    @staticmethod
+    def _vector_rankings(
+        current: _LoadedGeneration,
+        query_embeddings: list[list[float]],
+        k: int,
+    ) -> list[Ranking]:
+        if query_embeddings:
+            check_embedding_model(
+                current.snapshot.manifest,
+                "",
+                embedding_dim=len(query_embeddings[0]),
+            )
+        return cosine_top_k(query_embeddings, current.snapshot.embeddings, k)
+
+    @staticmethod
+    def _bm25_rankings(
+        current: _LoadedGeneration,
+        token_lists: list[list[str]],
+        k: int,
+    ) -> list[Ranking]:
+        return bm25_top_k(token_lists, current.vocab, current.snapshot.bm25_matrix, k)
+
+    @staticmethod
+    def _to_search_results(
+        current: _LoadedGeneration,
+        ranking: Ranking,
+    ) -> list[SearchResult]:
+        indices, scores = ranking
+        return [
+            SearchResult(chunk=current.snapshot.chunk(int(i)), score=float(s))
+            for i, s in zip(indices, scores)
+        ]
@@ -2,21 +2,42 @@
 
 from __future__ import annotations
 
+import asyncio
 import logging
-
-from sentence_transformers import CrossEncoder
+import threading
+from concurrent.futures import Executor
+from typing import TYPE_CHECKING
 
 from domain.models import SearchResult
 
+if TYPE_CHECKING:
+    from sentence_transformers import CrossEncoder
+
 logger = logging.getLogger(__name__)
 
 
 class RerankerAdapter:
-    """CrossEncoder を使用した RerankerPort の具体実装"""
+    """CrossEncoder を使用した RerankerPort の具体実装
+
+    モデルは初回の再ランキング（またはウォームアップ）時にロードする。
+    """
 
-    def __init__(self, model_name: str) -> None:
-        self._model = CrossEncoder(model_name)
-        logger.info("Reranker モデルをロード: %s", model_name)
+    def __init__(self, model_name: str, executor: Executor | None = None) -> None:
+        self._model_name = model_name
+        self._model: CrossEncoder | None = None
+        self._model_lock = threading.Lock()
+        # 非同期 API 用の実行先（None の場合はイベントループ既定の Executor）
+        self._executor = executor
+
+    def _get_model(self) -> CrossEncoder:
+        """CrossEncoder を返す（未ロードならロードする）。"""
+        with self._model_lock:
+            if self._model is None:
+                from sentence_transformers import CrossEncoder
+
+                self._model = CrossEncoder(self._model_name)
+                logger.info("Reranker モデルをロード: %s", self._model_name)
+            return self._model
 
     def rerank(
         self,
@@ -29,7 +50,7 @@ class RerankerAdapter:
             return []
 
         pairs = [[query, r.chunk.text] for r in results]
-        scores = self._model.predict(pairs)
+        scores = self._get_model().predict(pairs)
 
         scored = sorted(
             zip(results, scores),
@@ -38,3 +59,19 @@ class RerankerAdapter:
         )
 
         return [SearchResult(chunk=r.chunk, score=float(s)) for r, s in scored[:top_k]]
+
+    async def arerank(
+        self,
+        query: str,
+        results: list[SearchResult],
+        top_k: int = 5,
+    ) -> list[SearchResult]:
+        """再ランキングを Executor 上で実行する"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor,
+            self.rerank,
+            query,
+            results,
+            top_k,
+        )
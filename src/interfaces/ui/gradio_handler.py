@@ -2,18 +2,28 @@
 
 from __future__ import annotations
 
+import asyncio
 import logging
+import math
+import time
 import uuid
 from collections.abc import AsyncIterator
 from typing import TYPE_CHECKING, Any
 
 import gradio as gr
 
+from domain.deadline import answer_budget, start_deadline, time_remaining
+from domain.session import current_session_id
+from domain.telemetry import RequestTelemetry, current_node, current_telemetry
+from usecases.prompt_layout import build_answer_messages
+from usecases.speculative_answer import SpeculationStats, SpeculativeAnswer
+
 if TYPE_CHECKING:
     from domain.config import WorkflowConfig
     from domain.ports.llm_port import LLMPort
     from domain.ports.reranker_port import RerankerPort
     from domain.ports.vectorstore_port import VectorStorePort
+    from domain.warmup import ModelWarmup
     from usecases.data_ingestion import DataIngestion
 
 logger = logging.getLogger(__name__)
@@ -33,22 +43,56 @@ class GradioHandler:
         llm: LLMPort,
         vectorstore: VectorStorePort,
         reranker: RerankerPort,
+        node_llms: dict[str, LLMPort] | None = None,
+        warmup: ModelWarmup | None = None,
     ) -> None:
         self._ingestion = ingestion
         self._config = config
-        self._llm = llm
         self._vectorstore = vectorstore
+        self._warmup = warmup
 
         # ノードファクトリからノード関数を生成
-        from usecases.nodes.doc_search_node import create_doc_search_node
+        from usecases.nodes.doc_search_node import (
+            create_doc_search_node,
+            create_result_resolver,
+            create_subtask_search,
+        )
         from usecases.nodes.judge_node import create_judge_node
+        from usecases.nodes.summarize_judge_node import create_summarize_judge_node
         from usecases.nodes.summarize_node import create_summarize_node
         from usecases.nodes.task_planning_node import create_task_planning_node
 
-        self._task_planning = create_task_planning_node(llm, config)
+        # ノード名 → LLM の上書き（応答キャッシュを挟むノードなど）
+        node_llms = node_llms or {}
+        # 回答ストリーミングはノード関数を経由せず直接呼び出す
+        self._llm = node_llms.get("generate_answer", llm)
+        # judge と並行する投機的な回答（スケジューラの予約スロットで実行）
+        self._speculative_llm = node_llms.get("speculative_answer", self._llm)
+        self._task_planning = create_task_planning_node(
+            node_llms.get("task_planning", llm),
+            config,
+            search_subtask=create_subtask_search(vectorstore, reranker, config),
+        )
         self._doc_search = create_doc_search_node(vectorstore, reranker, config)
-        self._summarize = create_summarize_node(llm, config)
-        self._judge = create_judge_node(llm, config)
+        # 状態のチャンク参照を、プロンプトの組み立て時に本文へ戻す
+        self._resolve_results = create_result_resolver(vectorstore, config)
+        self._summarize = create_summarize_node(
+            node_llms.get("summarize", llm),
+            config,
+            self._resolve_results,
+        )
+        self._judge = create_judge_node(node_llms.get("judge", llm), config)
+        # 要約と判定を1回の呼び出しに統合する場合のノード（無効なら None）
+        self._summarize_judge = (
+            create_summarize_judge_node(
+                node_llms.get("summarize_judge", llm),
+                config,
+                self._resolve_results,
+            )
+            if config.fused_summarize_judge
+            else None
+        )
+        self._speculation_stats = SpeculationStats()
 
     async def respond(
         self,
@@ -84,9 +128,16 @@ class GradioHandler:
 
         thread_id = session_state.get("thread_id", str(uuid.uuid4()))
         session_state["thread_id"] = thread_id
-
+        # LLM スケジューラがセッション単位で公平に割り当てるための識別子
+        current_session_id.set(thread_id)
+        # この質問1件分の LLM トークン数・処理時間をノードごとに集計する
+        telemetry = RequestTelemetry()
+        current_telemetry.set(telemetry)
+
+        # 回答プロンプトに渡す会話履歴（今回の質問は含めない）
+        past_history = list(history)
         # ユーザーメッセージを履歴に追加
-        history = list(history) + [{"role": "user", "content": message}]
+        history = past_history + [{"role": "user", "content": message}]
 
         # 前回の思考過程に区切り線を追加
         if thinking_log.strip():
@@ -98,12 +149,28 @@ class GradioHandler:
             "subtasks": [],
             "search_results": [],
             "summary": "",
+            "summarized_count": 0,
             "answer": "",
             "loop_count": 0,
+            "prefetched_results": [],
+            "prefetched_top_scores": [],
+            "retrieved_chunk_ids": [],
+            "fast_path": False,
+            "deadline": start_deadline(self._config.request_deadline_seconds),
         }
 
+        # 起動直後はウォームアップの完了を待つ（待機中であることを表示する）
+        if self._warmup is not None and not self._warmup.ready:
+            thinking_log += "⏳ モデルのウォームアップ完了を待機中...\n"
+            yield history, thinking_log, session_state
+            await asyncio.to_thread(self._warmup.wait)
+            thinking_log += f"{self._warmup.status_message()}\n\n"
+            yield history, thinking_log, session_state
+
         # --- Phase 1: タスク分割 ---
         thinking_log += "📋 タスク分割中...\n"
+        if self._config.speculative_retrieval:
+            thinking_log += "  （並行して質問全体で先行検索中）\n"
         yield history, thinking_log, session_state
 
         try:
@@ -115,6 +182,8 @@ class GradioHandler:
 
         # サブタスク情報をログに追記
         thinking_log += f"サブタスク数: {len(state['subtasks'])}\n"
+        if state["prefetched_results"]:
+            thinking_log += "  （サブタスクの確定ごとに検索済み）\n"
         for i, st in enumerate(state["subtasks"]):
             thinking_log += f"  {i + 1}. 目的: {st.get('purpose', '')}\n"
             thinking_log += f"     クエリ: {st.get('queries', [])}\n"
@@ -122,115 +191,217 @@ class GradioHandler:
         yield history, thinking_log, session_state
 
         # --- Phase 2: 検索 + 要約 + 判定ループ ---
-        while state["subtasks"]:
-            # 検索
-            thinking_log += "🔍 ドキュメント検索中...\n"
-            yield history, thinking_log, session_state
-
-            try:
-                result = self._doc_search(state)
-                state.update(result)
-            except Exception:
-                logger.exception("検索でエラーが発生しました")
-                state["subtasks"] = []
+        # 判定と並行して投機的に生成中の回答（十分と判定されたら採用する）
+        speculative: SpeculativeAnswer | None = None
+        try:
+            while state["subtasks"]:
+                # 検索
+                thinking_log += "🔍 ドキュメント検索中...\n"
+                yield history, thinking_log, session_state
 
-            thinking_log += f"  検索結果ブロック数: {len(state['search_results'])}\n\n"
-            yield history, thinking_log, session_state
+                try:
+                    result = await self._doc_search(state)
+                    state.update(result)
+                except Exception:
+                    logger.exception("検索でエラーが発生しました")
+                    state["subtasks"] = []
 
-            # ループ上限チェック
-            if state["loop_count"] >= self._config.max_loop_count:
-                thinking_log += "⚠️ ループ上限に到達 → 回答作成へ\n\n"
+                thinking_log += (
+                    f"  検索結果ブロック数: {len(state['search_results'])}\n\n"
+                )
                 yield history, thinking_log, session_state
-                break
 
-            # 要約
-            thinking_log += "📝 検索結果を要約中...\n"
-            yield history, thinking_log, session_state
+                # 検索の確信度が高ければ要約・判定を省略する
+                if state.get("fast_path"):
+                    thinking_log += (
+                        "⚡ 検索結果の確信度が高い → 要約・判定を省略して回答作成へ\n\n"
+                    )
+                    yield history, thinking_log, session_state
+                    break
+
+                # ループ上限チェック
+                if state["loop_count"] >= self._config.max_loop_count:
+                    thinking_log += "⚠️ ループ上限に到達 → 回答作成へ\n\n"
+                    yield history, thinking_log, session_state
+                    break
+
+                if self._summarize_judge is not None:
+                    # 要約 + 判定（1回の呼び出し）
+                    thinking_log += "📝⚖️ 検索結果の要約と十分性の判定を実行中...\n"
+                else:
+                    # 要約
+                    thinking_log += "📝 検索結果を要約中...\n"
+                    yield history, thinking_log, session_state
+
+                    try:
+                        result = await self._summarize(state)
+                        state.update(result)
+                    except Exception:
+                        logger.exception("要約でエラーが発生しました")
+                        state["summary"] = "\n\n".join(
+                            self._resolve_results(state["search_results"])
+                        )
+                        state["summarized_count"] = len(state["search_results"])
 
-            try:
-                result = await self._summarize(state)
-                state.update(result)
-            except Exception:
-                logger.exception("要約でエラーが発生しました")
-                state["summary"] = "\n\n".join(state["search_results"])
+                    thinking_log += f"  要約文字数: {len(state['summary'])}\n\n"
+                    yield history, thinking_log, session_state
 
-            thinking_log += f"  要約文字数: {len(state['summary'])}\n\n"
-            yield history, thinking_log, session_state
+                    # 判定
+                    thinking_log += "⚖️ 情報の十分性を判定中...\n"
+                if self._config.speculative_answer:
+                    thinking_log += "  （並行して回答を先行生成中）\n"
+                    speculative = self._start_speculative_answer(
+                        system_prompt, message, state, past_history, temperature
+                    )
+                yield history, thinking_log, session_state
 
-            # 判定
-            thinking_log += "⚖️ 情報の十分性を判定中...\n"
+                try:
+                    result = await (self._summarize_judge or self._judge)(state)
+                    state.update(result)
+                except Exception:
+                    logger.exception("判定でエラーが発生しました")
+                    state["subtasks"] = []
+                if self._summarize_judge is not None:
+                    thinking_log += f"  要約文字数: {len(state['summary'])}\n"
+
+                if speculative is not None:
+                    thinking_log += self._settle_speculation(
+                        speculative, hit=not state["subtasks"]
+                    )
+                    if state["subtasks"]:
+                        speculative = None
+
+                if state["subtasks"]:
+                    thinking_log += "🔄 情報不足 → 再検索\n"
+                    for i, st in enumerate(state["subtasks"]):
+                        thinking_log += (
+                            f"  追加 {i + 1}. {st.get('purpose', '')}: "
+                            f"{st.get('queries', [])}\n"
+                        )
+                else:
+                    thinking_log += "✅ 情報十分 → 回答作成へ\n"
+                thinking_log += "\n"
+                yield history, thinking_log, session_state
+
+            # --- Phase 3: 回答生成（ストリーミング） ---
+            thinking_log += "✏️ 回答を生成中...\n"
             yield history, thinking_log, session_state
 
-            try:
-                result = await self._judge(state)
-                state.update(result)
-            except Exception:
-                logger.exception("判定でエラーが発生しました")
-                state["subtasks"] = []
+            # ストリーミング回答生成
+            history = list(history) + [{"role": "assistant", "content": ""}]
+            bot_reply = ""
 
-            if state["subtasks"]:
-                thinking_log += "🔄 情報不足 → 再検索\n"
-                for i, st in enumerate(state["subtasks"]):
-                    thinking_log += (
-                        f"  追加 {i + 1}. {st.get('purpose', '')}: "
-                        f"{st.get('queries', [])}\n"
-                    )
+            if speculative is not None:
+                # 判定中に生成済みのトークンから表示する
+                tokens = speculative.tokens()
             else:
-                thinking_log += "✅ 情報十分 → 回答作成へ\n"
-            thinking_log += "\n"
-            yield history, thinking_log, session_state
+                current_node.set("generate_answer")
+                tokens = self._answer_stream(
+                    system_prompt, message, state, past_history, temperature
+                )
+            # 締め切りを過ぎたら、そこまでの回答で打ち切る
+            remaining = time_remaining(state["deadline"])
+            try:
+                async with asyncio.timeout(
+                    None if math.isinf(remaining) else remaining
+                ):
+                    async for token in tokens:
+                        bot_reply += token
+                        history[-1] = {"role": "assistant", "content": bot_reply}
+                        yield history, thinking_log, session_state
+            except TimeoutError:
+                logger.warning("締め切りに達したため、回答生成を打ち切りました")
+                thinking_log += "⏱️ 締め切りに達したため回答生成を打ち切り\n"
+                if not bot_reply:
+                    bot_reply = "時間内に回答を生成できませんでした。"
+                    history[-1] = {"role": "assistant", "content": bot_reply}
+            except Exception:
+                logger.exception("回答生成中にエラーが発生しました")
+                if not bot_reply:
+                    bot_reply = "エラーが発生しました。もう一度お試しください。"
+                    history[-1] = {"role": "assistant", "content": bot_reply}
+        finally:
+            # 停止ボタン等で中断された場合も投機的な生成を残さない
+            if speculative is not None:
+                speculative.cancel()
 
-        # --- Phase 3: 回答生成（ストリーミング） ---
-        thinking_log += "✏️ 回答を生成中...\n"
+        thinking_log += "✅ 回答生成完了\n"
+        telemetry.log_summary()
+        for node, stats in telemetry.by_node.items():
+            thinking_log += f"  📊 {node}: {stats.format()}\n"
         yield history, thinking_log, session_state
 
-        # システムプロンプト構築
-        sys_content = (
-            system_prompt + "\n\n" + self._config.system_prompt_generate_answer
+    def _answer_stream(
+        self,
+        system_prompt: str,
+        message: str,
+        state: dict[str, Any],
+        history: list[dict],
+        temperature: float,
+        *,
+        speculative: bool = False,
+    ) -> AsyncIterator[str]:
+        """回答生成のストリームを開始する。
+
+        回答生成には生の検索結果を使用する（情報の正確性を保持）。
+        history には現在の質問を含めない直近の会話履歴を渡す。
+        締め切りが近ければコンテキストを切り詰めて推論強度を下げる。
+        """
+        time_budget = answer_budget(state["deadline"], self._config)
+        messages = build_answer_messages(
+            self._config,
+            user_prompt=system_prompt,
+            question=message,
+            search_results=self._resolve_results(state["search_results"]),
+            history=history,
+            max_context_tokens=(
+                self._config.deadline_context_tokens if time_budget.pressed else None
+            ),
+        )
+        llm = self._speculative_llm if speculative else self._llm
+        return llm.astream(
+            messages,
+            reasoning=time_budget.reasoning,
+            temperature=temperature,
         )
 
-        # 回答生成には生の検索結果を使用（情報の正確性を保持）
-        results_text = "\n\n".join(state["search_results"])
-
-        # マルチターン対応: 直近の会話履歴をコンテキストに含める
-        # 現在の質問（末尾1件）は除外し、直近4メッセージ（2往復）まで含める
-        recent_history = history[:-1][-4:]
-        history_lines: list[str] = []
-        for msg in recent_history:
-            role = "ユーザ" if msg.get("role") == "user" else "AI"
-            content = msg.get("content", "")[:500]
-            history_lines.append(f"{role}: {content}")
-
-        user_content = ""
-        if history_lines:
-            user_content += "会話履歴:\n" + "\n".join(history_lines) + "\n\n"
-        user_content += f"質問: {message}\n\n検索結果:\n{results_text}"
-
-        messages = [
-            {"role": "system", "content": sys_content},
-            {"role": "user", "content": user_content},
-        ]
-
-        # ストリーミング回答生成
-        history = list(history) + [{"role": "assistant", "content": ""}]
-        bot_reply = ""
-
+    def _start_speculative_answer(
+        self,
+        system_prompt: str,
+        message: str,
+        state: dict[str, Any],
+        history: list[dict],
+        temperature: float,
+    ) -> SpeculativeAnswer:
+        """判定時点の検索結果で回答生成をバックグラウンドで開始する。"""
+        # 生成タスクはこの時点のコンテキストを引き継ぐため、ノード名を設定して作る
+        token = current_node.set("generate_answer")
         try:
-            async for token in self._llm.astream(
-                messages,
-                reasoning=self._config.reasoning_generate_answer,
-            ):
-                bot_reply += token
-                history[-1] = {"role": "assistant", "content": bot_reply}
-                yield history, thinking_log, session_state
-        except Exception:
-            logger.exception("回答生成中にエラーが発生しました")
-            if not bot_reply:
-                bot_reply = "エラーが発生しました。もう一度お試しください。"
-                history[-1] = {"role": "assistant", "content": bot_reply}
-
-        thinking_log += "✅ 回答生成完了\n"
-        yield history, thinking_log, session_state
+            return SpeculativeAnswer(
+                self._answer_stream(
+                    system_prompt,
+                    message,
+                    state,
+                    history,
+                    temperature,
+                    speculative=True,
+                )
+            )
+        finally:
+            current_node.reset(token)
+
+    def _settle_speculation(self, speculative: SpeculativeAnswer, *, hit: bool) -> str:
+        """判定結果に応じて投機的な回答を採用・破棄し、思考過程の行を返す。"""
+        if not hit:
+            speculative.cancel()
+            self._speculation_stats.record(hit=False)
+            return "⚡ 先行生成した回答を破棄\n"
+        saved = speculative.saved_ttft(time.perf_counter())
+        self._speculation_stats.record(hit=True, saved_ttft=saved)
+        return (
+            f"⚡ 先行生成した回答を採用（TTFT 短縮 {saved:.1f}s, "
+            f"的中率 {self._speculation_stats.hit_rate:.0%}）\n"
+        )
 
     def upload_file(
         self,
@@ -259,12 +430,23 @@ class GradioHandler:
         session_state["thread_id"] = str(uuid.uuid4())
         return [], "", session_state
 
+    def warmup_status(self) -> tuple[str, gr.Timer]:
+        """ウォームアップの進捗表示と、ポーリングを継続するかを返す。"""
+        if self._warmup is None:
+            return "", gr.Timer(active=False)
+        return (
+            self._warmup.status_message(),
+            gr.Timer(active=not self._warmup.ready),
+        )
+
     def launch(self) -> gr.Blocks:
         """Gradio UI を構築して返す。"""
         with gr.Blocks(
             title="RAG チャットアシスタント（AI Agent Workflow + RAG）",
         ) as demo:
             gr.Markdown("### RAG チャットアシスタント（AI Agent Workflow + RAG）")
+            warmup_status = gr.Markdown(visible=self._warmup is not None)
+            warmup_timer = gr.Timer(1.0, active=self._warmup is not None)
 
             session_state = gr.State(value={"thread_id": str(uuid.uuid4())})
 
@@ -359,4 +541,11 @@ class GradioHandler:
                 outputs=[chatbot, thinking_log, session_state],
             )
 
+            # ウォームアップ完了までは1秒ごとに進捗を更新する
+            demo.load(fn=self.warmup_status, outputs=[warmup_status, warmup_timer])
+            warmup_timer.tick(
+                fn=self.warmup_status,
+                outputs=[warmup_status, warmup_timer],
+            )
+
         return demo
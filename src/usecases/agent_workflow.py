@@ -8,13 +8,22 @@ from typing import TYPE_CHECKING, Any, TypedDict
 from langgraph.checkpoint.memory import MemorySaver
 from langgraph.graph import END, START, StateGraph
 
-from usecases.nodes.doc_search_node import create_doc_search_node
+from domain.deadline import start_deadline
+from domain.session import current_session_id
+from domain.telemetry import RequestTelemetry, current_telemetry
+from usecases.nodes.doc_search_node import (
+    create_doc_search_node,
+    create_result_resolver,
+    create_subtask_search,
+)
 from usecases.nodes.generate_answer_node import create_generate_answer_node
 from usecases.nodes.judge_node import create_judge_node
+from usecases.nodes.summarize_judge_node import create_summarize_judge_node
 from usecases.nodes.summarize_node import create_summarize_node
 from usecases.nodes.task_planning_node import create_task_planning_node
 
 if TYPE_CHECKING:
+    from langgraph.checkpoint.base import BaseCheckpointSaver
     from langgraph.graph.state import CompiledStateGraph
 
     from domain.config import WorkflowConfig
@@ -30,11 +39,24 @@ class WorkflowState(TypedDict):
 
     question: str
     subtasks: list[dict]
-    search_results: list[str]
+    search_results: list[str | dict]
     summary: str
+    summarized_count: int
     answer: str
     loop_count: int
     chat_history: list[dict]
+    prefetched_results: list[str | dict]
+    prefetched_top_scores: list[float]
+    retrieved_chunk_ids: list[str]
+    fast_path: bool
+    deadline: float
+
+
+def _after_search(state: dict[str, Any]) -> str:
+    """doc_search ノードの後の条件分岐（確信度が高ければ要約・判定を省略）"""
+    if state.get("fast_path"):
+        return "generate_answer"
+    return "assess"
 
 
 def _should_continue(state: dict[str, Any]) -> str:
@@ -53,22 +75,37 @@ class AgentWorkflow:
         vectorstore: VectorStorePort,
         reranker: RerankerPort,
         config: WorkflowConfig,
+        node_llms: dict[str, LLMPort] | None = None,
+        checkpointer: BaseCheckpointSaver | None = None,
     ) -> None:
         self._llm = llm
+        # ノード名 → LLM の上書き（応答キャッシュを挟むノードなど）
+        self._node_llms = node_llms or {}
         self._vectorstore = vectorstore
         self._reranker = reranker
         self._config = config
-        self._checkpointer = MemorySaver()
+        # 省略時はスレッドのチェックポイントをすべて保持する MemorySaver
+        self._checkpointer = checkpointer or MemorySaver()
         self._graph = self._build_graph()
 
     def _build_graph(self) -> CompiledStateGraph:
         """LangGraph グラフを構築してコンパイルする。"""
         graph = StateGraph(WorkflowState)
+        # 状態のチャンク参照を、プロンプトの組み立て時に本文へ戻す
+        resolve_results = create_result_resolver(self._vectorstore, self._config)
 
         # ノードの登録
         graph.add_node(
             "task_planning",
-            create_task_planning_node(self._llm, self._config),
+            create_task_planning_node(
+                self._llm_for("task_planning"),
+                self._config,
+                search_subtask=create_subtask_search(
+                    self._vectorstore,
+                    self._reranker,
+                    self._config,
+                ),
+            ),
         )
         graph.add_node(
             "doc_search",
@@ -78,26 +115,55 @@ class AgentWorkflow:
                 self._config,
             ),
         )
-        graph.add_node(
-            "summarize",
-            create_summarize_node(self._llm, self._config),
-        )
-        graph.add_node(
-            "judge",
-            create_judge_node(self._llm, self._config),
-        )
+        # 要約と判定は、設定に応じて1回の呼び出しに統合する
+        if self._config.fused_summarize_judge:
+            judge_node = "summarize_judge"
+            graph.add_node(
+                judge_node,
+                create_summarize_judge_node(
+                    self._llm_for("summarize_judge"),
+                    self._config,
+                    resolve_results,
+                ),
+            )
+        else:
+            judge_node = "judge"
+            graph.add_node(
+                "summarize",
+                create_summarize_node(
+                    self._llm_for("summarize"),
+                    self._config,
+                    resolve_results,
+                ),
+            )
+            graph.add_node(
+                "judge",
+                create_judge_node(self._llm_for("judge"), self._config),
+            )
         graph.add_node(
             "generate_answer",
-            create_generate_answer_node(self._llm, self._config),
+            create_generate_answer_node(
+                self._llm_for("generate_answer"),
+                self._config,
+                resolve_results,
+            ),
         )
 
         # エッジの定義
         graph.add_edge(START, "task_planning")
         graph.add_edge("task_planning", "doc_search")
-        graph.add_edge("doc_search", "summarize")
-        graph.add_edge("summarize", "judge")
+        if judge_node == "judge":
+            assess_node = "summarize"
+            graph.add_edge("summarize", "judge")
+        else:
+            assess_node = judge_node
         graph.add_conditional_edges(
-            "judge",
+            "doc_search",
+            _after_search,
+            {"assess": assess_node, "generate_answer": "generate_answer"},
+        )
+        graph.add_conditional_edges(
+            judge_node,
             _should_continue,
             {"doc_search": "doc_search", "generate_answer": "generate_answer"},
         )
@@ -105,24 +171,47 @@ class AgentWorkflow:
 
         return graph.compile(checkpointer=self._checkpointer)
 
+    def _llm_for(self, node: str) -> LLMPort:
+        """ノードに割り当てる LLM を返す（上書きが無ければ共通の LLM）。"""
+        return self._node_llms.get(node, self._llm)
+
     async def ainvoke(
         self,
         question: str,
         chat_history: list[dict] | None = None,
         thread_id: str = "default",
+        telemetry: RequestTelemetry | None = None,
     ) -> dict[str, Any]:
-        """ワークフローを非同期実行する。"""
+        """ワークフローを非同期実行する。
+
+        telemetry を渡すと、実行中の LLM 呼び出しのトークン数・処理時間が
+        ノードごとに記録される。
+        """
         initial_state: dict[str, Any] = {
             "question": question,
             "subtasks": [],
             "search_results": [],
             "summary": "",
+            "summarized_count": 0,
             "answer": "",
             "loop_count": 0,
             "chat_history": chat_history or [],
+            "prefetched_results": [],
+            "prefetched_top_scores": [],
+            "retrieved_chunk_ids": [],
+            "fast_path": False,
+            "deadline": start_deadline(self._config.request_deadline_seconds),
         }
         config = {"configurable": {"thread_id": thread_id}}
-        result = await self._graph.ainvoke(initial_state, config=config)
+        telemetry = telemetry if telemetry is not None else RequestTelemetry()
+        session_token = current_session_id.set(thread_id)
+        telemetry_token = current_telemetry.set(telemetry)
+        try:
+            result = await self._graph.ainvoke(initial_state, config=config)
+        finally:
+            current_telemetry.reset(telemetry_token)
+            current_session_id.reset(session_token)
+        telemetry.log_summary()
         return dict(result)
 
     @property
@@ -2,12 +2,20 @@
 
 from __future__ import annotations
 
+import asyncio
 import logging
-from collections.abc import Callable
+from collections.abc import Awaitable, Callable
 from typing import TYPE_CHECKING, Any
 
+from domain.context_packing import pack_passages
+from domain.passages import join_texts, merge_passages
+from domain.retrieval_confidence import assess_retrieval
+from domain.telemetry import record_decision
+from domain.token_budget import estimate_tokens
+
 if TYPE_CHECKING:
     from domain.config import WorkflowConfig
+    from domain.models import SearchResult
     from domain.ports.reranker_port import RerankerPort
     from domain.ports.vectorstore_port import VectorStorePort
 
@@ -15,84 +23,398 @@ logger = logging.getLogger(__name__)
 
 WorkflowState = dict[str, Any]
 
+# 検索結果ブロック。search_result_refs が有効な場合はチャンク本文の代わりに
+# {"purpose": 目的, "chunks": [{"chunk_id": ID, "score": スコア}, ...]} を
+# 状態に載せ、プロンプトを組み立てるときに ResultResolver でテキストに戻す。
+# つなげたパッセージの参照は {"chunk_ids": [ID, ...], "score": スコア}。
+ResultBlock = str | dict
+# ブロックにまとめる前の1チャンク（またはパッセージ）分（本文、または参照）
+ChunkItem = str | dict
+ResultResolver = Callable[[list[ResultBlock]], list[str]]
+
+
+def format_block(purpose: str, items: list[ChunkItem]) -> ResultBlock | None:
+    """1サブタスク分の検索結果を【目的】付きのブロックにまとめる。
+
+    items がチャンク参照の場合は、参照のままのブロックを返す。
+    """
+    if not items:
+        return None
+    if isinstance(items[0], dict):
+        return {"purpose": purpose, "chunks": list(items)}
+    return f"【目的: {purpose}】\n" + "\n---\n".join(items)
+
+
+def _ref_ids(ref: dict) -> list[str]:
+    """チャンク参照（またはパッセージの参照）が指すチャンク ID"""
+    return ref.get("chunk_ids") or [ref["chunk_id"]]
+
+
+def text_results(blocks: list[ResultBlock]) -> list[str]:
+    """参照を解決しない既定のリゾルバ（ブロックがすべてテキストの場合）"""
+    return list(blocks)
+
+
+def create_result_resolver(
+    vectorstore: VectorStorePort,
+    config: WorkflowConfig,
+) -> ResultResolver:
+    """チャンク参照のブロックを、ストアの本文でテキストのブロックに戻す関数を生成する。
+
+    テキストのブロックはそのまま返す。ブロック数は変えない（要約済みの件数を
+    数えるのに使うため）ので、参照先がすべて見つからないブロックは見出しのみになる。
+    context_pack_tokens が正なら、参照のパッセージを Reranker スコア順
+    （context_mmr_lambda < 1 なら MMR）で予算内に詰め、外れたものは含めない。
+    テキストのブロックはスコアを持たないため、予算を先に差し引くだけで対象外。
+    """
+
+    def pack(
+        blocks: list[ResultBlock],
+        passages: list[tuple[int, dict, str]],
+    ) -> set[int]:
+        """予算に収めるパッセージ（passages の添字）を選ぶ。"""
+        budget = config.context_pack_tokens - sum(
+            estimate_tokens(b) + 1 for b in blocks if isinstance(b, str)
+        )
+        embeddings = None
+        if config.context_mmr_lambda < 1.0:
+            embeddings = _passage_embeddings(
+                vectorstore,
+                [_ref_ids(ref) for _, ref, _ in passages],
+            )
+        result = pack_passages(
+            [estimate_tokens(text) + 1 for _, _, text in passages],
+            [ref["score"] for _, ref, _ in passages],
+            max(budget, 0),
+            embeddings=embeddings,
+            mmr_lambda=config.context_mmr_lambda,
+        )
+        logger.info(
+            "検索結果の詰め込み: %d パッセージ (%d トークン), 除外 %d パッセージ "
+            "(%d トークン)",
+            len(result.selected),
+            result.packed_tokens,
+            result.dropped_count,
+            result.dropped_tokens,
+        )
+        record_decision(
+            "context_packing",
+            budget_tokens=budget,
+            packed_tokens=result.packed_tokens,
+            dropped_tokens=result.dropped_tokens,
+            packed_passages=len(result.selected),
+            dropped_passages=result.dropped_count,
+            mmr=embeddings is not None,
+        )
+        return set(result.selected)
+
+    def resolve_results(blocks: list[ResultBlock]) -> list[str]:
+        chunk_ids = list(
+            dict.fromkeys(
+                chunk_id
+                for block in blocks
+                if isinstance(block, dict)
+                for ref in block["chunks"]
+                for chunk_id in _ref_ids(ref)
+            ),
+        )
+        if not chunk_ids:
+            return list(blocks)
+        chunks = {c.chunk_id: c for c in vectorstore.get_chunks(chunk_ids)}
+        if len(chunks) < len(chunk_ids):
+            logger.warning(
+                "参照先のチャンクが見つかりません: %d 件",
+                len(chunk_ids) - len(chunks),
+            )
+
+        # (ブロックの添字, 参照, 本文)。参照先が見つからない参照は含めない
+        passages: list[tuple[int, dict, str]] = []
+        for b, block in enumerate(blocks):
+            if isinstance(block, str):
+                continue
+            for ref in block["chunks"]:
+                found = [
+                    chunks[chunk_id].text[: config.max_return_chars]
+                    for chunk_id in _ref_ids(ref)
+                    if chunk_id in chunks
+                ]
+                if found:
+                    text = join_texts(found, config.search_merge_min_overlap)
+                    passages.append((b, ref, text))
+        keep = (
+            pack(blocks, passages)
+            if config.context_pack_tokens > 0
+            else set(range(len(passages)))
+        )
+
+        resolved = []
+        for b, block in enumerate(blocks):
+            if isinstance(block, str):
+                resolved.append(block)
+                continue
+            texts = [
+                text
+                for i, (pb, _, text) in enumerate(passages)
+                if pb == b and i in keep
+            ]
+            resolved.append(
+                format_block(block["purpose"], texts) or f"【目的: {block['purpose']}】"
+            )
+        return resolved
+
+    return resolve_results
 
-def _hybrid_search_rrf(
-    query: str,
+
+def _passage_embeddings(
     vectorstore: VectorStorePort,
-    top_k: int,
-    bm25_weight: float,
-) -> list:
-    """ハイブリッド検索（RRF によるスコア統合）を実行する。"""
-    vec_results = vectorstore.similarity_search(query, k=top_k)
-    bm25_results = vectorstore.keyword_search(query, k=top_k)
+    passage_ids: list[list[str]],
+) -> list[list[float]] | None:
+    """パッセージごとに、含まれるチャンクの Embedding の平均を返す。
+
+    ストアから取得できないチャンクがあれば None（MMR を使わない）。
+    """
+    chunk_ids = list(dict.fromkeys(cid for ids in passage_ids for cid in ids))
+    rows = vectorstore.get_embeddings(chunk_ids)
+    if len(rows) != len(chunk_ids):
+        logger.warning("Embedding を取得できないチャンクがあるため、MMR を省略します。")
+        return None
+    by_id = dict(zip(chunk_ids, rows))
+    return [
+        [sum(values) / len(ids) for values in zip(*(by_id[cid] for cid in ids))]
+        for ids in passage_ids
+    ]
+
 
-    # RRF スコアの計算
-    rrf_scores: dict[str, float] = {}
-    chunk_map: dict[str, object] = {}
-    k_param = 60  # RRF の定数
+def _chunk_items(
+    results: list[SearchResult],
+    config: WorkflowConfig,
+) -> list[ChunkItem]:
+    """Reranking 済みの結果からブロックに載せるチャンク（本文または参照）を取り出す。
+
+    search_merge_adjacent が有効なら、隣接・重複するチャンクをパッセージに
+    つなげてから取り出す。
+    """
+    if not config.search_merge_adjacent:
+        if config.search_result_refs:
+            return [{"chunk_id": r.chunk.chunk_id, "score": r.score} for r in results]
+        return [r.chunk.text[: config.max_return_chars] for r in results]
 
-    vec_weight = 1.0 - bm25_weight
+    passages = merge_passages(results, config.search_merge_min_overlap)
+    if config.search_result_refs:
+        return [
+            {"chunk_id": p.chunk_ids[0], "score": p.score}
+            if len(p.chunks) == 1
+            else {"chunk_ids": p.chunk_ids, "score": p.score}
+            for p in passages
+        ]
+    return [
+        join_texts(
+            [c.text[: config.max_return_chars] for c in p.chunks],
+            config.search_merge_min_overlap,
+        )
+        for p in passages
+    ]
 
-    for rank, r in enumerate(vec_results):
-        cid = r.chunk.chunk_id
-        rrf_scores[cid] = rrf_scores.get(cid, 0.0) + vec_weight / (k_param + rank + 1)
-        chunk_map[cid] = r
 
-    for rank, r in enumerate(bm25_results):
-        cid = r.chunk.chunk_id
-        rrf_scores[cid] = rrf_scores.get(cid, 0.0) + bm25_weight / (k_param + rank + 1)
-        if cid not in chunk_map:
-            chunk_map[cid] = r
+def collect_blocks(
+    groups: list[tuple[str, list[SearchResult]]],
+    config: WorkflowConfig,
+    retrieved: list[str],
+) -> list[ResultBlock]:
+    """（目的, Reranking 済みの結果）の組ごとに結果ブロックをまとめる。
 
-    # スコア順にソート
-    sorted_ids = sorted(rrf_scores, key=lambda x: rrf_scores[x], reverse=True)
-    return [chunk_map[cid] for cid in sorted_ids[:top_k]]
+    search_dedup が有効なら、retrieved（取得済みのチャンク ID）と先行する組に
+    含まれるチャンクを除き、採用したチャンクの ID を retrieved に追加する。
+    結果が空になった組のブロックは作らない。
+    """
+    seen = set(retrieved)
+    blocks: list[ResultBlock] = []
+    duplicates = merged = 0
+    for purpose, results in groups:
+        if config.search_dedup:
+            fresh = []
+            for r in results:
+                if r.chunk.chunk_id in seen:
+                    duplicates += 1
+                    continue
+                seen.add(r.chunk.chunk_id)
+                retrieved.append(r.chunk.chunk_id)
+                fresh.append(r)
+            results = fresh
+        items = _chunk_items(results, config)
+        if config.search_merge_adjacent:
+            merged += len({r.chunk.chunk_id for r in results}) - len(items)
+        block = format_block(purpose, items)
+        if block is not None:
+            blocks.append(block)
+
+    if config.search_dedup or config.search_merge_adjacent:
+        logger.info(
+            "重複チャンクの除外: %d 件, パッセージへの結合: %d 件",
+            duplicates,
+            merged,
+        )
+        record_decision(
+            "search_result_dedup",
+            duplicate_chunks=duplicates,
+            merged_chunks=merged,
+        )
+    return blocks
+
+
+async def _search_queries(
+    vectorstore: VectorStorePort,
+    reranker: RerankerPort,
+    config: WorkflowConfig,
+    queries: list[str],
+) -> list[list[SearchResult]]:
+    """クエリ群を1回のバッチ検索で処理し、クエリごとに Reranking する。"""
+    if not queries:
+        return []
+    logger.info("検索実行: queries=%s", queries)
+    batched_results = await vectorstore.ahybrid_search_many(
+        queries,
+        k=config.retrieval_top_k,
+        bm25_weight=config.bm25_weight,
+    )
+    # Reranking はクエリごとに並行実行する（順序は gather が保持）
+    return list(
+        await asyncio.gather(
+            *(
+                reranker.arerank(query, hybrid_results, top_k=config.rerank_top_k)
+                for query, hybrid_results in zip(queries, batched_results)
+            ),
+        ),
+    )
+
+
+def create_subtask_search(
+    vectorstore: VectorStorePort,
+    reranker: RerankerPort,
+    config: WorkflowConfig,
+) -> Callable[[dict], Awaitable[list[SearchResult]]]:
+    """1サブタスク分の検索を行い、Reranking 済みの結果を返す関数を生成する。
+
+    タスク分割と並行して検索を始める（パイプライン実行・先行検索）ために
+    使う。結果は collect_blocks でブロックにまとめる。
+    """
+
+    async def search_subtask(subtask: dict) -> list[SearchResult]:
+        queries = subtask.get("queries", [])
+        reranked = await _search_queries(vectorstore, reranker, config, queries)
+        return [r for rs in reranked for r in rs]
+
+    return search_subtask
+
+
+def top_score(results: list[SearchResult]) -> float:
+    """Reranking 済みの結果の最上位スコア（結果が無ければ 0.0）を返す。"""
+    return max((r.score for r in results), default=0.0)
+
+
+def _assess_fast_path(top_scores: list[float], config: WorkflowConfig) -> bool:
+    """サブタスクごとの Reranker 最上位スコアから、要約・判定を省略するか決める。
+
+    判断の入力と結果はテレメトリに記録する（閾値の調整用）。
+    """
+    assessment = assess_retrieval(
+        top_scores,
+        threshold=config.fast_path_score_threshold,
+        min_coverage=config.fast_path_min_coverage,
+        slope=config.reranker_calibration_slope,
+        intercept=config.reranker_calibration_intercept,
+    )
+    logger.info(
+        "検索の確信度: confidence=%.3f, coverage=%.2f, fast_path=%s",
+        assessment.confidence,
+        assessment.coverage,
+        assessment.fast_path,
+    )
+    record_decision(
+        "retrieval_fast_path",
+        raw_top_scores=top_scores,
+        top_scores=assessment.top_scores,
+        confidence=assessment.confidence,
+        coverage=assessment.coverage,
+        threshold=assessment.threshold,
+        fast_path=assessment.fast_path,
+    )
+    return assessment.fast_path
 
 
 def create_doc_search_node(
     vectorstore: VectorStorePort,
     reranker: RerankerPort,
     config: WorkflowConfig,
-) -> Callable[[WorkflowState], dict]:
+) -> Callable[[WorkflowState], Awaitable[dict]]:
     """ドキュメント検索ノードのファクトリ関数"""
 
-    def doc_search_node(state: WorkflowState) -> dict:
-        """各サブタスクの検索クエリでハイブリッド検索 + Reranking を実行する。"""
+    async def doc_search_node(state: WorkflowState) -> dict:
+        """各サブタスクの検索クエリでハイブリッド検索 + Reranking を実行する。
+
+        タスク分割ノードで検索済みの結果（prefetched_results）があれば、
+        検索せずにそれを使う（その場合 subtasks はすべて検索済み）。
+        retrieval_fast_path が有効なら、Reranker スコアの確信度から
+        要約・判定を省略するか（fast_path）を決める（検索済みの結果は
+        タスク分割ノードが残したサブタスクごとの最上位スコア
+        prefetched_top_scores で判断する）。search_result_refs が有効なら、
+        ブロックにはチャンク本文の代わりにチャンク ID・スコアを載せる。
+        search_dedup が有効なら、取得済みのチャンク ID（retrieved_chunk_ids）を
+        ループをまたいで引き継ぎ、同じチャンクを再び載せない。
+        """
         subtasks = state.get("subtasks", [])
         existing_results = state.get("search_results", [])
+        prefetched = state.get("prefetched_results", [])
+
+        all_results: list[ResultBlock] = list(existing_results)
+
+        if prefetched:
+            logger.info("先行して検索済みの結果を使用: %d ブロック", len(prefetched))
+            all_results.extend(prefetched)
+            fast_path = config.retrieval_fast_path and _assess_fast_path(
+                state.get("prefetched_top_scores", []),
+                config,
+            )
+            return {
+                "search_results": all_results,
+                "subtasks": [],
+                "prefetched_results": [],
+                "prefetched_top_scores": [],
+                "fast_path": fast_path,
+            }
+
+        # 全サブタスクのクエリをまとめて1回のバッチ検索で処理する
+        all_queries = [q for st in subtasks for q in st.get("queries", [])]
+        reranked_iter = iter(
+            await _search_queries(vectorstore, reranker, config, all_queries),
+        )
 
-        all_results: list[str] = list(existing_results)
-
-        for st in subtasks:
-            purpose = st.get("purpose", "")
-            queries = st.get("queries", [])
-            purpose_results: list[str] = []
-
-            for query in queries:
-                logger.info("検索実行: query=%s", query)
-                hybrid_results = _hybrid_search_rrf(
-                    query,
-                    vectorstore,
-                    top_k=config.retrieval_top_k,
-                    bm25_weight=config.bm25_weight,
-                )
-
-                reranked = reranker.rerank(
-                    query,
-                    hybrid_results,
-                    top_k=config.rerank_top_k,
-                )
-
-                for r in reranked:
-                    text = r.chunk.text[: config.max_return_chars]
-                    purpose_results.append(text)
-
-            if purpose_results:
-                header = f"【目的: {purpose}】\n"
-                body = "\n---\n".join(purpose_results)
-                all_results.append(header + body)
+        reranked_per_subtask = [
+            [next(reranked_iter) for _ in st.get("queries", [])] for st in subtasks
+        ]
+        retrieved = list(state.get("retrieved_chunk_ids", []))
+        all_results.extend(
+            collect_blocks(
+                [
+                    (st.get("purpose", ""), [r for rs in reranked for r in rs])
+                    for st, reranked in zip(subtasks, reranked_per_subtask)
+                ],
+                config,
+                retrieved,
+            ),
+        )
 
         logger.info("検索結果ブロック数: %d", len(all_results))
-        return {"search_results": all_results, "subtasks": []}
+        fast_path = config.retrieval_fast_path and _assess_fast_path(
+            [
+                top_score([r for rs in reranked for r in rs])
+                for reranked in reranked_per_subtask
+            ],
+            config,
+        )
+        update = {"search_results": all_results, "subtasks": [], "fast_path": fast_path}
+        if config.search_dedup:
+            update["retrieved_chunk_ids"] = retrieved
+        return update
 
     return doc_search_node
@@ -2,10 +2,17 @@
 
 from __future__ import annotations
 
+import asyncio
 import logging
+import math
 from collections.abc import Awaitable, Callable
 from typing import TYPE_CHECKING, Any
 
+from domain.deadline import NO_DEADLINE, answer_budget, time_remaining
+from domain.telemetry import traced_node
+from usecases.nodes.doc_search_node import ResultResolver, text_results
+from usecases.prompt_layout import answer_system_prompt, fit_answer_context
+
 if TYPE_CHECKING:
     from domain.config import WorkflowConfig
     from domain.ports.llm_port import LLMPort
@@ -18,22 +25,40 @@ WorkflowState = dict[str, Any]
 def create_generate_answer_node(
     llm: LLMPort,
     config: WorkflowConfig,
+    resolve_results: ResultResolver = text_results,
 ) -> Callable[[WorkflowState], Awaitable[dict]]:
-    """最終回答生成ノードのファクトリ関数"""
+    """最終回答生成ノードのファクトリ関数
+
+    resolve_results は検索結果ブロック（チャンク参照を含みうる）を
+    プロンプトに入れるテキストに戻す関数。
+    """
 
     async def generate_answer_node(state: WorkflowState) -> dict:
-        """検索結果をコンテキストとしてストリーミング回答を生成する。"""
+        """検索結果をコンテキストとしてストリーミング回答を生成する。
+
+        締め切りに近ければコンテキストを切り詰めて推論強度を下げ、
+        締め切りを過ぎたらそこまでに生成した回答を返す。
+        """
         question = state["question"]
-        search_results = state.get("search_results", [])
+        search_results = resolve_results(state.get("search_results", []))
         chat_history = state.get("chat_history", [])
-
-        context = "\n\n".join(search_results) if search_results else "検索結果なし"
-
-        sys_content = (
-            config.system_prompt_user_default
-            + "\n\n"
-            + config.system_prompt_generate_answer
+        deadline = state.get("deadline", NO_DEADLINE)
+        time_budget = answer_budget(deadline, config)
+        if time_budget.pressed:
+            logger.warning("締め切りが近いため、縮退して回答を生成します。")
+
+        sys_content = answer_system_prompt(config, config.system_prompt_user_default)
+        search_results, chat_history = fit_answer_context(
+            config,
+            system_prompt=sys_content,
+            question=question,
+            search_results=search_results,
+            history=chat_history,
+            max_context_tokens=(
+                config.deadline_context_tokens if time_budget.pressed else None
+            ),
         )
+        context = "\n\n".join(search_results) if search_results else "検索結果なし"
 
         messages: list[dict] = [{"role": "system", "content": sys_content}]
 
@@ -53,13 +78,14 @@ def create_generate_answer_node(
         logger.info("回答生成を開始")
 
         answer_parts: list[str] = []
+        remaining = time_remaining(deadline)
         try:
-            stream = llm.astream(
-                messages,
-                reasoning=config.reasoning_generate_answer,
-            )
-            async for token in stream:
-                answer_parts.append(token)
+            async with asyncio.timeout(None if math.isinf(remaining) else remaining):
+                stream = llm.astream(messages, reasoning=time_budget.reasoning)
+                async for token in stream:
+                    answer_parts.append(token)
+        except TimeoutError:
+            logger.warning("締め切りに達したため、回答生成を打ち切りました。")
         except Exception:
             logger.warning("ストリーミング中に例外が発生しました。", exc_info=True)
 
@@ -70,4 +96,4 @@ def create_generate_answer_node(
         logger.info("回答生成完了: %d 文字", len(answer))
         return {"answer": answer}
 
-    return generate_answer_node
+    return traced_node("generate_answer", generate_answer_node)
@@ -7,7 +7,9 @@ import logging
 from collections.abc import Awaitable, Callable
 from typing import TYPE_CHECKING, Any
 
+from domain.deadline import NO_DEADLINE, stage_budget
 from domain.models import JudgeResult
+from domain.telemetry import traced_node
 
 if TYPE_CHECKING:
     from domain.config import WorkflowConfig
@@ -18,6 +20,34 @@ logger = logging.getLogger(__name__)
 WorkflowState = dict[str, Any]
 
 
+def apply_judge_result(
+    result: JudgeResult,
+    loop_count: int,
+    config: WorkflowConfig,
+) -> dict:
+    """判定結果から次のサブタスクとループ回数の状態更新を作る。"""
+    logger.info(
+        "判定結果: sufficient=%s, reason=%s",
+        result.sufficient,
+        result.reason,
+    )
+
+    new_loop_count = loop_count + 1
+
+    if result.sufficient or new_loop_count >= config.max_loop_count:
+        if not result.sufficient:
+            logger.info(
+                "ループ上限 (%d) に到達。現状の情報で回答生成に進みます。",
+                config.max_loop_count,
+            )
+        return {"subtasks": [], "loop_count": new_loop_count}
+
+    # 情報不足: 追加サブタスクを設定
+    additional = [st.model_dump() for st in (result.additional_subtasks or [])]
+    logger.info("追加サブタスク数: %d", len(additional))
+    return {"subtasks": additional, "loop_count": new_loop_count}
+
+
 def create_judge_node(
     llm: LLMPort,
     config: WorkflowConfig,
@@ -32,6 +62,20 @@ def create_judge_node(
 
         logger.info("十分性判定を開始 (loop_count=%d)", loop_count)
 
+        time_budget = stage_budget(
+            state.get("deadline", NO_DEADLINE),
+            config,
+            timeout=config.structured_output_timeout,
+            reasoning=config.reasoning_judge,
+        )
+        if time_budget.pressed:
+            logger.warning("締め切りが近いため、判定を省略して回答生成に進みます。")
+            result = JudgeResult(
+                sufficient=True,
+                reason="締め切りが近いため、現状の情報で回答します",
+            )
+            return apply_judge_result(result, loop_count, config)
+
         messages = [
             {"role": "system", "content": config.system_prompt_judge},
             {
@@ -48,9 +92,9 @@ def create_judge_node(
                     messages,
                     JudgeResult,
                     num_predict=config.structured_output_num_predict,
-                    reasoning=config.reasoning_judge,
+                    reasoning=time_budget.reasoning,
                 ),
-                timeout=config.structured_output_timeout,
+                timeout=time_budget.timeout,
             )
         except asyncio.TimeoutError:
             logger.warning(
@@ -70,25 +114,6 @@ def create_judge_node(
                 reason="判定で例外が発生したため、現状の情報で回答します",
             )
 
-        logger.info(
-            "判定結果: sufficient=%s, reason=%s",
-            result.sufficient,
-            result.reason,
-        )
-
-        new_loop_count = loop_count + 1
-
-        if result.sufficient or new_loop_count >= config.max_loop_count:
-            if not result.sufficient:
-                logger.info(
-                    "ループ上限 (%d) に到達。現状の情報で回答生成に進みます。",
-                    config.max_loop_count,
-                )
-            return {"subtasks": [], "loop_count": new_loop_count}
-
-        # 情報不足: 追加サブタスクを設定
-        additional = [st.model_dump() for st in (result.additional_subtasks or [])]
-        logger.info("追加サブタスク数: %d", len(additional))
-        return {"subtasks": additional, "loop_count": new_loop_count}
+        return apply_judge_result(result, loop_count, config)
 
-    return judge_node
+    return traced_node("judge", judge_node)
@@ -0,0 +1,136 @@
+"""要約・十分性判定の統合ノード
+
+summarize → judge の2回の LLM 呼び出しを、要約と判定を同時に出力する
+1回の構造化出力呼び出しにまとめる（WorkflowConfig.fused_summarize_judge）。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable
+from typing import TYPE_CHECKING, Any
+
+from domain.deadline import NO_DEADLINE, stage_budget
+from domain.models import JudgeResult, SummarizeJudgeResult
+from domain.telemetry import traced_node
+from domain.token_budget import estimate_messages_tokens, fit_texts
+from usecases.nodes.doc_search_node import ResultResolver, text_results
+from usecases.nodes.judge_node import apply_judge_result
+
+if TYPE_CHECKING:
+    from domain.config import WorkflowConfig
+    from domain.ports.llm_port import LLMPort
+
+logger = logging.getLogger(__name__)
+
+WorkflowState = dict[str, Any]
+
+
+def create_summarize_judge_node(
+    llm: LLMPort,
+    config: WorkflowConfig,
+    resolve_results: ResultResolver = text_results,
+) -> Callable[[WorkflowState], Awaitable[dict]]:
+    """要約・十分性判定の統合ノードのファクトリ関数
+
+    resolve_results は検索結果ブロック（チャンク参照を含みうる）を
+    プロンプトに入れるテキストに戻す関数。
+    """
+
+    async def summarize_judge_node(state: WorkflowState) -> dict:
+        """検索結果を要約し、同じ呼び出しで情報の十分性を判定する。"""
+        question = state["question"]
+        search_results = state.get("search_results", [])
+        loop_count = state.get("loop_count", 0)
+
+        logger.info("要約・十分性判定を開始 (loop_count=%d)", loop_count)
+
+        time_budget = stage_budget(
+            state.get("deadline", NO_DEADLINE),
+            config,
+            timeout=config.structured_output_timeout,
+            reasoning=config.reasoning_judge,
+        )
+        if time_budget.pressed:
+            logger.warning(
+                "締め切りが近いため、要約・判定を省略して回答生成に進みます。"
+            )
+            fitted = fit_texts(
+                resolve_results(search_results),
+                config.deadline_context_tokens,
+            )
+            return {
+                "summary": "\n\n".join(fitted),
+                "summarized_count": len(search_results),
+                **apply_judge_result(
+                    JudgeResult(
+                        sufficient=True,
+                        reason="締め切りが近いため、現状の情報で回答します",
+                    ),
+                    loop_count,
+                    config,
+                ),
+            }
+
+        header = f"## ユーザの質問\n{question}\n\n## 検索結果\n"
+        messages = [
+            {"role": "system", "content": config.system_prompt_summarize_judge},
+            {"role": "user", "content": header},
+        ]
+
+        # 出力分を除いた num_ctx に収まるよう、検索結果を上位から詰める
+        budget = (
+            config.llm_num_ctx
+            - config.structured_output_num_predict
+            - estimate_messages_tokens(messages)
+        )
+        results_text = "\n\n".join(
+            fit_texts(resolve_results(search_results), budget),
+        )
+        messages[1]["content"] = header + (results_text or "検索結果なし")
+
+        try:
+            result: SummarizeJudgeResult = await asyncio.wait_for(
+                llm.agenerate_structured(
+                    messages,
+                    SummarizeJudgeResult,
+                    num_predict=config.structured_output_num_predict,
+                    reasoning=time_budget.reasoning,
+                ),
+                timeout=time_budget.timeout,
+            )
+        except TimeoutError:
+            logger.warning(
+                "要約・判定がタイムアウトしました。"
+                "検索結果をそのまま使用し、十分と判定して回答生成に進みます。"
+            )
+            result = SummarizeJudgeResult(
+                summary=results_text,
+                judgement=JudgeResult(
+                    sufficient=True,
+                    reason="判定がタイムアウトしたため、現状の情報で回答します",
+                ),
+            )
+        except Exception:
+            logger.warning(
+                "要約・判定で例外が発生しました。"
+                "検索結果をそのまま使用し、十分と判定して回答生成に進みます。",
+                exc_info=True,
+            )
+            result = SummarizeJudgeResult(
+                summary=results_text,
+                judgement=JudgeResult(
+                    sufficient=True,
+                    reason="判定で例外が発生したため、現状の情報で回答します",
+                ),
+            )
+
+        logger.info("要約完了: %d 文字", len(result.summary))
+        return {
+            "summary": result.summary,
+            "summarized_count": len(search_results),
+            **apply_judge_result(result.judgement, loop_count, config),
+        }
+
+    return traced_node("summarize_judge", summarize_judge_node)
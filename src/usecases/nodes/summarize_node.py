@@ -7,6 +7,11 @@ import logging
 from collections.abc import Awaitable, Callable
 from typing import TYPE_CHECKING, Any
 
+from domain.deadline import NO_DEADLINE, stage_budget
+from domain.telemetry import traced_node
+from domain.token_budget import estimate_messages_tokens, fit_texts
+from usecases.nodes.doc_search_node import ResultResolver, text_results
+
 if TYPE_CHECKING:
     from domain.config import WorkflowConfig
     from domain.ports.llm_port import LLMPort
@@ -16,54 +21,200 @@ logger = logging.getLogger(__name__)
 WorkflowState = dict[str, Any]
 
 
+def _block_header(block: str) -> str | None:
+    """【目的】付きブロックの見出し行を返す（見出しが無ければ None）。"""
+    first = block.split("\n", 1)[0]
+    return first if first.startswith("【目的") else None
+
+
 def create_summarize_node(
     llm: LLMPort,
     config: WorkflowConfig,
+    resolve_results: ResultResolver = text_results,
 ) -> Callable[[WorkflowState], Awaitable[dict]]:
-    """検索結果要約ノードのファクトリ関数"""
-
-    async def summarize_node(state: WorkflowState) -> dict:
-        """検索結果を要約し、judge の入力コンテキストを削減する。"""
-        question = state["question"]
-        search_results = state.get("search_results", [])
+    """検索結果要約ノードのファクトリ関数
 
-        if not search_results:
-            logger.warning("検索結果が空のため、要約をスキップします。")
-            return {"summary": "検索結果なし"}
+    resolve_results は検索結果ブロック（チャンク参照を含みうる）を
+    プロンプトに入れるテキストに戻す関数。
+    """
 
-        results_text = "\n\n".join(search_results)
+    async def summarize_text(
+        system_prompt: str,
+        question: str,
+        label: str,
+        texts: list[str],
+        num_predict: int,
+        deadline: float,
+    ) -> str:
+        """texts を1回の呼び出しで要約する。
 
+        タイムアウト（締め切りまでの残り時間で頭打ち）・例外時は
+        プロンプトに入れたテキストをそのまま返す。
+        """
+        header = f"## ユーザの質問\n{question}\n\n## {label}\n"
         messages = [
-            {"role": "system", "content": config.system_prompt_summarize},
-            {
-                "role": "user",
-                "content": (
-                    f"## ユーザの質問\n{question}\n\n## 検索結果\n{results_text}"
-                ),
-            },
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": header},
         ]
 
+        # 出力分を除いた num_ctx に収まるよう、テキストを上位から詰める
+        budget = config.llm_num_ctx - num_predict - estimate_messages_tokens(messages)
+        fitted = fit_texts(texts, budget)
+        if fitted != list(texts):
+            logger.info(
+                "%sをプロンプトの上限に合わせて削減しました: %d → %d 件",
+                label,
+                len(texts),
+                len(fitted),
+            )
+        text = "\n\n".join(fitted)
+        messages[1]["content"] = header + text
+
+        time_budget = stage_budget(
+            deadline,
+            config,
+            timeout=config.summarize_timeout,
+            reasoning=config.reasoning_summarize,
+        )
         try:
             response = await asyncio.wait_for(
                 llm.agenerate(
                     messages,
-                    num_predict=config.summarize_num_predict,
-                    reasoning=config.reasoning_summarize,
+                    num_predict=num_predict,
+                    reasoning=time_budget.reasoning,
                 ),
-                timeout=config.summarize_timeout,
+                timeout=time_budget.timeout,
             )
-            summary = response.content
+            return response.content
         except asyncio.TimeoutError:
-            logger.warning("要約がタイムアウトしました。検索結果をそのまま使用します。")
-            summary = results_text
+            logger.warning(
+                "要約がタイムアウトしました。%sをそのまま使用します。", label
+            )
         except Exception:
             logger.warning(
-                "要約で例外が発生しました。検索結果をそのまま使用します。",
+                "要約で例外が発生しました。%sをそのまま使用します。",
+                label,
                 exc_info=True,
             )
-            summary = results_text
+        return text
+
+    async def map_blocks(
+        question: str,
+        search_results: list[str],
+        deadline: float,
+    ) -> list[str]:
+        """【目的】ブロックごとに並列に要約する（map）。"""
+        semaphore = asyncio.Semaphore(max(1, config.summarize_map_concurrency))
+
+        async def summarize_block(block: str) -> str:
+            async with semaphore:
+                summary = await summarize_text(
+                    config.system_prompt_summarize_map,
+                    question,
+                    "検索結果",
+                    [block],
+                    config.summarize_map_num_predict,
+                    deadline,
+                )
+            header = _block_header(block)
+            if header is None or summary.startswith(header):
+                return summary
+            return f"{header}\n{summary}"
+
+        parts = await asyncio.gather(*(summarize_block(b) for b in search_results))
+        logger.info("map 要約完了: %d ブロック", len(parts))
+        return list(parts)
+
+    async def merge(question: str, parts: list[str], deadline: float) -> str:
+        """部分要約を統合する（reduce が無効なら連結するだけ）。"""
+        if not config.summarize_reduce or len(parts) == 1:
+            return "\n\n".join(parts)
+        return await summarize_text(
+            config.system_prompt_summarize_reduce,
+            question,
+            "目的ごとの要約",
+            parts,
+            config.summarize_num_predict,
+            deadline,
+        )
+
+    async def summarize(
+        question: str,
+        search_results: list[str],
+        deadline: float,
+    ) -> str:
+        """検索結果ブロックを設定に応じた方式で要約する。"""
+        if config.summarize_map_reduce:
+            parts = await map_blocks(question, search_results, deadline)
+            return await merge(question, parts, deadline)
+        return await summarize_text(
+            config.system_prompt_summarize,
+            question,
+            "検索結果",
+            search_results,
+            config.summarize_num_predict,
+            deadline,
+        )
+
+    async def summarize_node(state: WorkflowState) -> dict:
+        """検索結果を要約し、judge の入力コンテキストを削減する。
+
+        summarize_incremental が有効な場合、前回の要約に含まれている
+        検索結果ブロック（先頭 summarized_count 件）は要約し直さず、
+        新しいブロックの要約を前回の要約と統合する。
+        """
+        question = state["question"]
+        search_results = state.get("search_results", [])
+
+        if not search_results:
+            logger.warning("検索結果が空のため、要約をスキップします。")
+            return {"summary": "検索結果なし", "summarized_count": 0}
+
+        # 締め切りが近ければ要約せず、上限まで切り詰めた検索結果を使う
+        deadline = state.get("deadline", NO_DEADLINE)
+        time_budget = stage_budget(
+            deadline,
+            config,
+            timeout=config.summarize_timeout,
+            reasoning=config.reasoning_summarize,
+        )
+        if time_budget.pressed:
+            logger.warning("締め切りが近いため、要約を省略します。")
+            fitted = fit_texts(
+                resolve_results(search_results),
+                config.deadline_context_tokens,
+            )
+            return {
+                "summary": "\n\n".join(fitted),
+                "summarized_count": len(search_results),
+            }
+
+        previous = state.get("summary", "")
+        covered = state.get("summarized_count", 0)
+        if config.summarize_incremental and previous and 0 < covered:
+            delta = search_results[covered:]
+            if not delta:
+                logger.info("新しい検索結果が無いため、前回の要約を使用します。")
+                return {"summary": previous, "summarized_count": covered}
+            logger.info(
+                "差分要約: 要約済み %d ブロック + 新規 %d ブロック",
+                covered,
+                len(delta),
+            )
+            if config.summarize_map_reduce:
+                # 前回の要約と新規ブロックの map 要約を1回の reduce で統合する
+                parts = await map_blocks(question, resolve_results(delta), deadline)
+            else:
+                parts = [await summarize(question, resolve_results(delta), deadline)]
+            summary = await merge(question, [previous, *parts], deadline)
+        else:
+            summary = await summarize(
+                question,
+                resolve_results(search_results),
+                deadline,
+            )
 
         logger.info("要約完了: %d 文字", len(summary))
-        return {"summary": summary}
+        return {"summary": summary, "summarized_count": len(search_results)}
 
-    return summarize_node
+    return traced_node("summarize", summarize_node)
@@ -4,10 +4,14 @@ from __future__ import annotations
 
 import asyncio
 import logging
+import math
 from collections.abc import Awaitable, Callable
 from typing import TYPE_CHECKING, Any
 
-from domain.models import TaskPlanningResult
+from domain.deadline import NO_DEADLINE, NodeBudget, stage_budget, time_remaining
+from domain.models import SearchResult, Subtask, TaskPlanningResult
+from domain.telemetry import traced_node
+from usecases.nodes.doc_search_node import collect_blocks, top_score
 
 if TYPE_CHECKING:
     from domain.config import WorkflowConfig
@@ -19,50 +23,228 @@ logger = logging.getLogger(__name__)
 WorkflowState = dict[str, Any]
 
 
+# 先行検索（生の質問での検索）の結果ブロックの目的
+SPECULATIVE_PURPOSE = "質問全体（先行検索）"
+
+SubtaskSearch = Callable[[dict], Awaitable[list[SearchResult]]]
+
+
 def create_task_planning_node(
     llm: LLMPort,
     config: WorkflowConfig,
+    search_subtask: SubtaskSearch | None = None,
 ) -> Callable[[WorkflowState], Awaitable[dict]]:
-    """タスク分割ノードのファクトリ関数"""
+    """タスク分割ノードのファクトリ関数
 
-    async def task_planning_node(state: WorkflowState) -> dict:
-        """ユーザーの質問を分析し、サブタスク（目的 + 検索クエリ）を生成する。"""
-        question = state["question"]
-        logger.info("タスク分割を開始: %s", question)
+    search_subtask が渡された場合、以下の設定でタスク分割と検索を重ねる。
+    検索結果は prefetched_results として doc_search に引き渡す。
 
-        messages = [
-            {"role": "system", "content": config.system_prompt_task_planning},
-            {"role": "user", "content": question},
-        ]
-
-        fallback_subtasks = [{"purpose": "基本調査", "queries": [question]}]
+    - task_planning_pipeline: 構造化出力をストリーミングし、サブタスクが
+      1件確定するたびにその検索を始める
+    - speculative_retrieval: タスク分割と並行して生の質問で検索し、
+      サブタスクの検索結果と重複しないチャンクを追加する。タスク分割が
+      失敗した場合は、この結果をそのままフォールバックの検索結果にする
+    """
 
+    async def plan(messages: list[dict], budget: NodeBudget) -> list[dict]:
+        """構造化出力の完了を待ってサブタスクを得る（失敗時は空リスト）。"""
         try:
             result: TaskPlanningResult = await asyncio.wait_for(
                 llm.agenerate_structured(
                     messages,
                     TaskPlanningResult,
                     num_predict=config.structured_output_num_predict,
-                    reasoning=config.reasoning_task_planning,
+                    reasoning=budget.reasoning,
                 ),
-                timeout=config.structured_output_timeout,
+                timeout=budget.timeout,
             )
-            subtasks = [st.model_dump() for st in result.subtasks]
-            if not subtasks:
-                subtasks = fallback_subtasks
         except asyncio.TimeoutError:
             logger.warning(
                 "タスク分割がタイムアウトしました。フォールバックを使用します。"
             )
-            subtasks = fallback_subtasks
+            return []
         except Exception:
             logger.warning(
                 "タスク分割で例外が発生しました。フォールバックを使用します。",
                 exc_info=True,
             )
-            subtasks = fallback_subtasks
+            return []
+        return [st.model_dump() for st in result.subtasks]
+
+    async def plan_pipelined(
+        messages: list[dict],
+        search: SubtaskSearch,
+        budget: NodeBudget,
+        searches: list[asyncio.Task[list[SearchResult]]],
+    ) -> list[dict]:
+        """サブタスクの生成と検索を並行して進める（検索タスクは searches に追加）。"""
+        subtasks: list[dict] = []
+
+        async def consume() -> None:
+            async for subtask in llm.astream_list_items(
+                messages,
+                TaskPlanningResult,
+                Subtask,
+                field="subtasks",
+                num_predict=config.structured_output_num_predict,
+                reasoning=budget.reasoning,
+            ):
+                st = subtask.model_dump()
+                logger.info("サブタスク確定、検索を開始: %s", st["purpose"])
+                subtasks.append(st)
+                searches.append(asyncio.create_task(search(st)))
+
+        try:
+            await asyncio.wait_for(consume(), timeout=budget.timeout)
+        except TimeoutError:
+            logger.warning(
+                "タスク分割がタイムアウトしました。確定済みのサブタスク (%d 件) を"
+                "使用します。",
+                len(subtasks),
+            )
+        except Exception:
+            logger.warning(
+                "タスク分割で例外が発生しました。確定済みのサブタスク (%d 件) を"
+                "使用します。",
+                len(subtasks),
+                exc_info=True,
+            )
+        return subtasks
+
+    async def settle(
+        tasks: list[asyncio.Task[list[SearchResult]]],
+        timeout: float | None,
+    ) -> list[list[SearchResult] | None]:
+        """検索タスクの完了を待ち、失敗・時間切れのものは None として返す。
+
+        1件の失敗で他の検索結果を捨てないよう、例外はログに記録して落とす。
+        """
+        if not tasks:
+            return []
+        done, _ = await asyncio.wait(tasks, timeout=timeout)
+        results: list[list[SearchResult] | None] = []
+        for task in tasks:
+            if task not in done:
+                logger.warning("締め切りまでに検索が完了しなかったため、破棄します。")
+                results.append(None)
+            elif task.cancelled() or task.exception() is not None:
+                logger.warning(
+                    "検索で例外が発生しました。この検索結果を除外します。",
+                    exc_info=None if task.cancelled() else task.exception(),
+                )
+                results.append(None)
+            else:
+                results.append(task.result())
+        return results
+
+    async def plan_and_search(
+        messages: list[dict],
+        fallback_subtasks: list[dict],
+        search: SubtaskSearch,
+        budget: NodeBudget,
+        deadline: float,
+    ) -> dict:
+        """タスク分割と検索を重ねて実行し、検索済みのブロックを返す。
+
+        doc_search のファストパス判定用に、サブタスクごとの Reranker 最上位
+        スコア（検索に失敗したサブタスクは 0.0）も返す。
+        検索の完了待ちは締め切り（回答生成の時間を残した分）で打ち切り、
+        ノードがキャンセルされた場合も含めて未完了の検索はキャンセルする。
+        """
+        speculative: asyncio.Task[list[SearchResult]] | None = None
+        searches: list[asyncio.Task[list[SearchResult]]] = []
+        try:
+            if config.speculative_retrieval:
+                # フォールバックと同じクエリ（生の質問）で先に検索しておく
+                speculative = asyncio.create_task(search(fallback_subtasks[0]))
+
+            if config.task_planning_pipeline:
+                subtasks = await plan_pipelined(messages, search, budget, searches)
+            else:
+                subtasks = await plan(messages, budget)
+                searches.extend(asyncio.create_task(search(st)) for st in subtasks)
+
+            if not subtasks:
+                subtasks = fallback_subtasks
+                searches = [speculative or asyncio.create_task(search(subtasks[0]))]
+                speculative = None
+
+            remaining = time_remaining(
+                deadline,
+                reserve=config.deadline_answer_reserve,
+            )
+            outcomes = await settle(
+                [*searches, *([speculative] if speculative else [])],
+                timeout=None if math.isinf(remaining) else max(0.0, remaining),
+            )
+        finally:
+            for task in [*searches, *([speculative] if speculative else [])]:
+                task.cancel()
+
+        results = outcomes[: len(searches)]
+        groups = [
+            (st.get("purpose", ""), rs)
+            for st, rs in zip(subtasks, results)
+            if rs is not None
+        ]
+        if speculative is not None:
+            planned = {r.chunk.chunk_id for rs in results if rs for r in rs}
+            extra = [r for r in outcomes[-1] or [] if r.chunk.chunk_id not in planned]
+            logger.info("先行検索の追加チャンク数: %d", len(extra))
+            groups.append((SPECULATIVE_PURPOSE, extra))
+
+        retrieved: list[str] = []
+        blocks = collect_blocks(groups, config, retrieved)
+
+        logger.info("生成されたサブタスク数: %d", len(subtasks))
+        update = {
+            "subtasks": subtasks,
+            "prefetched_results": blocks,
+            "prefetched_top_scores": [top_score(rs or []) for rs in results],
+            "loop_count": 0,
+        }
+        if config.search_dedup:
+            update["retrieved_chunk_ids"] = retrieved
+        return update
+
+    async def task_planning_node(state: WorkflowState) -> dict:
+        """ユーザーの質問を分析し、サブタスク（目的 + 検索クエリ）を生成する。"""
+        question = state["question"]
+        logger.info("タスク分割を開始: %s", question)
+
+        messages = [
+            {"role": "system", "content": config.system_prompt_task_planning},
+            {"role": "user", "content": question},
+        ]
+
+        fallback_subtasks = [{"purpose": "基本調査", "queries": [question]}]
+
+        # 締め切りまでの残り時間に応じてタイムアウト・推論強度を決める
+        budget = stage_budget(
+            state.get("deadline", NO_DEADLINE),
+            config,
+            timeout=config.structured_output_timeout,
+            reasoning=config.reasoning_task_planning,
+        )
+        if budget.expired:
+            logger.warning(
+                "締め切りまでの時間が残っていないため、タスク分割を省略します。"
+            )
+            return {"subtasks": fallback_subtasks, "loop_count": 0}
+
+        if search_subtask is not None and (
+            config.task_planning_pipeline or config.speculative_retrieval
+        ):
+            return await plan_and_search(
+                messages,
+                fallback_subtasks,
+                search_subtask,
+                budget,
+                state.get("deadline", NO_DEADLINE),
+            )
 
+        subtasks = await plan(messages, budget) or fallback_subtasks
         logger.info("生成されたサブタスク数: %d", len(subtasks))
         return {"subtasks": subtasks, "loop_count": 0}
 
-    return task_planning_node
+    return traced_node("task_planning", task_planning_node)
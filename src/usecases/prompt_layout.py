@@ -0,0 +1,150 @@
+"""プロンプトのメッセージ配置
+
+Ollama は直前のリクエストとプロンプトの先頭が一致する範囲の KV キャッシュを
+再利用し、その部分のプロンプト処理（prompt_eval）を省略できる。
+stable_prefix 配置では、静的なシステムプロンプト → 会話履歴 → 変動する内容
+（検索結果・質問）の順に並べ、会話をまたいで先頭部分が変わらないようにする。
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from domain.token_budget import (
+    MESSAGE_OVERHEAD_TOKENS,
+    estimate_messages_tokens,
+    estimate_tokens,
+    fit_texts,
+)
+
+if TYPE_CHECKING:
+    from domain.config import WorkflowConfig
+
+STABLE_PREFIX = "stable_prefix"
+LEGACY = "legacy"
+
+# 会話履歴の各メッセージの最大文字数
+_HISTORY_CONTENT_CHARS = 500
+
+# 見出し・区切りなど、本文以外に加わるトークン数の見込み
+_TEMPLATE_TOKENS = 32
+
+
+def answer_system_prompt(config: WorkflowConfig, user_prompt: str) -> str:
+    """回答生成のシステムプロンプトを組み立てる。
+
+    stable_prefix 配置では固定の回答生成プロンプトを先頭に置き、
+    ユーザが編集できるプロンプトを後ろに置く（編集されても先頭部分は共有できる）。
+    """
+    if config.prompt_layout == STABLE_PREFIX:
+        return config.system_prompt_generate_answer + "\n\n" + user_prompt
+    return user_prompt + "\n\n" + config.system_prompt_generate_answer
+
+
+def history_window(history: list[dict], size: int, layout: str) -> list[dict]:
+    """回答生成に含める直近の会話履歴を選ぶ。
+
+    legacy 配置は常に直近 size 件を使うため、1往復ごとに先頭がずれる。
+    stable_prefix 配置は開始位置を size 件単位に揃え、size 件進むまで
+    開始位置を固定する（含める件数は size 〜 2 × size 件で変動する）。
+    """
+    if size <= 0:
+        return []
+    if layout != STABLE_PREFIX:
+        return history[-size:]
+    start = max(0, (len(history) // size - 1) * size)
+    return history[start:]
+
+
+def fit_answer_context(
+    config: WorkflowConfig,
+    *,
+    system_prompt: str,
+    question: str,
+    search_results: list[str],
+    history: list[dict],
+    max_context_tokens: int | None = None,
+) -> tuple[list[str], list[dict]]:
+    """回答生成プロンプトが num_ctx に収まるよう、検索結果と会話履歴を削る。
+
+    num_ctx から出力用の answer_num_predict_reserve を除いた予算のうち、
+    システムプロンプトと質問の残りをまず検索結果に（上位から）割り当て、
+    さらに残った分に収まる直近の会話履歴を含める。max_context_tokens を
+    指定すると、検索結果と会話履歴の合計をさらにその値に制限する。
+    """
+    budget = (
+        config.llm_num_ctx
+        - config.answer_num_predict_reserve
+        - estimate_tokens(system_prompt)
+        - estimate_tokens(question)
+        - 2 * MESSAGE_OVERHEAD_TOKENS
+        - _TEMPLATE_TOKENS
+    )
+    if max_context_tokens is not None:
+        budget = min(budget, max_context_tokens)
+    results = fit_texts(search_results, budget)
+    budget -= sum(estimate_tokens(r) + 1 for r in results)
+
+    recent = list(history)
+    while recent and estimate_messages_tokens(recent) > budget:
+        recent.pop(0)
+    return results, recent
+
+
+def build_answer_messages(
+    config: WorkflowConfig,
+    *,
+    user_prompt: str,
+    question: str,
+    search_results: list[str],
+    history: list[dict],
+    max_context_tokens: int | None = None,
+) -> list[dict]:
+    """回答生成（ストリーミング）に渡すメッセージ列を組み立てる。
+
+    history は現在の質問を含まない過去の会話履歴。
+    max_context_tokens は fit_answer_context を参照。
+    """
+    recent = [
+        {**msg, "content": msg.get("content", "")[:_HISTORY_CONTENT_CHARS]}
+        for msg in history_window(
+            history,
+            config.answer_history_messages,
+            config.prompt_layout,
+        )
+    ]
+    system = {"role": "system", "content": answer_system_prompt(config, user_prompt)}
+    search_results, recent = fit_answer_context(
+        config,
+        system_prompt=system["content"],
+        question=question,
+        search_results=search_results,
+        history=recent,
+        max_context_tokens=max_context_tokens,
+    )
+    results_text = "\n\n".join(search_results)
+
+    if config.prompt_layout == STABLE_PREFIX:
+        # 会話履歴はメッセージとして並べ、変動する検索結果と質問を末尾に置く
+        messages = [system]
+        for msg in recent:
+            role = "user" if msg.get("role") == "user" else "assistant"
+            messages.append({"role": role, "content": msg["content"]})
+        messages.append(
+            {
+                "role": "user",
+                "content": f"検索結果:\n{results_text}\n\n質問: {question}",
+            },
+        )
+        return messages
+
+    history_lines: list[str] = []
+    for msg in recent:
+        role = "ユーザ" if msg.get("role") == "user" else "AI"
+        history_lines.append(f"{role}: {msg['content']}")
+
+    user_content = ""
+    if history_lines:
+        user_content += "会話履歴:\n" + "\n".join(history_lines) + "\n\n"
+    user_content += f"質問: {question}\n\n検索結果:\n{results_text}"
+    return [system, {"role": "user", "content": user_content}]
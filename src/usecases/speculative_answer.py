@@ -0,0 +1,122 @@
+"""judge と並行した投機的な回答生成
+
+judge は多くの場合「十分」と判定し、その後の回答生成は judge 時点と同じ
+検索結果・質問で行われる。judge と同時に回答のストリーミングを始めて
+トークンをバッファに溜めておき、十分と判定されたらバッファから即座に
+表示する。再検索となった場合は生成タスクをキャンセルし、ストリームの
+切断によって Ollama 側の生成も止める。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections.abc import AsyncIterator, Callable
+
+from pydantic import BaseModel, Field
+
+logger = logging.getLogger(__name__)
+
+
+class SpeculationStats(BaseModel):
+    """投機的回答生成の的中率と短縮時間の統計"""
+
+    attempts: int = Field(default=0, description="投機的に生成を開始した回数")
+    hits: int = Field(default=0, description="生成結果を採用した回数")
+    saved_ttft_total: float = Field(
+        default=0.0,
+        description="短縮した最初のトークンまでの時間の合計（秒）",
+    )
+
+    @property
+    def hit_rate(self) -> float:
+        """的中率（試行が無ければ 0.0）"""
+        return self.hits / self.attempts if self.attempts else 0.0
+
+    @property
+    def mean_saved_ttft(self) -> float:
+        """採用1回あたりの平均短縮時間（秒）"""
+        return self.saved_ttft_total / self.hits if self.hits else 0.0
+
+    def record(self, *, hit: bool, saved_ttft: float = 0.0) -> None:
+        """1回分の結果を記録する。"""
+        self.attempts += 1
+        if hit:
+            self.hits += 1
+            self.saved_ttft_total += saved_ttft
+        logger.info(
+            "投機的回答: %s (的中率 %.0f%%, 平均 TTFT 短縮 %.2fs)",
+            "採用" if hit else "破棄",
+            self.hit_rate * 100,
+            self.mean_saved_ttft,
+        )
+
+
+class SpeculativeAnswer:
+    """回答のストリームをバックグラウンドで消費し、トークンをバッファに溜める
+
+    イベントループ上で生成すること（生成時点でストリームの消費を開始する）。
+    """
+
+    def __init__(
+        self,
+        stream: AsyncIterator[str],
+        clock: Callable[[], float] = time.perf_counter,
+    ) -> None:
+        self._stream = stream
+        self._clock = clock
+        self._tokens: list[str] = []
+        self._done = False
+        self._changed = asyncio.Event()
+        self.started_at = clock()
+        self.first_token_at: float | None = None
+        self._task = asyncio.create_task(self._consume())
+        self._task.add_done_callback(self._log_failure)
+
+    async def _consume(self) -> None:
+        try:
+            async for token in self._stream:
+                if self.first_token_at is None:
+                    self.first_token_at = self._clock()
+                self._tokens.append(token)
+                self._changed.set()
+        finally:
+            self._done = True
+            self._changed.set()
+
+    @staticmethod
+    def _log_failure(task: asyncio.Task[None]) -> None:
+        """生成の失敗を記録する（破棄されて読み出されない場合も取りこぼさない）。"""
+        if not task.cancelled() and task.exception() is not None:
+            logger.debug("投機的回答の生成に失敗しました", exc_info=task.exception())
+
+    def saved_ttft(self, decided_at: float) -> float:
+        """判定時刻 decided_at から見て短縮できた最初のトークンまでの時間を返す。
+
+        投機なしなら判定後に (最初のトークンまでの生成待ち) がかかるところ、
+        判定までに進んだ分（最初のトークンが届いていればそこまで）を短縮できる。
+        """
+        reached = decided_at
+        if self.first_token_at is not None:
+            reached = min(reached, self.first_token_at)
+        return max(0.0, reached - self.started_at)
+
+    async def tokens(self) -> AsyncIterator[str]:
+        """バッファ済みのトークンを返した後、生成に追従して残りを返す。"""
+        i = 0
+        while True:
+            self._changed.clear()
+            while i < len(self._tokens):
+                yield self._tokens[i]
+                i += 1
+            if self._done:
+                if not self._task.cancelled():
+                    # 生成中の例外はここで読み手に送出する
+                    self._task.result()
+                return
+            await self._changed.wait()
+
+    def cancel(self) -> None:
+        """生成を中止する（ストリームが閉じられ、Ollama 側の生成も止まる）。"""
+        self._task.cancel()
@@ -102,6 +102,7 @@ class MockLLM:
         messages: list[dict],
         *,
         reasoning: str | None = None,
+        temperature: float | None = None,
     ) -> AsyncIterator[str]:
         for token in self._stream_tokens:
             yield token
@@ -161,6 +162,59 @@ class MockVectorStore:
             ),
         ]
 
+    def hybrid_search(
+        self,
+        query: str,
+        k: int = 10,
+        bm25_weight: float = 0.3,
+    ) -> list[SearchResult]:
+        results = self.similarity_search(query, k) + self.keyword_search(query, k)
+        return results[:k]
+
+    def similarity_search_many(
+        self,
+        queries: list[str],
+        k: int = 10,
+    ) -> list[list[SearchResult]]:
+        return [self.similarity_search(q, k) for q in queries]
+
+    def keyword_search_many(
+        self,
+        queries: list[str],
+        k: int = 10,
+    ) -> list[list[SearchResult]]:
+        return [self.keyword_search(q, k) for q in queries]
+
+    def hybrid_search_many(
+        self,
+        queries: list[str],
+        k: int = 10,
+        bm25_weight: float = 0.3,
+    ) -> list[list[SearchResult]]:
+        return [self.hybrid_search(q, k, bm25_weight) for q in queries]
+
+    async def asimilarity_search(
+        self,
+        query: str,
+        k: int = 10,
+    ) -> list[SearchResult]:
+        return self.similarity_search(query, k)
+
+    async def akeyword_search(
+        self,
+        query: str,
+        k: int = 10,
+    ) -> list[SearchResult]:
+        return self.keyword_search(query, k)
+
+    async def ahybrid_search_many(
+        self,
+        queries: list[str],
+        k: int = 10,
+        bm25_weight: float = 0.3,
+    ) -> list[list[SearchResult]]:
+        return self.hybrid_search_many(queries, k, bm25_weight)
+
 
 @pytest.fixture()
 def mock_vectorstore() -> MockVectorStore:
@@ -184,6 +238,14 @@ class MockReranker:
     ) -> list[SearchResult]:
         return results[:top_k]
 
+    async def arerank(
+        self,
+        query: str,
+        results: list[SearchResult],
+        top_k: int = 5,
+    ) -> list[SearchResult]:
+        return self.rerank(query, results, top_k)
+
 
 @pytest.fixture()
 def mock_reranker() -> MockReranker:
@@ -10,9 +10,12 @@ from domain.models import (
     JudgeResult,
     SearchResult,
     Subtask,
+    SummarizeJudgeResult,
     TaskPlanningResult,
 )
-from domain.ports.llm_port import ChatResponse
+from domain.ports.llm_port import ChatResponse, LLMUsage
+from domain.telemetry import RequestTelemetry, record_llm_usage
+from interfaces.adapters.checkpointer import BoundedMemorySaver
 from usecases.agent_workflow import AgentWorkflow
 
 
@@ -59,13 +62,33 @@ class _MockLLM:
                 sufficient=True,
                 reason="十分な情報があります",
             )
+        if response_model is SummarizeJudgeResult:
+            return SummarizeJudgeResult(
+                summary="要約: テスト結果に基づく要約です。",
+                judgement=JudgeResult(sufficient=True, reason="十分な情報があります"),
+            )
         return None
 
+    async def astream_list_items(
+        self,
+        messages: list[dict],
+        response_model: type,
+        item_model: type,
+        *,
+        field: str,
+        num_predict: int | None = None,
+        reasoning: str | None = None,
+    ) -> AsyncIterator[object]:
+        result = await self.agenerate_structured(messages, response_model)
+        for item in getattr(result, field):
+            yield item
+
     async def astream(
         self,
         messages: list[dict],
         *,
         reasoning: str | None = None,
+        temperature: float | None = None,
     ) -> AsyncIterator[str]:
         for token in ["テスト", "回答", "です。"]:
             yield token
@@ -76,10 +99,19 @@ class _MockVectorStore:
 
     def __init__(self) -> None:
         self.stored_chunks: list[DocumentChunk] = []
+        # 検索で返したチャンク（get_chunks で引けるようにする）
+        self.returned_chunks: dict[str, DocumentChunk] = {}
 
     def add_documents(self, chunks: list[DocumentChunk]) -> None:
         self.stored_chunks.extend(chunks)
 
+    def get_chunks(self, chunk_ids: list[str]) -> list[DocumentChunk]:
+        return [
+            self.returned_chunks[cid]
+            for cid in chunk_ids
+            if cid in self.returned_chunks
+        ]
+
     def similarity_search(
         self,
         query: str,
@@ -114,6 +146,60 @@ class _MockVectorStore:
             ),
         ]
 
+    def hybrid_search(
+        self,
+        query: str,
+        k: int = 10,
+        bm25_weight: float = 0.3,
+    ) -> list[SearchResult]:
+        results = self.similarity_search(query, k) + self.keyword_search(query, k)
+        self.returned_chunks.update({r.chunk.chunk_id: r.chunk for r in results})
+        return results[:k]
+
+    def similarity_search_many(
+        self,
+        queries: list[str],
+        k: int = 10,
+    ) -> list[list[SearchResult]]:
+        return [self.similarity_search(q, k) for q in queries]
+
+    def keyword_search_many(
+        self,
+        queries: list[str],
+        k: int = 10,
+    ) -> list[list[SearchResult]]:
+        return [self.keyword_search(q, k) for q in queries]
+
+    def hybrid_search_many(
+        self,
+        queries: list[str],
+        k: int = 10,
+        bm25_weight: float = 0.3,
+    ) -> list[list[SearchResult]]:
+        return [self.hybrid_search(q, k, bm25_weight) for q in queries]
+
+    async def asimilarity_search(
+        self,
+        query: str,
+        k: int = 10,
+    ) -> list[SearchResult]:
+        return self.similarity_search(query, k)
+
+    async def akeyword_search(
+        self,
+        query: str,
+        k: int = 10,
+    ) -> list[SearchResult]:
+        return self.keyword_search(query, k)
+
+    async def ahybrid_search_many(
+        self,
+        queries: list[str],
+        k: int = 10,
+        bm25_weight: float = 0.3,
+    ) -> list[list[SearchResult]]:
+        return self.hybrid_search_many(queries, k, bm25_weight)
+
 
 class _MockReranker:
     """RerankerPort のモック"""
@@ -126,6 +212,14 @@ class _MockReranker:
     ) -> list[SearchResult]:
         return results[:top_k]
 
+    async def arerank(
+        self,
+        query: str,
+        results: list[SearchResult],
+        top_k: int = 5,
+    ) -> list[SearchResult]:
+        return self.rerank(query, results, top_k)
+
 
 # ---------------------------------------------------------------------------
 # テスト
@@ -155,6 +249,188 @@ class TestAgentWorkflow:
         assert result["question"] == "テスト質問"
         assert result["loop_count"] == 1
 
+    @pytest.mark.asyncio()
+    async def test_pipelined_planning(self) -> None:
+        """パイプライン実行でも検索結果が要約・回答生成に渡ることを検証する。"""
+        config = WorkflowConfig(task_planning_pipeline=True)
+        workflow = AgentWorkflow(
+            llm=_MockLLM(),
+            vectorstore=_MockVectorStore(),
+            reranker=_MockReranker(),
+            config=config,
+        )
+
+        result = await workflow.ainvoke(
+            question="テスト質問",
+            thread_id="test-thread-pipeline",
+        )
+
+        assert result["answer"] == "テスト回答です。"
+        assert len(result["search_results"]) == 1
+        assert "【目的: 基本調査】" in result["search_results"][0]
+        assert result["prefetched_results"] == []
+
+    @pytest.mark.asyncio()
+    async def test_fused_summarize_judge(self) -> None:
+        """統合ノードで要約と判定を1回の呼び出しで行えることを検証する。"""
+        config = WorkflowConfig(fused_summarize_judge=True)
+        llm = _MockLLM()
+        workflow = AgentWorkflow(
+            llm=llm,
+            vectorstore=_MockVectorStore(),
+            reranker=_MockReranker(),
+            config=config,
+        )
+
+        result = await workflow.ainvoke(
+            question="テスト質問",
+            thread_id="test-thread-fused",
+        )
+
+        assert result["answer"] == "テスト回答です。"
+        assert result["summary"] == "要約: テスト結果に基づく要約です。"
+        assert result["loop_count"] == 1
+        # タスク分割 + 要約・判定の2回
+        assert llm._call_count == 2
+
+    @pytest.mark.asyncio()
+    async def test_retrieval_fast_path(self) -> None:
+        """検索の確信度が高い場合、要約・判定を省略して回答することを検証する。"""
+        config = WorkflowConfig(
+            retrieval_fast_path=True,
+            fast_path_score_threshold=0.85,
+        )
+        llm = _MockLLM()
+        workflow = AgentWorkflow(
+            llm=llm,
+            vectorstore=_MockVectorStore(),
+            reranker=_MockReranker(),
+            config=config,
+        )
+        telemetry = RequestTelemetry()
+
+        result = await workflow.ainvoke(
+            question="テスト質問",
+            thread_id="test-thread-fast-path",
+            telemetry=telemetry,
+        )
+
+        assert result["answer"] == "テスト回答です。"
+        assert result["summary"] == ""
+        assert result["loop_count"] == 0
+        # 構造化出力はタスク分割の1回だけ（judge を呼ばない）
+        assert llm._call_count == 1
+        assert [d["fast_path"] for d in telemetry.decisions] == [True]
+
+    @pytest.mark.asyncio()
+    async def test_chunk_references(self) -> None:
+        """状態にはチャンク参照を載せ、回答のプロンプトでは本文に戻すことを検証する。"""
+
+        class _PromptRecordingLLM(_MockLLM):
+            def __init__(self) -> None:
+                super().__init__()
+                self.answer_prompts: list[str] = []
+
+            async def astream(self, messages, **kwargs):
+                self.answer_prompts.append(messages[-1]["content"])
+                async for token in super().astream(messages, **kwargs):
+                    yield token
+
+        llm = _PromptRecordingLLM()
+        workflow = AgentWorkflow(
+            llm=llm,
+            vectorstore=_MockVectorStore(),
+            reranker=_MockReranker(),
+            config=WorkflowConfig(search_result_refs=True),
+        )
+
+        result = await workflow.ainvoke(
+            question="テスト質問",
+            thread_id="test-thread-refs",
+        )
+
+        assert result["answer"] == "テスト回答です。"
+        assert result["search_results"] == [
+            {
+                "purpose": "基本調査",
+                "chunks": [
+                    {"chunk_id": "vec-1", "score": 0.9},
+                    {"chunk_id": "bm25-1", "score": 0.8},
+                ],
+            },
+        ]
+        assert "ベクトル検索結果: テストクエリ" in llm.answer_prompts[0]
+        assert "【目的: 基本調査】" in llm.answer_prompts[0]
+
+    @pytest.mark.asyncio()
+    async def test_search_dedup_across_loops(self) -> None:
+        """先行検索・前のループで取得したチャンクを再検索で載せないことを検証する。"""
+
+        class _RetryOnceLLM(_MockLLM):
+            async def agenerate_structured(self, messages, response_model, **kwargs):
+                if response_model is JudgeResult and self._call_count == 1:
+                    self._call_count += 1
+                    return JudgeResult(
+                        sufficient=False,
+                        reason="情報が不足しています",
+                        additional_subtasks=[
+                            Subtask(purpose="追加調査", queries=["テストクエリ"]),
+                        ],
+                    )
+                return await super().agenerate_structured(
+                    messages,
+                    response_model,
+                    **kwargs,
+                )
+
+        workflow = AgentWorkflow(
+            llm=_RetryOnceLLM(),
+            vectorstore=_MockVectorStore(),
+            reranker=_MockReranker(),
+            config=WorkflowConfig(search_dedup=True, task_planning_pipeline=True),
+        )
+
+        result = await workflow.ainvoke(
+            question="テスト質問",
+            thread_id="test-thread-dedup",
+        )
+
+        assert result["loop_count"] == 2
+        # 追加調査は同じチャンクしか返さないため、ブロックが増えない
+        assert len(result["search_results"]) == 1
+        assert result["retrieved_chunk_ids"] == ["vec-1", "bm25-1"]
+
+    @pytest.mark.asyncio()
+    async def test_bounded_checkpointer(self) -> None:
+        """上限付きチェックポインタでもスレッドの状態を保持できることを検証する。"""
+        checkpointer = BoundedMemorySaver(
+            max_threads=2,
+            max_checkpoints_per_thread=1,
+        )
+        workflow = AgentWorkflow(
+            llm=_MockLLM(),
+            vectorstore=_MockVectorStore(),
+            reranker=_MockReranker(),
+            config=WorkflowConfig(),
+            checkpointer=checkpointer,
+        )
+
+        for thread_id in ("s1", "s2", "s3"):
+            result = await workflow.ainvoke(
+                question=f"テスト質問 {thread_id}",
+                thread_id=thread_id,
+            )
+
+        assert result["answer"] == "テスト回答です。"
+        stats = checkpointer.stats()
+        assert stats.threads == 2
+        assert stats.checkpoints == 2
+        assert stats.evicted_threads == 1
+        snapshot = await workflow.graph.aget_state(
+            {"configurable": {"thread_id": "s3"}},
+        )
+        assert snapshot.values["question"] == "テスト質問 s3"
+
     @pytest.mark.asyncio()
     async def test_workflow_with_retry(self) -> None:
         """情報が不十分な場合、再検索ループが実行されることを検証する。"""
@@ -211,3 +487,59 @@ class TestAgentWorkflow:
 
         assert result["answer"] == "テスト回答です。"
         assert result["loop_count"] == 2  # 2回ループした
+
+    @pytest.mark.asyncio()
+    async def test_telemetry_per_node(self) -> None:
+        """LLM の応答統計がノードごとに集計されることを検証する。"""
+
+        class _UsageLLM(_MockLLM):
+            async def agenerate(self, messages: list[dict], **kwargs) -> ChatResponse:
+                record_llm_usage(LLMUsage(prompt_eval_count=1000, eval_count=200))
+                return await super().agenerate(messages, **kwargs)
+
+            async def agenerate_structured(
+                self,
+                messages: list[dict],
+                response_model: type,
+                **kwargs,
+            ) -> object:
+                record_llm_usage(LLMUsage(prompt_eval_count=300, eval_count=50))
+                return await super().agenerate_structured(
+                    messages,
+                    response_model,
+                    **kwargs,
+                )
+
+            async def astream(
+                self,
+                messages: list[dict],
+                **kwargs,
+            ) -> AsyncIterator[str]:
+                async for token in super().astream(messages, **kwargs):
+                    yield token
+                record_llm_usage(LLMUsage(prompt_eval_count=2000, eval_count=400))
+
+        workflow = AgentWorkflow(
+            llm=_UsageLLM(),
+            vectorstore=_MockVectorStore(),
+            reranker=_MockReranker(),
+            config=WorkflowConfig(),
+        )
+        telemetry = RequestTelemetry()
+
+        await workflow.ainvoke(
+            question="テスト質問",
+            thread_id="test-thread-telemetry",
+            telemetry=telemetry,
+        )
+
+        by_node = telemetry.by_node
+        assert set(by_node) == {
+            "task_planning",
+            "summarize",
+            "judge",
+            "generate_answer",
+        }
+        assert by_node["summarize"].prompt_eval_count == 1000
+        assert by_node["generate_answer"].eval_count == 400
+        assert telemetry.total.calls == 4
@@ -0,0 +1,261 @@
+"""同時セッション時のイベントループ応答性の統合テスト"""
+
+import asyncio
+import time
+import uuid
+from collections.abc import AsyncIterator
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from domain.config import WorkflowConfig
+from domain.models import (
+    DocumentChunk,
+    JudgeResult,
+    SearchResult,
+    Subtask,
+    TaskPlanningResult,
+)
+from domain.ports.llm_port import ChatResponse
+from interfaces.adapters.chromadb_adapter import ChromaDBAdapter
+from interfaces.ui.gradio_handler import GradioHandler
+from usecases.data_ingestion import DataIngestion
+
+# 1回のクエリ Embedding が CPU を占有する時間（秒）
+_EMBEDDING_SECONDS = 0.3
+
+
+class _MockLLM:
+    """LLMPort のモック（ストリーミングは少しずつトークンを返す）"""
+
+    async def agenerate(
+        self,
+        messages: list[dict],
+        *,
+        num_predict: int | None = None,
+        reasoning: str | None = None,
+    ) -> ChatResponse:
+        return ChatResponse(content="要約", thinking="")
+
+    async def agenerate_structured(
+        self,
+        messages: list[dict],
+        response_model: type,
+        *,
+        num_predict: int | None = None,
+        reasoning: str | None = None,
+    ) -> object:
+        if response_model is TaskPlanningResult:
+            return TaskPlanningResult(
+                subtasks=[Subtask(purpose="基本調査", queries=["軸受 寿命"])],
+            )
+        return JudgeResult(sufficient=True, reason="十分な情報があります")
+
+    async def astream(
+        self,
+        messages: list[dict],
+        *,
+        reasoning: str | None = None,
+        temperature: float | None = None,
+    ) -> AsyncIterator[str]:
+        for token in ["回答", "です。"]:
+            await asyncio.sleep(0.01)
+            yield token
+
+
+class _RecordingLLM(_MockLLM):
+    """回答生成に渡されたメッセージを記録する LLMPort のモック"""
+
+    def __init__(self) -> None:
+        self.stream_messages: list[list[dict]] = []
+
+    async def astream(
+        self,
+        messages: list[dict],
+        *,
+        reasoning: str | None = None,
+        temperature: float | None = None,
+    ) -> AsyncIterator[str]:
+        self.stream_messages.append(messages)
+        yield "回答です。"
+
+
+class _MockReranker:
+    """RerankerPort のモック"""
+
+    def rerank(
+        self,
+        query: str,
+        results: list[SearchResult],
+        top_k: int = 5,
+    ) -> list[SearchResult]:
+        return results[:top_k]
+
+    async def arerank(
+        self,
+        query: str,
+        results: list[SearchResult],
+        top_k: int = 5,
+    ) -> list[SearchResult]:
+        return self.rerank(query, results, top_k)
+
+
+class _MockDataLoader:
+    """DataLoaderPort のモック"""
+
+    def load(self, file_path: str) -> list[DocumentChunk]:
+        return []
+
+
+def _embed(texts: list[str]) -> list[list[float]]:
+    return [[float(len(t)), 1.0] for t in texts]
+
+
+def _slow_embed(texts: list[str]) -> list[list[float]]:
+    """GIL を解放しつつ CPU を占有するクエリ Embedding の代用"""
+    time.sleep(_EMBEDDING_SECONDS)
+    return _embed(texts)
+
+
+class TestConcurrentSessions:
+    """同時セッションのテスト"""
+
+    @pytest.mark.asyncio()
+    async def test_search_does_not_block_event_loop(self) -> None:
+        """検索中もイベントループが他セッションに応答できることを検証する。"""
+        config = WorkflowConfig()
+        executor = ThreadPoolExecutor(max_workers=4)
+        vectorstore = ChromaDBAdapter(
+            embedding_fn=_embed,
+            query_embedding_fn=_slow_embed,
+            collection_name=f"test-{uuid.uuid4().hex}",
+            tokenize_fn=str.split,
+            executor=executor,
+        )
+        vectorstore.add_documents(
+            [DocumentChunk(chunk_id="c1", text="軸受 寿命 試験", source="a.pdf")],
+        )
+        handler = GradioHandler(
+            ingestion=DataIngestion(_MockDataLoader(), vectorstore),
+            config=config,
+            llm=_MockLLM(),
+            vectorstore=vectorstore,
+            reranker=_MockReranker(),
+        )
+
+        async def _session() -> str:
+            history: list[dict] = []
+            async for history, _, _ in handler.respond(
+                "軸受の寿命は？",
+                [],
+                config.system_prompt_user_default,
+                config.llm_temperature,
+                "",
+                {"thread_id": str(uuid.uuid4())},
+            ):
+                pass
+            return history[-1]["content"]
+
+        max_lag = 0.0
+        done = asyncio.Event()
+
+        async def _heartbeat() -> None:
+            nonlocal max_lag
+            while not done.is_set():
+                start = time.perf_counter()
+                await asyncio.sleep(0.01)
+                max_lag = max(max_lag, time.perf_counter() - start - 0.01)
+
+        heartbeat = asyncio.create_task(_heartbeat())
+        answers = await asyncio.gather(*(_session() for _ in range(3)))
+        done.set()
+        await heartbeat
+        executor.shutdown()
+
+        assert answers == ["回答です。"] * 3
+        # 検索が同期実行されていれば、ループは Embedding 時間分停止する
+        assert max_lag < _EMBEDDING_SECONDS / 2
+
+    @pytest.mark.asyncio()
+    async def test_speculative_answer_is_adopted(self) -> None:
+        """判定と並行して生成した回答が、十分と判定された後に採用されることを検証する。"""
+        config = WorkflowConfig(speculative_answer=True)
+        vectorstore = ChromaDBAdapter(
+            embedding_fn=_embed,
+            collection_name=f"test-{uuid.uuid4().hex}",
+            tokenize_fn=str.split,
+        )
+        vectorstore.add_documents(
+            [DocumentChunk(chunk_id="c1", text="軸受 寿命 試験", source="a.pdf")],
+        )
+        # 投機的な回答は専用の LLM（スケジューラの予約スロット）で生成する
+        speculative_llm = _RecordingLLM()
+        handler = GradioHandler(
+            ingestion=DataIngestion(_MockDataLoader(), vectorstore),
+            config=config,
+            llm=_MockLLM(),
+            vectorstore=vectorstore,
+            reranker=_MockReranker(),
+            node_llms={"speculative_answer": speculative_llm},
+        )
+
+        history: list[dict] = []
+        log = ""
+        async for history, log, _ in handler.respond(
+            "軸受の寿命は？",
+            [],
+            config.system_prompt_user_default,
+            config.llm_temperature,
+            "",
+            {"thread_id": str(uuid.uuid4())},
+        ):
+            pass
+
+        assert history[-1]["content"] == "回答です。"
+        assert "先行生成した回答を採用" in log
+        assert handler._speculation_stats.hits == 1
+        assert len(speculative_llm.stream_messages) == 1
+
+    @pytest.mark.asyncio()
+    @pytest.mark.parametrize("speculative_answer", [False, True])
+    async def test_answer_history_excludes_current_question(
+        self,
+        speculative_answer: bool,
+    ) -> None:
+        """回答プロンプトの会話履歴に今回の質問が含まれないことを検証する。"""
+        config = WorkflowConfig(speculative_answer=speculative_answer)
+        vectorstore = ChromaDBAdapter(
+            embedding_fn=_embed,
+            collection_name=f"test-{uuid.uuid4().hex}",
+            tokenize_fn=str.split,
+        )
+        vectorstore.add_documents(
+            [DocumentChunk(chunk_id="c1", text="軸受 寿命 試験", source="a.pdf")],
+        )
+        llm = _RecordingLLM()
+        handler = GradioHandler(
+            ingestion=DataIngestion(_MockDataLoader(), vectorstore),
+            config=config,
+            llm=llm,
+            vectorstore=vectorstore,
+            reranker=_MockReranker(),
+        )
+        past = [
+            {"role": "user", "content": "前回の質問"},
+            {"role": "assistant", "content": "前回の回答"},
+        ]
+
+        async for _ in handler.respond(
+            "今回の軸受の質問",
+            past,
+            config.system_prompt_user_default,
+            config.llm_temperature,
+            "",
+            {"thread_id": str(uuid.uuid4())},
+        ):
+            pass
+
+        (messages,) = llm.stream_messages
+        prompt = "\n".join(m["content"] for m in messages)
+        assert prompt.count("今回の軸受の質問") == 1
+        assert "前回の質問" in prompt
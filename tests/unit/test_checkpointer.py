@@ -0,0 +1,213 @@
+"""上限付きチェックポインタのユニットテスト"""
+
+import threading
+from pathlib import Path
+from typing import TypedDict
+
+import pytest
+from langgraph.graph import END, START, StateGraph
+
+from interfaces.adapters.checkpointer import BoundedMemorySaver, SQLiteCheckpointSaver
+
+
+class _State(TypedDict):
+    value: int
+    total: int
+
+
+def _build_graph(checkpointer):
+    """value を total に足し込む2ノードのグラフ（1回の実行で4チェックポイント）"""
+
+    def add(state: _State) -> dict:
+        return {"total": state.get("total", 0) + state["value"]}
+
+    def keep(state: _State) -> dict:
+        return {"value": state["value"]}
+
+    graph = StateGraph(_State)
+    graph.add_node("add", add)
+    graph.add_node("keep", keep)
+    graph.add_edge(START, "add")
+    graph.add_edge("add", "keep")
+    graph.add_edge("keep", END)
+    return graph.compile(checkpointer=checkpointer)
+
+
+def _run(graph, thread_id: str, value: int = 1) -> dict:
+    return graph.invoke(
+        {"value": value},
+        config={"configurable": {"thread_id": thread_id}},
+    )
+
+
+class _Clock:
+    """テスト用の手動クロック"""
+
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestBoundedMemorySaver:
+    """BoundedMemorySaver のテスト"""
+
+    def test_resumes_thread(self) -> None:
+        """同じスレッドの2回目の実行が前回の状態から再開することを検証する。"""
+        graph = _build_graph(BoundedMemorySaver(max_checkpoints_per_thread=1))
+
+        _run(graph, "t1", 2)
+        result = _run(graph, "t1", 3)
+
+        assert result["total"] == 5
+
+    def test_caps_checkpoints_per_thread(self) -> None:
+        """スレッドあたりのチェックポイントと値が上限以下に保たれることを検証する。"""
+        saver = BoundedMemorySaver(max_checkpoints_per_thread=2)
+        graph = _build_graph(saver)
+
+        for _ in range(5):
+            _run(graph, "t1")
+        sizes = (len(saver.blobs), len(saver.writes))
+        for _ in range(15):
+            result = _run(graph, "t1")
+
+        stats = saver.stats()
+        assert result["total"] == 20
+        assert stats.checkpoints == 2
+        assert stats.pruned_checkpoints == 20 * 4 - 2
+        # 残る2チェックポイントが参照する値・書き込みだけが残る
+        assert (len(saver.blobs), len(saver.writes)) == sizes
+        assert len(saver.writes) <= 2
+
+    def test_evicts_least_recently_used_thread(self) -> None:
+        """スレッド数の上限を超えると、最も古くアクセスされたスレッドを破棄する。"""
+        clock = _Clock()
+        saver = BoundedMemorySaver(max_threads=2, clock=clock)
+        graph = _build_graph(saver)
+
+        for thread_id in ("a", "b", "a", "c"):
+            clock.now += 1
+            _run(graph, thread_id)
+
+        stats = saver.stats()
+        assert stats.threads == 2
+        assert stats.evicted_threads == 1
+        assert set(saver.storage) == {"a", "c"}
+        assert not any(key[0] == "b" for key in saver.blobs)
+        assert not any(key[0] == "b" for key in saver.writes)
+        # 破棄したスレッドは最初からやり直しになる
+        assert _run(graph, "b")["total"] == 1
+
+    def test_expires_idle_threads(self) -> None:
+        """最終アクセスから TTL を超えたスレッドを破棄することを検証する。"""
+        clock = _Clock()
+        saver = BoundedMemorySaver(thread_ttl=10.0, clock=clock)
+        graph = _build_graph(saver)
+
+        _run(graph, "a")
+        clock.now += 5
+        _run(graph, "b")
+        clock.now += 6
+        _run(graph, "b")
+
+        stats = saver.stats()
+        assert stats.expired_threads == 1
+        assert set(saver.storage) == {"b"}
+
+    def test_lookup_does_not_create_thread(self) -> None:
+        """存在しないスレッドの参照で空のエントリが残らないことを検証する。"""
+        saver = BoundedMemorySaver()
+
+        assert saver.get_tuple({"configurable": {"thread_id": "none"}}) is None
+        assert saver.stats().threads == 0
+        assert "none" not in saver.storage
+
+
+class TestSQLiteCheckpointSaver:
+    """SQLiteCheckpointSaver のテスト"""
+
+    def test_persists_across_instances(self, tmp_path: Path) -> None:
+        """DB を開き直しても、スレッドを前回の状態から再開できることを検証する。"""
+        path = tmp_path / "checkpoints.sqlite3"
+        saver = SQLiteCheckpointSaver(path)
+        _run(_build_graph(saver), "t1", 2)
+        saver.close()
+
+        saver = SQLiteCheckpointSaver(path)
+        result = _run(_build_graph(saver), "t1", 3)
+
+        assert result["total"] == 5
+
+    def test_caps_checkpoints_and_threads(self, tmp_path: Path) -> None:
+        """チェックポイント数・スレッド数が上限以下に保たれることを検証する。"""
+        clock = _Clock()
+        saver = SQLiteCheckpointSaver(
+            tmp_path / "checkpoints.sqlite3",
+            max_threads=2,
+            max_checkpoints_per_thread=2,
+            clock=clock,
+        )
+        graph = _build_graph(saver)
+
+        for thread_id in ("a", "b", "a", "c"):
+            clock.now += 1
+            result = _run(graph, thread_id)
+
+        stats = saver.stats()
+        assert result["total"] == 1
+        assert stats.threads == 2
+        assert stats.checkpoints == 4
+        assert stats.evicted_threads == 1
+        threads = {t.config["configurable"]["thread_id"] for t in saver.list(None)}
+        assert threads == {"a", "c"}
+        assert _run(graph, "a")["total"] == 3
+
+    def test_expires_idle_threads_on_open(self, tmp_path: Path) -> None:
+        """再起動時に TTL を超えたスレッドを破棄することを検証する。"""
+        path = tmp_path / "checkpoints.sqlite3"
+        clock = _Clock()
+        saver = SQLiteCheckpointSaver(path, thread_ttl=10.0, clock=clock)
+        _run(_build_graph(saver), "a")
+        saver.close()
+
+        clock.now += 11
+        saver = SQLiteCheckpointSaver(path, thread_ttl=10.0, clock=clock)
+
+        stats = saver.stats()
+        assert stats.threads == 0
+        assert stats.checkpoints == 0
+        assert stats.expired_threads == 1
+
+    @pytest.mark.asyncio()
+    async def test_async_invoke(self, tmp_path: Path) -> None:
+        """非同期実行でも前回の状態から再開できることを検証する。"""
+        graph = _build_graph(SQLiteCheckpointSaver(tmp_path / "checkpoints.sqlite3"))
+        config = {"configurable": {"thread_id": "t1"}}
+
+        await graph.ainvoke({"value": 2}, config=config)
+        result = await graph.ainvoke({"value": 3}, config=config)
+
+        assert result["total"] == 5
+        state = await graph.aget_state(config)
+        assert state.values["total"] == 5
+
+    @pytest.mark.asyncio()
+    async def test_async_api_runs_off_event_loop(self, tmp_path: Path) -> None:
+        """非同期 API の DB 操作がイベントループ外で行われることを検証する。"""
+        saver = SQLiteCheckpointSaver(tmp_path / "checkpoints.sqlite3")
+        threads: set[int] = set()
+        touch = saver._touch
+
+        def recording_touch(thread_id: str) -> None:
+            threads.add(threading.get_ident())
+            touch(thread_id)
+
+        saver._touch = recording_touch
+        graph = _build_graph(saver)
+
+        await graph.ainvoke({"value": 1}, config={"configurable": {"thread_id": "t1"}})
+
+        assert threads
+        assert threading.get_ident() not in threads
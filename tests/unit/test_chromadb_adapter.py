@@ -0,0 +1,200 @@
+"""ChromaDBAdapter（ハイブリッド検索）とランキング計算のユニットテスト"""
+
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from domain.models import DocumentChunk
+from interfaces.adapters.chromadb_adapter import ChromaDBAdapter
+from interfaces.adapters.ranking import reciprocal_rank_fusion
+
+_VOCAB = ["ホイール", "振動", "試験", "軸受", "寿命", "潤滑"]
+
+
+def _embed(texts: list[str]) -> list[list[float]]:
+    """語彙の出現回数によるテスト用 Embedding（Bag-of-Words）"""
+    vectors = []
+    for t in texts:
+        vec = [float(t.count(w)) for w in _VOCAB]
+        vec.append(0.01)  # ゼロベクトル回避
+        vectors.append(vec)
+    return vectors
+
+
+def _make_adapter() -> ChromaDBAdapter:
+    adapter = ChromaDBAdapter(
+        embedding_fn=_embed,
+        collection_name=f"test-{uuid.uuid4().hex}",
+        tokenize_fn=str.split,
+    )
+    adapter.add_documents(
+        [
+            DocumentChunk(chunk_id="c1", text="ホイール 振動 試験", source="a.pdf"),
+            DocumentChunk(chunk_id="c2", text="軸受 寿命 試験", source="a.pdf"),
+            DocumentChunk(chunk_id="c3", text="潤滑 軸受", source="b.pdf"),
+        ],
+    )
+    return adapter
+
+
+class TestReciprocalRankFusion:
+    """reciprocal_rank_fusion のテスト"""
+
+    def test_two_retrievers(self) -> None:
+        """両方のランキングに現れるチャンクが上位になることを検証する。"""
+        scores = reciprocal_rank_fusion(
+            [np.array([0, 1]), np.array([1, 2])],
+            [0.5, 0.5],
+            n_items=4,
+        )
+
+        assert np.argmax(scores) == 1
+        assert scores[3] == 0.0
+
+    def test_more_than_two_retrievers(self) -> None:
+        """3つ以上のリトリーバを重み付きで統合できることを検証する。"""
+        scores = reciprocal_rank_fusion(
+            [np.array([0]), np.array([1]), np.array([2])],
+            [0.2, 0.3, 0.5],
+            n_items=3,
+        )
+
+        assert list(np.argsort(-scores)) == [2, 1, 0]
+
+    def test_matches_scalar_formula(self) -> None:
+        """RRF スコアが weight / (k + rank) の総和と一致することを検証する。"""
+        scores = reciprocal_rank_fusion(
+            [np.array([2, 0]), np.array([0])],
+            [0.7, 0.3],
+            n_items=3,
+            rrf_k=60,
+        )
+
+        assert np.isclose(scores[0], 0.7 / 62 + 0.3 / 61)
+        assert np.isclose(scores[2], 0.7 / 61)
+
+
+class TestHybridSearch:
+    """ChromaDBAdapter.hybrid_search のテスト"""
+
+    def test_returns_fused_results(self) -> None:
+        """ベクトル・BM25 の両方で上位のチャンクが先頭になることを検証する。"""
+        adapter = _make_adapter()
+
+        results = adapter.hybrid_search("軸受 寿命", k=2, bm25_weight=0.5)
+
+        assert len(results) == 2
+        assert results[0].chunk.chunk_id == "c2"
+
+    def test_empty_store(self) -> None:
+        """ドキュメント未登録時は空リストを返すことを検証する。"""
+        adapter = ChromaDBAdapter(
+            embedding_fn=_embed,
+            collection_name=f"test-{uuid.uuid4().hex}",
+            tokenize_fn=str.split,
+        )
+
+        assert adapter.hybrid_search("軸受") == []
+
+    def test_get_chunks(self) -> None:
+        """ID でチャンクを取得でき、存在しない ID は除かれることを検証する。"""
+        adapter = _make_adapter()
+
+        chunks = adapter.get_chunks(["c3", "missing", "c1"])
+
+        assert [c.chunk_id for c in chunks] == ["c3", "c1"]
+        assert chunks[0].text == "潤滑 軸受"
+
+    def test_get_embeddings(self) -> None:
+        """ID の順に Embedding を取得でき、存在しない ID は除かれることを検証する。"""
+        adapter = _make_adapter()
+
+        embeddings = adapter.get_embeddings(["c3", "missing", "c1"])
+
+        assert np.allclose(embeddings, _embed(["潤滑 軸受", "ホイール 振動 試験"]))
+
+
+class TestBatchedSearch:
+    """複数クエリ一括検索のテスト"""
+
+    def test_keyword_search_many_matches_bm25okapi(self) -> None:
+        """疎行列積による BM25 スコアが BM25Okapi と一致することを検証する。"""
+        from rank_bm25 import BM25Okapi
+
+        adapter = _make_adapter()
+        corpus = [c.text.split() for c in adapter._chunks_cache]
+        bm25 = BM25Okapi(corpus)
+        queries = ["軸受 寿命", "ホイール 試験 試験"]
+
+        batched = adapter.keyword_search_many(queries, k=3)
+
+        for query, results in zip(queries, batched):
+            expected = bm25.get_scores(query.split())
+            for r in results:
+                idx = adapter._chunk_index[r.chunk.chunk_id]
+                assert np.isclose(r.score, expected[idx])
+
+    def test_single_query_equals_batched(self) -> None:
+        """単一クエリ API と一括 API の結果が一致することを検証する。"""
+        adapter = _make_adapter()
+        queries = ["軸受 寿命", "潤滑"]
+
+        batched = adapter.hybrid_search_many(queries, k=3)
+        single = [adapter.hybrid_search(q, k=3) for q in queries]
+
+        assert batched == single
+
+    def test_queries_embedded_in_one_call(self) -> None:
+        """全クエリが1回の Embedding 呼び出しで処理されることを検証する。"""
+        calls: list[int] = []
+
+        def _counting_embed(texts: list[str]) -> list[list[float]]:
+            calls.append(len(texts))
+            return _embed(texts)
+
+        adapter = ChromaDBAdapter(
+            embedding_fn=_embed,
+            query_embedding_fn=_counting_embed,
+            collection_name=f"test-{uuid.uuid4().hex}",
+            tokenize_fn=str.split,
+        )
+        adapter.add_documents(
+            [DocumentChunk(chunk_id="c1", text="軸受 寿命", source="a.pdf")],
+        )
+
+        adapter.similarity_search_many(["軸受", "寿命", "潤滑"], k=1)
+
+        assert calls == [3]
+
+    def test_embedding_executor(self) -> None:
+        """共有プールでクエリ Embedding を計算しても結果が変わらないことを検証する。"""
+        threads: list[str] = []
+
+        def _recording_embed(texts: list[str]) -> list[list[float]]:
+            threads.append(threading.current_thread().name)
+            return _embed(texts)
+
+        inline = _make_adapter()
+        with ThreadPoolExecutor(thread_name_prefix="query-embedding") as pool:
+            adapter = ChromaDBAdapter(
+                embedding_fn=_embed,
+                query_embedding_fn=_recording_embed,
+                collection_name=f"test-{uuid.uuid4().hex}",
+                tokenize_fn=str.split,
+                embedding_executor=pool,
+            )
+            adapter.add_documents(inline._chunks_cache)
+            queries = ["軸受 寿命", "潤滑"]
+
+            results = adapter.hybrid_search_many(queries, k=3)
+
+        assert results == inline.hybrid_search_many(queries, k=3)
+        assert threads[0].startswith("query-embedding")
+
+    def test_unknown_tokens_return_empty(self) -> None:
+        """語彙に無いクエリの BM25 結果が空になることを検証する。"""
+        adapter = _make_adapter()
+
+        assert adapter.keyword_search_many(["未知語"], k=3) == [[]]
@@ -0,0 +1,62 @@
+"""トークン予算に合わせたパッセージ選択のユニットテスト"""
+
+from domain.context_packing import pack_passages
+
+
+class TestPackPassages:
+    """pack_passages のテスト"""
+
+    def test_fills_budget_by_score(self) -> None:
+        """スコアの高い順に予算まで詰めることを検証する。"""
+        pack = pack_passages([40, 40, 40], [0.2, 0.9, 0.5], max_tokens=100)
+
+        assert pack.selected == [1, 2]
+        assert pack.packed_tokens == 80
+        assert pack.dropped_tokens == 40
+        assert pack.dropped_count == 1
+
+    def test_skips_passage_over_budget(self) -> None:
+        """収まらないパッセージは飛ばし、より短いものを詰めることを検証する。"""
+        pack = pack_passages([60, 80, 30], [0.9, 0.8, 0.1], max_tokens=100)
+
+        assert pack.selected == [0, 2]
+        assert pack.packed_tokens == 90
+
+    def test_mmr_prefers_diverse_passage(self) -> None:
+        """MMR では選択済みとほぼ同じ内容のパッセージを後回しにすることを検証する。"""
+        tokens = [30, 30, 30]
+        scores = [0.9, 0.85, 0.6]
+        # 0 と 1 はほぼ同じ内容、2 は別の内容
+        embeddings = [[1.0, 0.0], [0.99, 0.1], [0.0, 1.0]]
+
+        by_score = pack_passages(tokens, scores, max_tokens=60)
+        by_mmr = pack_passages(
+            tokens,
+            scores,
+            max_tokens=60,
+            embeddings=embeddings,
+            mmr_lambda=0.5,
+        )
+
+        assert by_score.selected == [0, 1]
+        assert by_mmr.selected == [0, 2]
+
+    def test_mmr_lambda_one_ignores_embeddings(self) -> None:
+        """mmr_lambda=1.0 ではスコア順と同じになることを検証する。"""
+        pack = pack_passages(
+            [30, 30, 30],
+            [0.9, 0.85, 0.6],
+            max_tokens=60,
+            embeddings=[[1.0, 0.0], [1.0, 0.0], [0.0, 1.0]],
+            mmr_lambda=1.0,
+        )
+
+        assert pack.selected == [0, 1]
+
+    def test_empty_and_zero_budget(self) -> None:
+        """パッセージが無い・予算が 0 の場合に何も選ばないことを検証する。"""
+        assert pack_passages([], [], max_tokens=100).selected == []
+
+        pack = pack_passages([10], [0.5], max_tokens=0)
+        assert pack.selected == []
+        assert pack.dropped_tokens == 10
@@ -0,0 +1,150 @@
+"""リクエスト単位の締め切りのユニットテスト"""
+
+import asyncio
+import math
+import time
+from collections.abc import AsyncIterator
+
+import pytest
+
+from domain.config import WorkflowConfig
+from domain.deadline import (
+    DEGRADED_REASONING,
+    NO_DEADLINE,
+    answer_budget,
+    node_budget,
+    stage_budget,
+    start_deadline,
+    time_remaining,
+)
+from domain.ports.llm_port import ChatResponse
+from usecases.nodes.generate_answer_node import create_generate_answer_node
+
+
+class TestDeadline:
+    """締め切り時刻と残り時間のテスト"""
+
+    def test_no_deadline(self) -> None:
+        """0 以下の予算では締め切りなしになることを検証する。"""
+        assert start_deadline(0.0) == NO_DEADLINE
+        assert math.isinf(time_remaining(NO_DEADLINE, reserve=60.0))
+
+    def test_remaining_with_reserve(self) -> None:
+        """reserve 秒前までの残り時間が返されることを検証する。"""
+        deadline = start_deadline(100.0, now=1000.0)
+
+        assert deadline == 1100.0
+        assert time_remaining(deadline, now=1030.0) == pytest.approx(70.0)
+        assert time_remaining(deadline, reserve=60.0, now=1030.0) == pytest.approx(10.0)
+
+
+class TestNodeBudget:
+    """ノードの時間予算と縮退判定のテスト"""
+
+    def test_plenty_of_time(self) -> None:
+        """残り時間が十分なら固定のタイムアウトと推論強度のままになることを検証する。"""
+        budget = node_budget(
+            1000.0,
+            timeout=120.0,
+            reasoning="medium",
+            reserve=60.0,
+            pressure=30.0,
+            now=0.0,
+        )
+
+        assert budget.timeout == 120.0
+        assert budget.reasoning == "medium"
+        assert not budget.pressed
+        assert not budget.expired
+
+    def test_pressed(self) -> None:
+        """残りが少なければタイムアウトを頭打ちにして縮退することを検証する。"""
+        budget = node_budget(
+            100.0,
+            timeout=120.0,
+            reasoning="medium",
+            reserve=60.0,
+            pressure=30.0,
+            now=20.0,
+        )
+
+        assert budget.timeout == pytest.approx(20.0)
+        assert budget.reasoning == DEGRADED_REASONING
+        assert budget.pressed
+        assert not budget.expired
+
+    def test_expired(self) -> None:
+        """reserve に食い込んだら中間ノードの時間が無いと判定されることを検証する。"""
+        config = WorkflowConfig(deadline_answer_reserve=60.0)
+        budget = stage_budget(
+            100.0,
+            config,
+            timeout=120.0,
+            reasoning="low",
+            now=50.0,
+        )
+
+        assert budget.timeout == 0.0
+        assert budget.expired
+
+    def test_answer_budget(self) -> None:
+        """回答生成は reserve に食い込むまで縮退しないことを検証する。"""
+        config = WorkflowConfig(deadline_answer_reserve=60.0)
+
+        assert not answer_budget(100.0, config, now=30.0).pressed
+        assert answer_budget(100.0, config, now=50.0).pressed
+        assert not answer_budget(NO_DEADLINE, config).pressed
+
+
+class _SlowStreamLLM:
+    """1トークンごとに待つストリーミングのモック"""
+
+    def __init__(self) -> None:
+        self.reasoning: str | None = None
+        self.messages: list[dict] = []
+
+    async def agenerate(self, messages: list[dict], **kwargs) -> ChatResponse:
+        return ChatResponse(content="mock", thinking="")
+
+    async def agenerate_structured(
+        self,
+        messages: list[dict],
+        response_model: type,
+        **kwargs,
+    ) -> object:
+        return None
+
+    async def astream(
+        self,
+        messages: list[dict],
+        *,
+        reasoning: str | None = None,
+        temperature: float | None = None,
+    ) -> AsyncIterator[str]:
+        self.reasoning = reasoning
+        self.messages = messages
+        yield "途中"
+        await asyncio.sleep(999)
+        yield "までの回答"
+
+
+class TestDeadlineAnswer:
+    """締め切りに近い回答生成のテスト"""
+
+    @pytest.mark.asyncio()
+    async def test_answer_cut_at_deadline(self) -> None:
+        """締め切りで回答生成が打ち切られ、縮退して実行されることを検証する。"""
+        config = WorkflowConfig(deadline_context_tokens=100)
+        llm = _SlowStreamLLM()
+        node = create_generate_answer_node(llm, config)
+
+        state = {
+            "question": "テスト質問",
+            "search_results": ["あ" * 1000],
+            "deadline": time.time() + 0.1,
+        }
+        result = await node(state)
+
+        assert result["answer"] == "途中"
+        assert llm.reasoning == DEGRADED_REASONING
+        assert "あ" * 1000 not in llm.messages[-1]["content"]
@@ -0,0 +1,67 @@
+"""DIContainer のユニットテスト"""
+
+import threading
+
+import pytest
+
+from domain.config import WorkflowConfig
+from infrastructure.di_container import DIContainer
+from interfaces.adapters.ollama_adapter import OllamaAdapter
+from interfaces.adapters.reranker_adapter import RerankerAdapter
+
+
+class _FakeCrossEncoder:
+    """すべてのペアに同じスコアを返す CrossEncoder のスタブ"""
+
+    def predict(self, pairs: list[list[str]]) -> list[float]:
+        return [0.0] * len(pairs)
+
+
+class TestCreateUI:
+    """UI 生成とモデルのロードのテスト"""
+
+    def test_returns_before_models_load(
+        self,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        """モデルのロードを待たずに UI を生成し、ウォームアップで読むことを検証する。"""
+        entered = threading.Event()
+        release = threading.Event()
+        loaded_on: list[str] = []
+
+        def slow_load(self: DIContainer) -> tuple:
+            loaded_on.append(threading.current_thread().name)
+            entered.set()
+            release.wait(timeout=10)
+
+            def embed(texts: list[str]) -> list[list[float]]:
+                return [[1.0, 0.0] for _ in texts]
+
+            return embed, embed
+
+        def load_reranker(self: RerankerAdapter) -> _FakeCrossEncoder:
+            loaded_on.append(threading.current_thread().name)
+            return _FakeCrossEncoder()
+
+        monkeypatch.setattr(DIContainer, "_load_embedding_fns", slow_load)
+        monkeypatch.setattr(RerankerAdapter, "_get_model", load_reranker)
+        monkeypatch.setattr(OllamaAdapter, "load_model", lambda self: None)
+        container = DIContainer(WorkflowConfig(warmup_enabled=True))
+
+        try:
+            container.create_ui()
+
+            # UI 生成後もロードはウォームアップのスレッドで続いている
+            assert entered.wait(timeout=10)
+            warmup = container.create_warmup()
+            assert not warmup.ready
+            assert "Embedding" in warmup.status_message()
+
+            release.set()
+            assert warmup.wait(timeout=10)
+            assert "Embedding" not in warmup.failed
+            assert "Reranker" not in warmup.failed
+            assert loaded_on == ["warmup", "warmup"]
+        finally:
+            release.set()
+            container.close()
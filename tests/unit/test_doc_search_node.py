@@ -1,16 +1,36 @@
 """ドキュメント検索ノードのユニットテスト"""
 
+import logging
+
+import pytest
+
 from domain.config import WorkflowConfig
 from domain.models import DocumentChunk, SearchResult
-from usecases.nodes.doc_search_node import create_doc_search_node
+from domain.telemetry import RequestTelemetry, current_telemetry
+from usecases.nodes.doc_search_node import (
+    collect_blocks,
+    create_doc_search_node,
+    create_result_resolver,
+    create_subtask_search,
+)
 
 
 class _MockVectorStore:
-    """VectorStorePort のモック"""
+    """VectorStorePort のモック（返したチャンクを ID で引けるよう記録する）"""
+
+    def __init__(self) -> None:
+        self.chunks: dict[str, DocumentChunk] = {}
+        self.embeddings: dict[str, list[float]] = {}
 
     def add_documents(self, chunks: list[DocumentChunk]) -> None:
         pass
 
+    def get_chunks(self, chunk_ids: list[str]) -> list[DocumentChunk]:
+        return [self.chunks[cid] for cid in chunk_ids if cid in self.chunks]
+
+    def get_embeddings(self, chunk_ids: list[str]) -> list[list[float]]:
+        return [self.embeddings[cid] for cid in chunk_ids if cid in self.embeddings]
+
     def similarity_search(
         self,
         query: str,
@@ -45,6 +65,60 @@ class _MockVectorStore:
             ),
         ]
 
+    def hybrid_search(
+        self,
+        query: str,
+        k: int = 10,
+        bm25_weight: float = 0.3,
+    ) -> list[SearchResult]:
+        results = self.similarity_search(query, k) + self.keyword_search(query, k)
+        self.chunks.update({r.chunk.chunk_id: r.chunk for r in results})
+        return results[:k]
+
+    def similarity_search_many(
+        self,
+        queries: list[str],
+        k: int = 10,
+    ) -> list[list[SearchResult]]:
+        return [self.similarity_search(q, k) for q in queries]
+
+    def keyword_search_many(
+        self,
+        queries: list[str],
+        k: int = 10,
+    ) -> list[list[SearchResult]]:
+        return [self.keyword_search(q, k) for q in queries]
+
+    def hybrid_search_many(
+        self,
+        queries: list[str],
+        k: int = 10,
+        bm25_weight: float = 0.3,
+    ) -> list[list[SearchResult]]:
+        return [self.hybrid_search(q, k, bm25_weight) for q in queries]
+
+    async def asimilarity_search(
+        self,
+        query: str,
+        k: int = 10,
+    ) -> list[SearchResult]:
+        return self.similarity_search(query, k)
+
+    async def akeyword_search(
+        self,
+        query: str,
+        k: int = 10,
+    ) -> list[SearchResult]:
+        return self.keyword_search(query, k)
+
+    async def ahybrid_search_many(
+        self,
+        queries: list[str],
+        k: int = 10,
+        bm25_weight: float = 0.3,
+    ) -> list[list[SearchResult]]:
+        return self.hybrid_search_many(queries, k, bm25_weight)
+
 
 class _MockReranker:
     """RerankerPort のモック"""
@@ -57,11 +131,20 @@ class _MockReranker:
     ) -> list[SearchResult]:
         return results[:top_k]
 
+    async def arerank(
+        self,
+        query: str,
+        results: list[SearchResult],
+        top_k: int = 5,
+    ) -> list[SearchResult]:
+        return self.rerank(query, results, top_k)
+
 
 class TestDocSearchNode:
     """doc_search ノードのテスト"""
 
-    def test_normal_search(self, test_config: WorkflowConfig) -> None:
+    @pytest.mark.asyncio()
+    async def test_normal_search(self, test_config: WorkflowConfig) -> None:
         """サブタスクに基づいて検索結果が返されることを検証する。"""
         node = create_doc_search_node(
             _MockVectorStore(),
@@ -75,13 +158,14 @@ class TestDocSearchNode:
             ],
             "search_results": [],
         }
-        result = node(state)
+        result = await node(state)
 
         assert len(result["search_results"]) > 0
         assert "【目的: 基本調査】" in result["search_results"][0]
         assert result["subtasks"] == []
 
-    def test_multiple_subtasks(self, test_config: WorkflowConfig) -> None:
+    @pytest.mark.asyncio()
+    async def test_multiple_subtasks(self, test_config: WorkflowConfig) -> None:
         """複数サブタスクの検索結果が蓄積されることを検証する。"""
         node = create_doc_search_node(
             _MockVectorStore(),
@@ -96,11 +180,14 @@ class TestDocSearchNode:
             ],
             "search_results": [],
         }
-        result = node(state)
+        result = await node(state)
 
         assert len(result["search_results"]) == 2
 
-    def test_existing_results_preserved(self, test_config: WorkflowConfig) -> None:
+    @pytest.mark.asyncio()
+    async def test_existing_results_preserved(
+        self, test_config: WorkflowConfig
+    ) -> None:
         """既存の検索結果が保持されることを検証する。"""
         node = create_doc_search_node(
             _MockVectorStore(),
@@ -114,12 +201,13 @@ class TestDocSearchNode:
             ],
             "search_results": ["既存の結果"],
         }
-        result = node(state)
+        result = await node(state)
 
         assert result["search_results"][0] == "既存の結果"
         assert len(result["search_results"]) == 2
 
-    def test_empty_subtasks(self, test_config: WorkflowConfig) -> None:
+    @pytest.mark.asyncio()
+    async def test_empty_subtasks(self, test_config: WorkflowConfig) -> None:
         """サブタスクが空の場合、既存結果のみが返されることを検証する。"""
         node = create_doc_search_node(
             _MockVectorStore(),
@@ -131,6 +219,438 @@ class TestDocSearchNode:
             "subtasks": [],
             "search_results": ["既存の結果"],
         }
-        result = node(state)
+        result = await node(state)
 
         assert result["search_results"] == ["既存の結果"]
+
+
+class TestPrefetchedResults:
+    """先行検索の結果の引き継ぎのテスト"""
+
+    @pytest.mark.asyncio()
+    async def test_prefetched_results_used(self, test_config: WorkflowConfig) -> None:
+        """検索済みの結果があれば再検索せずに使うことを検証する。"""
+        node = create_doc_search_node(
+            _MockVectorStore(),
+            _MockReranker(),
+            test_config,
+        )
+        state = {
+            "question": "テスト質問",
+            "subtasks": [{"purpose": "基本調査", "queries": ["テストクエリ"]}],
+            "search_results": [],
+            "prefetched_results": ["【目的: 基本調査】\n検索済み"],
+        }
+        result = await node(state)
+
+        assert result["search_results"] == ["【目的: 基本調査】\n検索済み"]
+        assert result["prefetched_results"] == []
+        assert result["subtasks"] == []
+
+    @pytest.mark.asyncio()
+    async def test_subtask_search_matches_node(
+        self,
+        test_config: WorkflowConfig,
+    ) -> None:
+        """1サブタスク分の検索結果が doc_search ノードと同じになることを検証する。"""
+        subtask = {"purpose": "基本調査", "queries": ["テストクエリ"]}
+        search = create_subtask_search(
+            _MockVectorStore(),
+            _MockReranker(),
+            test_config,
+        )
+        node = create_doc_search_node(
+            _MockVectorStore(),
+            _MockReranker(),
+            test_config,
+        )
+
+        blocks = collect_blocks(
+            [(subtask["purpose"], await search(subtask))],
+            test_config,
+            [],
+        )
+        result = await node({"subtasks": [subtask], "search_results": []})
+
+        assert blocks == result["search_results"]
+
+
+class TestChunkReferences:
+    """状態にチャンク参照を載せる（search_result_refs）のテスト"""
+
+    @pytest.mark.asyncio()
+    async def test_refs_in_state(self, test_config: WorkflowConfig) -> None:
+        """検索結果ブロックにチャンク本文ではなく ID・スコアが入ることを検証する。"""
+        test_config.search_result_refs = True
+        node = create_doc_search_node(
+            _MockVectorStore(),
+            _MockReranker(),
+            test_config,
+        )
+        state = {
+            "subtasks": [{"purpose": "基本調査", "queries": ["テストクエリ"]}],
+            "search_results": ["既存の結果"],
+        }
+
+        result = await node(state)
+
+        assert result["search_results"] == [
+            "既存の結果",
+            {
+                "purpose": "基本調査",
+                "chunks": [
+                    {"chunk_id": "vec-1", "score": 0.9},
+                    {"chunk_id": "bm25-1", "score": 0.8},
+                ],
+            },
+        ]
+
+    @pytest.mark.asyncio()
+    async def test_resolved_blocks_match_text_mode(
+        self,
+        test_config: WorkflowConfig,
+    ) -> None:
+        """参照を解決したブロックが、本文を載せた場合と一致することを検証する。"""
+        state = {
+            "subtasks": [
+                {"purpose": "調査1", "queries": ["クエリA"]},
+                {"purpose": "調査2", "queries": ["クエリA"]},
+            ],
+            "search_results": [],
+        }
+        text_node = create_doc_search_node(
+            _MockVectorStore(),
+            _MockReranker(),
+            test_config,
+        )
+        expected = (await text_node(state))["search_results"]
+
+        vectorstore = _MockVectorStore()
+        ref_config = test_config.model_copy(update={"search_result_refs": True})
+        ref_node = create_doc_search_node(vectorstore, _MockReranker(), ref_config)
+        refs = (await ref_node(state))["search_results"]
+        resolve = create_result_resolver(vectorstore, ref_config)
+
+        assert resolve(refs) == expected
+
+    def test_resolver_keeps_block_count(self, test_config: WorkflowConfig) -> None:
+        """テキストはそのまま、参照先の無いブロックは見出しのみで返すことを検証する。"""
+        resolve = create_result_resolver(_MockVectorStore(), test_config)
+        blocks = [
+            "既存の結果",
+            {"purpose": "削除済み", "chunks": [{"chunk_id": "gone", "score": 0.5}]},
+        ]
+
+        assert resolve(blocks) == ["既存の結果", "【目的: 削除済み】"]
+
+
+class _PassageVectorStore(_MockVectorStore):
+    """同じ資料の連続する2チャンクを、順位を逆にして返すモック"""
+
+    def hybrid_search(
+        self,
+        query: str,
+        k: int = 10,
+        bm25_weight: float = 0.3,
+    ) -> list[SearchResult]:
+        results = [
+            SearchResult(
+                chunk=DocumentChunk(
+                    chunk_id=f"p-{i}",
+                    text=text,
+                    source="test.pdf",
+                    metadata={"chunk_index": i},
+                ),
+                score=score,
+            )
+            for i, text, score in [(1, "後半の段落。", 0.9), (0, "前半の段落。", 0.8)]
+        ]
+        self.chunks.update({r.chunk.chunk_id: r.chunk for r in results})
+        return results[:k]
+
+
+class TestSearchDedup:
+    """取得済みチャンクの除外・隣接チャンクの結合のテスト"""
+
+    @pytest.mark.asyncio()
+    async def test_dedup_across_queries_and_loops(
+        self,
+        test_config: WorkflowConfig,
+    ) -> None:
+        """他のサブタスク・前のループで取得したチャンクを除くことを検証する。"""
+        test_config.search_dedup = True
+        node = create_doc_search_node(
+            _MockVectorStore(),
+            _MockReranker(),
+            test_config,
+        )
+        state = {
+            "subtasks": [
+                {"purpose": "調査1", "queries": ["クエリA"]},
+                {"purpose": "調査2", "queries": ["クエリB"]},
+            ],
+            "search_results": [],
+        }
+        telemetry = RequestTelemetry()
+        token = current_telemetry.set(telemetry)
+        try:
+            first = await node(state)
+        finally:
+            current_telemetry.reset(token)
+
+        # 2つ目のサブタスクは同じチャンクしか返さないため、ブロックを作らない
+        assert first["search_results"] == [
+            "【目的: 調査1】\nベクトル検索結果: クエリA\n---\nBM25 検索結果: クエリA",
+        ]
+        assert first["retrieved_chunk_ids"] == ["vec-1", "bm25-1"]
+        (decision,) = telemetry.decisions
+        assert decision["name"] == "search_result_dedup"
+        assert decision["duplicate_chunks"] == 2
+
+        second = await node(
+            {
+                "subtasks": [{"purpose": "再調査", "queries": ["クエリC"]}],
+                "search_results": first["search_results"],
+                "retrieved_chunk_ids": ["vec-1"],
+            },
+        )
+
+        assert second["search_results"][1:] == [
+            "【目的: 再調査】\nBM25 検索結果: クエリC"
+        ]
+        assert second["retrieved_chunk_ids"] == ["vec-1", "bm25-1"]
+
+    @pytest.mark.asyncio()
+    async def test_disabled_keeps_duplicates(
+        self,
+        test_config: WorkflowConfig,
+    ) -> None:
+        """無効時は同じチャンクもそのまま載せ、取得済み ID を返さないことを検証する。"""
+        node = create_doc_search_node(
+            _MockVectorStore(),
+            _MockReranker(),
+            test_config,
+        )
+        state = {
+            "subtasks": [
+                {"purpose": "調査1", "queries": ["クエリA"]},
+                {"purpose": "調査2", "queries": ["クエリA"]},
+            ],
+            "search_results": [],
+        }
+
+        result = await node(state)
+
+        assert len(result["search_results"]) == 2
+        assert "retrieved_chunk_ids" not in result
+
+    @pytest.mark.asyncio()
+    @pytest.mark.parametrize("refs", [False, True])
+    async def test_merge_adjacent_chunks(
+        self,
+        test_config: WorkflowConfig,
+        refs: bool,
+    ) -> None:
+        """同じ資料の連続するチャンクが、資料内の順で1つのパッセージになることを検証する。"""
+        test_config.search_merge_adjacent = True
+        test_config.search_result_refs = refs
+        vectorstore = _PassageVectorStore()
+        node = create_doc_search_node(vectorstore, _MockReranker(), test_config)
+        state = {
+            "subtasks": [{"purpose": "調査", "queries": ["クエリA"]}],
+            "search_results": [],
+        }
+
+        blocks = (await node(state))["search_results"]
+
+        if refs:
+            assert blocks == [
+                {
+                    "purpose": "調査",
+                    "chunks": [{"chunk_ids": ["p-0", "p-1"], "score": 0.9}],
+                },
+            ]
+        resolve = create_result_resolver(vectorstore, test_config)
+        assert resolve(blocks) == ["【目的: 調査】\n前半の段落。\n後半の段落。"]
+
+
+_PACKING_TEXTS = {"a": "甲" * 30, "b": "乙" * 30, "c": "丙" * 30}
+
+
+def _packing_store() -> _MockVectorStore:
+    """本文 30 文字のチャンク a・b・c を持つモック（a と b はほぼ同じ内容）"""
+    vectorstore = _MockVectorStore()
+    for cid, embedding in [("a", [1.0, 0.0]), ("b", [0.99, 0.1]), ("c", [0.0, 1.0])]:
+        vectorstore.chunks[cid] = DocumentChunk(
+            chunk_id=cid,
+            text=_PACKING_TEXTS[cid],
+            source="test.pdf",
+        )
+        vectorstore.embeddings[cid] = embedding
+    return vectorstore
+
+
+_PACKING_BLOCKS = [
+    {
+        "purpose": "調査1",
+        "chunks": [{"chunk_id": "a", "score": 0.9}, {"chunk_id": "b", "score": 0.85}],
+    },
+    {"purpose": "調査2", "chunks": [{"chunk_id": "c", "score": 0.6}]},
+]
+
+
+class TestContextPacking:
+    """検索結果パッセージのトークン予算への詰め込みのテスト"""
+
+    def test_packs_by_score_within_budget(self, test_config: WorkflowConfig) -> None:
+        """予算に収まる分だけスコア順に残し、外れた量を記録することを検証する。"""
+        test_config.context_pack_tokens = 70
+        resolve = create_result_resolver(_packing_store(), test_config)
+        telemetry = RequestTelemetry()
+        token = current_telemetry.set(telemetry)
+        try:
+            resolved = resolve(_PACKING_BLOCKS)
+        finally:
+            current_telemetry.reset(token)
+
+        # ブロック数は変えず、全パッセージが外れたブロックは見出しのみ
+        assert resolved == [
+            "【目的: 調査1】\n" + _PACKING_TEXTS["a"] + "\n---\n" + _PACKING_TEXTS["b"],
+            "【目的: 調査2】",
+        ]
+        (decision,) = telemetry.decisions
+        assert decision["name"] == "context_packing"
+        assert decision["packed_tokens"] == 62
+        assert decision["dropped_tokens"] == 31
+        assert decision["dropped_passages"] == 1
+        assert decision["mmr"] is False
+
+    def test_mmr_keeps_diverse_passage(self, test_config: WorkflowConfig) -> None:
+        """MMR では内容の似たパッセージより別の内容のものを残すことを検証する。"""
+        test_config.context_pack_tokens = 70
+        test_config.context_mmr_lambda = 0.5
+        resolve = create_result_resolver(_packing_store(), test_config)
+
+        assert resolve(_PACKING_BLOCKS) == [
+            "【目的: 調査1】\n" + _PACKING_TEXTS["a"],
+            "【目的: 調査2】\n" + _PACKING_TEXTS["c"],
+        ]
+
+    def test_text_blocks_use_budget_first(self, test_config: WorkflowConfig) -> None:
+        """テキストのブロックはそのまま残し、その分だけ予算を減らすことを検証する。"""
+        test_config.context_pack_tokens = 70
+        resolve = create_result_resolver(_packing_store(), test_config)
+
+        resolved = resolve(["テ" * 30, *_PACKING_BLOCKS])
+
+        assert resolved[0] == "テ" * 30
+        assert resolved[1:] == [
+            "【目的: 調査1】\n" + _PACKING_TEXTS["a"],
+            "【目的: 調査2】",
+        ]
+
+    def test_disabled_keeps_all(self, test_config: WorkflowConfig) -> None:
+        """無効時はすべてのパッセージを残すことを検証する。"""
+        resolve = create_result_resolver(_packing_store(), test_config)
+
+        resolved = resolve(_PACKING_BLOCKS)
+
+        assert resolved[1] == "【目的: 調査2】\n" + _PACKING_TEXTS["c"]
+
+    @pytest.mark.parametrize(("refs", "warned"), [(False, True), (True, False)])
+    def test_warns_without_refs(
+        self,
+        caplog: pytest.LogCaptureFixture,
+        refs: bool,
+        warned: bool,
+    ) -> None:
+        """参照モードでない詰め込みの設定を警告することを検証する。"""
+        with caplog.at_level(logging.WARNING):
+            WorkflowConfig(context_pack_tokens=1000, search_result_refs=refs)
+
+        assert ("context_pack_tokens" in caplog.text) is warned
+
+
+class TestRetrievalFastPath:
+    """Reranker スコアの確信度による要約・判定の省略のテスト"""
+
+    @pytest.mark.asyncio()
+    @pytest.mark.parametrize(("threshold", "expected"), [(0.85, True), (0.95, False)])
+    async def test_fast_path_by_threshold(
+        self,
+        test_config: WorkflowConfig,
+        threshold: float,
+        expected: bool,
+    ) -> None:
+        """最上位スコアが閾値を超えた場合のみファストパスになることを検証する。"""
+        test_config.retrieval_fast_path = True
+        test_config.fast_path_score_threshold = threshold
+        node = create_doc_search_node(
+            _MockVectorStore(),
+            _MockReranker(),
+            test_config,
+        )
+        state = {
+            "question": "テスト質問",
+            "subtasks": [{"purpose": "基本調査", "queries": ["テストクエリ"]}],
+            "search_results": [],
+        }
+        telemetry = RequestTelemetry()
+        token = current_telemetry.set(telemetry)
+        try:
+            result = await node(state)
+        finally:
+            current_telemetry.reset(token)
+
+        assert result["fast_path"] is expected
+        (decision,) = telemetry.decisions
+        assert decision["name"] == "retrieval_fast_path"
+        assert decision["raw_top_scores"] == [0.9]
+        assert decision["fast_path"] is expected
+
+    @pytest.mark.asyncio()
+    @pytest.mark.parametrize(("scores", "expected"), [([0.9], True), ([0.5], False)])
+    async def test_prefetched_results_assessed(
+        self,
+        test_config: WorkflowConfig,
+        scores: list[float],
+        expected: bool,
+    ) -> None:
+        """先行検索の結果も最上位スコアでファストパスを判定することを検証する。"""
+        test_config.retrieval_fast_path = True
+        test_config.fast_path_score_threshold = 0.85
+        node = create_doc_search_node(
+            _MockVectorStore(),
+            _MockReranker(),
+            test_config,
+        )
+        state = {
+            "question": "テスト質問",
+            "subtasks": [{"purpose": "基本調査", "queries": ["テストクエリ"]}],
+            "search_results": [],
+            "prefetched_results": ["【目的: 基本調査】\n検索済み"],
+            "prefetched_top_scores": scores,
+        }
+        result = await node(state)
+
+        assert result["search_results"] == ["【目的: 基本調査】\n検索済み"]
+        assert result["prefetched_top_scores"] == []
+        assert result["fast_path"] is expected
+
+    @pytest.mark.asyncio()
+    async def test_disabled(self, test_config: WorkflowConfig) -> None:
+        """無効時は確信度を評価せず、ファストパスにならないことを検証する。"""
+        test_config.fast_path_score_threshold = 0.0
+        node = create_doc_search_node(
+            _MockVectorStore(),
+            _MockReranker(),
+            test_config,
+        )
+        state = {
+            "question": "テスト質問",
+            "subtasks": [{"purpose": "基本調査", "queries": ["テストクエリ"]}],
+            "search_results": [],
+        }
+        result = await node(state)
+
+        assert result["fast_path"] is False
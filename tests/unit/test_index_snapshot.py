@@ -0,0 +1,146 @@
+"""検索インデックスのスナップショットのユニットテスト"""
+
+import json
+import uuid
+from pathlib import Path
+
+import pytest
+
+from domain.models import DocumentChunk
+from interfaces.adapters.chromadb_adapter import ChromaDBAdapter
+from interfaces.adapters.index_snapshot import read_manifest
+
+_VOCAB = ["ホイール", "振動", "試験", "軸受", "寿命", "潤滑"]
+
+
+def _embed(texts: list[str]) -> list[list[float]]:
+    """語彙の出現回数によるテスト用 Embedding（Bag-of-Words）"""
+    return [[float(t.count(w)) for w in _VOCAB] + [0.01] for t in texts]
+
+
+def _make_adapter(embedding_model: str = "") -> ChromaDBAdapter:
+    return ChromaDBAdapter(
+        embedding_fn=_embed,
+        collection_name=f"test-{uuid.uuid4().hex}",
+        tokenize_fn=str.split,
+        embedding_model=embedding_model,
+    )
+
+
+def _make_populated_adapter(embedding_model: str = "") -> ChromaDBAdapter:
+    adapter = _make_adapter(embedding_model)
+    adapter.add_documents(
+        [
+            DocumentChunk(
+                chunk_id="c1",
+                text="ホイール 振動 試験",
+                source="a.pdf",
+                page=3,
+            ),
+            DocumentChunk(chunk_id="c2", text="軸受 寿命 試験", source="a.pdf"),
+            DocumentChunk(
+                chunk_id="c3",
+                text="潤滑 軸受",
+                source="b.pdf",
+                metadata={"section": "2.1"},
+            ),
+        ],
+    )
+    return adapter
+
+
+class TestIndexSnapshot:
+    """export_snapshot / import_snapshot のテスト"""
+
+    def test_roundtrip_preserves_search_results(self, tmp_path: Path) -> None:
+        """復元したストアが元のストアと同じ検索結果を返すことを検証する。"""
+        source = _make_populated_adapter()
+        source.export_snapshot(tmp_path / "snapshot")
+
+        restored = _make_adapter()
+        restored.import_snapshot(tmp_path / "snapshot")
+
+        queries = ["軸受 寿命", "ホイール 振動"]
+        assert restored.hybrid_search_many(queries, k=3) == (
+            source.hybrid_search_many(queries, k=3)
+        )
+        assert restored.keyword_search_many(queries, k=3) == (
+            source.keyword_search_many(queries, k=3)
+        )
+
+    def test_roundtrip_preserves_chunks_and_version(self, tmp_path: Path) -> None:
+        """チャンクのメタデータとコーパスバージョンが保持されることを検証する。"""
+        source = _make_populated_adapter()
+        manifest = source.export_snapshot(tmp_path / "snapshot")
+
+        restored = _make_adapter()
+        restored.import_snapshot(tmp_path / "snapshot")
+
+        assert manifest.num_chunks == 3
+        assert restored.corpus_version == source.corpus_version
+        assert restored.corpus_fingerprint == source.corpus_fingerprint
+        assert restored._chunks_cache == source._chunks_cache
+
+    def test_fingerprint_depends_on_content_only(self) -> None:
+        """内容ハッシュが登録の分け方によらず、本文の変更で変わることを検証する。"""
+        source = _make_populated_adapter()
+
+        batched = _make_adapter()
+        for chunk in source._chunks_cache:
+            batched.add_documents([chunk])
+        changed = _make_adapter()
+        changed.add_documents(
+            [c.model_copy(update={"text": "改訂"}) for c in source._chunks_cache],
+        )
+
+        assert batched.corpus_fingerprint == source.corpus_fingerprint
+        assert batched.corpus_version != source.corpus_version
+        assert changed.corpus_fingerprint != source.corpus_fingerprint
+
+    def test_legacy_manifest_fingerprint(self, tmp_path: Path) -> None:
+        """内容ハッシュを持たないマニフェストでは本文から求めることを検証する。"""
+        source = _make_populated_adapter()
+        source.export_snapshot(tmp_path / "snapshot")
+        manifest_path = tmp_path / "snapshot" / "manifest.json"
+        manifest = json.loads(manifest_path.read_text())
+        del manifest["corpus_fingerprint"]
+        manifest_path.write_text(json.dumps(manifest))
+
+        restored = _make_adapter()
+        restored.import_snapshot(tmp_path / "snapshot")
+
+        assert restored.corpus_fingerprint == source.corpus_fingerprint
+
+    def test_embedding_model_mismatch_rejected(self, tmp_path: Path) -> None:
+        """別の Embedding モデルで作られたスナップショットを拒否することを検証する。"""
+        source = _make_populated_adapter("model-a")
+        manifest = source.export_snapshot(tmp_path / "snapshot")
+
+        assert manifest.embedding_model == "model-a"
+        assert manifest.embedding_dim == len(_VOCAB) + 1
+        with pytest.raises(ValueError):
+            _make_adapter("model-b").import_snapshot(tmp_path / "snapshot")
+
+        restored = _make_adapter("model-a")
+        restored.import_snapshot(tmp_path / "snapshot")
+        assert restored.corpus_fingerprint == source.corpus_fingerprint
+
+    def test_import_into_non_empty_store_fails(self, tmp_path: Path) -> None:
+        """登録済みのストアへの復元がエラーになることを検証する。"""
+        source = _make_populated_adapter()
+        source.export_snapshot(tmp_path / "snapshot")
+
+        with pytest.raises(ValueError):
+            source.import_snapshot(tmp_path / "snapshot")
+
+    def test_unsupported_format_version(self, tmp_path: Path) -> None:
+        """未対応のフォーマットバージョンがエラーになることを検証する。"""
+        source = _make_populated_adapter()
+        source.export_snapshot(tmp_path / "snapshot")
+        manifest_path = tmp_path / "snapshot" / "manifest.json"
+        manifest = json.loads(manifest_path.read_text())
+        manifest["format_version"] = 999
+        manifest_path.write_text(json.dumps(manifest))
+
+        with pytest.raises(ValueError):
+            read_manifest(tmp_path / "snapshot")
@@ -0,0 +1,49 @@
+"""JsonArrayItemStream のユニットテスト"""
+
+import json
+
+from interfaces.adapters.json_stream import JsonArrayItemStream
+
+_PLAN = {
+    "subtasks": [
+        {"purpose": "寿命の調査 {括弧}", "queries": ["軸受 寿命", '引用 "符"']},
+        {"purpose": "試験条件", "queries": ["振動試験 [条件]"]},
+    ],
+}
+
+
+class TestJsonArrayItemStream:
+    """配列要素の逐次取り出しのテスト"""
+
+    def test_items_emitted_when_complete(self) -> None:
+        """1文字ずつ与えたとき、各要素の閉じ括弧の時点で取り出されることを検証する。"""
+        text = json.dumps(_PLAN, ensure_ascii=False)
+        parser = JsonArrayItemStream("subtasks")
+        emitted_at: list[int] = []
+        items = []
+
+        for i, c in enumerate(text):
+            new = parser.feed(c)
+            items.extend(new)
+            emitted_at.extend([i] * len(new))
+
+        assert items == _PLAN["subtasks"]
+        first = json.dumps(_PLAN["subtasks"][0], ensure_ascii=False)
+        assert emitted_at[0] == text.index(first) + len(first) - 1
+        assert emitted_at[1] < len(text) - 2
+
+    def test_other_fields_ignored(self) -> None:
+        """対象外のキーの配列やネストしたオブジェクトを取り出さないことを検証する。"""
+        text = '{"notes": [{"a": 1}], "subtasks": [{"purpose": "p", "queries": []}]}'
+        parser = JsonArrayItemStream("subtasks")
+
+        items = parser.feed(text[:30]) + parser.feed(text[30:])
+
+        assert items == [{"purpose": "p", "queries": []}]
+        assert parser.text == text
+
+    def test_incomplete_item_not_emitted(self) -> None:
+        """閉じていない要素は返さないことを検証する。"""
+        parser = JsonArrayItemStream("subtasks")
+
+        assert parser.feed('{"subtasks": [{"purpose": "途中') == []
@@ -1,5 +1,6 @@
 """十分性判定ノードのユニットテスト"""
 
+import time
 from typing import AsyncIterator
 
 import pytest
@@ -42,6 +43,7 @@ class _MockLLM:
         messages: list[dict],
         *,
         reasoning: str | None = None,
+        temperature: float | None = None,
     ) -> AsyncIterator[str]:
         yield "mock"
 
@@ -157,3 +159,31 @@ class TestJudgeNode:
         result = await node(state)
 
         assert result["subtasks"] == []
+
+    @pytest.mark.asyncio()
+    async def test_deadline_pressure_skips_judge(
+        self,
+        test_config: WorkflowConfig,
+    ) -> None:
+        """締め切りが近い場合、LLM を呼ばずに十分と判定することを検証する。"""
+        test_config.max_loop_count = 3
+        judge_result = JudgeResult(
+            sufficient=False,
+            reason="情報不足",
+            additional_subtasks=[Subtask(purpose="追加", queries=["クエリ"])],
+        )
+        node = create_judge_node(
+            _MockLLM(structured_response=judge_result), test_config
+        )
+
+        state = {
+            "question": "テスト質問",
+            "summary": "要約テキスト",
+            "loop_count": 0,
+            # 回答生成用の予備時間（既定 60 秒）に食い込んでいる
+            "deadline": time.time() + 10.0,
+        }
+        result = await node(state)
+
+        assert result["subtasks"] == []
+        assert result["loop_count"] == 1
@@ -0,0 +1,268 @@
+"""LLM 応答キャッシュのユニットテスト"""
+
+import sqlite3
+from collections.abc import AsyncIterator
+from pathlib import Path
+
+import pytest
+
+from domain.models import DocumentChunk, JudgeResult
+from domain.ports.llm_port import ChatResponse
+from interfaces.adapters.index_snapshot import corpus_fingerprint
+from interfaces.adapters.llm_cache import CachedLLMAdapter, LLMResponseCache
+
+_MESSAGES = [
+    {"role": "system", "content": "あなたは審査員です。"},
+    {"role": "user", "content": "## ユーザの質問\n軸受の寿命は？"},
+]
+
+
+class _CountingLLM:
+    """呼び出し回数を数える LLM モック"""
+
+    def __init__(self) -> None:
+        self.calls = 0
+
+    async def agenerate(
+        self,
+        messages: list[dict],
+        *,
+        num_predict: int | None = None,
+        reasoning: str | None = None,
+    ) -> ChatResponse:
+        self.calls += 1
+        return ChatResponse(content=f"応答{self.calls}", thinking="")
+
+    async def agenerate_structured(
+        self,
+        messages: list[dict],
+        response_model: type,
+        *,
+        num_predict: int | None = None,
+        reasoning: str | None = None,
+    ) -> object:
+        self.calls += 1
+        return JudgeResult(sufficient=True, reason=f"理由{self.calls}")
+
+    async def astream(
+        self,
+        messages: list[dict],
+        *,
+        reasoning: str | None = None,
+        temperature: float | None = None,
+    ) -> AsyncIterator[str]:
+        self.calls += 1
+        yield "回答"
+
+
+class _Clock:
+    """テスト用の手動クロック"""
+
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _make_adapter(
+    llm: _CountingLLM,
+    cache: LLMResponseCache,
+    *,
+    node: str = "judge",
+    corpus_fingerprint_fn=None,
+) -> CachedLLMAdapter:
+    return CachedLLMAdapter(
+        llm,
+        cache,
+        node=node,
+        model_name="test-model",
+        sampling_params={"temperature": 0.8},
+        corpus_fingerprint_fn=corpus_fingerprint_fn,
+    )
+
+
+class TestCachedLLMAdapter:
+    """CachedLLMAdapter のテスト"""
+
+    @pytest.mark.asyncio()
+    async def test_identical_call_hits_cache(self) -> None:
+        """同一メッセージの2回目の呼び出しで LLM が呼ばれないことを検証する。"""
+        llm = _CountingLLM()
+        cache = LLMResponseCache()
+        adapter = _make_adapter(llm, cache)
+
+        first = await adapter.agenerate_structured(_MESSAGES, JudgeResult)
+        second = await adapter.agenerate_structured(_MESSAGES, JudgeResult)
+
+        assert llm.calls == 1
+        assert second == first
+        assert cache.stats("judge").hits == 1
+        assert cache.stats("judge").misses == 1
+
+    @pytest.mark.asyncio()
+    async def test_params_are_part_of_key(self) -> None:
+        """推論パラメータや応答形式が異なる呼び出しはヒットしないことを検証する。"""
+        llm = _CountingLLM()
+        adapter = _make_adapter(llm, LLMResponseCache())
+
+        await adapter.agenerate(_MESSAGES, reasoning="low")
+        await adapter.agenerate(_MESSAGES, reasoning="high")
+        await adapter.agenerate(_MESSAGES, reasoning="low", num_predict=128)
+        await adapter.agenerate_structured(_MESSAGES, JudgeResult, reasoning="low")
+
+        assert llm.calls == 4
+
+    @pytest.mark.asyncio()
+    async def test_ttl_expiry(self) -> None:
+        """TTL を過ぎたエントリが破棄されることを検証する。"""
+        clock = _Clock()
+        llm = _CountingLLM()
+        cache = LLMResponseCache(ttl=60.0, clock=clock)
+        adapter = _make_adapter(llm, cache)
+
+        await adapter.agenerate(_MESSAGES)
+        clock.now += 61.0
+        await adapter.agenerate(_MESSAGES)
+
+        assert llm.calls == 2
+        assert cache.stats().expired == 1
+
+    @pytest.mark.asyncio()
+    async def test_size_bound_evicts_lru(self) -> None:
+        """上限を超えると最も古く使われたエントリが破棄されることを検証する。"""
+        llm = _CountingLLM()
+        cache = LLMResponseCache(max_entries=2)
+        adapter = _make_adapter(llm, cache)
+        a = [{"role": "user", "content": "A"}]
+        b = [{"role": "user", "content": "B"}]
+        c = [{"role": "user", "content": "C"}]
+
+        await adapter.agenerate(a)
+        await adapter.agenerate(b)
+        await adapter.agenerate(a)  # A を最近使用にする
+        await adapter.agenerate(c)  # B が破棄される
+        calls_before = llm.calls
+        await adapter.agenerate(a)
+        await adapter.agenerate(b)
+
+        assert len(cache) == 2
+        assert llm.calls == calls_before + 1
+        assert cache.stats().evictions >= 1
+
+    @pytest.mark.asyncio()
+    async def test_corpus_change_invalidates(self) -> None:
+        """コーパスの内容ハッシュが変わるとキャッシュが破棄されることを検証する。"""
+        fingerprint = "a"
+        llm = _CountingLLM()
+        cache = LLMResponseCache()
+        adapter = _make_adapter(llm, cache, corpus_fingerprint_fn=lambda: fingerprint)
+
+        await adapter.agenerate(_MESSAGES)
+        fingerprint = "b"
+        await adapter.agenerate(_MESSAGES)
+
+        assert llm.calls == 2
+        assert len(cache) == 1
+
+    @pytest.mark.asyncio()
+    async def test_stats_per_node(self) -> None:
+        """統計がノードごとに集計されることを検証する。"""
+        llm = _CountingLLM()
+        cache = LLMResponseCache()
+        planning = _make_adapter(llm, cache, node="task_planning")
+        judge = _make_adapter(llm, cache, node="judge")
+
+        await planning.agenerate(_MESSAGES)
+        await planning.agenerate(_MESSAGES)
+        await judge.agenerate_structured(_MESSAGES, JudgeResult)
+
+        assert cache.stats("task_planning").hit_rate == 0.5
+        assert cache.stats("judge").misses == 1
+        assert cache.stats().hits == 1
+
+    @pytest.mark.asyncio()
+    async def test_stream_not_cached(self) -> None:
+        """ストリーミング生成はキャッシュされないことを検証する。"""
+        llm = _CountingLLM()
+        adapter = _make_adapter(llm, LLMResponseCache())
+
+        for _ in range(2):
+            tokens = [t async for t in adapter.astream(_MESSAGES)]
+            assert tokens == ["回答"]
+
+        assert llm.calls == 2
+
+
+class TestPersistence:
+    """SQLite 永続化のテスト"""
+
+    @pytest.mark.asyncio()
+    async def test_entries_survive_restart(self, tmp_path: Path) -> None:
+        """再起動後も永続化したエントリでヒットすることを検証する。"""
+        path = tmp_path / "llm_cache.sqlite"
+        llm = _CountingLLM()
+        await _make_adapter(llm, LLMResponseCache(path=path)).agenerate(_MESSAGES)
+
+        restarted = LLMResponseCache(path=path)
+        result = await _make_adapter(llm, restarted).agenerate(_MESSAGES)
+
+        assert llm.calls == 1
+        assert result.content == "応答1"
+
+    @pytest.mark.asyncio()
+    async def test_stale_corpus_not_restored(self, tmp_path: Path) -> None:
+        """異なるコーパスのエントリは再起動後に使われないことを検証する。"""
+        path = tmp_path / "llm_cache.sqlite"
+        llm = _CountingLLM()
+        await _make_adapter(
+            llm,
+            LLMResponseCache(path=path),
+            corpus_fingerprint_fn=lambda: "a",
+        ).agenerate(_MESSAGES)
+
+        await _make_adapter(
+            llm,
+            LLMResponseCache(path=path),
+            corpus_fingerprint_fn=lambda: "b",
+        ).agenerate(_MESSAGES)
+
+        assert llm.calls == 2
+
+    @pytest.mark.asyncio()
+    async def test_same_corpus_restored_after_restart(self, tmp_path: Path) -> None:
+        """同じ内容のコーパスを再登録すれば、再起動後もヒットすることを検証する。"""
+        path = tmp_path / "llm_cache.sqlite"
+        llm = _CountingLLM()
+        chunks = [DocumentChunk(chunk_id="c1", text="軸受 寿命", source="a.pdf")]
+        fingerprint = corpus_fingerprint(chunks)
+        await _make_adapter(
+            llm,
+            LLMResponseCache(path=path),
+            corpus_fingerprint_fn=lambda: fingerprint,
+        ).agenerate(_MESSAGES)
+
+        # 再起動後はプロセス内のコーパスバージョンが 0 から数え直しになる
+        restarted = corpus_fingerprint(chunks)
+        await _make_adapter(
+            llm,
+            LLMResponseCache(path=path),
+            corpus_fingerprint_fn=lambda: restarted,
+        ).agenerate(_MESSAGES)
+
+        assert llm.calls == 1
+
+    @pytest.mark.asyncio()
+    async def test_legacy_table_discarded(self, tmp_path: Path) -> None:
+        """コーパスを検証できない旧形式のエントリを読み戻さないことを検証する。"""
+        path = tmp_path / "llm_cache.sqlite"
+        db = sqlite3.connect(path)
+        db.execute(
+            "CREATE TABLE llm_cache (key TEXT PRIMARY KEY, payload TEXT NOT NULL,"
+            " created_at REAL NOT NULL, corpus_version INTEGER NOT NULL)"
+        )
+        db.execute("INSERT INTO llm_cache VALUES ('k', '{}', 0, 0)")
+        db.commit()
+        db.close()
+
+        assert len(LLMResponseCache(path=path, clock=lambda: 0.0)) == 0
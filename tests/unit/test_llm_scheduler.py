@@ -0,0 +1,322 @@
+"""優先度付き LLM スケジューラのユニットテスト"""
+
+import asyncio
+from collections.abc import AsyncIterator
+
+import pytest
+
+from domain.ports.llm_port import ChatResponse
+from domain.session import current_session_id
+from interfaces.adapters.llm_scheduler import (
+    LLMPriority,
+    LLMScheduler,
+    ScheduledLLMAdapter,
+)
+
+
+class _GatedLLM:
+    """ゲートが開くまで応答を保留する LLM モック"""
+
+    def __init__(self) -> None:
+        self.gate = asyncio.Event()
+        self.running = 0
+        self.max_running = 0
+
+    async def agenerate(
+        self,
+        messages: list[dict],
+        *,
+        num_predict: int | None = None,
+        reasoning: str | None = None,
+    ) -> ChatResponse:
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        await self.gate.wait()
+        self.running -= 1
+        return ChatResponse(content="ok", thinking="")
+
+    async def agenerate_structured(
+        self,
+        messages: list[dict],
+        response_model: type,
+        *,
+        num_predict: int | None = None,
+        reasoning: str | None = None,
+    ) -> object:
+        raise NotImplementedError
+
+    async def astream(
+        self,
+        messages: list[dict],
+        *,
+        reasoning: str | None = None,
+        temperature: float | None = None,
+    ) -> AsyncIterator[str]:
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        await self.gate.wait()
+        self.running -= 1
+        yield "回答"
+
+
+async def _acquire_in_order(
+    scheduler: LLMScheduler,
+    requests: list[tuple[LLMPriority, str]],
+) -> list[str]:
+    """スロットを1つ塞いだ状態で requests を順に投入し、獲得順を返す。"""
+    order: list[str] = []
+    release = asyncio.Event()
+
+    async def _hold() -> None:
+        async with scheduler.slot(LLMPriority.PLANNING, "holder"):
+            await release.wait()
+
+    async def _request(priority: LLMPriority, label: str) -> None:
+        async with scheduler.slot(priority, label.split(":")[0]):
+            order.append(label)
+
+    holder = asyncio.create_task(_hold())
+    await asyncio.sleep(0)
+    tasks = []
+    for priority, label in requests:
+        tasks.append(asyncio.create_task(_request(priority, label)))
+        await asyncio.sleep(0)
+    release.set()
+    await asyncio.gather(holder, *tasks)
+    return order
+
+
+class TestLLMScheduler:
+    """LLMScheduler のテスト"""
+
+    @pytest.mark.asyncio()
+    async def test_concurrency_limit(self) -> None:
+        """同時実行数が上限を超えないことを検証する。"""
+        llm = _GatedLLM()
+        adapter = ScheduledLLMAdapter(
+            llm,
+            LLMScheduler(max_concurrency=2),
+            priority=LLMPriority.SUMMARIZE,
+        )
+
+        tasks = [asyncio.create_task(adapter.agenerate([])) for _ in range(5)]
+        await asyncio.sleep(0.01)
+        running = llm.running
+        llm.gate.set()
+        await asyncio.gather(*tasks)
+
+        assert running == 2
+        assert llm.max_running == 2
+
+    @pytest.mark.asyncio()
+    async def test_priority_order(self) -> None:
+        """空いたスロットが優先度の高いクラスから割り当てられることを検証する。"""
+        order = await _acquire_in_order(
+            LLMScheduler(max_concurrency=1),
+            [
+                (LLMPriority.PLANNING, "a:planning"),
+                (LLMPriority.SUMMARIZE, "b:summarize"),
+                (LLMPriority.FINAL_ANSWER, "c:answer"),
+                (LLMPriority.JUDGE, "d:judge"),
+            ],
+        )
+
+        assert order == ["c:answer", "d:judge", "b:summarize", "a:planning"]
+
+    @pytest.mark.asyncio()
+    async def test_fair_across_sessions(self) -> None:
+        """同じ優先度ではセッション間で交互に割り当てられることを検証する。"""
+        order = await _acquire_in_order(
+            LLMScheduler(max_concurrency=1),
+            [
+                (LLMPriority.SUMMARIZE, "a:1"),
+                (LLMPriority.SUMMARIZE, "a:2"),
+                (LLMPriority.SUMMARIZE, "a:3"),
+                (LLMPriority.SUMMARIZE, "b:1"),
+            ],
+        )
+
+        assert order == ["a:1", "b:1", "a:2", "a:3"]
+
+    @pytest.mark.asyncio()
+    async def test_cancelled_waiter_does_not_leak_slot(self) -> None:
+        """待機中にキャンセルされた呼び出しがスロットを消費しないことを検証する。"""
+        scheduler = LLMScheduler(max_concurrency=1)
+        release = asyncio.Event()
+
+        async def _hold() -> None:
+            async with scheduler.slot(LLMPriority.PLANNING):
+                await release.wait()
+
+        async def _wait() -> None:
+            async with scheduler.slot(LLMPriority.JUDGE):
+                pass
+
+        holder = asyncio.create_task(_hold())
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(_wait())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        release.set()
+        await holder
+
+        assert scheduler.active == 0
+        assert scheduler.queue_depth() == 0
+        async with scheduler.slot(LLMPriority.JUDGE):
+            assert scheduler.active == 1
+
+    @pytest.mark.asyncio()
+    async def test_wait_time_metrics(self) -> None:
+        """待ち時間の統計が優先度クラスごとに記録されることを検証する。"""
+        scheduler = LLMScheduler(max_concurrency=1)
+        await _acquire_in_order(
+            scheduler,
+            [(LLMPriority.JUDGE, "a:judge")],
+        )
+
+        judge = scheduler.stats(LLMPriority.JUDGE)
+        assert judge.requests == 1
+        assert judge.queued == 1
+        assert judge.max_wait >= 0.0
+        assert scheduler.stats(LLMPriority.PLANNING).queued == 0
+
+    @pytest.mark.asyncio()
+    async def test_stream_holds_slot_until_done(self) -> None:
+        """最後のトークンまでストリームがスロットを保持することを検証する。"""
+        scheduler = LLMScheduler(max_concurrency=1)
+        finish_stream = asyncio.Event()
+
+        class _StreamingLLM(_GatedLLM):
+            async def astream(self, messages: list[dict], **kwargs):
+                yield "回答"
+                await finish_stream.wait()
+                yield "です。"
+
+        adapter = ScheduledLLMAdapter(
+            _StreamingLLM(),
+            scheduler,
+            priority=LLMPriority.FINAL_ANSWER,
+        )
+
+        stream = adapter.astream([])
+        assert await anext(stream) == "回答"
+        assert scheduler.active == 1
+
+        finish_stream.set()
+        assert [t async for t in stream] == ["です。"]
+        assert scheduler.active == 0
+
+    @pytest.mark.asyncio()
+    async def test_judge_not_blocked_by_speculative_stream(self) -> None:
+        """投機的な回答が予約スロットで生成され、judge を塞がないことを検証する。"""
+        scheduler = LLMScheduler(max_concurrency=1)
+        finish_stream = asyncio.Event()
+
+        class _StreamingLLM(_GatedLLM):
+            async def astream(self, messages: list[dict], **kwargs):
+                yield "回答"
+                await finish_stream.wait()
+                yield "です。"
+
+        llm = _StreamingLLM()
+        llm.gate.set()
+        speculative = ScheduledLLMAdapter(
+            llm,
+            scheduler,
+            priority=LLMPriority.SPECULATIVE_ANSWER,
+        )
+        judge = ScheduledLLMAdapter(llm, scheduler, priority=LLMPriority.JUDGE)
+
+        # 判定と並行して投機的に回答を生成する
+        stream = speculative.astream([])
+        assert await anext(stream) == "回答"
+        assert scheduler.speculative_active == 1
+        assert scheduler.active == 0
+
+        result = await asyncio.wait_for(judge.agenerate([]), timeout=1.0)
+
+        assert result.content == "ok"
+        assert scheduler.stats(LLMPriority.JUDGE).queued == 0
+        finish_stream.set()
+        assert [t async for t in stream] == ["です。"]
+        assert scheduler.speculative_active == 0
+
+    @pytest.mark.asyncio()
+    async def test_speculative_slots_limit(self) -> None:
+        """投機的な呼び出しの同時実行数が予約スロット数を超えないことを検証する。"""
+        llm = _GatedLLM()
+        scheduler = LLMScheduler(max_concurrency=2, speculative_slots=1)
+        speculative = ScheduledLLMAdapter(
+            llm,
+            scheduler,
+            priority=LLMPriority.SPECULATIVE_ANSWER,
+        )
+
+        tasks = [asyncio.create_task(speculative.agenerate([])) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        running = llm.running
+        queued = scheduler.queue_depth(LLMPriority.SPECULATIVE_ANSWER)
+        llm.gate.set()
+        await asyncio.gather(*tasks)
+
+        assert running == 1
+        assert queued == 2
+        assert scheduler.active == 0
+        assert llm.max_running == 1
+
+    @pytest.mark.asyncio()
+    async def test_stream_error_releases_slot(self) -> None:
+        """最初のトークンの前に失敗したストリームがスロットを解放することを検証する。"""
+        scheduler = LLMScheduler(max_concurrency=1)
+
+        class _FailingLLM(_GatedLLM):
+            async def astream(self, messages: list[dict], **kwargs):
+                raise RuntimeError("stream error")
+                yield
+
+        adapter = ScheduledLLMAdapter(
+            _FailingLLM(),
+            scheduler,
+            priority=LLMPriority.FINAL_ANSWER,
+        )
+
+        with pytest.raises(RuntimeError):
+            [t async for t in adapter.astream([])]
+
+        assert scheduler.active == 0
+
+    @pytest.mark.asyncio()
+    async def test_session_from_context(self) -> None:
+        """セッション ID を省略するとコンテキスト変数から取得されることを検証する。"""
+        scheduler = LLMScheduler(max_concurrency=1)
+        release = asyncio.Event()
+        order: list[str] = []
+
+        async def _hold() -> None:
+            async with scheduler.slot(LLMPriority.PLANNING):
+                await release.wait()
+
+        async def _request(label: str) -> None:
+            async with scheduler.slot(LLMPriority.JUDGE):
+                order.append(label)
+
+        holder = asyncio.create_task(_hold())
+        await asyncio.sleep(0)
+        tasks = []
+        for session, label in [("a", "a1"), ("a", "a2"), ("b", "b1")]:
+            # タスクは生成時点のコンテキストを引き継ぐ
+            token = current_session_id.set(session)
+            tasks.append(asyncio.create_task(_request(label)))
+            current_session_id.reset(token)
+            await asyncio.sleep(0)
+        release.set()
+        await asyncio.gather(holder, *tasks)
+
+        assert order == ["a1", "b1", "a2"]
+
+    def test_invalid_concurrency(self) -> None:
+        """同時実行数に0を指定するとエラーになることを検証する。"""
+        with pytest.raises(ValueError):
+            LLMScheduler(max_concurrency=0)
+        with pytest.raises(ValueError):
+            LLMScheduler(max_concurrency=1, speculative_slots=0)
@@ -0,0 +1,263 @@
+"""OllamaAdapter（クライアントプール）のユニットテスト"""
+
+import logging
+
+import pytest
+
+from domain.models import JudgeResult, Subtask, TaskPlanningResult
+from domain.token_budget import estimate_messages_tokens
+from interfaces.adapters.ollama_adapter import OllamaAdapter
+
+
+class TestClientPool:
+    """ChatOllama プールのテスト"""
+
+    def test_same_params_reuse_client(self) -> None:
+        """同じパラメータでは同一の ChatOllama が再利用されることを検証する。"""
+        adapter = OllamaAdapter("test-model")
+
+        first = adapter._get_llm(adapter._params_key(num_predict=256))
+        second = adapter._get_llm(adapter._params_key(num_predict=256))
+
+        assert first is second
+
+    def test_different_params_use_separate_clients(self) -> None:
+        """実効パラメータが異なる場合は別の ChatOllama になることを検証する。"""
+        adapter = OllamaAdapter("test-model", temperature=0.8)
+
+        default = adapter._get_llm(adapter._params_key())
+        limited = adapter._get_llm(adapter._params_key(num_predict=128))
+        thinking = adapter._get_llm(adapter._params_key(reasoning="high"))
+        cold = adapter._get_llm(adapter._params_key(temperature=0.1))
+
+        assert len({id(default), id(limited), id(thinking), id(cold)}) == 4
+        assert limited.num_predict == 128
+        assert cold.temperature == 0.1
+
+    def test_default_temperature_shares_key(self) -> None:
+        """temperature 省略時は既定値と同じキーになることを検証する。"""
+        adapter = OllamaAdapter("test-model", temperature=0.8)
+
+        assert adapter._params_key() == adapter._params_key(temperature=0.8)
+
+    def test_structured_runnable_cached_per_model(self) -> None:
+        """構造化出力の Runnable が応答モデルごとにキャッシュされることを検証する。"""
+        adapter = OllamaAdapter("test-model")
+        key = adapter._params_key(num_predict=512)
+
+        judge = adapter._get_structured_llm(key, JudgeResult)
+
+        assert adapter._get_structured_llm(key, JudgeResult) is judge
+        assert adapter._get_structured_llm(key, TaskPlanningResult) is not judge
+        assert len(adapter._llm_pool) == 1
+
+    def test_prepare_structured_populates_cache(self) -> None:
+        """事前生成した構造化出力 Runnable が呼び出し時に再利用されることを検証する。"""
+        adapter = OllamaAdapter("test-model")
+
+        adapter.prepare_structured(JudgeResult, num_predict=4096, reasoning="low")
+        key = adapter._params_key(num_predict=4096, reasoning="low")
+
+        assert (key, JudgeResult) in adapter._structured_pool
+
+
+class TestProfiles:
+    """呼び出しオプションのプロファイル正規化のテスト"""
+
+    def test_num_predict_unchanged(self) -> None:
+        """num_predict が指定された値のまま使われることを検証する。"""
+        adapter = OllamaAdapter("test-model")
+
+        assert adapter._params_key(num_predict=100)[1] == 100
+        assert adapter._params_key(num_predict=300)[1] == 300
+        assert adapter._params_key(num_predict=10000)[1] == 10000
+        assert adapter._params_key()[1] is None
+
+    def test_temperature_rounded(self) -> None:
+        """近い temperature が同じプロファイルにまとまることを検証する。"""
+        adapter = OllamaAdapter("test-model", temperature=0.8)
+
+        assert adapter._params_key(temperature=0.78) == adapter._params_key()
+        assert adapter._params_key(temperature=0.33)[3] == 0.3
+
+    def test_load_options_fixed_across_profiles(self) -> None:
+        """プロファイルが異なっても num_ctx・keep_alive が同じことを検証する。"""
+        adapter = OllamaAdapter("test-model", num_ctx=8192, keep_alive="30m")
+
+        clients = [
+            adapter._get_llm(adapter._params_key(num_predict=128)),
+            adapter._get_llm(adapter._params_key(reasoning="high")),
+            adapter._get_llm(adapter._params_key(temperature=0.2)),
+        ]
+
+        assert {c.num_ctx for c in clients} == {8192}
+        assert {c.keep_alive for c in clients} == {"30m"}
+
+    @pytest.mark.asyncio()
+    async def test_astream_honors_temperature(self) -> None:
+        """astream が指定された temperature のプロファイルを使うことを検証する。"""
+        adapter = OllamaAdapter("test-model", temperature=0.8)
+        keys = []
+
+        class _FakeLLM:
+            async def astream(self, messages):
+                return
+                yield
+
+        def fake_get_llm(key):
+            keys.append(key)
+            return _FakeLLM()
+
+        adapter._get_llm = fake_get_llm
+        async for _ in adapter.astream([], temperature=0.2):
+            pass
+
+        assert keys[0][3] == 0.2
+
+
+class TestCallSizing:
+    """プロンプト長に応じた num_ctx・num_predict の決定のテスト"""
+
+    def test_fixed_num_ctx_by_default(self) -> None:
+        """区切り値を指定しない場合は num_ctx が固定であることを検証する。"""
+        adapter = OllamaAdapter("test-model", num_ctx=16384)
+        short = [{"role": "user", "content": "質問"}]
+
+        assert adapter._size_call(short, 4096) == (16384, 4096)
+
+    def test_num_ctx_bucket_from_prompt(self) -> None:
+        """プロンプトと出力が収まる最小の num_ctx が選ばれることを検証する。"""
+        adapter = OllamaAdapter(
+            "test-model",
+            num_ctx=16384,
+            num_ctx_buckets=[4096, 8192],
+        )
+        short = [{"role": "user", "content": "質問"}]
+        long = [{"role": "user", "content": "あ" * 6000}]
+
+        assert adapter._size_call(short, 1024)[0] == 4096
+        assert adapter._size_call(long, 1024)[0] == 8192
+        assert adapter._size_call(long * 3, 1024)[0] == 16384
+
+    def test_num_predict_fits_context(self) -> None:
+        """num_predict がプロンプトと合わせて num_ctx に収まることを検証する。"""
+        adapter = OllamaAdapter("test-model", num_ctx=8192)
+        long = [{"role": "user", "content": "あ" * 6000}]
+
+        num_ctx, num_predict = adapter._size_call(long, 4096)
+        available = 8192 - estimate_messages_tokens(long)
+
+        assert num_ctx == 8192
+        assert available // 2 < num_predict <= available
+        assert num_predict & (num_predict - 1) == 0
+        assert adapter._size_call(long, 1000) == (8192, 1000)
+
+    def test_capped_num_predict_keeps_pool_bounded(self) -> None:
+        """プロンプト長が変わってもクライアントプールが増え続けないことを検証する。"""
+        adapter = OllamaAdapter("test-model", num_ctx=16384)
+
+        for length in range(15000, 16300, 50):
+            messages = [{"role": "user", "content": "あ" * length}]
+            _, num_predict = adapter._size_call(messages, 4096)
+            adapter._get_llm(adapter._params_key(num_predict=num_predict))
+
+        assert len(adapter._llm_pool) <= 3
+
+
+class TestStreamListItems:
+    """構造化出力のリスト要素ストリーミングのテスト"""
+
+    @pytest.mark.asyncio()
+    async def test_items_yielded_incrementally(self) -> None:
+        """要素が完成した時点で Subtask として返されることを検証する。"""
+        adapter = OllamaAdapter("test-model")
+        text = (
+            '{"subtasks": [{"purpose": "調査1", "queries": ["A"]},'
+            ' {"purpose": "調査2", "queries": ["B"]}]}'
+        )
+        received: list[int] = []
+
+        class _Chunk:
+            def __init__(self, content: str, done: bool = False) -> None:
+                self.content = content
+                self.response_metadata = {"done": done}
+
+        class _FakeLLM:
+            async def astream(self, messages, **kwargs):
+                assert "format" in kwargs
+                for i in range(0, len(text), 5):
+                    received.append(i)
+                    yield _Chunk(text[i : i + 5])
+                yield _Chunk("", done=True)
+
+        adapter._get_llm = lambda key: _FakeLLM()
+        items = []
+        async for item in adapter.astream_list_items(
+            [{"role": "user", "content": "質問"}],
+            TaskPlanningResult,
+            Subtask,
+            field="subtasks",
+        ):
+            items.append((item, received[-1]))
+
+        assert [i.purpose for i, _ in items] == ["調査1", "調査2"]
+        assert items[0][1] < received[-1]
+
+
+class TestReloadDetection:
+    """load_duration による再ロード検出のテスト"""
+
+    @staticmethod
+    def _metadata(load_seconds: float) -> dict:
+        return {"eval_count": 1, "load_duration": int(load_seconds * 1e9)}
+
+    def test_initial_load_not_counted(self) -> None:
+        """起動後最初のロードは再ロードとして数えないことを検証する。"""
+        adapter = OllamaAdapter("test-model", reload_warning_seconds=1.0)
+
+        adapter._record_usage(self._metadata(12.0))
+        adapter._record_usage(self._metadata(0.01))
+
+        assert adapter.reload_count == 0
+
+    def test_reload_warns(self, caplog: pytest.LogCaptureFixture) -> None:
+        """ロード済みのモデルが再ロードされたら警告することを検証する。"""
+        adapter = OllamaAdapter("test-model", reload_warning_seconds=1.0)
+
+        adapter._record_usage(self._metadata(0.01))
+        with caplog.at_level(logging.WARNING):
+            adapter._record_usage(self._metadata(8.0))
+
+        assert adapter.reload_count == 1
+        assert "再ロード" in caplog.text
+
+
+class TestUsage:
+    """応答統計の取り出しのテスト"""
+
+    def test_to_usage_converts_nanoseconds(self) -> None:
+        """Ollama の応答統計が秒単位の LLMUsage に変換されることを検証する。"""
+        usage = OllamaAdapter._to_usage(
+            {
+                "done": True,
+                "prompt_eval_count": 1200,
+                "eval_count": 300,
+                "prompt_eval_duration": 1_500_000_000,
+                "eval_duration": 6_000_000_000,
+                "load_duration": 250_000_000,
+                "total_duration": 7_800_000_000,
+            },
+        )
+
+        assert usage is not None
+        assert usage.prompt_eval_count == 1200
+        assert usage.eval_count == 300
+        assert usage.prompt_eval_duration == 1.5
+        assert usage.eval_duration == 6.0
+        assert usage.load_duration == 0.25
+        assert usage.total_duration == 7.8
+
+    def test_to_usage_without_stats(self) -> None:
+        """応答統計を含まないメタデータでは None を返すことを検証する。"""
+        assert OllamaAdapter._to_usage({"model": "test-model"}) is None
+        assert OllamaAdapter._to_usage(None) is None
@@ -0,0 +1,122 @@
+"""検索結果のパッセージ結合のユニットテスト"""
+
+from domain.models import DocumentChunk, SearchResult
+from domain.passages import join_texts, merge_passages, overlap_length
+
+_DOC = (
+    "転がり軸受の定格寿命は基本動定格荷重と動等価荷重から求める。"
+    "玉軸受では寿命指数を3とし、ころ軸受では10/3とする。"
+    "信頼度90%の寿命を基本定格寿命と呼び、L10で表す。"
+    "使用条件に応じて潤滑や温度の補正係数を掛ける。"
+    "回転速度が一定なら、寿命を時間に換算できる。"
+    "変動荷重では、平均有効荷重を用いて寿命を見積もる。"
+    "静的な過荷重には、基本静定格荷重で安全率を確認する。"
+    "取付け誤差が大きいと、早期はく離の原因になる。"
+)
+
+
+def _split(text: str, size: int = 60, overlap: int = 25) -> list[str]:
+    """chunk_overlap 付きのチャンク分割を模した分割"""
+    return [text[i : i + size] for i in range(0, len(text) - overlap, size - overlap)]
+
+
+def _result(
+    chunk_id: str,
+    text: str,
+    score: float = 0.5,
+    source: str = "bearing.pdf",
+    **metadata: object,
+) -> SearchResult:
+    return SearchResult(
+        chunk=DocumentChunk(
+            chunk_id=chunk_id,
+            text=text,
+            source=source,
+            metadata=metadata,
+        ),
+        score=score,
+    )
+
+
+class TestOverlapLength:
+    """本文の重なりの検出のテスト"""
+
+    def test_longest_overlap(self) -> None:
+        """末尾と先頭が一致する最長の文字数を返すことを検証する。"""
+        assert overlap_length("abcabc", "abcabcX", 1) == 6
+        assert overlap_length("xxabc", "abcyy", 1) == 3
+
+    def test_below_minimum(self) -> None:
+        """最小文字数に満たない一致は重なりとみなさないことを検証する。"""
+        assert overlap_length("xxabc", "abcyy", 4) == 0
+        assert overlap_length("abc", "xyz", 1) == 0
+
+
+class TestMergePassages:
+    """隣接・重複するチャンクの結合のテスト"""
+
+    def test_overlapping_chunks_restore_text(self) -> None:
+        """重なりで隣接するチャンクが、元の本文どおりにつながることを検証する。"""
+        texts = _split(_DOC)
+        # 順位は資料内の順と無関係（3番目 → 1番目 → 2番目）
+        results = [
+            _result("c2", texts[2], 0.9),
+            _result("c0", texts[0], 0.7),
+            _result("c1", texts[1], 0.8),
+        ]
+
+        (passage,) = merge_passages(results, min_overlap=10)
+
+        assert passage.chunk_ids == ["c0", "c1", "c2"]
+        assert passage.score == 0.9
+        merged = join_texts([c.text for c in passage.chunks], min_overlap=10)
+        assert merged == _DOC[: 60 + (60 - 25) * 2]
+
+    def test_keeps_rank_order_and_separate_runs(self) -> None:
+        """離れたチャンク・別資料のチャンクはつなげず、順位順に並ぶことを検証する。"""
+        texts = _split(_DOC)
+        results = [
+            _result("c5", texts[5], 0.9),
+            _result("c0", texts[0], 0.8),
+            _result("other", texts[1], 0.7, source="other.pdf"),
+            _result("c1", texts[1], 0.6),
+        ]
+
+        passages = merge_passages(results, min_overlap=10)
+
+        assert [p.chunk_ids for p in passages] == [["c5"], ["c0", "c1"], ["other"]]
+
+    def test_bridging_chunk_joins_runs(self) -> None:
+        """2つのパッセージの間を埋めるチャンクで1つにつながることを検証する。"""
+        texts = _split(_DOC)
+        results = [
+            _result("c2", texts[2]),
+            _result("c0", texts[0]),
+            _result("c1", texts[1]),
+        ]
+
+        passages = merge_passages(results, min_overlap=10)
+
+        assert [p.chunk_ids for p in passages] == [["c0", "c1", "c2"]]
+
+    def test_chunk_index_adjacency(self) -> None:
+        """通し番号があれば、重なりのない連続チャンクもつなげることを検証する。"""
+        results = [
+            _result("b", "後半の段落。", chunk_index=4),
+            _result("a", "前半の段落。", chunk_index=3),
+            _result("z", "離れた段落。", chunk_index=9),
+        ]
+
+        passages = merge_passages(results, min_overlap=10)
+
+        assert [p.chunk_ids for p in passages] == [["a", "b"], ["z"]]
+        texts = [c.text for c in passages[0].chunks]
+        assert join_texts(texts, min_overlap=10) == "前半の段落。\n後半の段落。"
+
+    def test_duplicates_used_once(self) -> None:
+        """同じチャンクが複数回含まれても1回だけ使うことを検証する。"""
+        results = [_result("a", "本文A"), _result("a", "本文A")]
+
+        passages = merge_passages(results, min_overlap=10)
+
+        assert [p.chunk_ids for p in passages] == [["a"]]
@@ -0,0 +1,106 @@
+"""プロンプト配置のユニットテスト"""
+
+from domain.config import WorkflowConfig
+from domain.token_budget import estimate_messages_tokens
+from usecases.prompt_layout import (
+    LEGACY,
+    STABLE_PREFIX,
+    build_answer_messages,
+    history_window,
+)
+
+
+def _history(n: int) -> list[dict]:
+    return [
+        {"role": "user" if i % 2 == 0 else "assistant", "content": f"m{i}"}
+        for i in range(n)
+    ]
+
+
+def _prefix_shared(previous: list[dict], current: list[dict]) -> int:
+    """先頭から一致するメッセージ数を返す。"""
+    n = 0
+    for a, b in zip(previous, current):
+        if a != b:
+            break
+        n += 1
+    return n
+
+
+class TestHistoryWindow:
+    """history_window のテスト"""
+
+    def test_legacy_slides_every_turn(self) -> None:
+        """legacy 配置は常に直近 size 件になることを検証する。"""
+        assert history_window(_history(6), 4, LEGACY) == _history(6)[-4:]
+
+    def test_stable_start_is_block_aligned(self) -> None:
+        """stable_prefix 配置は開始位置が size 件単位で固定されることを検証する。"""
+        starts = [
+            history_window(_history(n), 4, STABLE_PREFIX)[0]["content"]
+            for n in (2, 4, 6, 8, 10)
+        ]
+
+        assert starts == ["m0", "m0", "m0", "m4", "m4"]
+
+    def test_zero_size(self) -> None:
+        """size が0なら履歴を含めないことを検証する。"""
+        assert history_window(_history(4), 0, STABLE_PREFIX) == []
+
+
+class TestBuildAnswerMessages:
+    """build_answer_messages のテスト"""
+
+    def _turn(self, config: WorkflowConfig, n_history: int) -> list[dict]:
+        return build_answer_messages(
+            config,
+            user_prompt="日本語で回答してください。",
+            question=f"質問{n_history}",
+            search_results=[f"検索結果{n_history}"],
+            history=_history(n_history),
+        )
+
+    def test_stable_layout_volatile_content_last(self) -> None:
+        """静的プロンプトが先頭、検索結果と質問が末尾に置かれることを検証する。"""
+        config = WorkflowConfig(prompt_layout=STABLE_PREFIX)
+
+        messages = self._turn(config, 2)
+
+        assert messages[0]["content"].startswith(config.system_prompt_generate_answer)
+        assert [m["content"] for m in messages[1:3]] == ["m0", "m1"]
+        assert messages[-1]["content"].endswith("質問: 質問2")
+
+    def test_stable_layout_shares_prefix_across_turns(self) -> None:
+        """次のターンでもシステムプロンプトと会話履歴が先頭に残ることを検証する。"""
+        config = WorkflowConfig(prompt_layout=STABLE_PREFIX)
+
+        shared = _prefix_shared(self._turn(config, 4), self._turn(config, 6))
+
+        assert shared == 5  # システムプロンプト + 履歴4件
+
+    def test_legacy_layout_unchanged(self) -> None:
+        """既定の legacy 配置がユーザメッセージに履歴を含めることを検証する。"""
+        config = WorkflowConfig()
+        assert config.prompt_layout == LEGACY
+
+        messages = self._turn(config, 2)
+
+        assert len(messages) == 2
+        assert messages[0]["content"].endswith(config.system_prompt_generate_answer)
+        assert messages[1]["content"].startswith("会話履歴:\nユーザ: m0\nAI: m1")
+
+    def test_search_results_capped_to_budget(self) -> None:
+        """検索結果が出力分を除いた予算に収まるよう削られることを検証する。"""
+        config = WorkflowConfig(llm_num_ctx=4096, answer_num_predict_reserve=1024)
+
+        messages = build_answer_messages(
+            config,
+            user_prompt="日本語で回答してください。",
+            question="質問",
+            search_results=["あ" * 2000, "い" * 2000],
+            history=_history(4),
+        )
+
+        assert estimate_messages_tokens(messages) <= 4096 - 1024
+        assert "あ" * 2000 in messages[-1]["content"]
+        assert "い" * 2000 not in messages[-1]["content"]
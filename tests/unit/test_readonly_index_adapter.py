@@ -0,0 +1,171 @@
+"""ReadOnlyIndexAdapter（共有メモリマップ上の読み取り専用インデックス）のユニットテスト"""
+
+import uuid
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from domain.models import DocumentChunk
+from interfaces.adapters.chromadb_adapter import ChromaDBAdapter
+from interfaces.adapters.index_snapshot import current_generation
+from interfaces.adapters.readonly_index_adapter import ReadOnlyIndexAdapter
+
+_VOCAB = ["ホイール", "振動", "試験", "軸受", "寿命", "潤滑"]
+
+
+def _embed(texts: list[str]) -> list[list[float]]:
+    """語彙の出現回数によるテスト用 Embedding（Bag-of-Words）"""
+    return [[float(t.count(w)) for w in _VOCAB] + [0.01] for t in texts]
+
+
+def _make_writer(embedding_model: str = "") -> ChromaDBAdapter:
+    writer = ChromaDBAdapter(
+        embedding_fn=_embed,
+        collection_name=f"test-{uuid.uuid4().hex}",
+        tokenize_fn=str.split,
+        embedding_model=embedding_model,
+    )
+    writer.add_documents(
+        [
+            DocumentChunk(chunk_id="c1", text="ホイール 振動 試験", source="a.pdf"),
+            DocumentChunk(chunk_id="c2", text="軸受 寿命 試験", source="a.pdf"),
+            DocumentChunk(chunk_id="c3", text="潤滑 軸受", source="b.pdf"),
+        ],
+    )
+    return writer
+
+
+def _make_reader(root: Path, embedding_model: str = "") -> ReadOnlyIndexAdapter:
+    return ReadOnlyIndexAdapter(
+        root,
+        query_embedding_fn=_embed,
+        tokenize_fn=str.split,
+        refresh_interval=0.0,
+        embedding_model=embedding_model,
+    )
+
+
+class TestReadOnlyIndexAdapter:
+    """ReadOnlyIndexAdapter のテスト"""
+
+    def test_matches_writer_results(self, tmp_path: Path) -> None:
+        """書き込み側の ChromaDBAdapter と同じ順位で検索結果を返すことを検証する。"""
+        writer = _make_writer()
+        writer.publish_snapshot(tmp_path)
+        reader = _make_reader(tmp_path)
+
+        queries = ["軸受 寿命", "ホイール 振動", "潤滑"]
+        for expected, actual in zip(
+            writer.hybrid_search_many(queries, k=3),
+            reader.hybrid_search_many(queries, k=3),
+        ):
+            assert [r.chunk.chunk_id for r in actual] == [
+                r.chunk.chunk_id for r in expected
+            ]
+        assert reader.keyword_search_many(queries, k=3) == (
+            writer.keyword_search_many(queries, k=3)
+        )
+
+    def test_get_chunks(self, tmp_path: Path) -> None:
+        """現在の世代から ID でチャンクを取得できることを検証する。"""
+        writer = _make_writer()
+        writer.publish_snapshot(tmp_path)
+        reader = _make_reader(tmp_path)
+
+        ids = ["c2", "missing", "c1"]
+
+        assert reader.get_chunks(ids) == writer.get_chunks(ids)
+        assert [c.chunk_id for c in reader.get_chunks(ids)] == ["c2", "c1"]
+
+    def test_get_embeddings(self, tmp_path: Path) -> None:
+        """現在の世代から正規化済みの Embedding を取得できることを検証する。"""
+        writer = _make_writer()
+        writer.publish_snapshot(tmp_path)
+        reader = _make_reader(tmp_path)
+
+        embeddings = np.asarray(reader.get_embeddings(["c2", "missing", "c1"]))
+        expected = np.asarray(writer.get_embeddings(["c2", "c1"]))
+
+        assert embeddings.shape == expected.shape
+        assert np.allclose(
+            embeddings,
+            expected / np.linalg.norm(expected, axis=1, keepdims=True),
+        )
+
+    def test_arrays_are_memory_mapped(self, tmp_path: Path) -> None:
+        """Embedding 行列がプロセス間で共有可能なメモリマップであることを検証する。"""
+        _make_writer().publish_snapshot(tmp_path)
+        reader = _make_reader(tmp_path)
+
+        assert isinstance(reader._current.snapshot.embeddings, np.memmap)
+
+    def test_picks_up_new_generation(self, tmp_path: Path) -> None:
+        """新しい世代が公開されると読み手が切り替わることを検証する。"""
+        writer = _make_writer()
+        writer.publish_snapshot(tmp_path)
+        reader = _make_reader(tmp_path)
+        assert reader.keyword_search("冷却", k=3) == []
+
+        writer.add_documents(
+            [DocumentChunk(chunk_id="c4", text="冷却 試験", source="c.pdf")],
+        )
+        writer.publish_snapshot(tmp_path)
+
+        results = reader.keyword_search("冷却", k=3)
+        assert [r.chunk.chunk_id for r in results] == ["c4"]
+        assert reader.corpus_version == writer.corpus_version
+        assert reader.corpus_fingerprint == writer.corpus_fingerprint
+
+    def test_embedding_model_mismatch_rejected(self, tmp_path: Path) -> None:
+        """別モデルの世代を拒否し、現在の世代を使い続けることを検証する。"""
+        _make_writer("model-a").publish_snapshot(tmp_path)
+        with pytest.raises(ValueError):
+            _make_reader(tmp_path, "model-b")
+
+        reader = _make_reader(tmp_path, "model-a")
+        other = _make_writer("model-b")
+        other.add_documents(
+            [DocumentChunk(chunk_id="c4", text="冷却 試験", source="c.pdf")],
+        )
+        other.publish_snapshot(tmp_path)
+
+        assert reader.keyword_search("冷却", k=3) == []
+        assert reader.corpus_fingerprint != other.corpus_fingerprint
+
+    def test_query_embedding_dim_mismatch(self, tmp_path: Path) -> None:
+        """クエリ Embedding の次元数が世代と異なる場合にエラーになることを検証する。"""
+        _make_writer().publish_snapshot(tmp_path)
+        reader = ReadOnlyIndexAdapter(
+            tmp_path,
+            query_embedding_fn=lambda texts: [[1.0, 0.0] for _ in texts],
+        )
+
+        with pytest.raises(ValueError):
+            reader.similarity_search("軸受", k=3)
+
+    def test_old_generations_are_pruned(self, tmp_path: Path) -> None:
+        """直近 keep 世代より古い世代が削除されることを検証する。"""
+        writer = _make_writer()
+        for _ in range(4):
+            writer.publish_snapshot(tmp_path, keep=2)
+
+        generations = list((tmp_path / "generations").iterdir())
+        assert len(generations) == 2
+        assert current_generation(tmp_path) in generations
+
+    def test_not_published(self, tmp_path: Path) -> None:
+        """世代が未公開の場合は空のストアとして振る舞うことを検証する。"""
+        reader = _make_reader(tmp_path)
+
+        assert reader.is_empty()
+        assert reader.hybrid_search("軸受") == []
+
+    def test_add_documents_rejected(self, tmp_path: Path) -> None:
+        """読み取り専用のため、ドキュメント追加がエラーになることを検証する。"""
+        reader = _make_reader(tmp_path)
+
+        with pytest.raises(RuntimeError):
+            reader.add_documents(
+                [DocumentChunk(chunk_id="x", text="x", source="x.pdf")],
+            )
@@ -0,0 +1,51 @@
+"""検索結果の確信度評価のユニットテスト"""
+
+import pytest
+
+from domain.retrieval_confidence import assess_retrieval, calibrate_score
+
+
+class TestCalibrateScore:
+    """Reranker スコア較正のテスト"""
+
+    def test_identity_by_default(self) -> None:
+        """既定の傾き・切片ではスコアが変わらないことを検証する。"""
+        assert calibrate_score(0.73) == pytest.approx(0.73)
+
+    def test_slope_sharpens(self) -> None:
+        """傾きを大きくすると 0.5 から離れる方向に較正されることを検証する。"""
+        assert calibrate_score(0.8, slope=2.0) > 0.8
+        assert calibrate_score(0.2, slope=2.0) < 0.2
+
+    def test_extreme_scores(self) -> None:
+        """0 / 1 のスコアでも計算できることを検証する。"""
+        assert 0.0 < calibrate_score(0.0) < 0.01
+        assert 0.99 < calibrate_score(1.0) < 1.0
+
+
+class TestAssessRetrieval:
+    """確信度・カバレッジによるファストパス判定のテスト"""
+
+    def test_all_subtasks_confident(self) -> None:
+        """全サブタスクが閾値を超えればファストパスになることを検証する。"""
+        assessment = assess_retrieval([0.95, 0.92], threshold=0.9, min_coverage=1.0)
+
+        assert assessment.coverage == 1.0
+        assert assessment.confidence == pytest.approx(0.92)
+        assert assessment.fast_path
+
+    def test_partial_coverage(self) -> None:
+        """カバレッジが足りなければファストパスにならないことを検証する。"""
+        assessment = assess_retrieval([0.95, 0.4], threshold=0.9, min_coverage=1.0)
+
+        assert assessment.coverage == 0.5
+        assert not assessment.fast_path
+        relaxed = assess_retrieval([0.95, 0.4], threshold=0.9, min_coverage=0.5)
+        assert relaxed.fast_path
+
+    def test_no_subtasks(self) -> None:
+        """サブタスクが無い場合はファストパスにならないことを検証する。"""
+        assessment = assess_retrieval([], threshold=0.9, min_coverage=0.0)
+
+        assert assessment.confidence == 0.0
+        assert not assessment.fast_path
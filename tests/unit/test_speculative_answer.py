@@ -0,0 +1,125 @@
+"""SpeculativeAnswer / SpeculationStats のユニットテスト"""
+
+import asyncio
+from collections.abc import AsyncIterator
+
+import pytest
+
+from usecases.speculative_answer import SpeculationStats, SpeculativeAnswer
+
+
+async def _tokens(
+    tokens: list[str],
+    gate: asyncio.Event | None = None,
+) -> AsyncIterator[str]:
+    """先頭トークンを返した後、gate が設定されるまで残りを止めるストリーム"""
+    for i, token in enumerate(tokens):
+        if i == 1 and gate is not None:
+            await gate.wait()
+        yield token
+
+
+class TestSpeculativeAnswer:
+    """投機的な回答生成のバッファリングとキャンセルのテスト"""
+
+    @pytest.mark.asyncio()
+    async def test_buffers_while_undecided(self) -> None:
+        """採用前に届いたトークンがバッファされ、全て返されることを検証する。"""
+        speculative = SpeculativeAnswer(_tokens(["回答", "です", "。"]))
+        await asyncio.sleep(0.01)
+
+        assert speculative.first_token_at is not None
+        assert [t async for t in speculative.tokens()] == ["回答", "です", "。"]
+
+    @pytest.mark.asyncio()
+    async def test_follows_live_generation(self) -> None:
+        """バッファを返し切った後も生成に追従することを検証する。"""
+        gate = asyncio.Event()
+        speculative = SpeculativeAnswer(_tokens(["回答", "です"], gate))
+        await asyncio.sleep(0.01)
+
+        received: list[str] = []
+
+        async def _read() -> None:
+            async for token in speculative.tokens():
+                received.append(token)
+
+        reader = asyncio.create_task(_read())
+        await asyncio.sleep(0.01)
+        assert received == ["回答"]
+
+        gate.set()
+        await reader
+        assert received == ["回答", "です"]
+
+    @pytest.mark.asyncio()
+    async def test_cancel_stops_stream(self) -> None:
+        """破棄するとストリームが閉じられ、生成が止まることを検証する。"""
+        gate = asyncio.Event()
+        closed = asyncio.Event()
+
+        async def _stream() -> AsyncIterator[str]:
+            try:
+                yield "回答"
+                await gate.wait()
+                yield "です"
+            finally:
+                closed.set()
+
+        speculative = SpeculativeAnswer(_stream())
+        await asyncio.sleep(0.01)
+        speculative.cancel()
+        await asyncio.wait_for(closed.wait(), timeout=1.0)
+
+        assert closed.is_set()
+
+    @pytest.mark.asyncio()
+    async def test_error_is_raised_to_reader(self) -> None:
+        """生成中のエラーが読み出し側に伝わることを検証する。"""
+
+        async def _stream() -> AsyncIterator[str]:
+            yield "回答"
+            raise RuntimeError("接続が切れました")
+
+        speculative = SpeculativeAnswer(_stream())
+        received: list[str] = []
+        with pytest.raises(RuntimeError):
+            async for token in speculative.tokens():
+                received.append(token)
+
+        assert received == ["回答"]
+
+    @pytest.mark.asyncio()
+    async def test_saved_ttft(self) -> None:
+        """短縮時間が最初のトークン到着か判定時刻の早い方で測られることを検証する。"""
+        times = iter([10.0, 12.0])
+        speculative = SpeculativeAnswer(
+            _tokens(["回答"]),
+            clock=lambda: next(times),
+        )
+        await asyncio.sleep(0.01)
+
+        # 最初のトークンが判定前に届いた場合
+        assert speculative.saved_ttft(15.0) == pytest.approx(2.0)
+        # 判定が最初のトークンより早い場合
+        assert speculative.saved_ttft(11.0) == pytest.approx(1.0)
+
+
+class TestSpeculationStats:
+    """的中率・平均短縮時間の集計テスト"""
+
+    def test_record(self) -> None:
+        """採用・破棄の記録から的中率と平均短縮時間を計算することを検証する。"""
+        stats = SpeculationStats()
+        assert stats.hit_rate == 0.0
+        assert stats.mean_saved_ttft == 0.0
+
+        stats.record(hit=True, saved_ttft=2.0)
+        stats.record(hit=True, saved_ttft=4.0)
+        stats.record(hit=False)
+        stats.record(hit=False)
+
+        assert stats.attempts == 4
+        assert stats.hits == 2
+        assert stats.hit_rate == pytest.approx(0.5)
+        assert stats.mean_saved_ttft == pytest.approx(3.0)
@@ -0,0 +1,142 @@
+"""要約・十分性判定の統合ノードのユニットテスト"""
+
+import asyncio
+from collections.abc import AsyncIterator
+
+import pytest
+
+from domain.config import WorkflowConfig
+from domain.models import JudgeResult, Subtask, SummarizeJudgeResult
+from domain.ports.llm_port import ChatResponse
+from usecases.nodes.summarize_judge_node import create_summarize_judge_node
+
+
+class _MockLLM:
+    """テスト用 LLM モック"""
+
+    def __init__(self, structured_response: object | None = None) -> None:
+        self._structured_response = structured_response
+        self.calls: list[tuple[list[dict], type]] = []
+
+    async def agenerate(
+        self,
+        messages: list[dict],
+        *,
+        num_predict: int | None = None,
+        reasoning: str | None = None,
+    ) -> ChatResponse:
+        return ChatResponse(content="mock", thinking="")
+
+    async def agenerate_structured(
+        self,
+        messages: list[dict],
+        response_model: type,
+        *,
+        num_predict: int | None = None,
+        reasoning: str | None = None,
+    ) -> object:
+        self.calls.append((messages, response_model))
+        return self._structured_response
+
+    async def astream(
+        self,
+        messages: list[dict],
+        *,
+        reasoning: str | None = None,
+        temperature: float | None = None,
+    ) -> AsyncIterator[str]:
+        yield "mock"
+
+
+class TestSummarizeJudgeNode:
+    """summarize_judge ノードのテスト"""
+
+    @pytest.mark.asyncio()
+    async def test_sufficient(self, test_config: WorkflowConfig) -> None:
+        """1回の呼び出しで要約と判定が状態に反映されることを検証する。"""
+        llm = _MockLLM(
+            SummarizeJudgeResult(
+                summary="要約結果",
+                judgement=JudgeResult(sufficient=True, reason="十分"),
+            ),
+        )
+        node = create_summarize_judge_node(llm, test_config)
+
+        state = {
+            "question": "テスト質問",
+            "search_results": ["【目的: 寿命】\n結果A"],
+            "loop_count": 0,
+        }
+        result = await node(state)
+
+        assert len(llm.calls) == 1
+        messages, response_model = llm.calls[0]
+        assert response_model is SummarizeJudgeResult
+        assert "結果A" in messages[1]["content"]
+        assert result == {
+            "summary": "要約結果",
+            "summarized_count": 1,
+            "subtasks": [],
+            "loop_count": 1,
+        }
+
+    @pytest.mark.asyncio()
+    async def test_insufficient(self, test_config: WorkflowConfig) -> None:
+        """情報不足の場合に追加サブタスクが設定されることを検証する。"""
+        test_config.max_loop_count = 3
+        llm = _MockLLM(
+            SummarizeJudgeResult(
+                summary="要約結果",
+                judgement=JudgeResult(
+                    sufficient=False,
+                    reason="材質の情報が不足",
+                    additional_subtasks=[
+                        Subtask(purpose="材質", queries=["軸受 材質"]),
+                    ],
+                ),
+            ),
+        )
+        node = create_summarize_judge_node(llm, test_config)
+
+        state = {
+            "question": "テスト質問",
+            "search_results": ["結果A"],
+            "loop_count": 0,
+        }
+        result = await node(state)
+
+        assert result["subtasks"] == [{"purpose": "材質", "queries": ["軸受 材質"]}]
+        assert result["loop_count"] == 1
+
+    @pytest.mark.asyncio()
+    async def test_timeout_uses_raw_results(
+        self,
+        test_config: WorkflowConfig,
+    ) -> None:
+        """タイムアウト時に検索結果を要約として使い、十分と判定することを検証する。"""
+
+        class _SlowLLM(_MockLLM):
+            async def agenerate_structured(
+                self,
+                messages: list[dict],
+                response_model: type,
+                *,
+                num_predict: int | None = None,
+                reasoning: str | None = None,
+            ) -> object:
+                await asyncio.sleep(999)
+                return None
+
+        test_config.structured_output_timeout = 0.01
+        node = create_summarize_judge_node(_SlowLLM(), test_config)
+
+        state = {
+            "question": "テスト質問",
+            "search_results": ["結果A", "結果B"],
+            "loop_count": 0,
+        }
+        result = await node(state)
+
+        assert "結果A" in result["summary"]
+        assert "結果B" in result["summary"]
+        assert result["subtasks"] == []
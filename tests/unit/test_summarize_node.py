@@ -1,6 +1,7 @@
 """検索結果要約ノードのユニットテスト"""
 
 import asyncio
+import time
 from typing import AsyncIterator
 
 import pytest
@@ -15,6 +16,7 @@ class _MockLLM:
 
     def __init__(self, response: str = "要約されたテキスト") -> None:
         self._response = response
+        self.last_messages: list[dict] = []
 
     async def agenerate(
         self,
@@ -23,6 +25,7 @@ class _MockLLM:
         num_predict: int | None = None,
         reasoning: str | None = None,
     ) -> ChatResponse:
+        self.last_messages = messages
         return ChatResponse(content=self._response, thinking="")
 
     async def agenerate_structured(
@@ -40,6 +43,7 @@ class _MockLLM:
         messages: list[dict],
         *,
         reasoning: str | None = None,
+        temperature: float | None = None,
     ) -> AsyncIterator[str]:
         yield "mock"
 
@@ -61,6 +65,24 @@ class TestSummarizeNode:
 
         assert result["summary"] == "要約結果テキスト"
 
+    @pytest.mark.asyncio()
+    async def test_search_results_capped(self, test_config: WorkflowConfig) -> None:
+        """num_ctx に収まらない検索結果が上位から詰めて削られることを検証する。"""
+        test_config.llm_num_ctx = 4096
+        test_config.summarize_num_predict = 1024
+        mock_llm = _MockLLM()
+        node = create_summarize_node(mock_llm, test_config)
+
+        state = {
+            "question": "テスト質問",
+            "search_results": ["あ" * 2000, "い" * 2000],
+        }
+        await node(state)
+
+        prompt = mock_llm.last_messages[1]["content"]
+        assert "あ" * 2000 in prompt
+        assert "い" * 2000 not in prompt
+
     @pytest.mark.asyncio()
     async def test_empty_search_results(self, test_config: WorkflowConfig) -> None:
         """検索結果が空の場合、要約がスキップされることを検証する。"""
@@ -100,3 +122,281 @@ class TestSummarizeNode:
 
         assert "結果A" in result["summary"]
         assert "結果B" in result["summary"]
+
+
+class _RecordingLLM(_MockLLM):
+    """呼び出しごとのプロンプトと同時実行数を記録するモック"""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.calls: list[list[dict]] = []
+        self.running = 0
+        self.max_running = 0
+
+    async def agenerate(
+        self,
+        messages: list[dict],
+        *,
+        num_predict: int | None = None,
+        reasoning: str | None = None,
+    ) -> ChatResponse:
+        self.calls.append(messages)
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        await asyncio.sleep(0.01)
+        self.running -= 1
+        if "遅延" in messages[1]["content"]:
+            await asyncio.sleep(999)
+        return ChatResponse(content=f"要約{len(self.calls)}", thinking="")
+
+
+class TestMapReduceSummarize:
+    """【目的】ブロック単位の map-reduce 要約のテスト"""
+
+    @pytest.mark.asyncio()
+    async def test_map_per_block(self, test_config: WorkflowConfig) -> None:
+        """ブロックごとに要約され、見出し付きで連結されることを検証する。"""
+        test_config.summarize_map_reduce = True
+        test_config.summarize_map_concurrency = 2
+        llm = _RecordingLLM()
+        node = create_summarize_node(llm, test_config)
+
+        state = {
+            "question": "テスト質問",
+            "search_results": [
+                "【目的: 寿命】\n結果A",
+                "【目的: 材質】\n結果B",
+                "【目的: 潤滑】\n結果C",
+            ],
+        }
+        result = await node(state)
+
+        assert len(llm.calls) == 3
+        assert llm.max_running == 2
+        assert all(
+            c[0]["content"] == test_config.system_prompt_summarize_map
+            for c in llm.calls
+        )
+        # 各呼び出しのプロンプトには1ブロックだけが含まれる
+        assert "結果A" in llm.calls[0][1]["content"]
+        assert "結果B" not in llm.calls[0][1]["content"]
+        summary = result["summary"]
+        assert summary.index("【目的: 寿命】") < summary.index("【目的: 材質】")
+        assert "【目的: 潤滑】" in summary
+
+    @pytest.mark.asyncio()
+    async def test_reduce_merges_parts(self, test_config: WorkflowConfig) -> None:
+        """reduce を有効にすると map 要約が1回の呼び出しで統合されることを検証する。"""
+        test_config.summarize_map_reduce = True
+        test_config.summarize_reduce = True
+        llm = _RecordingLLM()
+        node = create_summarize_node(llm, test_config)
+
+        state = {
+            "question": "テスト質問",
+            "search_results": ["【目的: 寿命】\n結果A", "【目的: 材質】\n結果B"],
+        }
+        result = await node(state)
+
+        assert len(llm.calls) == 3
+        reduce_messages = llm.calls[-1]
+        assert reduce_messages[0]["content"] == (
+            test_config.system_prompt_summarize_reduce
+        )
+        assert "【目的: 寿命】" in reduce_messages[1]["content"]
+        assert result["summary"] == "要約3"
+
+    @pytest.mark.asyncio()
+    async def test_timeout_falls_back_per_block(
+        self,
+        test_config: WorkflowConfig,
+    ) -> None:
+        """タイムアウトしたブロックだけが検索結果のまま使われることを検証する。"""
+        test_config.summarize_map_reduce = True
+        test_config.summarize_timeout = 0.1
+        node = create_summarize_node(_RecordingLLM(), test_config)
+
+        state = {
+            "question": "テスト質問",
+            "search_results": ["【目的: 寿命】\n結果A", "【目的: 材質】\n遅延する結果"],
+        }
+        result = await node(state)
+
+        assert "遅延する結果" in result["summary"]
+        assert "結果A" not in result["summary"]
+        assert "要約" in result["summary"]
+
+
+class TestIncrementalSummarize:
+    """再検索ループでの差分要約のテスト"""
+
+    @pytest.mark.asyncio()
+    async def test_only_new_blocks_are_summarized(
+        self,
+        test_config: WorkflowConfig,
+    ) -> None:
+        """要約済みのブロックを含めず、差分の要約を前回の要約に連結することを検証する。"""
+        test_config.summarize_incremental = True
+        llm = _RecordingLLM()
+        node = create_summarize_node(llm, test_config)
+
+        state = {
+            "question": "テスト質問",
+            "search_results": ["【目的: 寿命】\n結果A", "【目的: 材質】\n結果B"],
+            "summary": "前回の要約",
+            "summarized_count": 1,
+        }
+        result = await node(state)
+
+        assert len(llm.calls) == 1
+        prompt = llm.calls[0][1]["content"]
+        assert "結果B" in prompt
+        assert "結果A" not in prompt
+        assert result["summary"] == "前回の要約\n\n要約1"
+        assert result["summarized_count"] == 2
+
+    @pytest.mark.asyncio()
+    async def test_resolves_only_new_references(
+        self,
+        test_config: WorkflowConfig,
+    ) -> None:
+        """チャンク参照のブロックは、差分だけを本文に戻して要約することを検証する。"""
+        test_config.summarize_incremental = True
+        resolved: list[list] = []
+
+        def resolve(blocks: list) -> list[str]:
+            resolved.append(blocks)
+            return [f"【目的: {b['purpose']}】\n{b['purpose']}の本文" for b in blocks]
+
+        llm = _RecordingLLM()
+        node = create_summarize_node(llm, test_config, resolve)
+
+        state = {
+            "question": "テスト質問",
+            "search_results": [
+                {"purpose": "寿命", "chunks": [{"chunk_id": "c1", "score": 0.9}]},
+                {"purpose": "材質", "chunks": [{"chunk_id": "c2", "score": 0.8}]},
+            ],
+            "summary": "前回の要約",
+            "summarized_count": 1,
+        }
+        result = await node(state)
+
+        assert [b["purpose"] for b in resolved[0]] == ["材質"]
+        assert "材質の本文" in llm.calls[0][1]["content"]
+        assert result["summarized_count"] == 2
+
+    @pytest.mark.asyncio()
+    async def test_merge_with_reduce(self, test_config: WorkflowConfig) -> None:
+        """reduce を有効にすると前回の要約と差分の要約を統合することを検証する。"""
+        test_config.summarize_incremental = True
+        test_config.summarize_reduce = True
+        llm = _RecordingLLM()
+        node = create_summarize_node(llm, test_config)
+
+        state = {
+            "question": "テスト質問",
+            "search_results": ["結果A", "結果B"],
+            "summary": "前回の要約",
+            "summarized_count": 1,
+        }
+        result = await node(state)
+
+        assert len(llm.calls) == 2
+        merge_prompt = llm.calls[1][1]["content"]
+        assert "前回の要約" in merge_prompt
+        assert "要約1" in merge_prompt
+        assert result["summary"] == "要約2"
+
+    @pytest.mark.asyncio()
+    async def test_map_reduce_merges_once(self, test_config: WorkflowConfig) -> None:
+        """map-reduce では前回の要約と差分の map 要約を1回で統合することを検証する。"""
+        test_config.summarize_incremental = True
+        test_config.summarize_map_reduce = True
+        test_config.summarize_reduce = True
+        llm = _RecordingLLM()
+        node = create_summarize_node(llm, test_config)
+
+        state = {
+            "question": "テスト質問",
+            "search_results": [
+                "【目的: 寿命】\n結果A",
+                "【目的: 材質】\n結果B",
+                "【目的: 潤滑】\n結果C",
+            ],
+            "summary": "前回の要約",
+            "summarized_count": 1,
+        }
+        result = await node(state)
+
+        # map 2回 + reduce 1回
+        assert len(llm.calls) == 3
+        reduce_messages = llm.calls[-1]
+        assert reduce_messages[0]["content"] == (
+            test_config.system_prompt_summarize_reduce
+        )
+        assert "前回の要約" in reduce_messages[1]["content"]
+        assert "【目的: 材質】" in reduce_messages[1]["content"]
+        assert "【目的: 潤滑】" in reduce_messages[1]["content"]
+        assert result["summary"] == "要約3"
+
+    @pytest.mark.asyncio()
+    async def test_no_new_blocks(self, test_config: WorkflowConfig) -> None:
+        """新しいブロックが無ければ LLM を呼ばずに前回の要約を返すことを検証する。"""
+        test_config.summarize_incremental = True
+        llm = _RecordingLLM()
+        node = create_summarize_node(llm, test_config)
+
+        state = {
+            "question": "テスト質問",
+            "search_results": ["結果A"],
+            "summary": "前回の要約",
+            "summarized_count": 1,
+        }
+        result = await node(state)
+
+        assert llm.calls == []
+        assert result["summary"] == "前回の要約"
+
+    @pytest.mark.asyncio()
+    async def test_disabled_resummarizes_all(
+        self,
+        test_config: WorkflowConfig,
+    ) -> None:
+        """無効時は全ブロックを要約し直すことを検証する。"""
+        llm = _RecordingLLM()
+        node = create_summarize_node(llm, test_config)
+
+        state = {
+            "question": "テスト質問",
+            "search_results": ["結果A", "結果B"],
+            "summary": "前回の要約",
+            "summarized_count": 1,
+        }
+        result = await node(state)
+
+        prompt = llm.calls[0][1]["content"]
+        assert "結果A" in prompt
+        assert "結果B" in prompt
+        assert result["summarized_count"] == 2
+
+
+class TestDeadlineSummarize:
+    """締め切りが近い場合の要約のテスト"""
+
+    @pytest.mark.asyncio()
+    async def test_pressure_skips_summarize(self, test_config: WorkflowConfig) -> None:
+        """締め切りが近い場合、LLM を呼ばずに検索結果を使うことを検証する。"""
+        llm = _RecordingLLM()
+        node = create_summarize_node(llm, test_config)
+
+        state = {
+            "question": "テスト質問",
+            "search_results": ["結果A", "結果B"],
+            "deadline": time.time() + 10.0,
+        }
+        result = await node(state)
+
+        assert llm.calls == []
+        assert result["summary"] == "結果A\n\n結果B"
+        assert result["summarized_count"] == 2
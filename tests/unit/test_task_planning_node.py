@@ -1,16 +1,28 @@
 """タスク分割ノードのユニットテスト"""
 
 import asyncio
+import time
 from typing import AsyncIterator
 
 import pytest
 
 from domain.config import WorkflowConfig
-from domain.models import Subtask, TaskPlanningResult
+from domain.models import DocumentChunk, SearchResult, Subtask, TaskPlanningResult
 from domain.ports.llm_port import ChatResponse
 from usecases.nodes.task_planning_node import create_task_planning_node
 
 
+def _results(*texts: str) -> list[SearchResult]:
+    """本文をそのままチャンク ID にした検索結果"""
+    return [
+        SearchResult(
+            chunk=DocumentChunk(chunk_id=text, text=text, source="test.pdf"),
+            score=0.5,
+        )
+        for text in texts
+    ]
+
+
 class _MockLLM:
     """テスト用 LLM モック"""
 
@@ -45,6 +57,7 @@ class _MockLLM:
         messages: list[dict],
         *,
         reasoning: str | None = None,
+        temperature: float | None = None,
     ) -> AsyncIterator[str]:
         yield "mock"
 
@@ -141,3 +154,291 @@ class TestTaskPlanningNode:
 
         assert len(result["subtasks"]) == 1
         assert result["subtasks"][0]["purpose"] == "基本調査"
+
+    @pytest.mark.asyncio()
+    async def test_expired_deadline_skips_planning(
+        self,
+        test_config: WorkflowConfig,
+    ) -> None:
+        """締め切りを過ぎていればタスク分割を省略することを検証する。"""
+        planned = TaskPlanningResult(
+            subtasks=[Subtask(purpose="詳細調査", queries=["詳細クエリ"])],
+        )
+        node = create_task_planning_node(_MockLLM(planned), test_config)
+
+        state = {"question": "テスト質問", "deadline": time.time() + 10.0}
+        result = await node(state)
+
+        assert result["subtasks"] == [
+            {"purpose": "基本調査", "queries": ["テスト質問"]},
+        ]
+
+
+class _StreamingLLM(_MockLLM):
+    """サブタスクを1件ずつストリーミングする LLM モック
+
+    2件目以降は、直前のサブタスクの検索が始まるまで返さない。
+    """
+
+    def __init__(self, subtasks: list[Subtask], started: list[asyncio.Event]) -> None:
+        super().__init__()
+        self._subtasks = subtasks
+        self._started = started
+
+    async def astream_list_items(
+        self,
+        messages: list[dict],
+        response_model: type,
+        item_model: type,
+        *,
+        field: str,
+        num_predict: int | None = None,
+        reasoning: str | None = None,
+    ) -> AsyncIterator[object]:
+        for subtask, started in zip(self._subtasks, self._started):
+            yield subtask
+            await asyncio.wait_for(started.wait(), timeout=1.0)
+
+
+class TestPipelinedPlanning:
+    """タスク分割のパイプライン実行のテスト"""
+
+    @pytest.mark.asyncio()
+    async def test_search_starts_before_planning_finishes(
+        self,
+        test_config: WorkflowConfig,
+    ) -> None:
+        """サブタスクが確定するたびに検索が始まり、結果が引き渡されることを検証する。"""
+        subtasks = [
+            Subtask(purpose="調査1", queries=["クエリA"]),
+            Subtask(purpose="調査2", queries=["クエリB"]),
+        ]
+        started = [asyncio.Event() for _ in subtasks]
+        searched: list[str] = []
+
+        async def search(subtask: dict) -> list[SearchResult]:
+            searched.append(subtask["purpose"])
+            started[len(searched) - 1].set()
+            return _results(f"{subtask['purpose']}の結果")
+
+        test_config.task_planning_pipeline = True
+        node = create_task_planning_node(
+            _StreamingLLM(subtasks, started),
+            test_config,
+            search_subtask=search,
+        )
+
+        result = await node({"question": "テスト質問"})
+
+        assert searched == ["調査1", "調査2"]
+        assert [st["purpose"] for st in result["subtasks"]] == ["調査1", "調査2"]
+        assert result["prefetched_results"] == [
+            "【目的: 調査1】\n調査1の結果",
+            "【目的: 調査2】\n調査2の結果",
+        ]
+        assert result["prefetched_top_scores"] == [0.5, 0.5]
+
+    @pytest.mark.asyncio()
+    async def test_timeout_keeps_completed_subtasks(
+        self,
+        test_config: WorkflowConfig,
+    ) -> None:
+        """タイムアウト時も確定済みのサブタスクとその検索結果を使うことを検証する。"""
+
+        class _StallingLLM(_MockLLM):
+            async def astream_list_items(self, *args, **kwargs):
+                yield Subtask(purpose="調査1", queries=["クエリA"])
+                await asyncio.sleep(999)
+
+        async def search(subtask: dict) -> list[SearchResult]:
+            return _results(subtask["purpose"])
+
+        test_config.task_planning_pipeline = True
+        test_config.structured_output_timeout = 0.05
+        node = create_task_planning_node(
+            _StallingLLM(),
+            test_config,
+            search_subtask=search,
+        )
+
+        result = await node({"question": "テスト質問"})
+
+        assert [st["purpose"] for st in result["subtasks"]] == ["調査1"]
+        assert result["prefetched_results"] == ["【目的: 調査1】\n調査1"]
+
+    @pytest.mark.asyncio()
+    async def test_exception_searches_fallback(
+        self,
+        test_config: WorkflowConfig,
+    ) -> None:
+        """サブタスクが1件も得られない場合はフォールバックを検索することを検証する。"""
+
+        class _ErrorLLM(_MockLLM):
+            async def astream_list_items(self, *args, **kwargs):
+                raise RuntimeError("LLM error")
+                yield
+
+        async def search(subtask: dict) -> list[SearchResult]:
+            return _results(*subtask["queries"])
+
+        test_config.task_planning_pipeline = True
+        node = create_task_planning_node(
+            _ErrorLLM(),
+            test_config,
+            search_subtask=search,
+        )
+
+        result = await node({"question": "テスト質問"})
+
+        assert result["subtasks"][0]["purpose"] == "基本調査"
+        assert result["prefetched_results"] == ["【目的: 基本調査】\nテスト質問"]
+
+
+class TestSearchSettlement:
+    """タスク分割と並行した検索の完了待ちのテスト"""
+
+    @pytest.mark.asyncio()
+    async def test_failed_search_is_dropped(
+        self,
+        test_config: WorkflowConfig,
+    ) -> None:
+        """1件の検索が失敗しても、他のサブタスクの検索結果を使うことを検証する。"""
+        planned = TaskPlanningResult(
+            subtasks=[
+                Subtask(purpose="調査1", queries=["クエリA"]),
+                Subtask(purpose="調査2", queries=["クエリB"]),
+            ],
+        )
+
+        async def search(subtask: dict) -> list[SearchResult]:
+            if subtask["purpose"] == "調査1":
+                raise RuntimeError("search error")
+            return _results(subtask["purpose"])
+
+        test_config.speculative_retrieval = True
+        node = create_task_planning_node(
+            _MockLLM(structured_response=planned),
+            test_config,
+            search_subtask=search,
+        )
+
+        result = await node({"question": "テスト質問"})
+
+        assert [st["purpose"] for st in result["subtasks"]] == ["調査1", "調査2"]
+        assert result["prefetched_results"] == [
+            "【目的: 調査2】\n調査2",
+            "【目的: 質問全体（先行検索）】\n基本調査",
+        ]
+        assert result["prefetched_top_scores"] == [0.0, 0.5]
+
+    @pytest.mark.asyncio()
+    async def test_pending_searches_cancelled_at_deadline(
+        self,
+        test_config: WorkflowConfig,
+    ) -> None:
+        """締め切りまでに終わらない検索を待たずにキャンセルすることを検証する。"""
+        planned = TaskPlanningResult(
+            subtasks=[
+                Subtask(purpose="調査1", queries=["クエリA"]),
+                Subtask(purpose="調査2", queries=["クエリB"]),
+            ],
+        )
+        cancelled: list[str] = []
+
+        async def search(subtask: dict) -> list[SearchResult]:
+            if subtask["purpose"] == "調査2":
+                try:
+                    await asyncio.sleep(999)
+                except asyncio.CancelledError:
+                    cancelled.append(subtask["purpose"])
+                    raise
+            return _results(subtask["purpose"])
+
+        test_config.task_planning_pipeline = False
+        test_config.speculative_retrieval = True
+        test_config.deadline_pressure_seconds = 0.0
+        node = create_task_planning_node(
+            _MockLLM(structured_response=planned),
+            test_config,
+            search_subtask=search,
+        )
+        deadline = time.time() + test_config.deadline_answer_reserve + 0.2
+
+        result = await asyncio.wait_for(
+            node({"question": "テスト質問", "deadline": deadline}),
+            timeout=2.0,
+        )
+        await asyncio.sleep(0)
+
+        assert cancelled == ["調査2"]
+        assert result["prefetched_results"][0] == "【目的: 調査1】\n調査1"
+
+
+class TestSpeculativeRetrieval:
+    """生の質問による先行検索のテスト"""
+
+    @pytest.mark.asyncio()
+    async def test_merged_without_duplicates(
+        self,
+        test_config: WorkflowConfig,
+    ) -> None:
+        """先行検索の結果がサブタスクの結果と重複なく統合されることを検証する。"""
+        planned = TaskPlanningResult(
+            subtasks=[Subtask(purpose="寿命の調査", queries=["軸受 寿命"])],
+        )
+        results = {
+            "テスト質問": ["チャンクA", "チャンクB"],
+            "軸受 寿命": ["チャンクA", "チャンクC"],
+        }
+
+        async def search(subtask: dict) -> list[SearchResult]:
+            return _results(*results[subtask["queries"][0]])
+
+        test_config.speculative_retrieval = True
+        node = create_task_planning_node(
+            _MockLLM(structured_response=planned),
+            test_config,
+            search_subtask=search,
+        )
+
+        result = await node({"question": "テスト質問"})
+
+        assert result["subtasks"][0]["purpose"] == "寿命の調査"
+        assert result["prefetched_results"] == [
+            "【目的: 寿命の調査】\nチャンクA\n---\nチャンクC",
+            "【目的: 質問全体（先行検索）】\nチャンクB",
+        ]
+
+    @pytest.mark.asyncio()
+    async def test_starts_before_planning_and_reused_on_timeout(
+        self,
+        test_config: WorkflowConfig,
+    ) -> None:
+        """先行検索がタスク分割より先に始まり、タイムアウト時に再利用されることを検証する。"""
+        searched: list[str] = []
+        searched_before_planning: list[str] = []
+
+        class _SlowLLM(_MockLLM):
+            async def agenerate_structured(self, *args, **kwargs) -> object:
+                await asyncio.sleep(0)
+                searched_before_planning.extend(searched)
+                await asyncio.sleep(999)
+
+        async def search(subtask: dict) -> list[SearchResult]:
+            searched.append(subtask["queries"][0])
+            return _results("チャンクA")
+
+        test_config.speculative_retrieval = True
+        test_config.structured_output_timeout = 0.05
+        node = create_task_planning_node(
+            _SlowLLM(),
+            test_config,
+            search_subtask=search,
+        )
+
+        result = await node({"question": "テスト質問"})
+
+        assert searched_before_planning == ["テスト質問"]
+        assert searched == ["テスト質問"]  # フォールバックで再検索しない
+        assert result["subtasks"][0]["purpose"] == "基本調査"
+        assert result["prefetched_results"] == ["【目的: 基本調査】\nチャンクA"]
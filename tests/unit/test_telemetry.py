@@ -0,0 +1,92 @@
+"""LLM テレメトリ集計のユニットテスト"""
+
+import asyncio
+
+import pytest
+
+from domain.ports.llm_port import LLMUsage
+from domain.telemetry import (
+    UNKNOWN_NODE,
+    RequestTelemetry,
+    current_node,
+    current_telemetry,
+    record_decision,
+    record_llm_usage,
+    traced_node,
+)
+
+
+def _usage(prompt: int, decode: int) -> LLMUsage:
+    return LLMUsage(
+        prompt_eval_count=prompt,
+        eval_count=decode,
+        prompt_eval_duration=prompt / 1000,
+        eval_duration=decode / 100,
+    )
+
+
+class TestRequestTelemetry:
+    """RequestTelemetry のテスト"""
+
+    def test_aggregates_per_node(self) -> None:
+        """ノードごと・リクエスト全体の集計を検証する。"""
+        telemetry = RequestTelemetry()
+
+        telemetry.record("summarize", _usage(1000, 200))
+        telemetry.record("summarize", _usage(500, 100))
+        telemetry.record("judge", _usage(300, 50))
+
+        summarize = telemetry.by_node["summarize"]
+        assert summarize.calls == 2
+        assert summarize.prompt_eval_count == 1500
+        assert summarize.eval_count == 300
+        assert telemetry.total.calls == 3
+        assert telemetry.total.prompt_eval_count == 1800
+        assert telemetry.total.eval_duration == pytest.approx(3.5)
+
+    def test_record_without_request_is_noop(self) -> None:
+        """リクエスト外での記録は無視されることを検証する。"""
+        assert current_telemetry.get() is None
+        record_llm_usage(_usage(10, 1))
+
+    def test_record_decision(self) -> None:
+        """分岐判断が実行中のリクエストに記録されることを検証する。"""
+        telemetry = RequestTelemetry()
+        token = current_telemetry.set(telemetry)
+        try:
+            record_decision("retrieval_fast_path", confidence=0.95, fast_path=True)
+        finally:
+            current_telemetry.reset(token)
+        record_decision("retrieval_fast_path", fast_path=False)
+
+        assert telemetry.decisions == [
+            {"name": "retrieval_fast_path", "confidence": 0.95, "fast_path": True},
+        ]
+
+
+class TestTracedNode:
+    """traced_node のテスト"""
+
+    @pytest.mark.asyncio()
+    async def test_usage_attributed_to_node(self) -> None:
+        """ノード実行中の記録がそのノード名で集計されることを検証する。"""
+
+        async def _node(state: dict) -> dict:
+            # タイムアウト付き呼び出し（別タスク）でもノード名を引き継ぐ
+            await asyncio.wait_for(_call_llm(), timeout=1.0)
+            return {}
+
+        async def _call_llm() -> None:
+            record_llm_usage(_usage(100, 10))
+
+        telemetry = RequestTelemetry()
+        token = current_telemetry.set(telemetry)
+        try:
+            await traced_node("judge", _node)({})
+            record_llm_usage(_usage(1, 1))
+        finally:
+            current_telemetry.reset(token)
+
+        assert telemetry.by_node["judge"].prompt_eval_count == 100
+        assert telemetry.by_node[UNKNOWN_NODE].calls == 1
+        assert current_node.get() == UNKNOWN_NODE
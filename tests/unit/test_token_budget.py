@@ -0,0 +1,67 @@
+"""トークン数の概算・予算配分のユニットテスト"""
+
+from domain.token_budget import (
+    estimate_tokens,
+    fit_texts,
+    select_bucket,
+    truncate_to_tokens,
+)
+
+
+class TestEstimateTokens:
+    """トークン数の概算のテスト"""
+
+    def test_japanese_and_ascii(self) -> None:
+        """日本語は1文字1トークン、ASCII は4文字1トークンで数えることを検証する。"""
+        assert estimate_tokens("軸受の寿命") == 5
+        assert estimate_tokens("bearing") == 2
+        assert estimate_tokens("") == 0
+
+    def test_truncate(self) -> None:
+        """切り詰めた結果が予算に収まることを検証する。"""
+        text = "振動試験" * 100
+
+        truncated = truncate_to_tokens(text, 50)
+
+        assert estimate_tokens(truncated) <= 50
+        assert text.startswith(truncated)
+        assert truncate_to_tokens("短い", 50) == "短い"
+
+
+class TestFitTexts:
+    """検索結果の予算配分のテスト"""
+
+    def test_all_fit(self) -> None:
+        """予算内なら全件をそのまま残すことを検証する。"""
+        texts = ["結果1", "結果2"]
+
+        assert fit_texts(texts, 100) == texts
+
+    def test_keeps_top_and_truncates_boundary(self) -> None:
+        """上位から詰め、境界のテキストを切り詰めて以降を捨てることを検証する。"""
+        texts = ["あ" * 100, "い" * 200, "う" * 100]
+
+        fitted = fit_texts(texts, 200)
+
+        assert fitted[0] == texts[0]
+        assert len(fitted) == 2
+        assert fitted[1].startswith("い")
+        assert sum(estimate_tokens(t) + 1 for t in fitted) <= 200
+
+    def test_small_remainder_dropped(self) -> None:
+        """残り予算が少なければ境界のテキストを含めないことを検証する。"""
+        texts = ["あ" * 100, "い" * 200]
+
+        assert fit_texts(texts, 110) == [texts[0]]
+
+
+class TestSelectBucket:
+    """num_ctx の区切り値選択のテスト"""
+
+    def test_smallest_fitting_bucket(self) -> None:
+        """必要量以上の最小の区切り値を選び、超える場合は最大値にすることを検証する。"""
+        buckets = [4096, 8192, 16384]
+
+        assert select_bucket(1000, buckets) == 4096
+        assert select_bucket(4097, buckets) == 8192
+        assert select_bucket(50000, buckets) == 16384
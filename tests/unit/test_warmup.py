@@ -0,0 +1,57 @@
+"""ModelWarmup のユニットテスト"""
+
+import threading
+
+from domain.warmup import ModelWarmup
+
+
+class TestModelWarmup:
+    """ウォームアップの実行と状態表示のテスト"""
+
+    def test_steps_run_in_order(self) -> None:
+        """登録したステップが順に実行され、完了状態になることを検証する。"""
+        calls: list[str] = []
+        warmup = ModelWarmup()
+        warmup.add_step("LLM", lambda: calls.append("LLM"))
+        warmup.add_step("Embedding", lambda: calls.append("Embedding"))
+
+        assert not warmup.ready
+        warmup.run()
+
+        assert calls == ["LLM", "Embedding"]
+        assert warmup.ready
+        assert warmup.status_message().startswith("✅")
+
+    def test_failed_step_does_not_block(self) -> None:
+        """失敗したステップがあっても残りを実行して完了することを検証する。"""
+        calls: list[str] = []
+
+        def fail() -> None:
+            raise RuntimeError("Ollama に接続できません")
+
+        warmup = ModelWarmup()
+        warmup.add_step("LLM", fail)
+        warmup.add_step("Reranker", lambda: calls.append("Reranker"))
+        warmup.run()
+
+        assert calls == ["Reranker"]
+        assert warmup.ready
+        assert warmup.failed == ["LLM"]
+        assert "LLM" in warmup.status_message()
+
+    def test_background_start(self) -> None:
+        """バックグラウンド実行中は未完了として表示され、完了を待てることを検証する。"""
+        release = threading.Event()
+        warmup = ModelWarmup()
+        warmup.add_step("LLM", release.wait)
+
+        thread = warmup.start()
+        assert warmup.start() is None  # 2回目は無視される
+        assert not warmup.ready
+        assert "LLM" in warmup.status_message()
+
+        release.set()
+        assert warmup.wait(timeout=5.0)
+        assert thread is not None
+        thread.join(timeout=5.0)
+        assert warmup.ready